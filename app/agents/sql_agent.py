@@ -4,17 +4,243 @@ Generates SQL queries using retrieved schema context
 Supports both Gemini and OpenRouter LLM providers
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import timedelta
 import asyncio
+import threading
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import caching as genai_caching
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from loguru import logger
-import requests
 
 from app.config import settings
 from app.database import db_manager
+from app.services.llm_transport import llm_transport
+from app.services.llm_router import llm_router
+from app.services.llm_usage import llm_usage
+from app.services.sql_template_registry import sql_template_registry
+from app.services.result_snapshots import result_snapshot_store, ResultSnapshot
+from app.services.prompt_budget import ContextItem, estimate_tokens, fit_context
+from app.services.history_compactor import FOLLOWUP_CONTEXT_MARKER, history_compactor, parse_followup_context
 from app.rag.chroma_manager import chroma_manager
 from app.rag.few_shot_manager import few_shot_manager
+from app.rag.embedding_context import EmbeddingContext
+
+
+# Follow-up ECode lists longer than this are passed to the LLM as a placeholder
+MAX_INLINE_ECODES = 100
+PREVIOUS_ECODES_PLACEHOLDER = "__PREVIOUS_RESULT_ECODES__"
+
+# Instruction block shared by every SQL-generation prompt. Built once at import and
+# kept first in the prompt so providers can cache it (see PROMPT_PREFIX_CACHING).
+SQL_PROMPT_STATIC_PREFIX = """You are an expert SQL query generator for SQL Server databases.
+
+Given the user's question, relevant SQL query examples, and database schema information, generate a precise SQL query.
+
+INSTRUCTIONS:
+1. Study the RELEVANT EXAMPLES in the request context to understand patterns and best practices
+2. Analyze the user's question carefully
+3. Use ONLY the tables and columns provided in the DATABASE SCHEMA CONTEXT of the request
+4. Generate a valid SQL Server query (T-SQL syntax) similar to the examples
+5. Use appropriate JOINs if multiple tables are needed
+6. DO NOT use TOP clause - return ALL results (frontend handles pagination)
+7. Use clear aliases for readability (e.g., e.Ecode, lp.ECode) to AVOID ambiguous column errors
+8. Format dates appropriately for SQL Server (GETDATE(), DATEADD, etc.)
+9. Ensure the query is safe and optimized
+10. ALWAYS include Ecode/primary key in SELECT results when querying people/employees/students
+    - This enables follow-up queries to filter on specific records
+    - Example: SELECT e.Ecode, e.EmpName, ... FROM vw_EmployeeMaster_Vms e WHERE ...
+
+[CRITICAL] VIEW-FIRST ARCHITECTURE - ALWAYS CHECK FOR VIEWS FIRST!
+
+[!!!] MANDATORY POLICY [!!!]
+Before writing ANY query, check if a VIEW exists that covers your requirements.
+90% of queries can be answered using the 9 critical views below.
+DO NOT manually JOIN base tables if a view already does it for you!
+
+===========================================================================
+
+**TIER 1 VIEWS - MUST USE FIRST** [5 STARS] (Priority: 5/5)
+
+1. **vw_EmployeeMaster_Vms** [5 STARS]
+   USE FOR: ANY employee query with department/section/branch
+   COLUMNS: Ecode, CorpEmpCode, EmpName, Dname, SecName, BranchName, CName, Active, DateofJoin
+   PRE-JOINS: 18 tables (EmployeeMaster + SectionMaster + DeptMaster + BranchMaster + ...)
+
+   [YES] ALWAYS USE FOR:
+   - "How many employees in each department?" -> SELECT Dname, COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY Dname
+   - "Show employees in IT department" -> SELECT * FROM vw_EmployeeMaster_Vms WHERE Active=1 AND Dname LIKE '%IT%'
+   - "Employee count by branch" -> SELECT BranchName, COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY BranchName
+   - "List all active employees" -> SELECT Ecode, EmpName, Dname, SecName FROM vw_EmployeeMaster_Vms WHERE Active=1
+
+   [NO] NEVER DO THIS:
+   SELECT e.*, d.Dname FROM EmployeeMaster e JOIN SectionMaster s ON e.SecCode=s.SecCode JOIN DeptMaster d ON s.Dcode=d.Dcode
+
+2. **vw_RawPunchDetail** [5 STARS]
+   USE FOR: Raw punch/swipe records only (NOT for late arrivals!)
+   COLUMNS: ATDate, ATTime, ECode, EmpName, Dname, MachineID, MachineName, InOut (1=IN, 0=OUT)
+   PRE-JOINS: MachineRawPunch + EmployeeMaster + MachineMaster + DeptMaster + SectionMaster
+   [!] WARNING: This view does NOT have InTime, OutTime, LateArrival, or WorkDuration columns!
+
+   [YES] USE FOR:
+   - "Show raw punches today" -> SELECT * FROM vw_RawPunchDetail WHERE ATDate = CAST(GETDATE() AS DATE)
+   - "Show all swipes for employee" -> SELECT * FROM vw_RawPunchDetail WHERE ECode = '123'
+
+   [NO] NEVER USE vw_RawPunchDetail FOR:
+   - Late arrival queries (use vw_CompleteAttendanceReport instead)
+   - Work hours queries (use vw_CompleteAttendanceReport instead)
+   - InTime/OutTime queries (use vw_CompleteAttendanceReport instead)
+
+3. **vw_CompleteAttendanceReport** [5 STARS] (CRITICAL FOR LATE ARRIVALS!)
+   USE FOR: Late arrivals, early departures, work hours, attendance status
+   COLUMNS: ATDate, CorpEmpCode, EmpName, Dname, InTime, OutTime, LateArrival (minutes), EarlyDeparture (minutes), WorkDuration (minutes), Status
+
+   [YES] ALWAYS USE FOR:
+   - "Who was late today?" -> SELECT CorpEmpCode, EmpName, Dname, InTime, LateArrival FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE) AND LateArrival > 0
+   - "Who left early?" -> SELECT CorpEmpCode, EmpName, OutTime, EarlyDeparture FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE) AND EarlyDeparture > 0
+   - "Show work hours" -> SELECT CorpEmpCode, EmpName, WorkDuration FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE)
+
+   [NO] NEVER DO THIS:
+   SELECT m.*, e.EmpName FROM MachineRawPunch m JOIN EmployeeMaster e ON m.ECode=e.Ecode
+
+4. **AllEmployeeUnion** [5 STARS]
+   USE FOR: Total employee count (active + deleted)
+   UNION OF: EmployeeMaster + EmployeeMaster_Deleted
+
+   [YES] ALWAYS USE FOR:
+   - "How many total employees?" -> SELECT COUNT(*) FROM AllEmployeeUnion WHERE Active=1
+   - "All employees (including deleted)" -> SELECT * FROM AllEmployeeUnion
+
+   [NO] NEVER DO THIS:
+   SELECT COUNT(*) FROM EmployeeMaster WHERE Active=1
+
+===========================================================================
+
+**TIER 2 VIEWS - DOMAIN-SPECIFIC** [4 STARS] (Priority: 3/5)
+
+4. **View_Visitor_EnrollmentDetail** [4 STARS]
+   USE FOR: Visitor management queries
+   Example: SELECT * FROM View_Visitor_EnrollmentDetail WHERE EnrollmentDate = CAST(GETDATE() AS DATE)
+
+5. **View_Contractor_Detail** [4 STARS]
+   USE FOR: Contractor information queries
+   Example: SELECT * FROM View_Contractor_Detail WHERE Active=1
+
+6. **View_Employee_Terminal_Authentication_Relation** [5 STARS] (CRITICAL FOR DEVICE DATA PUSH!)
+   USE FOR: Device data push queries, biometric access control, face access, fingerprint access
+   COLUMNS: Ecode, CorpEmpCode, EmpName, DomainName (device name), AuthenticationID, Status
+
+   [CRITICAL] AuthenticationID VALUES (MUST USE THESE!):
+   - AuthenticationID = 2: Fingerprint access
+   - AuthenticationID = 3: Card/Finger access
+   - AuthenticationID = 7: Face Only access (use this for "face access" queries!)
+   - AuthenticationID = 1001: REMOVED from device (use this for "removed" queries!)
+
+   [YES] ALWAYS USE FOR:
+   - "Who has face access?" -> WHERE AuthenticationID = 7
+   - "Which students have face access on SUBWAY?" -> WHERE AuthenticationID = 7 AND DomainName LIKE '%SUBWAY%'
+   - "Who is removed from devices?" -> WHERE AuthenticationID = 1001
+   - "Device data push queries" -> Use View_Employee_Terminal_Authentication_Relation
+
+   Example: SELECT DISTINCT CorpEmpCode, EmpName, DomainName FROM View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7 AND DomainName LIKE '%SUBWAY%'
+
+7. **View_EmployeeByUserGroupPolicy** [4 STARS]
+   USE FOR: User group/policy queries
+   Example: SELECT * FROM View_EmployeeByUserGroupPolicy WHERE GroupName='Admin'
+
+===========================================================================
+
+**TIER 3 VIEWS - SPECIALIZED** [3 STARS] (Priority: 2/5)
+
+8. **Vw_TerminalDetail_VMS** [3 STARS]
+   USE FOR: Terminal/device configuration queries
+   Example: SELECT * FROM Vw_TerminalDetail_VMS WHERE Status='Online'
+
+9. **vw_VisitorBasicDetail** [3 STARS]
+   USE FOR: Basic visitor lookup
+   Example: SELECT * FROM vw_VisitorBasicDetail WHERE VisitorName LIKE '%John%'
+
+===========================================================================
+
+[!!!] MANDATORY: FACE ACCESS QUERY PATTERN [!!!]
+
+When user asks about "face access", "who has face access", "face recognition access", "face data push":
+-> ALWAYS use View_Employee_Terminal_Authentication_Relation with AuthenticationID = 7
+
+[NO] WRONG - DO NOT DO THIS:
+SELECT * FROM View_FACE_V1  -- This is for biometric images, NOT access control!
+SELECT * FROM Biometric WHERE Format IN (250, 401)  -- Wrong table!
+
+[YES] CORRECT - ALWAYS DO THIS:
+SELECT CorpEmpCode, EmpName, DomainName FROM View_Employee_Terminal_Authentication_Relation
+WHERE AuthenticationID = 7  -- 7 = Face Only access
+
+===========================================================================
+
+[!!!] DEPRECATED TABLES - DO NOT USE [!!!]
+
+[NO] **EmpDepartRole** - EMPTY TABLE (0 rows)
+   Replacement: Use vw_EmployeeMaster_Vms (has Dname column)
+
+   [NO] WRONG: SELECT * FROM EmpDepartRole
+   [YES] CORRECT: SELECT * FROM vw_EmployeeMaster_Vms
+
+[NO] **View_FACE_V1** - This is for biometric IMAGES, NOT for access control!
+   DO NOT USE for "face access" queries!
+   Replacement: Use View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7
+
+   [NO] WRONG: SELECT * FROM View_FACE_V1 (this is biometric image data!)
+   [YES] CORRECT: SELECT * FROM View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7
+
+===========================================================================
+
+**CRITICAL EXAMPLES - LEARN FROM THESE:**
+
+Example 1: Department employee count
+[NO] WRONG: SELECT d.Dname, COUNT(e.Ecode) FROM EmployeeMaster e JOIN SectionMaster s ON e.SecCode=s.SecCode JOIN DeptMaster d ON s.Dcode=d.Dcode WHERE e.Active=1 GROUP BY d.Dname
+[YES] CORRECT: SELECT Dname, COUNT(*) AS EmployeeCount FROM dbo.vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY Dname ORDER BY EmployeeCount DESC
+
+Example 2: Today's attendance
+[NO] WRONG: SELECT m.ATDate, e.EmpName FROM MachineRawPunch m JOIN EmployeeMaster e ON m.ECode=e.Ecode WHERE m.ATDate=CAST(GETDATE() AS DATE)
+[YES] CORRECT: SELECT ATDate, EmpName, InTime, OutTime FROM dbo.vw_RawPunchDetail WHERE ATDate=CAST(GETDATE() AS DATE)
+
+Example 3: Active employee count
+[NO] WRONG: SELECT COUNT(*) FROM EmployeeMaster WHERE Active=1
+[YES] CORRECT: SELECT COUNT(*) FROM dbo.AllEmployeeUnion WHERE Active=1
+
+Example 4: FACE ACCESS QUERIES (MANDATORY PATTERN!)
+Question: "Which students have face access on SUBWAY devices?"
+[NO] WRONG: SELECT * FROM View_FACE_V1 (this is for biometric images!)
+[NO] WRONG: SELECT * FROM Employee_Terminal_Authentication_Relation (missing AuthenticationID filter!)
+[YES] CORRECT: SELECT v.CorpEmpCode, v.EmpName, v.DomainName FROM dbo.View_Employee_Terminal_Authentication_Relation v JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode WHERE v.AuthenticationID = 7 AND v.DomainName LIKE '%SUBWAY%' AND e.AccessType = 'Student'
+
+**FACE ACCESS = AuthenticationID = 7** (NEVER forget this filter!)
+
+CRITICAL COLUMN NAME RULES:
+[!] DO NOT hallucinate or invent column names that "sound right" but aren't in the schema!
+[!] Use EXACT column names from the schema context, even if they are abbreviated
+[!] Common mistakes to AVOID:
+   - DO NOT use "DeptCode" - the actual column is "SecCode" (Section/Department Code)
+   - DO NOT use "DeptName" - use the actual column names listed in the schema
+   - DO NOT use "EmployeeCode" - the actual column is "Ecode"
+   - DO NOT assume standard names - VERIFY each column exists in the schema
+[!] If the schema says "SecCode", use "SecCode" - do NOT rename it to "DepartmentCode"
+[!] Before writing SELECT/WHERE/GROUP BY, cross-check every column name against the schema
+
+IMPORTANT RULES:
+- Only return the SQL query, nothing else
+- Do NOT include markdown code blocks or explanations
+- Use SQL Server syntax (not MySQL or PostgreSQL)
+- Always validate column names against the schema provided
+- Follow the patterns shown in the relevant examples
+- PREFER VIEWS over manual table JOINs whenever possible
+
+===========================================================================
+REQUEST CONTEXT
+===========================================================================
+"""
 
 
 class RAGSQLAgent:
@@ -50,12 +276,39 @@ class RAGSQLAgent:
             self.model = genai.GenerativeModel(settings.gemini_model)
             logger.info(f"[SQL_AGENT] Using Gemini: {settings.gemini_model}")
 
+        # Set up the other provider too when its key is present, so the LLM
+        # router can hedge / fail over to it
+        self.secondary_providers: List[str] = []
+        if self.llm_provider == 'gemini' and getattr(settings, 'openrouter_api_key', ''):
+            self.openrouter_api_key = settings.openrouter_api_key
+            self.openrouter_model = getattr(settings, 'openrouter_model', 'tngtech/deepseek-r1t2-chimera:free')
+            self.openrouter_base_url = getattr(settings, 'openrouter_base_url', 'https://openrouter.ai/api/v1')
+            self.secondary_providers.append('openrouter')
+        elif self.llm_provider == 'openrouter' and settings.gemini_api_key:
+            genai.configure(api_key=settings.gemini_api_key)
+            self.model = genai.GenerativeModel(settings.gemini_model)
+            self.secondary_providers.append('gemini')
+
+        if self.secondary_providers:
+            logger.info(f"[SQL_AGENT] Secondary LLM providers: {', '.join(self.secondary_providers)}")
+
+        # Static prompt prefix: counted once here; its provider-side cache is created lazily
+        self.static_prefix_tokens = estimate_tokens(SQL_PROMPT_STATIC_PREFIX)
+        self._prefix_cache_lock = threading.Lock()
+        self._gemini_prefix_model = None
+        self._gemini_prefix_expires = 0.0
+        logger.info(
+            f"[SQL_AGENT] Static prompt prefix: {self.static_prefix_tokens} tokens "
+            f"(prefix caching: {settings.prompt_prefix_caching})"
+        )
+
     def _check_template_query(self, question: str) -> Optional[Dict[str, Any]]:
         """
         Check if the question matches a known pattern and return a pre-built SQL template.
 
         This method bypasses the LLM entirely for queries that require specific SQL patterns
-        that the LLM consistently fails to generate correctly.
+        that the LLM consistently fails to generate correctly. Templates are defined in
+        data/sql_templates.json (see app/services/sql_template_registry.py).
 
         Args:
             question: User's question
@@ -63,168 +316,7 @@ class RAGSQLAgent:
         Returns:
             Dict with sql_query and other info if template matches, None otherwise
         """
-        import re
-        question_lower = question.lower()
-
-        # FACE ACCESS query detection
-        face_keywords = ['face access', 'face recognition access', 'face data push',
-                         'who has face', 'facial access', 'face only access',
-                         'face authentication']
-
-        if any(kw in question_lower for kw in face_keywords):
-            logger.info(f"[TEMPLATE] Detected face access query - using direct SQL template")
-
-            # Extract device/domain filter if mentioned (e.g., "SUBWAY", "MAIN GATE")
-            domain_filter = ""
-            domain_patterns = [
-                r'on\s+(\w+)\s+devices?',  # "on SUBWAY devices"
-                r'(\w+)\s+device(?:s)?',    # "SUBWAY devices"
-                r'at\s+(\w+)',              # "at SUBWAY"
-            ]
-            for pattern in domain_patterns:
-                match = re.search(pattern, question, re.IGNORECASE)
-                if match:
-                    domain = match.group(1)
-                    if domain.lower() not in ['the', 'all', 'any', 'which', 'what']:
-                        domain_filter = f"AND v.DomainName LIKE '%{domain}%'"
-                        break
-
-            # Extract role filter if mentioned (student, staff, employee)
-            role_filter = ""
-            if 'student' in question_lower:
-                role_filter = "AND e.AccessType = 'Student'"
-            elif 'staff' in question_lower or 'employee' in question_lower:
-                role_filter = "AND e.AccessType IN ('Staff', 'Employee')"
-
-            # Build WHERE clause conditions
-            conditions = ["v.AuthenticationID = 7"]
-            if domain_filter:
-                conditions.append(domain_filter.replace("AND ", ""))
-            if role_filter:
-                conditions.append(role_filter.replace("AND ", ""))
-            conditions.append("e.Active = 1")
-
-            # Build the correct SQL query
-            where_clause = "\n    AND ".join(conditions)
-            sql_query = f"""SELECT DISTINCT v.CorpEmpCode, v.EmpName, v.DomainName
-FROM dbo.View_Employee_Terminal_Authentication_Relation v
-JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode
-WHERE {where_clause}
-ORDER BY v.EmpName"""
-
-            return {
-                "sql_query": sql_query.strip(),
-                "explanation": "Generated using face access template (AuthenticationID = 7)",
-                "context_used": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "tables_referenced": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "template_used": "face_access"
-            }
-
-        # FINGERPRINT ACCESS query detection
-        fingerprint_keywords = ['fingerprint access', 'finger access', 'fingerprint data push']
-        if any(kw in question_lower for kw in fingerprint_keywords):
-            logger.info(f"[TEMPLATE] Detected fingerprint access query - using direct SQL template")
-
-            domain_filter = ""
-            for pattern in [r'on\s+(\w+)\s+devices?', r'(\w+)\s+device(?:s)?']:
-                match = re.search(pattern, question, re.IGNORECASE)
-                if match:
-                    domain = match.group(1)
-                    if domain.lower() not in ['the', 'all', 'any', 'which', 'what']:
-                        domain_filter = f"AND v.DomainName LIKE '%{domain}%'"
-                        break
-
-            # Build WHERE clause conditions
-            conditions = ["v.AuthenticationID = 2"]
-            if domain_filter:
-                conditions.append(domain_filter.replace("AND ", ""))
-            conditions.append("e.Active = 1")
-
-            where_clause = "\n    AND ".join(conditions)
-            sql_query = f"""SELECT DISTINCT v.CorpEmpCode, v.EmpName, v.DomainName
-FROM dbo.View_Employee_Terminal_Authentication_Relation v
-JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode
-WHERE {where_clause}
-ORDER BY v.EmpName"""
-
-            return {
-                "sql_query": sql_query.strip(),
-                "explanation": "Generated using fingerprint access template (AuthenticationID = 2)",
-                "context_used": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "tables_referenced": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "template_used": "fingerprint_access"
-            }
-
-        # CARD ACCESS query detection
-        card_keywords = ['card access', 'card/finger access', 'card and finger']
-        if any(kw in question_lower for kw in card_keywords):
-            logger.info(f"[TEMPLATE] Detected card access query - using direct SQL template")
-
-            domain_filter = ""
-            for pattern in [r'on\s+(\w+)\s+devices?', r'(\w+)\s+device(?:s)?']:
-                match = re.search(pattern, question, re.IGNORECASE)
-                if match:
-                    domain = match.group(1)
-                    if domain.lower() not in ['the', 'all', 'any', 'which', 'what']:
-                        domain_filter = f"AND v.DomainName LIKE '%{domain}%'"
-                        break
-
-            # Build WHERE clause conditions
-            conditions = ["v.AuthenticationID = 3"]
-            if domain_filter:
-                conditions.append(domain_filter.replace("AND ", ""))
-            conditions.append("e.Active = 1")
-
-            where_clause = "\n    AND ".join(conditions)
-            sql_query = f"""SELECT DISTINCT v.CorpEmpCode, v.EmpName, v.DomainName
-FROM dbo.View_Employee_Terminal_Authentication_Relation v
-JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode
-WHERE {where_clause}
-ORDER BY v.EmpName"""
-
-            return {
-                "sql_query": sql_query.strip(),
-                "explanation": "Generated using card access template (AuthenticationID = 3)",
-                "context_used": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "tables_referenced": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "template_used": "card_access"
-            }
-
-        # REMOVED FROM DEVICE query detection
-        removed_keywords = ['removed from device', 'data removed', 'removed data push']
-        if any(kw in question_lower for kw in removed_keywords):
-            logger.info(f"[TEMPLATE] Detected removed from device query - using direct SQL template")
-
-            domain_filter = ""
-            for pattern in [r'on\s+(\w+)\s+devices?', r'(\w+)\s+device(?:s)?']:
-                match = re.search(pattern, question, re.IGNORECASE)
-                if match:
-                    domain = match.group(1)
-                    if domain.lower() not in ['the', 'all', 'any', 'which', 'what']:
-                        domain_filter = f"AND v.DomainName LIKE '%{domain}%'"
-                        break
-
-            # Build WHERE clause conditions
-            conditions = ["v.AuthenticationID = 1001"]
-            if domain_filter:
-                conditions.append(domain_filter.replace("AND ", ""))
-
-            where_clause = "\n    AND ".join(conditions)
-            sql_query = f"""SELECT DISTINCT v.CorpEmpCode, v.EmpName, v.DomainName
-FROM dbo.View_Employee_Terminal_Authentication_Relation v
-JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode
-WHERE {where_clause}
-ORDER BY v.EmpName"""
-
-            return {
-                "sql_query": sql_query.strip(),
-                "explanation": "Generated using removed from device template (AuthenticationID = 1001)",
-                "context_used": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "tables_referenced": ["View_Employee_Terminal_Authentication_Relation", "vw_EmployeeMaster_Vms"],
-                "template_used": "removed_from_device"
-            }
-
-        return None
+        return sql_template_registry.match(question)
 
     def _is_followup_query(self, question: str) -> bool:
         """
@@ -258,7 +350,7 @@ ORDER BY v.EmpName"""
 
         return False
 
-    def _extract_ecodes_from_previous_sql(self, previous_sql: str) -> Optional[List[str]]:
+    def _extract_ecodes_from_previous_sql(self, previous_sql: str) -> Tuple[Optional[List[str]], Optional[str]]:
         """
         Transform a previous aggregation SQL query to extract the underlying ECodes.
 
@@ -270,7 +362,8 @@ ORDER BY v.EmpName"""
             previous_sql: The previous SQL query (usually an aggregation)
 
         Returns:
-            List of ECodes extracted by executing modified query, or None if failed
+            (ECodes extracted by executing the modified query, or None if failed;
+            the modified query when it can be nested as a subquery, else None)
         """
         import re
 
@@ -286,7 +379,7 @@ ORDER BY v.EmpName"""
 
             if not is_aggregation:
                 logger.info("[ECODE_EXTRACT] Previous query is not an aggregation, skipping")
-                return None
+                return None, None
 
             # Strategy 1: Query has CTE (WITH ... AS ...)
             if 'WITH ' in sql_upper and ' AS ' in sql_upper:
@@ -327,7 +420,7 @@ ORDER BY v.EmpName"""
 
                                     if ecodes:
                                         logger.info(f"[ECODE_EXTRACT] Successfully extracted {len(ecodes)} ECodes")
-                                        return ecodes
+                                        return ecodes, None
                             except Exception as e:
                                 logger.debug(f"[ECODE_EXTRACT] Failed with {ecode_col}: {e}")
                                 continue
@@ -364,17 +457,17 @@ ORDER BY v.EmpName"""
 
                                 if ecodes:
                                     logger.info(f"[ECODE_EXTRACT] Successfully extracted {len(ecodes)} ECodes")
-                                    return ecodes
+                                    return ecodes, modified_sql
                         except Exception as e:
                             logger.debug(f"[ECODE_EXTRACT] Failed with {ecode_expr}: {e}")
                             continue
 
             logger.warning("[ECODE_EXTRACT] Could not extract ECodes from previous query")
-            return None
+            return None, None
 
         except Exception as e:
             logger.error(f"[ECODE_EXTRACT] Error extracting ECodes: {e}")
-            return None
+            return None, None
 
     def _get_previous_context(self, conversation_history: Optional[List[Dict]]) -> Dict[str, Any]:
         """
@@ -396,16 +489,8 @@ ORDER BY v.EmpName"""
 
             content = msg.get("message_content", "")
 
-            if "---CONTEXT_FOR_FOLLOWUP---" in content:
-                parts = content.split("---CONTEXT_FOR_FOLLOWUP---")
-                context_part = parts[1] if len(parts) > 1 else ""
-
-                for line in context_part.split("\n"):
-                    line = line.strip()
-                    if line.startswith("[SQL_QUERY]:"):
-                        last_sql_query = line.replace("[SQL_QUERY]:", "").strip()
-                    elif line.startswith("[RESULT_IDS]:"):
-                        last_result_ids = line.replace("[RESULT_IDS]:", "").strip()
+            if FOLLOWUP_CONTEXT_MARKER in content:
+                _, last_sql_query, last_result_ids, _ = parse_followup_context(content)
 
                 # Found context, stop searching
                 break
@@ -416,6 +501,80 @@ ORDER BY v.EmpName"""
             'has_context': bool(last_result_ids or last_sql_query)
         }
 
+    def _answer_from_snapshot(self, question: str, snapshot: ResultSnapshot) -> Optional[Dict[str, Any]]:
+        """
+        Answer a follow-up by filtering the previous result in memory.
+
+        Only used when the follow-up restricts the previous rows by values
+        they already contain ("which of them are in IT"); anything that needs
+        new columns or conditions goes through the LLM.
+
+        Args:
+            question: Follow-up question
+            snapshot: The session's previous result
+
+        Returns:
+            Dict with sql_query and the filtered results, or None
+        """
+        filters = snapshot.match_filters(question)
+        if not filters:
+            return None
+
+        results = snapshot.filter_rows(filters)
+        logger.info(
+            f"[SQL_AGENT] Answered follow-up from previous result: {filters} "
+            f"({len(results)} of {snapshot.row_count} rows)"
+        )
+        return {
+            "sql_query": snapshot.filtered_sql(filters),
+            "explanation": f"Filtered the previous {snapshot.row_count} results in memory",
+            "context_used": [],
+            "tables_referenced": [],
+            "results": results,
+            "answered_from_snapshot": True,
+        }
+
+    def _limit_prefetched_ecodes(
+        self,
+        prefetched_ecodes: Optional[List[str]],
+        ecode_subquery: Optional[str]
+    ) -> Tuple[Optional[List[str]], Optional[str]]:
+        """
+        Keep a follow-up ECode list only if it can reach SQL Server safely
+
+        Lists above RESULT_SNAPSHOT_MAX_INLINE_KEYS are filtered through the
+        previous query as a subquery instead of an IN (...) literal list (large
+        literal lists fail with errors 8623 / 8632). Without a subquery to fall
+        back to, the list is dropped and the LLM works from the history instead.
+
+        Returns:
+            (prefetched_ecodes, ecode_subquery to expand the placeholder with, or None)
+        """
+        if not prefetched_ecodes or len(prefetched_ecodes) <= settings.result_snapshot_max_inline_keys:
+            return prefetched_ecodes, None
+        if ecode_subquery:
+            logger.info(f"[SQL_AGENT] {len(prefetched_ecodes)} ECodes - filtering through the previous query")
+            return prefetched_ecodes, ecode_subquery
+        logger.warning(
+            f"[SQL_AGENT] {len(prefetched_ecodes)} ECodes and no subquery to filter through, "
+            "LLM will handle context"
+        )
+        return None, None
+
+    def _expand_ecode_placeholder(
+        self,
+        sql_query: str,
+        prefetched_ecodes: Optional[List[str]],
+        ecode_subquery: Optional[str] = None
+    ) -> str:
+        """Replace the follow-up ECode placeholder with the quoted ID list (or the previous query)"""
+        if not prefetched_ecodes or PREVIOUS_ECODES_PLACEHOLDER not in sql_query:
+            return sql_query
+        if ecode_subquery:
+            return sql_query.replace(PREVIOUS_ECODES_PLACEHOLDER, ecode_subquery)
+        ecodes_str = ", ".join("'{}'".format(e.strip().replace("'", "''")) for e in prefetched_ecodes)
+        return sql_query.replace(PREVIOUS_ECODES_PLACEHOLDER, ecodes_str)
+
     def _preprocess_question(self, question: str) -> str:
         """
         Preprocess question to add hints for specific query patterns.
@@ -436,7 +595,8 @@ ORDER BY v.EmpName"""
         question: str,
         tenant_id: str = "default",
         user_id: str = "system",
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate SQL query from natural language question using RAG
@@ -446,9 +606,11 @@ ORDER BY v.EmpName"""
             tenant_id: Tenant identifier
             user_id: User identifier
             conversation_history: Optional list of previous conversation messages for context
+            session_id: Conversation session, used to reuse the previous result for follow-ups
 
         Returns:
             Dict with keys: 'sql_query', 'explanation', 'context_used'
+            (plus 'results' when a follow-up was answered from the previous result)
 
         Example:
             result = agent.generate_sql("How many employees joined last month?")
@@ -460,6 +622,7 @@ ORDER BY v.EmpName"""
 
         # Pre-fetched ECodes for follow-up queries (deterministic approach)
         prefetched_ecodes = None
+        ecode_subquery = None
 
         try:
             # Step 0: Check for template-based queries (bypass LLM for known patterns)
@@ -478,9 +641,23 @@ ORDER BY v.EmpName"""
             if conversation_history and self._is_followup_query(question):
                 logger.info("[SQL_AGENT] Detected follow-up query, checking for pre-fetch opportunity...")
 
+                # The session's previous result answers most follow-ups without a round trip
+                # (only if it is the result of the latest answer, not an older turn)
+                snapshot = result_snapshot_store.get_current(session_id, user_id, conversation_history)
+                if snapshot is not None:
+                    local_result = self._answer_from_snapshot(question, snapshot)
+                    if local_result:
+                        result_snapshot_store.record_use(local_answer=True)
+                        return local_result
+                    prefetched_ecodes = snapshot.key_values()
+                    ecode_subquery = snapshot.key_subquery()
+                    if prefetched_ecodes:
+                        result_snapshot_store.record_use(local_answer=False)
+                        logger.info(f"[SQL_AGENT] Using {len(prefetched_ecodes)} ECodes from previous result")
+
                 prev_context = self._get_previous_context(conversation_history)
 
-                if prev_context['has_context']:
+                if not prefetched_ecodes and prev_context['has_context']:
                     if prev_context['result_ids']:
                         # Already have ECodes from previous query
                         prefetched_ecodes = prev_context['result_ids'].split(',')
@@ -488,20 +665,24 @@ ORDER BY v.EmpName"""
                     elif prev_context['sql_query']:
                         # Previous query was aggregation - need to pre-fetch ECodes
                         logger.info("[SQL_AGENT] Previous query was aggregation, pre-fetching ECodes...")
-                        prefetched_ecodes = self._extract_ecodes_from_previous_sql(prev_context['sql_query'])
+                        prefetched_ecodes, ecode_subquery = self._extract_ecodes_from_previous_sql(prev_context['sql_query'])
                         if prefetched_ecodes:
                             logger.info(f"[SQL_AGENT] Pre-fetched {len(prefetched_ecodes)} ECodes from previous query")
                         else:
                             logger.warning("[SQL_AGENT] Could not pre-fetch ECodes, LLM will handle context")
 
+                prefetched_ecodes, ecode_subquery = self._limit_prefetched_ecodes(prefetched_ecodes, ecode_subquery)
+
             # Step 1: Retrieve relevant few-shot examples
             logger.info("[SQL_AGENT] Step 1: Retrieving few-shot examples...")
-            few_shot_examples = self._retrieve_few_shot_examples(enhanced_question)
+            # Embed the question once per model; both retrievers share the vector
+            embedding_context = EmbeddingContext(enhanced_question)
+            few_shot_examples = self._retrieve_few_shot_examples(enhanced_question, embedding_context=embedding_context)
             logger.info(f"[SQL_AGENT] Step 1 complete: {len(few_shot_examples)} examples")
 
             # Step 2: Retrieve relevant schema context using RAG
             logger.info("[SQL_AGENT] Step 2: Retrieving schema context...")
-            schema_context = self._retrieve_schema_context(enhanced_question)
+            schema_context = self._retrieve_schema_context(enhanced_question, embedding_context=embedding_context)
             logger.info(f"[SQL_AGENT] Step 2 complete: {len(schema_context['documents'])} schemas")
 
             # Step 3: Build prompt with examples, schema context, conversation history, and pre-fetched ECodes
@@ -516,6 +697,7 @@ ORDER BY v.EmpName"""
 
             # Step 4: Clean and validate SQL
             sql_query = self._clean_sql(sql_query)
+            sql_query = self._expand_ecode_placeholder(sql_query, prefetched_ecodes, ecode_subquery)
 
             logger.info(f"[OK] Generated SQL: {sql_query[:100]}...")
 
@@ -539,7 +721,8 @@ ORDER BY v.EmpName"""
         question: str,
         tenant_id: str = "default",
         user_id: str = "system",
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         PERFORMANCE OPTIMIZED: Async version of generate_sql.
@@ -552,6 +735,7 @@ ORDER BY v.EmpName"""
             tenant_id: Tenant identifier
             user_id: User identifier
             conversation_history: Optional list of previous conversation messages
+            session_id: Conversation session, used to reuse the previous result for follow-ups
 
         Returns:
             Dict with keys: 'sql_query', 'explanation', 'context_used'
@@ -561,6 +745,7 @@ ORDER BY v.EmpName"""
             logger.debug(f"[SQL_AGENT] Using {len(conversation_history)} messages from conversation history")
 
         prefetched_ecodes = None
+        ecode_subquery = None
 
         try:
             # Step 0: Check for template-based queries (bypass LLM for known patterns)
@@ -577,25 +762,39 @@ ORDER BY v.EmpName"""
             # Step 0c: Pre-fetch ECodes for follow-up queries
             if conversation_history and self._is_followup_query(question):
                 logger.info("[SQL_AGENT] Detected follow-up query, checking for pre-fetch opportunity...")
+                snapshot = result_snapshot_store.get_current(session_id, user_id, conversation_history)
+                if snapshot is not None:
+                    local_result = self._answer_from_snapshot(question, snapshot)
+                    if local_result:
+                        result_snapshot_store.record_use(local_answer=True)
+                        return local_result
+                    prefetched_ecodes = snapshot.key_values()
+                    ecode_subquery = snapshot.key_subquery()
+                    if prefetched_ecodes:
+                        result_snapshot_store.record_use(local_answer=False)
+                        logger.info(f"[SQL_AGENT] Using {len(prefetched_ecodes)} ECodes from previous result")
                 prev_context = self._get_previous_context(conversation_history)
-                if prev_context['has_context']:
+                if not prefetched_ecodes and prev_context['has_context']:
                     if prev_context['result_ids']:
                         prefetched_ecodes = prev_context['result_ids'].split(',')
                         logger.info(f"[SQL_AGENT] Using stored ECodes: {len(prefetched_ecodes)} IDs")
                     elif prev_context['sql_query']:
                         logger.info("[SQL_AGENT] Previous query was aggregation, pre-fetching ECodes...")
-                        prefetched_ecodes = self._extract_ecodes_from_previous_sql(prev_context['sql_query'])
+                        prefetched_ecodes, ecode_subquery = self._extract_ecodes_from_previous_sql(prev_context['sql_query'])
                         if prefetched_ecodes:
                             logger.info(f"[SQL_AGENT] Pre-fetched {len(prefetched_ecodes)} ECodes")
+                prefetched_ecodes, ecode_subquery = self._limit_prefetched_ecodes(prefetched_ecodes, ecode_subquery)
 
             # Step 1: Retrieve few-shot examples (sync but fast - in-memory FAISS)
             logger.info("[SQL_AGENT] Step 1: Retrieving few-shot examples...")
-            few_shot_examples = self._retrieve_few_shot_examples(enhanced_question)
+            # Embed the question once per model; both retrievers share the vector
+            embedding_context = EmbeddingContext(enhanced_question)
+            few_shot_examples = self._retrieve_few_shot_examples(enhanced_question, embedding_context=embedding_context)
             logger.info(f"[SQL_AGENT] Step 1 complete: {len(few_shot_examples)} examples")
 
             # Step 2: Retrieve schema context (sync but fast - local ChromaDB)
             logger.info("[SQL_AGENT] Step 2: Retrieving schema context...")
-            schema_context = self._retrieve_schema_context(enhanced_question)
+            schema_context = self._retrieve_schema_context(enhanced_question, embedding_context=embedding_context)
             logger.info(f"[SQL_AGENT] Step 2 complete: {len(schema_context['documents'])} schemas")
 
             # Step 3: Build prompt
@@ -610,6 +809,7 @@ ORDER BY v.EmpName"""
 
             # Step 5: Clean and validate SQL
             sql_query = self._clean_sql(sql_query)
+            sql_query = self._expand_ecode_placeholder(sql_query, prefetched_ecodes, ecode_subquery)
             logger.info(f"[SQL_AGENT] Generated SQL: {sql_query[:100]}...")
 
             return {
@@ -627,13 +827,19 @@ ORDER BY v.EmpName"""
             logger.error(f"[SQL_AGENT] SQL generation (async) failed: {str(e)}")
             raise
 
-    def _retrieve_schema_context(self, question: str, n_results: int = 10) -> Dict[str, Any]:
+    def _retrieve_schema_context(
+        self,
+        question: str,
+        n_results: int = 10,
+        embedding_context: Optional[EmbeddingContext] = None
+    ) -> Dict[str, Any]:
         """
         Retrieve relevant schema information from vector store
 
         Args:
             question: User's question
             n_results: Number of schema results to retrieve
+            embedding_context: Request-scoped question embeddings
 
         Returns:
             Dict with documents, metadatas, and distances
@@ -643,7 +849,8 @@ ORDER BY v.EmpName"""
         try:
             results = chroma_manager.query_schemas(
                 query_text=question,
-                n_results=n_results
+                n_results=n_results,
+                embedding_context=embedding_context
             )
 
             logger.info(f"[OK] Retrieved {len(results['documents'])} schema contexts")
@@ -658,13 +865,19 @@ ORDER BY v.EmpName"""
                 "distances": []
             }
 
-    def _retrieve_few_shot_examples(self, question: str, n_results: int = 3) -> List[Dict[str, Any]]:
+    def _retrieve_few_shot_examples(
+        self,
+        question: str,
+        n_results: int = 3,
+        embedding_context: Optional[EmbeddingContext] = None
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant few-shot examples from vector store
 
         Args:
             question: User's question
             n_results: Number of examples to retrieve (default: 3)
+            embedding_context: Request-scoped question embeddings
 
         Returns:
             List of relevant example dictionaries
@@ -674,7 +887,8 @@ ORDER BY v.EmpName"""
         try:
             examples = few_shot_manager.get_relevant_examples(
                 question=question,
-                n_results=n_results
+                n_results=n_results,
+                embedding_context=embedding_context
             )
 
             logger.info(f"[OK] Retrieved {len(examples)} few-shot examples")
@@ -694,7 +908,11 @@ ORDER BY v.EmpName"""
         prefetched_ecodes: Optional[List[str]] = None
     ) -> str:
         """
-        Build comprehensive prompt with question, few-shot examples, retrieved schema, and conversation history
+        Build the SQL prompt: static instruction prefix + budgeted request context
+
+        Schema documents and few-shot examples are selected in retrieval-rank
+        order under PROMPT_CONTEXT_TOKEN_BUDGET; the follow-up filter,
+        conversation history and question are always included.
 
         Args:
             question: User's question
@@ -704,17 +922,20 @@ ORDER BY v.EmpName"""
             prefetched_ecodes: Optional list of ECodes pre-fetched from previous query for follow-up filtering
 
         Returns:
-            Complete prompt for Gemini
+            Complete prompt (starts with SQL_PROMPT_STATIC_PREFIX)
         """
-        prompt = f"""You are an expert SQL query generator for SQL Server databases.
+        filter_block = ""
 
-Given the user's question, relevant SQL query examples, and database schema information, generate a precise SQL query.
-"""
-
-        # CRITICAL: If we have pre-fetched ECodes, inject MANDATORY filter instruction at the top
+        # CRITICAL: If we have pre-fetched ECodes, inject MANDATORY filter instruction first
         if prefetched_ecodes and len(prefetched_ecodes) > 0:
-            ecodes_str = ", ".join([f"'{e.strip()}'" for e in prefetched_ecodes[:100]])  # Limit to 100
-            prompt += f"""
+            placeholder_note = ""
+            if len(prefetched_ecodes) > MAX_INLINE_ECODES:
+                # Too many to inline - the placeholder is expanded after generation
+                ecodes_str = PREVIOUS_ECODES_PLACEHOLDER
+                placeholder_note = f"Write {PREVIOUS_ECODES_PLACEHOLDER} exactly as shown - it is replaced with the full ID list.\n"
+            else:
+                ecodes_str = ", ".join([f"'{e.strip()}'" for e in prefetched_ecodes])
+            filter_block = f"""
 [!!!] MANDATORY FILTER - DO NOT IGNORE [!!!]
 
 This is a FOLLOW-UP QUERY. The user is asking about specific records from a previous query.
@@ -728,46 +949,61 @@ OR if using a different table alias:
 
 This filter is NON-NEGOTIABLE. Without it, your query will return wrong results.
 The user asked about {len(prefetched_ecodes)} specific record(s) from their previous query.
-
+{placeholder_note}
 [!!!] END MANDATORY FILTER [!!!]
 
 """
 
-        # Add few-shot examples if available
-        if few_shot_examples:
-            import sys
-            print(f"DEBUG: Adding {len(few_shot_examples)} few-shot examples", file=sys.stderr)
-            logger.info(f"Adding {len(few_shot_examples)} few-shot examples to prompt")
-            prompt += "\n" + few_shot_manager.format_examples_for_prompt(few_shot_examples)
-
-        # Add retrieved schema context
-        prompt += "\nDATABASE SCHEMA CONTEXT:\n"
-        import sys
-        print(f"DEBUG: Adding {len(schema_context['documents'])} schema docs", file=sys.stderr)
-        logger.info(f"Adding {len(schema_context['documents'])} schema documents to prompt")
-        for i, doc in enumerate(schema_context["documents"], 1):
-            prompt += f"\n{i}. {doc}\n"
-            # Log the first few lines of each doc to verify it's a view
-            print(f"DEBUG: Schema Doc {i}: {doc[:100]}...", file=sys.stderr)
+        # Retrieved context competes for the token budget, most relevant first
+        documents = schema_context.get("documents") or []
+        distances = schema_context.get("distances") or []
+        candidates = [
+            ContextItem("schema", doc, distances[i] if i < len(distances) else float(i), payload=doc)
+            for i, doc in enumerate(documents)
+        ]
+        for i, example in enumerate(few_shot_examples or []):
+            candidates.append(ContextItem(
+                "example",
+                f"Question: {example.get('question')}\nSQL: {example.get('sql')}\n"
+                f"Explanation: {example.get('explanation')}\n",
+                example.get("similarity_score", float(i)),
+                payload=example,
+            ))
+        kept, _ = fit_context(candidates, settings.prompt_context_token_budget)
+        kept_examples = [item.payload for item in kept if item.kind == "example"]
+        kept_documents = [item.payload for item in kept if item.kind == "schema"]
+
+        context_block = ""
+        if kept_examples:
+            context_block += "\n" + few_shot_manager.format_examples_for_prompt(kept_examples)
+
+        context_block += "\nDATABASE SCHEMA CONTEXT:\n"
+        for i, doc in enumerate(kept_documents, 1):
+            context_block += f"\n{i}. {doc}\n"
             logger.debug(f"Schema Doc {i}: {doc[:100]}...")
 
-        # Add conversation history if available
+        # Conversation history (outside the context budget): older turns folded
+        # into the session's rolling digest, the last few verbatim
+        history_block = ""
         if conversation_history and len(conversation_history) > 0:
-            prompt += "\n\nCONVERSATION HISTORY:\n"
-            prompt += "Below is the recent conversation history. When the user uses pronouns like 'them', 'those', 'it', or refers to previous queries, check this history for context.\n"
-            prompt += "IMPORTANT: Pay attention to which tables/views were used in previous queries to maintain consistency.\n"
-            prompt += "CRITICAL: If the user asks about 'them' or 'those', use the RESULT_IDS from the previous query to filter with WHERE Ecode IN (...).\n\n"
+            compact = history_compactor.compact(conversation_history)
+            history_block += "\n\nCONVERSATION HISTORY:\n"
+            history_block += "Below is the recent conversation history. When the user uses pronouns like 'them', 'those', 'it', or refers to previous queries, check this history for context.\n"
+            history_block += "IMPORTANT: Pay attention to which tables/views were used in previous queries to maintain consistency.\n"
+            history_block += "CRITICAL: If the user asks about 'them' or 'those', use the RESULT_IDS from the previous query to filter with WHERE Ecode IN (...).\n\n"
+
+            history_block += compact.render_digest()
 
             # Track the most recent result IDs for follow-up queries
             last_result_ids = None
             last_sql_query = None
 
-            for msg in conversation_history:
+            for msg in compact.recent:
                 msg_type = msg.get("message_type", "")
                 content = msg.get("message_content", "")
 
                 if msg_type == "user":
-                    prompt += f"USER: {content}\n"
+                    history_block += f"USER: {content}\n"
                 elif msg_type == "assistant":
                     # Parse the enriched content format
                     # Format: answer_text\n\n---CONTEXT_FOR_FOLLOWUP---\n[SQL_QUERY]: ...\n[RESULT_IDS]: ...\n[RESULT_COUNT]: ...
@@ -801,266 +1037,96 @@ The user asked about {len(prefetched_ecodes)} specific record(s) from their prev
                                     break
 
                     # Show answer summary (first 200 chars)
-                    prompt += f"ASSISTANT: {answer_part[:200]}{'...' if len(answer_part) > 200 else ''}\n"
+                    history_block += f"ASSISTANT: {answer_part[:200]}{'...' if len(answer_part) > 200 else ''}\n"
                     if sql_query:
-                        prompt += f"  SQL USED: {sql_query}\n"
+                        history_block += f"  SQL USED: {sql_query}\n"
                     if result_ids:
                         # Show the IDs from previous query results
                         ids_list = result_ids.split(",")
-                        prompt += f"  RESULT IDS (ECodes): {result_ids} ({len(ids_list)} records)\n"
-                    prompt += "\n"
+                        history_block += f"  RESULT IDS (ECodes): {result_ids} ({len(ids_list)} records)\n"
+                    history_block += "\n"
+
+            # No query among the verbatim turns - fall back to the latest folded one
+            if not (last_result_ids or last_sql_query) and compact.last_fact():
+                last_result_ids = compact.last_fact().result_ids
+                last_sql_query = compact.last_fact().sql_query
 
             # Add explicit instructions for using previous result IDs
-            prompt += "\n[CRITICAL] FOLLOW-UP QUERY INSTRUCTIONS:\n"
-            prompt += "1. Check conversation history to understand what 'them', 'those', 'it', 'these' refers to\n"
-            prompt += "2. If RESULT_IDS are shown above from a previous query, you MUST filter your new query using:\n"
-            prompt += "   WHERE e.Ecode IN (id1, id2, id3, ...) -- Always use table alias!\n"
-            prompt += "   This ensures you query ONLY the records from the previous result set!\n"
+            history_block += "\n[CRITICAL] FOLLOW-UP QUERY INSTRUCTIONS:\n"
+            history_block += "1. Check conversation history to understand what 'them', 'those', 'it', 'these' refers to\n"
+            history_block += "2. If RESULT_IDS are shown above from a previous query, you MUST filter your new query using:\n"
+            history_block += "   WHERE e.Ecode IN (id1, id2, id3, ...) -- Always use table alias!\n"
+            history_block += "   This ensures you query ONLY the records from the previous result set!\n"
 
             if last_result_ids:
-                prompt += f"\n[!] PREVIOUS QUERY RETURNED THESE IDs: {last_result_ids}\n"
-                prompt += f"   If user asks about 'them' or 'those', use: WHERE e.Ecode IN ({last_result_ids})\n"
+                history_block += f"\n[!] PREVIOUS QUERY RETURNED THESE IDs: {last_result_ids}\n"
+                history_block += f"   If user asks about 'them' or 'those', use: WHERE e.Ecode IN ({last_result_ids})\n"
             elif last_sql_query:
                 # No IDs available (previous query was aggregation) - provide the SQL for reference
-                prompt += f"\n[!] PREVIOUS QUERY (use this logic as a subquery/CTE for follow-up):\n"
-                prompt += f"   {last_sql_query[:500]}{'...' if len(last_sql_query) > 500 else ''}\n"
-                prompt += "\n   Since no RESULT_IDS are available (previous query was COUNT/aggregation),\n"
-                prompt += "   you should REUSE the same CTE/WHERE conditions from the previous query to filter the same records.\n"
-                prompt += "   Example: Copy the CTE and WHERE conditions, but change SELECT to get the new information.\n"
+                history_block += f"\n[!] PREVIOUS QUERY (use this logic as a subquery/CTE for follow-up):\n"
+                history_block += f"   {last_sql_query[:500]}{'...' if len(last_sql_query) > 500 else ''}\n"
+                history_block += "\n   Since no RESULT_IDS are available (previous query was COUNT/aggregation),\n"
+                history_block += "   you should REUSE the same CTE/WHERE conditions from the previous query to filter the same records.\n"
+                history_block += "   Example: Copy the CTE and WHERE conditions, but change SELECT to get the new information.\n"
 
-            prompt += "\n3. ALWAYS use table aliases (e.g., e.Ecode, lp.ECode) to avoid 'Ambiguous column name' errors\n"
-            prompt += "4. If the previous query used a specific view/table, check the schema docs to see which columns that view/table has\n"
-            prompt += "5. If the previous view doesn't have the columns you need, JOIN with another table or switch views\n"
-            prompt += "6. Example: AllEmployeeUnion only has basic columns - for department info use vw_EmployeeMaster_Vms instead\n\n"
+            history_block += "\n3. ALWAYS use table aliases (e.g., e.Ecode, lp.ECode) to avoid 'Ambiguous column name' errors\n"
+            history_block += "4. If the previous query used a specific view/table, check the schema docs to see which columns that view/table has\n"
+            history_block += "5. If the previous view doesn't have the columns you need, JOIN with another table or switch views\n"
+            history_block += "6. Example: AllEmployeeUnion only has basic columns - for department info use vw_EmployeeMaster_Vms instead\n\n"
 
-        prompt += f"""
+        question_block = f"""
 
 USER QUESTION:
 {question}
 
-INSTRUCTIONS:
-1. Study the example queries above to understand patterns and best practices
-2. Analyze the user's question carefully
-3. Use ONLY the tables and columns provided in the schema context above
-4. Generate a valid SQL Server query (T-SQL syntax) similar to the examples
-5. Use appropriate JOINs if multiple tables are needed
-6. DO NOT use TOP clause - return ALL results (frontend handles pagination)
-7. Use clear aliases for readability (e.g., e.Ecode, lp.ECode) to AVOID ambiguous column errors
-8. Format dates appropriately for SQL Server (GETDATE(), DATEADD, etc.)
-9. Ensure the query is safe and optimized
-10. ALWAYS include Ecode/primary key in SELECT results when querying people/employees/students
-    - This enables follow-up queries to filter on specific records
-    - Example: SELECT e.Ecode, e.EmpName, ... FROM vw_EmployeeMaster_Vms e WHERE ...
-
-[CRITICAL] VIEW-FIRST ARCHITECTURE - ALWAYS CHECK FOR VIEWS FIRST!
-
-[!!!] MANDATORY POLICY [!!!]
-Before writing ANY query, check if a VIEW exists that covers your requirements.
-90% of queries can be answered using the 9 critical views below.
-DO NOT manually JOIN base tables if a view already does it for you!
-
-===========================================================================
-
-**TIER 1 VIEWS - MUST USE FIRST** [5 STARS] (Priority: 5/5)
-
-1. **vw_EmployeeMaster_Vms** [5 STARS]
-   USE FOR: ANY employee query with department/section/branch
-   COLUMNS: Ecode, CorpEmpCode, EmpName, Dname, SecName, BranchName, CName, Active, DateofJoin
-   PRE-JOINS: 18 tables (EmployeeMaster + SectionMaster + DeptMaster + BranchMaster + ...)
-
-   [YES] ALWAYS USE FOR:
-   - "How many employees in each department?" -> SELECT Dname, COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY Dname
-   - "Show employees in IT department" -> SELECT * FROM vw_EmployeeMaster_Vms WHERE Active=1 AND Dname LIKE '%IT%'
-   - "Employee count by branch" -> SELECT BranchName, COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY BranchName
-   - "List all active employees" -> SELECT Ecode, EmpName, Dname, SecName FROM vw_EmployeeMaster_Vms WHERE Active=1
-
-   [NO] NEVER DO THIS:
-   SELECT e.*, d.Dname FROM EmployeeMaster e JOIN SectionMaster s ON e.SecCode=s.SecCode JOIN DeptMaster d ON s.Dcode=d.Dcode
-
-2. **vw_RawPunchDetail** [5 STARS]
-   USE FOR: Raw punch/swipe records only (NOT for late arrivals!)
-   COLUMNS: ATDate, ATTime, ECode, EmpName, Dname, MachineID, MachineName, InOut (1=IN, 0=OUT)
-   PRE-JOINS: MachineRawPunch + EmployeeMaster + MachineMaster + DeptMaster + SectionMaster
-   [!] WARNING: This view does NOT have InTime, OutTime, LateArrival, or WorkDuration columns!
-
-   [YES] USE FOR:
-   - "Show raw punches today" -> SELECT * FROM vw_RawPunchDetail WHERE ATDate = CAST(GETDATE() AS DATE)
-   - "Show all swipes for employee" -> SELECT * FROM vw_RawPunchDetail WHERE ECode = '123'
-
-   [NO] NEVER USE vw_RawPunchDetail FOR:
-   - Late arrival queries (use vw_CompleteAttendanceReport instead)
-   - Work hours queries (use vw_CompleteAttendanceReport instead)
-   - InTime/OutTime queries (use vw_CompleteAttendanceReport instead)
-
-3. **vw_CompleteAttendanceReport** [5 STARS] (CRITICAL FOR LATE ARRIVALS!)
-   USE FOR: Late arrivals, early departures, work hours, attendance status
-   COLUMNS: ATDate, CorpEmpCode, EmpName, Dname, InTime, OutTime, LateArrival (minutes), EarlyDeparture (minutes), WorkDuration (minutes), Status
-
-   [YES] ALWAYS USE FOR:
-   - "Who was late today?" -> SELECT CorpEmpCode, EmpName, Dname, InTime, LateArrival FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE) AND LateArrival > 0
-   - "Who left early?" -> SELECT CorpEmpCode, EmpName, OutTime, EarlyDeparture FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE) AND EarlyDeparture > 0
-   - "Show work hours" -> SELECT CorpEmpCode, EmpName, WorkDuration FROM vw_CompleteAttendanceReport WHERE ATDate = CAST(GETDATE() AS DATE)
-
-   [NO] NEVER DO THIS:
-   SELECT m.*, e.EmpName FROM MachineRawPunch m JOIN EmployeeMaster e ON m.ECode=e.Ecode
-
-4. **AllEmployeeUnion** [5 STARS]
-   USE FOR: Total employee count (active + deleted)
-   UNION OF: EmployeeMaster + EmployeeMaster_Deleted
-
-   [YES] ALWAYS USE FOR:
-   - "How many total employees?" -> SELECT COUNT(*) FROM AllEmployeeUnion WHERE Active=1
-   - "All employees (including deleted)" -> SELECT * FROM AllEmployeeUnion
-
-   [NO] NEVER DO THIS:
-   SELECT COUNT(*) FROM EmployeeMaster WHERE Active=1
-
-===========================================================================
-
-**TIER 2 VIEWS - DOMAIN-SPECIFIC** [4 STARS] (Priority: 3/5)
-
-4. **View_Visitor_EnrollmentDetail** [4 STARS]
-   USE FOR: Visitor management queries
-   Example: SELECT * FROM View_Visitor_EnrollmentDetail WHERE EnrollmentDate = CAST(GETDATE() AS DATE)
-
-5. **View_Contractor_Detail** [4 STARS]
-   USE FOR: Contractor information queries
-   Example: SELECT * FROM View_Contractor_Detail WHERE Active=1
-
-6. **View_Employee_Terminal_Authentication_Relation** [5 STARS] (CRITICAL FOR DEVICE DATA PUSH!)
-   USE FOR: Device data push queries, biometric access control, face access, fingerprint access
-   COLUMNS: Ecode, CorpEmpCode, EmpName, DomainName (device name), AuthenticationID, Status
-
-   [CRITICAL] AuthenticationID VALUES (MUST USE THESE!):
-   - AuthenticationID = 2: Fingerprint access
-   - AuthenticationID = 3: Card/Finger access
-   - AuthenticationID = 7: Face Only access (use this for "face access" queries!)
-   - AuthenticationID = 1001: REMOVED from device (use this for "removed" queries!)
-
-   [YES] ALWAYS USE FOR:
-   - "Who has face access?" -> WHERE AuthenticationID = 7
-   - "Which students have face access on SUBWAY?" -> WHERE AuthenticationID = 7 AND DomainName LIKE '%SUBWAY%'
-   - "Who is removed from devices?" -> WHERE AuthenticationID = 1001
-   - "Device data push queries" -> Use View_Employee_Terminal_Authentication_Relation
-
-   Example: SELECT DISTINCT CorpEmpCode, EmpName, DomainName FROM View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7 AND DomainName LIKE '%SUBWAY%'
-
-7. **View_EmployeeByUserGroupPolicy** [4 STARS]
-   USE FOR: User group/policy queries
-   Example: SELECT * FROM View_EmployeeByUserGroupPolicy WHERE GroupName='Admin'
-
-===========================================================================
-
-**TIER 3 VIEWS - SPECIALIZED** [3 STARS] (Priority: 2/5)
-
-8. **Vw_TerminalDetail_VMS** [3 STARS]
-   USE FOR: Terminal/device configuration queries
-   Example: SELECT * FROM Vw_TerminalDetail_VMS WHERE Status='Online'
-
-9. **vw_VisitorBasicDetail** [3 STARS]
-   USE FOR: Basic visitor lookup
-   Example: SELECT * FROM vw_VisitorBasicDetail WHERE VisitorName LIKE '%John%'
-
-===========================================================================
-
-[!!!] MANDATORY: FACE ACCESS QUERY PATTERN [!!!]
-
-When user asks about "face access", "who has face access", "face recognition access", "face data push":
--> ALWAYS use View_Employee_Terminal_Authentication_Relation with AuthenticationID = 7
-
-[NO] WRONG - DO NOT DO THIS:
-SELECT * FROM View_FACE_V1  -- This is for biometric images, NOT access control!
-SELECT * FROM Biometric WHERE Format IN (250, 401)  -- Wrong table!
-
-[YES] CORRECT - ALWAYS DO THIS:
-SELECT CorpEmpCode, EmpName, DomainName FROM View_Employee_Terminal_Authentication_Relation
-WHERE AuthenticationID = 7  -- 7 = Face Only access
-
-===========================================================================
-
-[!!!] DEPRECATED TABLES - DO NOT USE [!!!]
-
-[NO] **EmpDepartRole** - EMPTY TABLE (0 rows)
-   Replacement: Use vw_EmployeeMaster_Vms (has Dname column)
-
-   [NO] WRONG: SELECT * FROM EmpDepartRole
-   [YES] CORRECT: SELECT * FROM vw_EmployeeMaster_Vms
-
-[NO] **View_FACE_V1** - This is for biometric IMAGES, NOT for access control!
-   DO NOT USE for "face access" queries!
-   Replacement: Use View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7
-
-   [NO] WRONG: SELECT * FROM View_FACE_V1 (this is biometric image data!)
-   [YES] CORRECT: SELECT * FROM View_Employee_Terminal_Authentication_Relation WHERE AuthenticationID = 7
-
-===========================================================================
-
-**CRITICAL EXAMPLES - LEARN FROM THESE:**
-
-Example 1: Department employee count
-[NO] WRONG: SELECT d.Dname, COUNT(e.Ecode) FROM EmployeeMaster e JOIN SectionMaster s ON e.SecCode=s.SecCode JOIN DeptMaster d ON s.Dcode=d.Dcode WHERE e.Active=1 GROUP BY d.Dname
-[YES] CORRECT: SELECT Dname, COUNT(*) AS EmployeeCount FROM dbo.vw_EmployeeMaster_Vms WHERE Active=1 GROUP BY Dname ORDER BY EmployeeCount DESC
-
-Example 2: Today's attendance
-[NO] WRONG: SELECT m.ATDate, e.EmpName FROM MachineRawPunch m JOIN EmployeeMaster e ON m.ECode=e.Ecode WHERE m.ATDate=CAST(GETDATE() AS DATE)
-[YES] CORRECT: SELECT ATDate, EmpName, InTime, OutTime FROM dbo.vw_RawPunchDetail WHERE ATDate=CAST(GETDATE() AS DATE)
-
-Example 3: Active employee count
-[NO] WRONG: SELECT COUNT(*) FROM EmployeeMaster WHERE Active=1
-[YES] CORRECT: SELECT COUNT(*) FROM dbo.AllEmployeeUnion WHERE Active=1
-
-Example 4: FACE ACCESS QUERIES (MANDATORY PATTERN!)
-Question: "Which students have face access on SUBWAY devices?"
-[NO] WRONG: SELECT * FROM View_FACE_V1 (this is for biometric images!)
-[NO] WRONG: SELECT * FROM Employee_Terminal_Authentication_Relation (missing AuthenticationID filter!)
-[YES] CORRECT: SELECT v.CorpEmpCode, v.EmpName, v.DomainName FROM dbo.View_Employee_Terminal_Authentication_Relation v JOIN dbo.vw_EmployeeMaster_Vms e ON v.Ecode = e.Ecode WHERE v.AuthenticationID = 7 AND v.DomainName LIKE '%SUBWAY%' AND e.AccessType = 'Student'
-
-**FACE ACCESS = AuthenticationID = 7** (NEVER forget this filter!)
-
-CRITICAL COLUMN NAME RULES:
-[!] DO NOT hallucinate or invent column names that "sound right" but aren't in the schema!
-[!] Use EXACT column names from the schema above, even if they are abbreviated
-[!] Common mistakes to AVOID:
-   - DO NOT use "DeptCode" - the actual column is "SecCode" (Section/Department Code)
-   - DO NOT use "DeptName" - use the actual column names listed in the schema
-   - DO NOT use "EmployeeCode" - the actual column is "Ecode"
-   - DO NOT assume standard names - VERIFY each column exists in the schema
-[!] If the schema says "SecCode", use "SecCode" - do NOT rename it to "DepartmentCode"
-[!] Before writing SELECT/WHERE/GROUP BY, cross-check every column name against the schema
-
-IMPORTANT RULES:
-- Only return the SQL query, nothing else
-- Do NOT include markdown code blocks or explanations
-- Use SQL Server syntax (not MySQL or PostgreSQL)
-- Always validate column names against the schema provided
-- Follow the patterns shown in the examples above
-- PREFER VIEWS over manual table JOINs whenever possible
-
 SQL QUERY:"""
 
-        return prompt
+        dynamic = filter_block + context_block + history_block + question_block
+        dynamic_tokens = estimate_tokens(dynamic)
+        logger.info(
+            f"[PROMPT] tokens: static={self.static_prefix_tokens}, dynamic={dynamic_tokens}, "
+            f"total={self.static_prefix_tokens + dynamic_tokens} "
+            f"(schema {len(kept_documents)}/{len(documents)}, "
+            f"examples {len(kept_examples)}/{len(few_shot_examples or [])}, "
+            f"history {estimate_tokens(history_block)})"
+        )
+        return SQL_PROMPT_STATIC_PREFIX + dynamic
+
+    def _providers(self) -> List[str]:
+        """Primary provider followed by any configured secondary providers"""
+        primary = 'openrouter' if self.llm_provider == 'openrouter' else 'gemini'
+        return [primary] + self.secondary_providers
 
     def _call_llm(self, prompt: str) -> str:
         """
         Call the configured LLM (Gemini or OpenRouter) to generate SQL
 
+        Routed through the LLM router: a secondary provider is hedged to when
+        the primary is slower than its p95, or used when the primary fails.
+
         Args:
             prompt: Complete prompt with question and schema
 
         Returns:
             Generated SQL query string
         """
-        if self.llm_provider == 'openrouter':
-            return self._call_openrouter(prompt)
-        else:
-            return self._call_gemini(prompt)
+        provider_calls = {
+            'gemini': lambda: self._call_gemini(prompt),
+            'openrouter': lambda: self._call_openrouter(prompt),
+        }
+        providers = self._providers()
+        with llm_usage.stage("sql_generation"):
+            return llm_router.generate_sync(
+                {name: provider_calls[name] for name in providers}, primary=providers[0]
+            ).text
 
     async def _call_llm_async(self, prompt: str) -> str:
         """
         PERFORMANCE OPTIMIZED: Async wrapper for LLM calls.
 
-        Uses asyncio.to_thread() to run blocking LLM calls in a thread pool,
-        allowing the event loop to handle other requests while waiting.
+        OpenRouter goes through the pooled async HTTP transport; Gemini's
+        blocking SDK call runs in a thread pool via asyncio.to_thread().
+        Both are routed through the LLM router (hedging / failover).
 
         Args:
             prompt: Complete prompt with question and schema
@@ -1068,12 +1134,92 @@ SQL QUERY:"""
         Returns:
             Generated SQL query string
         """
-        logger.debug("[SQL_AGENT] Running LLM call in thread pool for non-blocking execution")
-        return await asyncio.to_thread(self._call_llm, prompt)
+        provider_calls = {
+            'gemini': lambda: asyncio.to_thread(self._call_gemini, prompt),
+            'openrouter': lambda: self._call_openrouter_async(prompt),
+        }
+        providers = self._providers()
+        with llm_usage.stage("sql_generation"):
+            response = await llm_router.generate(
+                {name: provider_calls[name] for name in providers}, primary=providers[0]
+            )
+        return response.text
+
+    # System prompt for OpenRouter chat completions
+    OPENROUTER_SYSTEM_PROMPT = (
+        "You are an expert SQL query generator for SQL Server databases. Generate only valid T-SQL queries. "
+        "Return ONLY the SQL query without any explanation, markdown, or code blocks."
+    )
+
+    def _split_static_prefix(self, prompt: str) -> Tuple[Optional[str], str]:
+        """Split a prompt into its cacheable static prefix (None if caching is off) and the request context"""
+        if settings.prompt_prefix_caching and prompt.startswith(SQL_PROMPT_STATIC_PREFIX):
+            return SQL_PROMPT_STATIC_PREFIX, prompt[len(SQL_PROMPT_STATIC_PREFIX):]
+        return None, prompt
+
+    def _openrouter_messages(self, prompt: str) -> List[Dict[str, Any]]:
+        """
+        Chat messages for a prompt
+
+        With prefix caching the static prefix moves into the system message
+        with a cache_control breakpoint (honoured by Anthropic / Gemini models
+        on OpenRouter; OpenAI / DeepSeek models cache long prefixes automatically).
+        """
+        prefix, request_context = self._split_static_prefix(prompt)
+        if prefix is None:
+            return [
+                {"role": "system", "content": self.OPENROUTER_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        return [
+            {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": f"{self.OPENROUTER_SYSTEM_PROMPT}\n\n{prefix}",
+                    "cache_control": {"type": "ephemeral"},
+                }],
+            },
+            {"role": "user", "content": request_context}
+        ]
+
+    def _get_gemini_prefix_model(self):
+        """
+        Gemini model bound to a cached-content copy of the static prefix
+
+        Returns:
+            GenerativeModel, or None if context caching is unavailable (e.g. the
+            prefix is below the model's minimum cacheable size); creation is
+            retried once the TTL has passed
+        """
+        now = time.time()
+        with self._prefix_cache_lock:
+            if now < self._gemini_prefix_expires:
+                return self._gemini_prefix_model
+
+            ttl = settings.prompt_prefix_cache_ttl
+            model_name = settings.gemini_model
+            if not model_name.startswith("models/"):
+                model_name = f"models/{model_name}"
+            try:
+                cached_content = genai_caching.CachedContent.create(
+                    model=model_name,
+                    display_name="oryggi-sql-prompt-prefix",
+                    system_instruction=SQL_PROMPT_STATIC_PREFIX,
+                    ttl=timedelta(seconds=ttl),
+                )
+                self._gemini_prefix_model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+                logger.info(f"[SQL_AGENT] Cached static prompt prefix on Gemini ({self.static_prefix_tokens} tokens)")
+            except Exception as e:
+                logger.warning(f"[SQL_AGENT] Gemini context caching unavailable, sending full prompts: {e}")
+                self._gemini_prefix_model = None
+            # Refresh a minute before the server-side copy expires
+            self._gemini_prefix_expires = now + max(ttl - 60, 60)
+            return self._gemini_prefix_model
 
     def _call_openrouter(self, prompt: str) -> str:
         """
-        Call OpenRouter API to generate SQL
+        Call OpenRouter API to generate SQL (pooled sync client)
 
         Args:
             prompt: Complete prompt with question and schema
@@ -1084,63 +1230,54 @@ SQL QUERY:"""
         try:
             logger.info(f"[SQL_AGENT] Calling OpenRouter API with model: {self.openrouter_model}")
 
-            headers = {
-                "Authorization": f"Bearer {self.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://oryggi.ai",
-                "X-Title": "OryggiAI SQL Agent"
-            }
-
-            payload = {
-                "model": self.openrouter_model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an expert SQL query generator for SQL Server databases. Generate only valid T-SQL queries. Return ONLY the SQL query without any explanation, markdown, or code blocks."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": self.temperature,
-                "max_tokens": getattr(settings, 'gemini_max_tokens', 2000),
-            }
-
-            response = requests.post(
-                f"{self.openrouter_base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
+            result = llm_transport.chat_completion_sync(
+                self._openrouter_messages(prompt),
+                model=self.openrouter_model,
+                temperature=self.temperature,
+                max_tokens=getattr(settings, 'gemini_max_tokens', 2000),
             )
+            return self._parse_openrouter_result(result)
 
-            if response.status_code != 200:
-                error_msg = f"OpenRouter API error: {response.status_code} - {response.text}"
-                logger.error(f"[SQL_AGENT] {error_msg}")
-                raise Exception(error_msg)
+        except Exception as e:
+            logger.error(f"[SQL_AGENT] OpenRouter API call failed: {str(e)}")
+            raise
 
-            result = response.json()
+    async def _call_openrouter_async(self, prompt: str) -> str:
+        """
+        Call OpenRouter API to generate SQL (pooled async client)
 
-            # Extract the SQL query from the response
-            if 'choices' in result and len(result['choices']) > 0:
-                sql_query = result['choices'][0]['message']['content'].strip()
+        Args:
+            prompt: Complete prompt with question and schema
 
-                # Log which model was actually used (OpenRouter may route to different models)
-                if 'model' in result:
-                    logger.info(f"[SQL_AGENT] OpenRouter used model: {result['model']}")
+        Returns:
+            Generated SQL query string
+        """
+        try:
+            logger.info(f"[SQL_AGENT] Calling OpenRouter API (async) with model: {self.openrouter_model}")
 
-                logger.info(f"[SQL_AGENT] OpenRouter response received, length: {len(sql_query)}")
-                return sql_query
-            else:
-                raise Exception("OpenRouter returned empty response")
+            result = await llm_transport.chat_completion(
+                self._openrouter_messages(prompt),
+                model=self.openrouter_model,
+                temperature=self.temperature,
+                max_tokens=getattr(settings, 'gemini_max_tokens', 2000),
+            )
+            return self._parse_openrouter_result(result)
 
-        except requests.exceptions.Timeout:
-            logger.error("[SQL_AGENT] OpenRouter API timeout")
-            raise Exception("OpenRouter API request timed out")
         except Exception as e:
             logger.error(f"[SQL_AGENT] OpenRouter API call failed: {str(e)}")
             raise
 
+    def _parse_openrouter_result(self, result: Dict[str, Any]) -> str:
+        """Extract the SQL text from an OpenRouter chat completion response"""
+        sql_query = llm_transport.extract_content(result)
+
+        # Log which model was actually used (OpenRouter may route to different models)
+        if 'model' in result:
+            logger.info(f"[SQL_AGENT] OpenRouter used model: {result['model']}")
+
+        logger.info(f"[SQL_AGENT] OpenRouter response received, length: {len(sql_query)}")
+        return sql_query
+
     def _call_gemini(self, prompt: str) -> str:
         """
         Call Gemini API to generate SQL
@@ -1167,12 +1304,34 @@ SQL QUERY:"""
                 HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
             }
 
+            # With prefix caching, only the request context is sent
+            model, contents = self.model, prompt
+            prefix, request_context = self._split_static_prefix(prompt)
+            if prefix is not None:
+                prefix_model = self._get_gemini_prefix_model()
+                if prefix_model is not None:
+                    model, contents = prefix_model, request_context
+
             # Generate response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
+            started_at = time.perf_counter()
+            try:
+                response = model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings
+                )
+            except google_exceptions.NotFound:
+                if model is self.model:
+                    raise
+                # Cached prefix expired server-side before our refresh
+                logger.warning("[SQL_AGENT] Cached prompt prefix not found, resending full prompt")
+                self._gemini_prefix_expires = 0.0
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings
+                )
+            llm_usage.record_gemini(response, started_at)
 
             # Debug: Check response details
             logger.debug(f"Response finish_reason: {response.candidates[0].finish_reason if response.candidates else 'No candidates'}")
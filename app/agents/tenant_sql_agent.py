@@ -19,9 +19,12 @@ CLARIFICATION SUPPORT (Light Mode):
 - Returns clarification options when needed
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Callable, AsyncIterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import json
-import requests
+import re
 import time
 from loguru import logger
 from sqlalchemy.orm import Session
@@ -31,11 +34,22 @@ import google.generativeai as genai
 from app.config import settings
 from app.models.platform import TenantDatabase, SchemaCache, FewShotExample
 from app.database.tenant_connection import tenant_db_manager
-from app.gateway.query_router import query_router
+from app.gateway.query_router import query_router, batch_rows
 from app.services.query_logging_service import get_query_logging_service
+from app.services.query_cache import query_cache
+from app.services.query_cost_guard import query_cost_guard
+from app.services.result_cursors import paged_sql, result_cursor_store
+from app.services.llm_transport import llm_transport
+from app.services.llm_router import LLMResponse, llm_router
+from app.services.llm_usage import llm_usage
+from app.services.history_compactor import history_compactor, parse_followup_context
+from app.services.single_flight import SingleFlight, llm_single_flight
+from app.services.sql_template_registry import sql_template_registry
+from app.services.sql_validator import SQLValidationError, SQLValidationResult, sql_validator
 
 # GLOBAL shared managers - used by ALL tenants (same schema)
 from app.rag import chroma_manager, few_shot_manager
+from app.rag.embedding_context import EmbeddingContext
 
 # Clarity assessment for light clarification
 from app.services.clarity_assessor import clarity_assessor, ClarityAssessment
@@ -61,28 +75,103 @@ class TenantSQLAgent:
     LIGHT_CLARITY_THRESHOLD = 0.5
     MAX_CLARIFICATION_ATTEMPTS = 3
 
+    # Questions that refer back to earlier turns depend on conversation history,
+    # so their SQL must never be served from (or stored in) the answer cache
+    FOLLOWUP_PATTERN = re.compile(
+        r"\b(they|them|those|these|their|the same|same ones|previous|above)\b",
+        re.IGNORECASE
+    )
+    # "it" is matched case-sensitively and not before a department word, so
+    # questions about the IT department are not mistaken for follow-ups
+    FOLLOWUP_IT_PATTERN = re.compile(
+        r"\b[Ii]t\b(?!\s+(?i:department|dept|team|staff|section|support|admin))"
+    )
+
     def __init__(self):
         """Initialize Tenant SQL Agent with LLM client"""
         self.llm_provider = settings.llm_provider.lower()
         self.temperature = settings.gemini_temperature
 
-        if self.llm_provider == "gemini":
+        # Bounded pool for blocking pipeline stages (RAG retrieval, platform
+        # DB logging) so they never run on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.agent_executor_workers,
+            thread_name_prefix="tenant_agent"
+        )
+
+        # The configured provider is primary; the other one is also set up when
+        # its API key is present so the LLM router can hedge / fail over to it
+        self.secondary_providers: List[str] = []
+
+        if self.llm_provider == "gemini" or settings.gemini_api_key:
             # Initialize Gemini
             from google.generativeai.types import HarmCategory, HarmBlockThreshold
             genai.configure(api_key=settings.gemini_api_key)
             self.gemini_model = genai.GenerativeModel(settings.gemini_model)
             self.HarmCategory = HarmCategory
             self.HarmBlockThreshold = HarmBlockThreshold
-            logger.info(f"[TENANT_AGENT] Initialized with Gemini: {settings.gemini_model}")
-        else:
+            if self.llm_provider == "gemini":
+                logger.info(f"[TENANT_AGENT] Initialized with Gemini: {settings.gemini_model}")
+            else:
+                self.secondary_providers.append("gemini")
+
+        if self.llm_provider != "gemini" or settings.openrouter_api_key:
             # OpenRouter configuration
             self.openrouter_api_key = settings.openrouter_api_key
             self.openrouter_model = settings.openrouter_model
             self.openrouter_base_url = settings.openrouter_base_url
-            logger.info(f"[TENANT_AGENT] Initialized with OpenRouter: {self.openrouter_model}")
+            if self.llm_provider != "gemini":
+                logger.info(f"[TENANT_AGENT] Initialized with OpenRouter: {self.openrouter_model}")
+            else:
+                self.secondary_providers.append("openrouter")
+
+        if self.secondary_providers:
+            logger.info(f"[TENANT_AGENT] Secondary LLM providers: {', '.join(self.secondary_providers)}")
+
+        # Queries moved to the background by the cost guard (references keep the tasks alive)
+        self._background_queries: Set[asyncio.Task] = set()
 
         logger.info("[TENANT_AGENT] Using GLOBAL ChromaDB and FAISS (same schema for all tenants)")
 
+    async def _run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable in the agent's bounded thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _timed(self, timings: Dict[str, int], stage: str, awaitable) -> Any:
+        """Await a pipeline stage and record its wall time (ms) under timings[stage]"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = int((time.perf_counter() - start) * 1000)
+
+    def _start_retrieval(self, question: str, timings: Dict[str, int]) -> "asyncio.Task":
+        """
+        Start schema and few-shot retrieval concurrently
+
+        Both lookups begin immediately, so the returned task can be created
+        before the clarity check finishes and awaited (or cancelled) later.
+
+        Returns:
+            Task resolving to (schema_context, few_shot_examples)
+        """
+        # Both retrievers share one question embedding per model
+        embedding_context = EmbeddingContext(question)
+        retrieval = asyncio.gather(
+            self._timed(timings, "schema_retrieval_ms",
+                        self._run_blocking(self._get_global_schema_context, question,
+                                           embedding_context=embedding_context)),
+            self._timed(timings, "fewshot_retrieval_ms",
+                        self._run_blocking(self._get_global_fewshots, question,
+                                           embedding_context=embedding_context)),
+        )
+        return asyncio.ensure_future(self._timed(timings, "retrieval_ms", retrieval))
+
+    def _is_context_dependent(self, question: str) -> bool:
+        """Check if a question refers back to previous conversation turns"""
+        return bool(self.FOLLOWUP_PATTERN.search(question) or self.FOLLOWUP_IT_PATTERN.search(question))
+
     def _is_clarification_response(
         self,
         conversation_history: Optional[List[Dict]] = None
@@ -275,7 +364,9 @@ class TenantSQLAgent:
         # Clarification parameters
         clarification_response: Optional[str] = None,
         original_unclear_question: Optional[str] = None,
-        clarification_attempt: int = 0
+        clarification_attempt: int = 0,
+        page_size: Optional[int] = None,
+        refresh: bool = False
     ) -> Dict[str, Any]:
         """
         Process a natural language query for a specific tenant database
@@ -291,171 +382,586 @@ class TenantSQLAgent:
             clarification_response: User's response to a clarification question
             original_unclear_question: The original question that needed clarification
             clarification_attempt: Current clarification attempt number
+            page_size: Return only the first page of results plus a result cursor
+                (see app.services.result_cursors); None returns up to 1000 rows
+            refresh: Re-run the SQL against the database instead of serving cached
+                results (answer cache and SQL result cache)
 
         Returns:
             Dict with sql_query, results, natural_answer, etc.
             If clarification needed: includes needs_clarification, clarification_question, clarification_options
+            With page_size and more rows than one page: includes cursor
         """
-        tenant_db_id = tenant_database.id
-        logger.info(f"[TENANT_AGENT] Processing query for tenant DB: {tenant_database.name}")
-        logger.info(f"[TENANT_AGENT] Question: {question}")
+        result = None
+        async for event, data in self.process_query_events(
+            question=question,
+            tenant_database=tenant_database,
+            platform_db=platform_db,
+            user_id=user_id,
+            user_role=user_role,
+            conversation_history=conversation_history,
+            conversation_id=conversation_id,
+            clarification_response=clarification_response,
+            original_unclear_question=original_unclear_question,
+            clarification_attempt=clarification_attempt,
+            page_size=page_size,
+            refresh=refresh,
+        ):
+            if event == "result":
+                result = data
+        return result
+
+    async def process_query_events(
+        self,
+        question: str,
+        tenant_database: TenantDatabase,
+        platform_db: Session,
+        user_id: str = "system",
+        user_role: str = "ADMIN",
+        conversation_history: Optional[List[Dict]] = None,
+        conversation_id: str = None,
+        # Clarification parameters
+        clarification_response: Optional[str] = None,
+        original_unclear_question: Optional[str] = None,
+        clarification_attempt: int = 0,
+        stream_rows: bool = False,
+        batch_size: int = 100,
+        page_size: Optional[int] = None,
+        refresh: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the query pipeline, yielding (event, data) as each stage completes
 
-        # =====================================================
-        # LIGHT CLARIFICATION CHECK (Only for very unclear queries)
-        # =====================================================
-        # Skip clarity check if this is an explicit clarification response (from API params)
-        is_explicit_clarification = bool(clarification_response and original_unclear_question)
+        Events, in order:
+        - understanding: question accepted, clarity check and retrieval starting
+        - sql: generated (or cached) SQL, before execution
+        - columns: result column names (stream_rows only)
+        - rows: one batch of result rows (stream_rows only, repeated)
+        - result: final dict, identical to what process_query() returns
 
-        if is_explicit_clarification:
-            # Explicit clarification response via API parameters
-            logger.info(f"[TENANT_AGENT] Processing explicit clarification response: {clarification_response}")
-            question = f"{original_unclear_question} - {clarification_response}"
-        else:
-            # Run clarity check (will also detect implicit clarification responses from history)
-            clarity_result = await self._check_light_clarity(question, conversation_history)
+        A clarification or failure goes straight to "result".
 
-            if clarity_result.get("needs_clarification"):
-                logger.info(f"[TENANT_AGENT] Light clarification triggered for: {question}")
-                return {
-                    "success": True,
-                    "needs_clarification": True,
-                    "clarification_question": clarity_result.get("clarification_question"),
-                    "clarification_options": clarity_result.get("clarification_options"),
-                    "clarification_attempt": clarification_attempt + 1,
-                    "max_clarification_attempts": self.MAX_CLARIFICATION_ATTEMPTS,
-                    "original_question": question,
-                    "sql_query": None,
-                    "results": [],
-                    "result_count": 0,
-                    "natural_answer": clarity_result.get("clarification_question", "Could you please clarify?"),
-                    "tables_used": [],
-                    "tenant_db_name": tenant_database.name,
-                    "error": None
-                }
+        Args:
+            stream_rows: Fetch and yield result rows in batches
+            batch_size: Rows per "rows" event
+            page_size: First-page size for a result cursor (with stream_rows, only
+                the first page is sent as "rows" events)
+            (other arguments as for process_query)
+
+        Yields:
+            Tuples of (event name, event data)
+        """
+        tenant_db_id = tenant_database.id
+        logger.info(f"[TENANT_AGENT] Processing query for tenant DB: {tenant_database.name}")
+        logger.info(f"[TENANT_AGENT] Question: {question}")
 
-            # Check if user was responding to a clarification (auto-detected from history)
-            if clarity_result.get("combined_question"):
-                logger.info(f"[TENANT_AGENT] Using combined question from clarification response")
-                question = clarity_result.get("combined_question")
+        # Per-stage wall times (ms), returned with the response
+        timings: Dict[str, int] = {}
+        request_start = time.perf_counter()
+        # LLM tokens / latency per stage, written to the query log
+        usage = llm_usage.new_request(tenant_database.tenant_id)
+        speculative_retrieval = None
+        template_result = None
 
-        # Initialize logging service
-        query_logging_service = get_query_logging_service()
-        request_id = None
-        sql_query = None
-        generation_start_time = time.time()
+        yield "understanding", {"question": question, "tenant_db_name": tenant_database.name}
 
         try:
-            # Use GLOBAL ChromaDB and FAISS - same schema for ALL tenants
-            # All Oryggi clients have identical database structure, only data differs
-
-            # Step 1: Get schema context from GLOBAL ChromaDB
-            schema_context = self._get_global_schema_context(question)
-            logger.info(f"[TENANT_AGENT] Retrieved {len(schema_context)} schema items from GLOBAL ChromaDB")
-
-            # Step 2: Get few-shot examples from GLOBAL FAISS
-            few_shot_examples = self._get_global_fewshots(question)
-            logger.info(f"[TENANT_AGENT] Retrieved {len(few_shot_examples)} few-shot examples from GLOBAL FAISS")
-
-            # Step 3: Build prompt with tenant-specific context
-            prompt = self._build_prompt(
-                question=question,
-                schema_context=schema_context,
-                few_shot_examples=few_shot_examples,
-                conversation_history=conversation_history,
-                db_type=tenant_database.db_type
-            )
+            # =====================================================
+            # LIGHT CLARIFICATION CHECK (Only for very unclear queries)
+            # =====================================================
+            # Skip clarity check if this is an explicit clarification response (from API params)
+            is_explicit_clarification = bool(clarification_response and original_unclear_question)
+
+            if is_explicit_clarification:
+                # Explicit clarification response via API parameters
+                logger.info(f"[TENANT_AGENT] Processing explicit clarification response: {clarification_response}")
+                question = f"{original_unclear_question} - {clarification_response}"
+            else:
+                is_history_response = self._is_clarification_response(conversation_history).get("is_response")
+                is_standalone = not is_history_response and not self._is_context_dependent(question)
+
+                # Known patterns get pre-built SQL with no LLM call at all. The
+                # templates are T-SQL against dbo.View_* - SQL Server tenants only
+                if is_standalone and tenant_database.db_type == "mssql":
+                    template_result = sql_template_registry.match(question)
+
+                # A question already in the answer cache passed the clarity check before
+                already_cached = (
+                    settings.enable_cache
+                    and is_standalone
+                    and query_cache.contains(
+                        query_cache.make_key(question, tenant_database.id, user_role, conversation_history)
+                    )
+                )
 
-            # Step 4: Generate SQL using LLM
-            sql_query = self._generate_sql(prompt)
-            sql_query = self._clean_sql(sql_query)
-            generation_time_ms = int((time.time() - generation_start_time) * 1000)
-            logger.info(f"[TENANT_AGENT] Generated SQL: {sql_query[:100]}...")
+                if already_cached or template_result:
+                    clarity_result = {"needs_clarification": False}
+                else:
+                    # Speculatively retrieve context while the clarity check runs, so the
+                    # critical path is max(clarity, retrieval) instead of their sum.
+                    # Not done for clarification responses - the question gets rewritten.
+                    if settings.agent_speculative_retrieval and not is_history_response:
+                        speculative_retrieval = self._start_retrieval(question, timings)
+
+                    # Run clarity check (will also detect implicit clarification responses from history)
+                    clarity_result = await self._timed(
+                        timings, "clarity_ms",
+                        llm_usage.track(usage, "clarity", self._check_light_clarity(question, conversation_history))
+                    )
+
+                if clarity_result.get("needs_clarification"):
+                    if speculative_retrieval is not None:
+                        speculative_retrieval.cancel()
+                        logger.info("[TENANT_AGENT] Discarded speculative retrieval (clarification needed)")
+                    timings["total_ms"] = int((time.perf_counter() - request_start) * 1000)
+                    logger.info(f"[TENANT_AGENT] Light clarification triggered for: {question}")
+                    yield "result", {
+                        "success": True,
+                        "needs_clarification": True,
+                        "clarification_question": clarity_result.get("clarification_question"),
+                        "clarification_options": clarity_result.get("clarification_options"),
+                        "clarification_attempt": clarification_attempt + 1,
+                        "max_clarification_attempts": self.MAX_CLARIFICATION_ATTEMPTS,
+                        "original_question": question,
+                        "sql_query": None,
+                        "results": [],
+                        "result_count": 0,
+                        "natural_answer": clarity_result.get("clarification_question", "Could you please clarify?"),
+                        "tables_used": [],
+                        "tenant_db_name": tenant_database.name,
+                        "llm_usage": usage.to_dict(),
+                        "timings": timings,
+                        "error": None
+                    }
+                    return
+
+                # Check if user was responding to a clarification (auto-detected from history)
+                if clarity_result.get("combined_question"):
+                    logger.info(f"[TENANT_AGENT] Using combined question from clarification response")
+                    question = clarity_result.get("combined_question")
+                    # Context was retrieved for the old wording
+                    if speculative_retrieval is not None:
+                        speculative_retrieval.cancel()
+                        speculative_retrieval = None
+
+            # Initialize logging service
+            query_logging_service = get_query_logging_service()
+            request_id = None
+            sql_query = None
+            generation_start_time = time.time()
+
+            # Answer cache lookup (skipped for questions that depend on earlier turns).
+            # Elliptical questions ("what about last month?") are keyed by the previous
+            # answer too, so they are never served an answer cached in another conversation
+            cache_key = None
+            cached = None
+            if settings.enable_cache and not self._is_context_dependent(question):
+                cache_key = query_cache.make_key(question, tenant_database.id, user_role, conversation_history)
+                cached = query_cache.get(cache_key)
+            # With refresh the cached SQL is still reused, but it runs again
+            results_from_cache = cached is not None and cached.results is not None and not refresh
 
-            # Step 4.5: Log the query (synchronous, non-blocking)
-            llm_model = settings.gemini_model if self.llm_provider == "gemini" else self.openrouter_model
             try:
-                request_id = query_logging_service.log_query(
-                    tenant_id=tenant_database.tenant_id,
-                    database_id=tenant_database.id,
-                    sql_query=sql_query,
-                    natural_language_question=question,
-                    user_id=uuid.UUID(user_id) if user_id and user_id != "system" else None,
-                    conversation_id=conversation_id,
-                    llm_model=llm_model,
-                    generation_time_ms=generation_time_ms,
-                )
-            except Exception as log_error:
-                logger.warning(f"[TENANT_AGENT] Failed to log query (non-fatal): {log_error}")
+                if cached:
+                    # Cache hit - skip retrieval and LLM entirely
+                    if speculative_retrieval is not None:
+                        speculative_retrieval.cancel()
+                    sql_query = cached.sql_query
+                    llm_model = "cache"
+                    logger.info(f"[TENANT_AGENT] Answer cache hit (results served: {results_from_cache})")
+                elif template_result:
+                    # Template fast path - same zero-LLM SQL as RAGSQLAgent
+                    sql_query = template_result["sql_query"]
+                    llm_model = f"template:{template_result['template_used']}"
+                else:
+                    # Use GLOBAL ChromaDB and FAISS - same schema for ALL tenants
+                    # All Oryggi clients have identical database structure, only data differs
+
+                    # Steps 1-2: Schema context (GLOBAL ChromaDB) and few-shot examples
+                    # (GLOBAL FAISS), retrieved concurrently - possibly already in flight
+                    if speculative_retrieval is None:
+                        speculative_retrieval = self._start_retrieval(question, timings)
+                    schema_context, few_shot_examples = await speculative_retrieval
+                    logger.info(f"[TENANT_AGENT] Retrieved {len(schema_context)} schema items from GLOBAL ChromaDB")
+                    logger.info(f"[TENANT_AGENT] Retrieved {len(few_shot_examples)} few-shot examples from GLOBAL FAISS")
+                    timings["pre_llm_ms"] = int((time.perf_counter() - request_start) * 1000)
+
+                    # Step 3: Build prompt with tenant-specific context
+                    prompt = self._build_prompt(
+                        question=question,
+                        schema_context=schema_context,
+                        few_shot_examples=few_shot_examples,
+                        conversation_history=conversation_history,
+                        db_type=tenant_database.db_type
+                    )
 
-            # Step 5: Execute query on tenant's database (using query_router for gateway support)
-            execution_start_time = time.time()
-            results = await query_router.execute_query(
-                tenant_database=tenant_database,
-                query=sql_query,
-                timeout=60,
-                max_rows=1000,
-            )
-            execution_time_ms = int((time.time() - execution_start_time) * 1000)
-            logger.info(f"[TENANT_AGENT] Query returned {len(results)} rows in {execution_time_ms}ms")
+                    # Step 4: Generate SQL using LLM
+                    response = await self._timed(
+                        timings, "llm_ms", llm_usage.track(usage, "sql_generation", self._generate_sql(prompt))
+                    )
+                    sql_query = self._clean_sql(response.text)
+                    # The model that answered, which differs from the configured one after a hedge or failover
+                    llm_model = response.model or response.provider
+
+                    # Step 4.1: Pre-flight validation (one repair attempt before the gateway)
+                    if settings.sql_preflight_validation:
+                        sql_query = await self._timed(
+                            timings, "validation_ms",
+                            llm_usage.track(
+                                usage, "sql_repair",
+                                self._preflight_sql(prompt, sql_query, tenant_database, platform_db)
+                            )
+                        )
+
+                generation_time_ms = int((time.time() - generation_start_time) * 1000)
+                logger.info(f"[TENANT_AGENT] Generated SQL ({llm_model}): {sql_query[:100]}...")
+
+                # Step 4.2: Estimated-cost guard (SHOWPLAN, before anything runs)
+                cost_decision = None
+                if (
+                    settings.cost_guard_enabled
+                    and tenant_database.db_type == "mssql"
+                    and not results_from_cache
+                ):
+                    # Without result cursors there is nowhere to deliver background rows
+                    cost_decision = await self._timed(
+                        timings, "cost_check_ms",
+                        query_cost_guard.check(
+                            tenant_database, sql_query, allow_background=settings.result_cursors_enabled
+                        )
+                    )
+                    if cost_decision.action == "bound":
+                        sql_query = cost_decision.sql_query
+                    elif cost_decision.action == "narrow":
+                        timings["total_ms"] = int((time.perf_counter() - request_start) * 1000)
+                        yield "result", {
+                            "success": True,
+                            "needs_clarification": True,
+                            "clarification_question": cost_decision.message,
+                            "clarification_options": query_cost_guard.narrow_options(),
+                            "clarification_attempt": clarification_attempt + 1,
+                            "max_clarification_attempts": self.MAX_CLARIFICATION_ATTEMPTS,
+                            "original_question": question,
+                            "sql_query": sql_query,
+                            "results": [],
+                            "result_count": 0,
+                            "natural_answer": cost_decision.message,
+                            "tables_used": self._extract_tables_from_sql(sql_query),
+                            "tenant_db_name": tenant_database.name,
+                            "cost_guard": cost_decision.to_dict(),
+                            "llm_usage": usage.to_dict(),
+                            "timings": timings,
+                            "error": None
+                        }
+                        return
+                    elif cost_decision.action == "background":
+                        cursor = result_cursor_store.reserve(
+                            tenant_database_id=tenant_database.id,
+                            owner_id=user_id,
+                            sql_query=sql_query,
+                            db_type=tenant_database.db_type,
+                            page_size=page_size or settings.result_cursor_page_size,
+                            conversation_id=conversation_id,
+                        )
+                        self._start_background_query(
+                            cursor.cursor_id, tenant_database, sql_query, user_id, conversation_id,
+                            timeout=settings.cost_guard_background_timeout,
+                        )
+
+                        timings["total_ms"] = int((time.perf_counter() - request_start) * 1000)
+                        yield "result", {
+                            "success": True,
+                            "sql_query": sql_query,
+                            "results": [],
+                            "result_count": 0,
+                            "cursor": cursor.info(result_cursor_store.idle_ttl_seconds),
+                            "natural_answer": cost_decision.message,
+                            "tables_used": self._extract_tables_from_sql(sql_query),
+                            "tenant_db_name": tenant_database.name,
+                            "cost_guard": cost_decision.to_dict(),
+                            "llm_usage": usage.to_dict(),
+                            "timings": timings,
+                            "error": None
+                        }
+                        return
+
+                yield "sql", {
+                    "sql_query": sql_query,
+                    "tables_used": self._extract_tables_from_sql(sql_query),
+                    "cached": results_from_cache,
+                }
 
-            # Step 5.5: Update query log with success result
-            if request_id:
+                # Step 4.5: Log the query (platform DB write runs in the executor)
                 try:
-                    query_logging_service.update_query_result(
-                        request_id=request_id,
-                        success=True,
-                        row_count=len(results),
-                        execution_time_ms=execution_time_ms,
+                    request_id = await self._run_blocking(
+                        query_logging_service.log_query,
+                        tenant_id=tenant_database.tenant_id,
+                        database_id=tenant_database.id,
+                        sql_query=sql_query,
+                        natural_language_question=question,
+                        user_id=uuid.UUID(user_id) if user_id and user_id != "system" else None,
+                        conversation_id=conversation_id,
+                        llm_model=llm_model,
+                        generation_time_ms=generation_time_ms,
+                        tokens_used=usage.total_tokens,
                     )
                 except Exception as log_error:
-                    logger.warning(f"[TENANT_AGENT] Failed to update query log (non-fatal): {log_error}")
+                    logger.warning(f"[TENANT_AGENT] Failed to log query (non-fatal): {log_error}")
+
+                # Step 5: Execute query on tenant's database (using query_router for gateway support)
+                # Paged requests fetch only the first page plus one row (to tell whether
+                # more follow); later pages are read through a result cursor
+                use_cursor = bool(page_size)
+                max_rows = min(page_size + 1, 1000) if use_cursor else 1000
+                execution_start_time = time.time()
+                if stream_rows:
+                    # Forward rows batch by batch as the database returns them. With a
+                    # result cursor only the first page is streamed, as for /mt/query
+                    results = []
+                    batches = (
+                        self._iter_cached_batches(cached.results, batch_size) if results_from_cache
+                        else query_router.stream_query(
+                            tenant_database=tenant_database,
+                            query=sql_query,
+                            timeout=60,
+                            max_rows=max_rows,
+                            batch_size=batch_size,
+                            user_id=user_id,
+                            conversation_id=conversation_id,
+                            bypass_cache=refresh,
+                        )
+                    )
+                    columns_sent = False
+                    async for columns, batch in batches:
+                        if not columns_sent:
+                            yield "columns", {"columns": columns}
+                            columns_sent = True
+                        streamed = batch[:max(0, page_size - len(results))] if use_cursor else batch
+                        results.extend(batch)
+                        if streamed:
+                            yield "rows", {"rows": streamed}
+                elif results_from_cache:
+                    results = cached.results
+                else:
+                    results = await query_router.execute_query(
+                        tenant_database=tenant_database,
+                        query=sql_query,
+                        timeout=60,
+                        max_rows=max_rows,
+                        user_id=user_id,
+                        conversation_id=conversation_id,
+                        bypass_cache=refresh,
+                    )
+                # Only the first page was fetched - the result set continues past it
+                truncated = use_cursor and not results_from_cache and len(results) >= max_rows
+                if results_from_cache:
+                    query_router.audit_cached_read(
+                        str(tenant_database.id), sql_query, len(results), user_id, conversation_id,
+                        source="answer_cache",
+                    )
+                # Bounds the cost guard added - now, or when the cached SQL was generated
+                applied_limits = (
+                    list(cost_decision.applied) if cost_decision is not None and cost_decision.action == "bound"
+                    else []
+                )
+                if not applied_limits and cached is not None:
+                    applied_limits = list(cached.applied_limits)
+                if cache_key and not results_from_cache:
+                    # A first page is not the answer - keep the SQL only
+                    query_cache.set(
+                        cache_key, sql_query, None if truncated else results, applied_limits=applied_limits
+                    )
+                execution_time_ms = int((time.time() - execution_start_time) * 1000)
+                timings["execution_ms"] = execution_time_ms
+                logger.info(f"[TENANT_AGENT] Query returned {len(results)} rows in {execution_time_ms}ms")
+
+                # Step 5.5: Update query log with success result
+                if request_id:
+                    try:
+                        await self._run_blocking(
+                            query_logging_service.update_query_result,
+                            request_id=request_id,
+                            success=True,
+                            row_count=len(results),
+                            execution_time_ms=execution_time_ms,
+                        )
+                    except Exception as log_error:
+                        logger.warning(f"[TENANT_AGENT] Failed to update query log (non-fatal): {log_error}")
+
+                # Step 6: Format natural language answer
+                natural_answer = self._format_answer(question, results[:page_size] if truncated else results)
+                if truncated:
+                    natural_answer += "\n\nMore rows are available - fetch further pages with the result cursor."
+                if applied_limits:
+                    natural_answer += self._limits_note(applied_limits)
+
+                # Step 7: Keep rows past the first page behind a result cursor
+                cursor_info = None
+                page = results
+                if truncated:
+                    if paged_sql(sql_query, 0, 1, tenant_database.db_type) is not None:
+                        # Later pages are read with an OFFSET/FETCH rewrite
+                        cursor = result_cursor_store.open(
+                            tenant_database_id=tenant_database.id,
+                            owner_id=user_id,
+                            sql_query=sql_query,
+                            db_type=tenant_database.db_type,
+                            rows=results,
+                            complete=False,
+                            page_size=page_size,
+                            conversation_id=conversation_id,
+                        )
+                    else:
+                        # No stable row order to page through: read the spill in the
+                        # background, as for queries the cost guard defers
+                        cursor = result_cursor_store.reserve(
+                            tenant_database_id=tenant_database.id,
+                            owner_id=user_id,
+                            sql_query=sql_query,
+                            db_type=tenant_database.db_type,
+                            page_size=page_size,
+                            conversation_id=conversation_id,
+                        )
+                        self._start_background_query(
+                            cursor.cursor_id, tenant_database, sql_query, user_id, conversation_id
+                        )
+                    cursor_info = cursor.info(result_cursor_store.idle_ttl_seconds)
+                    page = results[:page_size]
+                elif use_cursor and len(results) > page_size:
+                    cursor = result_cursor_store.open(
+                        tenant_database_id=tenant_database.id,
+                        owner_id=user_id,
+                        sql_query=sql_query,
+                        db_type=tenant_database.db_type,
+                        rows=results,
+                        # Cached result sets come from an unpaged (1000-row) run
+                        complete=len(results) < 1000,
+                        page_size=page_size,
+                        conversation_id=conversation_id,
+                    )
+                    cursor_info = cursor.info(result_cursor_store.idle_ttl_seconds)
+                    page = results[:page_size]
 
-            # Step 6: Format natural language answer
-            natural_answer = self._format_answer(question, results)
+                timings["total_ms"] = int((time.perf_counter() - request_start) * 1000)
+                logger.info(f"[TENANT_AGENT] Stage timings (ms): {timings}")
 
-            return {
-                "success": True,
-                "sql_query": sql_query,
-                "results": results,
-                "result_count": len(results),
-                "natural_answer": natural_answer,
-                "tables_used": self._extract_tables_from_sql(sql_query),
-                "tenant_db_name": tenant_database.name,
-                "request_id": request_id,
-                "error": None
-            }
+                yield "result", {
+                    "success": True,
+                    "sql_query": sql_query,
+                    "results": page,
+                    "result_count": len(page) if truncated else len(results),
+                    "cursor": cursor_info,
+                    "natural_answer": natural_answer,
+                    "tables_used": self._extract_tables_from_sql(sql_query),
+                    "tenant_db_name": tenant_database.name,
+                    "request_id": request_id,
+                    "cached": results_from_cache,
+                    "cost_guard": cost_decision.to_dict() if cost_decision is not None else None,
+                    "applied_limits": applied_limits,
+                    "llm_usage": usage.to_dict(),
+                    "timings": timings,
+                    "error": None
+                }
 
-        except Exception as e:
-            logger.error(f"[TENANT_AGENT] Query processing failed: {str(e)}", exc_info=True)
+            except Exception as e:
+                logger.error(f"[TENANT_AGENT] Query processing failed: {str(e)}", exc_info=True)
+                timings["total_ms"] = int((time.perf_counter() - request_start) * 1000)
+
+                # Never keep serving cached SQL that no longer executes
+                if cached and cache_key:
+                    query_cache.discard(cache_key)
+
+                # Update query log with error if we have a request_id
+                if request_id:
+                    try:
+                        await self._run_blocking(
+                            query_logging_service.update_query_result,
+                            request_id=request_id,
+                            success=False,
+                            error_message=str(e),
+                            error_code="QUERY_FAILED",
+                        )
+                    except Exception as log_error:
+                        logger.warning(f"[TENANT_AGENT] Failed to update query log with error (non-fatal): {log_error}")
+
+                yield "result", {
+                    "success": False,
+                    "sql_query": sql_query,
+                    "results": [],
+                    "result_count": 0,
+                    "natural_answer": f"I encountered an error: {str(e)}",
+                    "tables_used": [],
+                    "tenant_db_name": tenant_database.name,
+                    "request_id": request_id,
+                    "llm_usage": usage.to_dict(),
+                    "timings": timings,
+                    "error": str(e)
+                }
+        finally:
+            # Drop speculative retrieval still in flight (e.g. client disconnected)
+            if speculative_retrieval is not None and not speculative_retrieval.done():
+                speculative_retrieval.cancel()
 
-            # Update query log with error if we have a request_id
-            if request_id:
-                try:
-                    query_logging_service.update_query_result(
-                        request_id=request_id,
-                        success=False,
-                        error_message=str(e),
-                        error_code="QUERY_FAILED",
-                    )
-                except Exception as log_error:
-                    logger.warning(f"[TENANT_AGENT] Failed to update query log with error (non-fatal): {log_error}")
+    def _start_background_query(
+        self,
+        cursor_id: str,
+        tenant_database: TenantDatabase,
+        sql_query: str,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        timeout: int = 60
+    ):
+        """Run _run_background_query as a task that outlives the request"""
+        task = asyncio.create_task(
+            self._run_background_query(cursor_id, tenant_database, sql_query, user_id, conversation_id, timeout)
+        )
+        self._background_queries.add(task)
+        task.add_done_callback(self._background_queries.discard)
 
-            return {
-                "success": False,
-                "sql_query": sql_query,
-                "results": [],
-                "result_count": 0,
-                "natural_answer": f"I encountered an error: {str(e)}",
-                "tables_used": [],
-                "tenant_db_name": tenant_database.name,
-                "request_id": request_id,
-                "error": str(e)
-            }
+    async def _run_background_query(
+        self,
+        cursor_id: str,
+        tenant_database: TenantDatabase,
+        sql_query: str,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        timeout: Optional[int] = None
+    ):
+        """Execute a query in the background and deliver its rows (the spill) to a pending result cursor"""
+        max_rows = result_cursor_store.spill_rows
+        try:
+            results = await query_router.execute_query(
+                tenant_database=tenant_database,
+                query=sql_query,
+                timeout=timeout or settings.cost_guard_background_timeout,
+                max_rows=max_rows,
+                user_id=user_id,
+                conversation_id=conversation_id,
+            )
+            result_cursor_store.fulfil(cursor_id, results, complete=len(results) < max_rows)
+            logger.info(f"[TENANT_AGENT] Background query finished: {len(results)} rows (cursor {cursor_id[:8]})")
+        except asyncio.CancelledError:
+            # Not an Exception - without this the cursor would stay pending
+            result_cursor_store.fail(cursor_id, "Background query was cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"[TENANT_AGENT] Background query failed: {e}")
+            result_cursor_store.fail(cursor_id, str(e))
+
+    @staticmethod
+    async def _iter_cached_batches(
+        rows: List[Dict[str, Any]],
+        batch_size: int
+    ) -> AsyncIterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        """Replay a cached result set in the same (columns, rows) batches as query_router.stream_query"""
+        for batch in batch_rows(rows, batch_size):
+            yield batch
 
     def _get_global_schema_context(
         self,
         question: str,
-        n_results: int = 10
+        n_results: int = 10,
+        embedding_context: Optional[EmbeddingContext] = None
     ) -> List[Dict[str, Any]]:
         """
         Get schema context from GLOBAL ChromaDB (shared across all tenants)
@@ -466,13 +972,16 @@ class TenantSQLAgent:
         Args:
             question: User's natural language question
             n_results: Number of schema items to retrieve
+            embedding_context: Request-scoped question embeddings (shared with few-shot retrieval)
 
         Returns:
             List of schema context dictionaries for prompt
         """
         try:
             # Query global ChromaDB for relevant schemas
-            results = chroma_manager.query_schemas(question, n_results=n_results)
+            results = chroma_manager.query_schemas(
+                question, n_results=n_results, embedding_context=embedding_context
+            )
 
             context = []
             for i, (doc, metadata) in enumerate(zip(results.get("documents", []), results.get("metadatas", []))):
@@ -496,7 +1005,8 @@ class TenantSQLAgent:
     def _get_global_fewshots(
         self,
         question: str,
-        n_results: int = 5
+        n_results: int = 5,
+        embedding_context: Optional[EmbeddingContext] = None
     ) -> List[Dict[str, Any]]:
         """
         Get relevant few-shot examples from GLOBAL FAISS (shared across all tenants)
@@ -507,13 +1017,16 @@ class TenantSQLAgent:
         Args:
             question: User's natural language question
             n_results: Number of examples to retrieve
+            embedding_context: Request-scoped question embeddings (shared with schema retrieval)
 
         Returns:
             List of few-shot example dictionaries
         """
         try:
             # Query global FAISS for relevant few-shot examples
-            examples = few_shot_manager.get_relevant_examples(question, n_results=n_results)
+            examples = few_shot_manager.get_relevant_examples(
+                question, n_results=n_results, embedding_context=embedding_context
+            )
 
             formatted_examples = []
             for ex in examples:
@@ -652,19 +1165,25 @@ SQL DIALECT: {dialect}
         for i, schema in enumerate(schema_context[:15], 1):  # Limit to 15 tables
             prompt += f"\n{i}. {schema.get('document', '')}\n"
 
-        # Add conversation history if available
+        # Add conversation history if available (older turns as the session's rolling digest)
         if conversation_history and len(conversation_history) > 0:
+            compact = history_compactor.compact(conversation_history)
             prompt += "\n\nCONVERSATION HISTORY:\n"
             prompt += "Use this history to understand context from previous queries.\n\n"
+            prompt += compact.render_digest()
 
-            for msg in conversation_history[-5:]:  # Last 5 messages
+            for msg in compact.recent:
                 msg_type = msg.get("message_type", "")
                 content = msg.get("message_content", "")
 
                 if msg_type == "user":
                     prompt += f"USER: {content}\n"
                 elif msg_type == "assistant":
-                    prompt += f"ASSISTANT: {content[:200]}...\n\n"
+                    answer, sql_used, _, _ = parse_followup_context(content)
+                    prompt += f"ASSISTANT: {answer[:200]}...\n"
+                    if sql_used:
+                        prompt += f"  SQL USED: {sql_used}\n"
+                    prompt += "\n"
 
         prompt += f"""
 
@@ -692,69 +1211,135 @@ SQL QUERY:"""
 
         return prompt
 
-    def _generate_sql(self, prompt: str) -> str:
-        """Call LLM API to generate SQL (supports OpenRouter and Gemini)"""
-        if self.llm_provider == "gemini":
-            return self._generate_sql_gemini(prompt)
-        else:
-            return self._generate_sql_openrouter(prompt)
+    async def _preflight_sql(
+        self,
+        prompt: str,
+        sql_query: str,
+        tenant_database: TenantDatabase,
+        platform_db: Session
+    ) -> str:
+        """
+        Validate generated SQL locally, asking the LLM for one repair if it fails
 
-    def _generate_sql_openrouter(self, prompt: str) -> str:
-        """Call OpenRouter API to generate SQL"""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://oryggi.ai",
-                "X-Title": "OryggiAI SQL Agent",
-            }
+        Catalog errors (unknown table / column) fail open: against the
+        reference catalog they are only logged, and against the tenant's own
+        catalog a repair that still fails them falls back to the original SQL.
+        Only errors in the statement itself (not a single SELECT) block it.
 
-            payload = {
-                "model": self.openrouter_model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": self.temperature,
-                "max_tokens": settings.gemini_max_tokens,
-            }
+        Args:
+            prompt: Prompt the SQL was generated from
+            sql_query: Cleaned SQL
+            tenant_database: Tenant database (selects the SchemaCache catalog)
+            platform_db: Platform database session
 
-            response = requests.post(
-                f"{self.openrouter_base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
+        Returns:
+            SQL to execute
 
-            if response.status_code != 200:
-                error_detail = response.text
-                logger.error(f"[TENANT_AGENT] OpenRouter API error: {response.status_code} - {error_detail}")
-                raise Exception(f"OpenRouter API error: {response.status_code} - {error_detail}")
+        Raises:
+            SQLValidationError: If the repaired SQL still has statement errors
+        """
+        try:
+            catalog = await self._run_blocking(sql_validator.tenant_catalog, platform_db, tenant_database.id)
+        except Exception as e:
+            logger.warning(f"[TENANT_AGENT] Tenant schema catalog unavailable, using reference catalog: {e}")
+            catalog = None
+
+        validation = sql_validator.validate(sql_query, catalog)
+        if validation.is_valid:
+            return sql_query
+
+        if not validation.has_statement_errors and not validation.catalog_complete:
+            # The reference catalog is not this tenant's schema - the database decides
+            sql_validator.record_fail_open()
+            logger.warning(f"[TENANT_AGENT] SQL fails reference catalog checks, executing as generated: {validation.to_prompt()}")
+            return sql_query
+
+        logger.warning(f"[TENANT_AGENT] Generated SQL failed validation, requesting repair: {validation.to_prompt()}")
+        response = await self._generate_sql(self._build_repair_prompt(prompt, sql_query, validation))
+        repaired = self._clean_sql(response.text)
+        revalidation = sql_validator.validate(repaired, catalog)
+        if revalidation.is_valid:
+            sql_validator.record_repair()
+            logger.info("[TENANT_AGENT] Repaired SQL passed validation")
+            return repaired
+
+        if not revalidation.has_statement_errors:
+            # Prefer the original unless it was the one that was unsafe
+            fallback = repaired if validation.has_statement_errors else sql_query
+            sql_validator.record_fail_open()
+            logger.warning(f"[TENANT_AGENT] Repair still fails catalog checks, executing anyway: {revalidation.to_prompt()}")
+            return fallback
+
+        raise SQLValidationError(revalidation)
+
+    def _build_repair_prompt(self, prompt: str, sql_query: str, validation: SQLValidationResult) -> str:
+        """Original prompt plus the rejected SQL and its validation errors"""
+        return f"""{prompt}
+{sql_query}
+
+The SQL query above was rejected before execution:
+{validation.to_prompt()}
+
+Fix these problems using only tables and columns from the schema context.
+Return ONLY the corrected SQL query.
+
+SQL QUERY:"""
+
+    async def _generate_sql(self, prompt: str) -> LLMResponse:
+        """
+        Call LLM API to generate SQL (supports OpenRouter and Gemini)
 
-            result = response.json()
+        Gemini uses the SDK's native async client; OpenRouter uses the
+        shared pooled HTTP transport. Concurrent calls with an identical
+        prompt (e.g. a dashboard refresh across one tenant) share a single
+        in-flight LLM call.
 
-            if "choices" not in result or len(result["choices"]) == 0:
-                raise Exception("OpenRouter returned empty response")
+        Returns:
+            The router's response: SQL text plus the provider / model that answered
+        """
+        if not settings.agent_llm_coalescing:
+            return await self._call_sql_llm(prompt)
 
-            content = result["choices"][0]["message"]["content"]
+        model = settings.gemini_model if self.llm_provider == "gemini" else self.openrouter_model
+        key = SingleFlight.make_key(self.llm_provider, model, self.temperature, prompt)
+        return await llm_single_flight.do(key, lambda: self._call_sql_llm(prompt))
 
-            if not content:
-                raise Exception("OpenRouter returned empty content")
+    async def _call_sql_llm(self, prompt: str) -> LLMResponse:
+        """
+        Dispatch a SQL-generation prompt through the LLM router
 
+        The configured provider is primary; secondary providers receive a
+        hedge request when the primary is slower than its p95, or the prompt
+        outright when the primary fails or its circuit is open. The response
+        names the provider and model that actually answered.
+        """
+        provider_calls = {
+            "gemini": lambda: self._generate_sql_gemini(prompt),
+            "openrouter": lambda: self._generate_sql_openrouter(prompt),
+        }
+        primary = "gemini" if self.llm_provider == "gemini" else "openrouter"
+        calls = {name: provider_calls[name] for name in [primary] + self.secondary_providers}
+        models = {"gemini": settings.gemini_model, "openrouter": getattr(self, "openrouter_model", None)}
+        return await llm_router.generate(calls, primary=primary, models=models)
+
+    async def _generate_sql_openrouter(self, prompt: str) -> str:
+        """Call OpenRouter API to generate SQL (pooled async transport)"""
+        try:
+            content = await llm_transport.complete(
+                prompt,
+                model=self.openrouter_model,
+                temperature=self.temperature,
+                max_tokens=settings.gemini_max_tokens,
+            )
             logger.info(f"[TENANT_AGENT] OpenRouter response received, model: {self.openrouter_model}")
-            return content.strip()
+            return content
 
-        except requests.exceptions.Timeout:
-            logger.error("[TENANT_AGENT] OpenRouter API timeout")
-            raise Exception("OpenRouter API request timed out")
         except Exception as e:
             logger.error(f"[TENANT_AGENT] OpenRouter API call failed: {str(e)}")
             raise
 
-    def _generate_sql_gemini(self, prompt: str) -> str:
-        """Call Gemini API to generate SQL"""
+    async def _generate_sql_gemini(self, prompt: str) -> str:
+        """Call Gemini API to generate SQL (native async)"""
         try:
             generation_config = {
                 "temperature": self.temperature,
@@ -768,11 +1353,13 @@ SQL QUERY:"""
                 self.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: self.HarmBlockThreshold.BLOCK_NONE,
             }
 
-            response = self.gemini_model.generate_content(
+            started_at = time.perf_counter()
+            response = await self.gemini_model.generate_content_async(
                 prompt,
                 generation_config=generation_config,
                 safety_settings=safety_settings
             )
+            llm_usage.record_gemini(response, started_at)
 
             if not response.text:
                 raise Exception("Gemini returned empty response")
@@ -823,6 +1410,15 @@ SQL QUERY:"""
 
         return list(set(tables))
 
+    @staticmethod
+    def _limits_note(applied_limits: List[str]) -> str:
+        """Tell the user which bounds were added to their query and how to get around them"""
+        return (
+            f"\n\nNote: to keep this query fast it was limited to {' and '.join(applied_limits)}, "
+            "so older or further rows may be missing. Ask again with a specific date range "
+            "or filter to see them."
+        )
+
     def _format_answer(
         self,
         question: str,
@@ -238,7 +238,7 @@ async def get_platform_analytics(
     - Tenant statistics (total, active, online)
     - Query statistics (total, success rate, avg time)
     - Top tenants by query volume
-    - Token usage summary
+    - Token usage summary (logged totals, plus LLM usage per stage and tenant)
 
     Headers Required:
     - X-Admin-API-Key: Admin authentication key
@@ -280,6 +280,7 @@ async def get_admin_dashboard(
     - Platform analytics summary
     - Online/offline tenant counts
     - Top 5 most active tenants
+    - LLM usage per stage (calls, tokens, latency)
     - Recent queries across all tenants
 
     Headers Required:
@@ -304,6 +305,7 @@ async def get_admin_dashboard(
             "total_tokens": analytics["query_stats"]["total_tokens_used"],
         },
         "top_tenants": analytics["top_tenants"][:5],
+        "llm_usage": analytics["llm_usage"]["stages"],
         "recent_tenants": tenants["tenants"][:10],
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -5,22 +5,30 @@ Handles user queries with RAG-enhanced SQL generation
 Multi-Tenant Support:
 - /query - Original endpoint (uses default database from settings)
 - /mt/query - Multi-tenant endpoint (uses authenticated user's tenant database)
+- /mt/query/stream - Server-Sent Events variant of /mt/query
+- /mt/results/{cursor_id} - Later pages of a paged /mt/query result
+- /mt/stats/{subsystem} - Process-wide cache / pipeline statistics (platform admin key)
 """
 
-from typing import Optional
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from typing import Callable, Dict, Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from loguru import logger
+import asyncio
+import json
 import time
 
 from app.models.chat import (
     ChatQueryRequest,
     ChatQueryResponse,
+    ResultPage,
     SchemaIndexRequest,
     SchemaIndexResponse
 )
 from app.agents.sql_agent import sql_agent
-from app.rag import index_database_schema, chroma_manager, few_shot_manager
+from app.rag import index_database_schema, schema_indexer, chroma_manager, few_shot_manager
 from app.config import settings
 
 # Phase 3: Conversation Memory
@@ -31,7 +39,8 @@ from app.memory.memory_retriever import memory_retriever
 from app.workflows.chatbot_orchestrator import chatbot_orchestrator
 
 # Multi-tenant support
-from app.database.platform_connection import get_platform_db
+from app.database.platform_connection import get_platform_db, platform_db
+from app.api.admin import verify_admin_api_key
 from app.api.deps import CurrentUserDep
 
 # Multi-tenant SQL agent
@@ -351,7 +360,9 @@ async def index_schema(request: SchemaIndexRequest):
     Index database schema into vector store
 
     This endpoint extracts database schema (tables, columns, relationships)
-    and creates embeddings for RAG-based query generation.
+    and creates embeddings for RAG-based query generation. Only new or
+    changed documents are embedded, removed ones are deleted, and queries
+    keep using the previous index until the update is written.
 
     **When to use:**
     - After database schema changes
@@ -371,24 +382,27 @@ async def index_schema(request: SchemaIndexRequest):
         "success": true,
         "embeddings_count": 1250,
         "tables_count": 35,
-        "message": "Schema indexed successfully"
+        "message": "Schema indexed successfully",
+        "added": 2,
+        "updated": 5,
+        "removed": 1,
+        "skipped": 1243,
+        "failed": 0,
+        "failed_ids": []
     }
     ```
     """
     logger.info(f"Schema indexing requested (force_reindex={request.force_reindex})")
 
     try:
-        # Force reindex if requested
-        if request.force_reindex:
-            chroma_manager.delete_all()
-
-        # Index schema
+        # Index schema (force_reindex re-embeds unchanged documents too)
         if settings.embedding_provider == "google":
             from reindex_schemas_google import reindex_schemas_google
-            result = reindex_schemas_google()
-            embeddings_count = result["total_embeddings"] if result else 0
+            result = reindex_schemas_google(force=request.force_reindex)
+            sync = result["sync"] if result else {}
         else:
-            embeddings_count = index_database_schema()
+            index_database_schema(force=request.force_reindex)
+            sync = schema_indexer.last_sync
 
         # Get stats
         stats = chroma_manager.get_collection_stats()
@@ -400,7 +414,16 @@ async def index_schema(request: SchemaIndexRequest):
                 meta for meta in stats.get("sample_documents", [])
                 if "table" in str(meta).lower()
             ]),
-            message="Schema indexed successfully"
+            message=(
+                f"Schema indexed, {sync['failed']} document(s) could not be embedded"
+                if sync.get("failed") else "Schema indexed successfully"
+            ),
+            added=sync.get("added", 0),
+            updated=sync.get("updated", 0),
+            removed=sync.get("removed", 0),
+            skipped=sync.get("skipped", 0),
+            failed=sync.get("failed", 0),
+            failed_ids=sync.get("failed_ids", [])
         )
 
     except Exception as e:
@@ -469,49 +492,24 @@ class MTChatRequest(BaseModel):
     clarification_response: Optional[str] = Field(None, description="User's response to a clarification question")
     original_unclear_question: Optional[str] = Field(None, description="The original question that needed clarification")
     clarification_attempt: int = Field(0, description="Current clarification attempt number")
+    # Result paging (/mt/query and /mt/query/stream)
+    page_size: Optional[int] = Field(
+        None, ge=1, le=1000,
+        description="Rows in the first page of results (defaults to RESULT_CURSOR_PAGE_SIZE)"
+    )
+    refresh: bool = Field(False, description="Re-run the query instead of serving cached results")
 
 
-@router.post("/mt/query", response_model=ChatQueryResponse)
-async def multi_tenant_query(
-    request: MTChatRequest,
-    current_user: CurrentUserDep,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_platform_db)
-):
+def _resolve_mt_database(request: MTChatRequest, tenant_id, db: Session):
     """
-    Multi-tenant chat endpoint - uses authenticated user's tenant database
-
-    This endpoint requires JWT authentication and will use the tenant's
-    configured database for queries.
-
-    **Flow:**
-    1. Authenticate user via JWT token
-    2. Get user's tenant and default database
-    3. Process query against tenant's database
-    4. Return results with tenant isolation
+    Pick the tenant database for a multi-tenant query and enforce usage limits
 
-    **Example Request:**
-    ```json
-    {
-        "question": "How many employees joined in the last 30 days?",
-        "database_id": null,  // Uses default database
-        "session_id": null    // Auto-generated if not provided
-    }
-    ```
-
-    **Headers Required:**
-    - Authorization: Bearer <jwt_token>
+    Raises:
+        HTTPException: If the database is unknown, not onboarded, or the daily limit is reached
     """
-    start_time = time.time()
-
-    # Get tenant's database
     from app.services.tenant_service import list_database_connections, get_database_connection
     import uuid as uuid_module
 
-    tenant_id = current_user.tenant_id
-    user_id = str(current_user.user_id)
-    user_role = current_user.role.upper()
-
     # Determine which database to use
     if request.database_id:
         try:
@@ -556,35 +554,229 @@ async def multi_tenant_query(
                    f"Upgrade your plan for more queries."
         )
 
-    # Generate session ID
-    session_id = request.session_id or conversation_store.generate_session_id(user_id)
+    return tenant_db
 
-    logger.info(f"[MT:{str(tenant_id)[:8]}:{user_id[:8]}:{session_id[:12]}] Query: {request.question}")
-    logger.info(f"[MT] Using database: {tenant_db.name} ({tenant_db.database_name})")
 
-    # Store user question
+def _load_mt_history(session_id: str, user_id: str) -> Optional[list]:
+    """Fetch conversation history (critical for detecting clarification responses)"""
+    try:
+        history_result = conversation_store.get_session_history(session_id, user_id)
+        if history_result and history_result.get("messages"):
+            conversation_history = history_result.get("messages", [])
+            logger.debug(f"[MT] Loaded {len(conversation_history)} messages for context")
+            return conversation_history
+    except Exception as hist_err:
+        logger.warning(f"[MT] Failed to load conversation history: {hist_err}")
+    return None
+
+
+def _store_mt_user_message(session_id: str, user_id: str, user_role: str, question: str):
+    """Store the user's question in conversation history"""
     try:
         conversation_store.store_message(
             session_id=session_id,
             user_id=user_id,
             user_role=user_role,
             message_type="user",
-            message_content=request.question
+            message_content=question
         )
     except Exception as e:
         logger.warning(f"[MEMORY] Failed to store user message: {str(e)}")
 
-    try:
-        # Fetch conversation history from conversation_store
-        # This is critical for clarification flow - allows detecting user responses
-        conversation_history = None
+
+def _record_mt_result(
+    db: Session,
+    result: dict,
+    question: str,
+    session_id: str,
+    tenant_id,
+    user_id: str,
+    user_role: str,
+    response_time_ms: int,
+    background_tasks: BackgroundTasks
+):
+    """Store the assistant turn and track usage for a tenant agent result"""
+    import uuid as uuid_module
+
+    # Check if clarification is needed (Light Mode)
+    if result.get("needs_clarification"):
+        logger.info(f"[MT] Light clarification needed for: {question}")
+
+        # Store clarification request in conversation history
         try:
-            history_result = conversation_store.get_session_history(session_id, user_id)
-            if history_result and history_result.get("messages"):
-                conversation_history = history_result.get("messages", [])
-                logger.debug(f"[MT] Loaded {len(conversation_history)} messages for context")
-        except Exception as hist_err:
-            logger.warning(f"[MT] Failed to load conversation history: {hist_err}")
+            conversation_store.store_message(
+                session_id=session_id,
+                user_id=user_id,
+                user_role=user_role,
+                message_type="assistant",
+                message_content=result.get("clarification_question", "Could you please clarify?"),
+                tools_used=["clarity_assessment"],
+                data_returned=result,
+                success_flag=True
+            )
+        except Exception as e:
+            logger.warning(f"[MEMORY] Failed to store clarification request: {str(e)}")
+        return
+
+    # Track usage metrics
+    try:
+        usage_service.track_query(
+            db=db,
+            tenant_id=tenant_id,
+            success=result.get("success", False),
+            tokens=(result.get("llm_usage") or {}).get("total_tokens", 0),
+            response_time_ms=response_time_ms,
+            is_sql_query=True,
+            user_id=uuid_module.UUID(user_id),
+            sql_query=result.get("sql_query"),
+            rows_affected=result.get("result_count", 0)
+        )
+    except Exception as e:
+        logger.warning(f"[USAGE] Failed to track query: {str(e)}")
+
+    # Store response
+    try:
+        conversation_store.store_message(
+            session_id=session_id,
+            user_id=user_id,
+            user_role=user_role,
+            message_type="assistant",
+            message_content=result.get("natural_answer", ""),
+            tools_used=["tenant_query_database"],
+            data_returned=result,
+            success_flag=result.get("success", False)
+        )
+        background_tasks.add_task(sync_to_chromadb, session_id, user_id)
+    except Exception as e:
+        logger.warning(f"[MEMORY] Failed to store response: {str(e)}")
+
+
+def _build_mt_response(
+    result: dict,
+    question: str,
+    session_id: str,
+    execution_time: float
+) -> ChatQueryResponse:
+    """Map a tenant agent result onto ChatQueryResponse"""
+    if result.get("needs_clarification"):
+        return ChatQueryResponse(
+            session_id=session_id,
+            question=question,
+            sql_query=None,
+            answer=result.get("natural_answer", "Could you please clarify your request?"),
+            result_count=0,
+            tables_used=[],
+            execution_time=execution_time,
+            success=True,
+            error=None,
+            # Clarification fields
+            needs_clarification=True,
+            clarification_question=result.get("clarification_question"),
+            clarification_options=result.get("clarification_options"),
+            clarification_attempt=result.get("clarification_attempt", 1),
+            max_clarification_attempts=result.get("max_clarification_attempts", 3),
+            original_unclear_question=result.get("original_question"),
+            timings=result.get("timings")
+        )
+
+    if not result.get("success"):
+        return ChatQueryResponse(
+            session_id=session_id,
+            question=question,
+            sql_query=result.get("sql_query"),
+            answer=result.get("natural_answer", "Error processing request"),
+            result_count=0,
+            tables_used=[],
+            execution_time=execution_time,
+            success=False,
+            error=result.get("error"),
+            timings=result.get("timings")
+        )
+
+    # Extract query details from tenant SQL agent result
+    # Frontend now supports pagination, so we can pass all results
+    return ChatQueryResponse(
+        session_id=session_id,
+        question=question,
+        sql_query=result.get("sql_query"),
+        answer=result.get("natural_answer", ""),
+        result_count=result.get("result_count", 0),
+        tables_used=result.get("tables_used", []),
+        execution_time=execution_time,
+        success=True,
+        results=result.get("results"),
+        cursor=result.get("cursor"),
+        applied_limits=result.get("applied_limits") or [],
+        timings=result.get("timings")
+    )
+
+
+def _mt_error_response(question: str, session_id: str, execution_time: float, error: Exception) -> ChatQueryResponse:
+    """ChatQueryResponse for an unexpected failure while processing a query"""
+    return ChatQueryResponse(
+        session_id=session_id,
+        question=question,
+        sql_query=None,
+        answer=f"I encountered an error processing your question: {str(error)}",
+        result_count=0,
+        tables_used=[],
+        execution_time=execution_time,
+        success=False,
+        error=str(error)
+    )
+
+
+@router.post("/mt/query", response_model=ChatQueryResponse)
+async def multi_tenant_query(
+    request: MTChatRequest,
+    current_user: CurrentUserDep,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_platform_db)
+):
+    """
+    Multi-tenant chat endpoint - uses authenticated user's tenant database
+
+    This endpoint requires JWT authentication and will use the tenant's
+    configured database for queries.
+
+    **Flow:**
+    1. Authenticate user via JWT token
+    2. Get user's tenant and default database
+    3. Process query against tenant's database
+    4. Return results with tenant isolation
+
+    **Example Request:**
+    ```json
+    {
+        "question": "How many employees joined in the last 30 days?",
+        "database_id": null,  // Uses default database
+        "session_id": null    // Auto-generated if not provided
+    }
+    ```
+
+    **Headers Required:**
+    - Authorization: Bearer <jwt_token>
+    """
+    start_time = time.time()
+
+    tenant_id = current_user.tenant_id
+    user_id = str(current_user.user_id)
+    user_role = current_user.role.upper()
+
+    # Get tenant's database
+    tenant_db = _resolve_mt_database(request, tenant_id, db)
+
+    # Generate session ID
+    session_id = request.session_id or conversation_store.generate_session_id(user_id)
+
+    logger.info(f"[MT:{str(tenant_id)[:8]}:{user_id[:8]}:{session_id[:12]}] Query: {request.question}")
+    logger.info(f"[MT] Using database: {tenant_db.name} ({tenant_db.database_name})")
+
+    # Store user question
+    _store_mt_user_message(session_id, user_id, user_role, request.question)
+
+    try:
+        conversation_history = _load_mt_history(session_id, user_id)
 
         # Process using the tenant-specific SQL agent
         # This uses the tenant's schema and few-shot examples from platform DB
@@ -599,129 +791,171 @@ async def multi_tenant_query(
             # Clarification parameters
             clarification_response=request.clarification_response,
             original_unclear_question=request.original_unclear_question,
-            clarification_attempt=request.clarification_attempt
+            clarification_attempt=request.clarification_attempt,
+            # First page only - the rest stays behind a result cursor
+            page_size=(request.page_size or settings.result_cursor_page_size) if settings.result_cursors_enabled else None,
+            refresh=request.refresh
         )
 
         execution_time = time.time() - start_time
         response_time_ms = int(execution_time * 1000)
 
-        # Check if clarification is needed (Light Mode)
-        if result.get("needs_clarification"):
-            logger.info(f"[MT] Light clarification needed for: {request.question}")
+        _record_mt_result(
+            db, result, request.question, session_id, tenant_id,
+            user_id, user_role, response_time_ms, background_tasks
+        )
+        return _build_mt_response(result, request.question, session_id, execution_time)
 
-            # Store clarification request in conversation history
+    except Exception as e:
+        logger.error(f"[MT] Query processing failed: {str(e)}", exc_info=True)
+        return _mt_error_response(request.question, session_id, time.time() - start_time, e)
+
+
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/mt/query/stream")
+async def multi_tenant_query_stream(
+    request: MTChatRequest,
+    current_user: CurrentUserDep,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_platform_db)
+):
+    """
+    Streaming variant of /mt/query using Server-Sent Events
+
+    Emits events as each pipeline stage completes instead of waiting for
+    the whole answer:
+
+    - `understanding` - question accepted (sent immediately)
+    - `sql` - generated SQL and tables used
+    - `columns` - result column names
+    - `rows` - a batch of result rows (repeated; first page only when result
+      cursors are enabled)
+    - `summary` - final ChatQueryResponse fields, including the result cursor
+      for later pages (rows are not repeated here; for clarifications and
+      errors this is the only event after `understanding`)
+
+    Request body, authentication and validation errors are the same as /mt/query.
+    """
+    start_time = time.time()
+
+    tenant_id = current_user.tenant_id
+    user_id = str(current_user.user_id)
+    user_role = current_user.role.upper()
+
+    # Validation happens before streaming so errors keep their HTTP status codes
+    tenant_db = _resolve_mt_database(request, tenant_id, db)
+    session_id = request.session_id or conversation_store.generate_session_id(user_id)
+
+    logger.info(f"[MT:STREAM:{str(tenant_id)[:8]}:{user_id[:8]}:{session_id[:12]}] Query: {request.question}")
+
+    async def event_stream():
+        result = None
+        # The request-scoped session is closed once streaming starts, so the
+        # stream opens its own for the agent (catalog lookups) and recording
+        stream_db = platform_db.get_session()
+        try:
             try:
-                conversation_store.store_message(
-                    session_id=session_id,
+                await asyncio.to_thread(_store_mt_user_message, session_id, user_id, user_role, request.question)
+                conversation_history = await asyncio.to_thread(_load_mt_history, session_id, user_id)
+
+                async for event, data in tenant_sql_agent.process_query_events(
+                    question=request.question,
+                    tenant_database=tenant_db,
+                    platform_db=stream_db,
                     user_id=user_id,
                     user_role=user_role,
-                    message_type="assistant",
-                    message_content=result.get("clarification_question", "Could you please clarify?"),
-                    tools_used=["clarity_assessment"],
-                    data_returned=result,
-                    success_flag=True
-                )
+                    conversation_history=conversation_history,
+                    clarification_response=request.clarification_response,
+                    original_unclear_question=request.original_unclear_question,
+                    clarification_attempt=request.clarification_attempt,
+                    stream_rows=True,
+                    batch_size=settings.mt_stream_batch_size,
+                    # Same paging as /mt/query: rows past the first page go behind a result cursor
+                    page_size=(request.page_size or settings.result_cursor_page_size) if settings.result_cursors_enabled else None,
+                    refresh=request.refresh
+                ):
+                    if event == "result":
+                        result = data
+                    else:
+                        yield _sse_event(event, data)
+
+                execution_time = time.time() - start_time
+                response = _build_mt_response(result, request.question, session_id, execution_time)
+
             except Exception as e:
-                logger.warning(f"[MEMORY] Failed to store clarification request: {str(e)}")
+                logger.error(f"[MT:STREAM] Query processing failed: {str(e)}", exc_info=True)
+                response = _mt_error_response(request.question, session_id, time.time() - start_time, e)
 
-            return ChatQueryResponse(
-                session_id=session_id,
-                question=request.question,
-                sql_query=None,
-                answer=result.get("natural_answer", "Could you please clarify your request?"),
-                result_count=0,
-                tables_used=[],
-                execution_time=execution_time,
-                success=True,
-                error=None,
-                # Clarification fields
-                needs_clarification=True,
-                clarification_question=result.get("clarification_question"),
-                clarification_options=result.get("clarification_options"),
-                clarification_attempt=result.get("clarification_attempt", 1),
-                max_clarification_attempts=result.get("max_clarification_attempts", 3),
-                original_unclear_question=result.get("original_question")
-            )
+            # Rows were already streamed - the summary carries everything else
+            yield _sse_event("summary", response.model_dump(exclude={"results"}))
 
-        # Track usage metrics
-        try:
-            usage_service.track_query(
-                db=db,
-                tenant_id=tenant_id,
-                success=result.get("success", False),
-                tokens=0,  # TODO: Get actual token count from LLM
-                response_time_ms=response_time_ms,
-                is_sql_query=True,
-                user_id=uuid_module.UUID(user_id),
-                sql_query=result.get("sql_query"),
-                rows_affected=result.get("result_count", 0)
-            )
-        except Exception as e:
-            logger.warning(f"[USAGE] Failed to track query: {str(e)}")
+            if result is not None:
+                await asyncio.to_thread(
+                    _record_mt_result,
+                    stream_db, result, request.question, session_id, tenant_id,
+                    user_id, user_role, int(response.execution_time * 1000), background_tasks
+                )
+        finally:
+            # Also runs when the client disconnects mid-stream
+            stream_db.close()
 
-        # Store response
-        try:
-            conversation_store.store_message(
-                session_id=session_id,
-                user_id=user_id,
-                user_role=user_role,
-                message_type="assistant",
-                message_content=result.get("natural_answer", ""),
-                tools_used=["tenant_query_database"],
-                data_returned=result,
-                success_flag=result.get("success", False)
-            )
-            background_tasks.add_task(sync_to_chromadb, session_id, user_id)
-        except Exception as e:
-            logger.warning(f"[MEMORY] Failed to store response: {str(e)}")
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks
+    )
 
-        if not result.get("success"):
-            return ChatQueryResponse(
-                session_id=session_id,
-                question=request.question,
-                sql_query=result.get("sql_query"),
-                answer=result.get("natural_answer", "Error processing request"),
-                result_count=0,
-                tables_used=[],
-                execution_time=execution_time,
-                success=False,
-                error=result.get("error")
-            )
 
-        # Extract query details from tenant SQL agent result
-        sql_query = result.get("sql_query")
-        result_count = result.get("result_count", 0)
-        tables_used_list = result.get("tables_used", [])
-        results_data = result.get("results")
-        # Frontend now supports pagination, so we can pass all results
+@router.get("/mt/results/{cursor_id}", response_model=ResultPage)
+async def get_result_page(
+    cursor_id: str,
+    current_user: CurrentUserDep,
+    offset: int = Query(0, ge=0, description="Index of the first row"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Rows per page (defaults to the cursor's page size)"),
+    db: Session = Depends(get_platform_db)
+):
+    """
+    Fetch a page of a result set returned by /mt/query
 
-        return ChatQueryResponse(
-            session_id=session_id,
-            question=request.question,
-            sql_query=sql_query,
-            answer=result.get("natural_answer", ""),
-            result_count=result_count,
-            tables_used=tables_used_list,
-            execution_time=execution_time,
-            success=True,
-            results=results_data
-        )
+    Cursors belong to the user who ran the query and expire after
+    RESULT_CURSOR_IDLE_TTL_SECONDS without a fetch. Cursors of queries
+    moved to the background report status "pending" until their rows arrive.
+    """
+    from app.services.result_cursors import result_cursor_store
+    from app.services.tenant_service import get_database_connection
+    import uuid as uuid_module
 
+    cursor = result_cursor_store.get(cursor_id, owner_id=str(current_user.user_id))
+    if cursor is None:
+        raise HTTPException(status_code=404, detail="Result cursor not found or expired")
+
+    tenant_db = None
+    if result_cursor_store.needs_database(cursor, offset, limit or cursor.page_size):
+        # Pages past the in-memory spill are re-queried with OFFSET/FETCH
+        tenant_db = get_database_connection(db, uuid_module.UUID(cursor.tenant_database_id), current_user.tenant_id)
+        if tenant_db is None:
+            raise HTTPException(status_code=404, detail="Database not found")
+
+    try:
+        return ResultPage(**await result_cursor_store.fetch_page(cursor, offset, limit, tenant_db))
     except Exception as e:
-        logger.error(f"[MT] Query processing failed: {str(e)}", exc_info=True)
-        execution_time = time.time() - start_time
+        logger.error(f"[MT] Failed to fetch result page: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return ChatQueryResponse(
-            session_id=session_id,
-            question=request.question,
-            sql_query=None,
-            answer=f"I encountered an error processing your question: {str(e)}",
-            result_count=0,
-            tables_used=[],
-            execution_time=execution_time,
-            success=False,
-            error=str(e)
-        )
+
+@router.delete("/mt/results/{cursor_id}")
+async def close_result_cursor(cursor_id: str, current_user: CurrentUserDep):
+    """Release a result cursor before it expires"""
+    from app.services.result_cursors import result_cursor_store
+
+    if not result_cursor_store.close(cursor_id, owner_id=str(current_user.user_id)):
+        raise HTTPException(status_code=404, detail="Result cursor not found or expired")
+    return {"success": True, "cursor_id": cursor_id}
 
 
 @router.get("/mt/databases")
@@ -780,3 +1014,95 @@ async def reload_fewshot_examples():
     except Exception as e:
         logger.error(f"[ERROR] Failed to reload few-shot examples: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _subsystem_stats() -> Dict[str, Callable[[], dict]]:
+    """Process-wide statistics getters, one per subsystem"""
+    from app.services.query_cache import query_cache
+    from app.services.single_flight import llm_single_flight
+    from app.services.result_cursors import result_cursor_store
+    from app.services.sql_result_cache import sql_result_cache
+    from app.services.result_snapshots import result_snapshot_store
+    from app.services.query_cost_guard import query_cost_guard
+    from app.services.history_compactor import history_compactor
+    from app.services.sql_validator import sql_validator
+    from app.services.llm_router import llm_router
+    from app.services.llm_transport import llm_transport
+    from app.rag.embedding_cache import embedding_cache
+    from app.rag.embedding_models import embedding_model_registry
+
+    return {
+        "answer_cache": query_cache.get_stats,
+        "llm_coalescing": llm_single_flight.get_stats,
+        "llm_router": llm_router.get_stats,
+        "openrouter_transport": llm_transport.get_stats,
+        "result_cursors": result_cursor_store.get_stats,
+        "result_cache": sql_result_cache.get_stats,
+        "followup_snapshots": result_snapshot_store.get_stats,
+        "cost_guard": query_cost_guard.get_stats,
+        "sql_validation": sql_validator.get_stats,
+        "history_compaction": history_compactor.get_stats,
+        "embedding_cache": embedding_cache.get_stats,
+        "embedding_models": embedding_model_registry.get_stats,
+    }
+
+
+@router.get("/mt/stats")
+async def list_subsystem_stats(_: bool = Depends(verify_admin_api_key)):
+    """
+    List the subsystems with statistics at /mt/stats/{subsystem}
+
+    Statistics are process-wide (all tenants), so every stats endpoint needs
+    the platform admin key, not a tenant admin login.
+
+    Headers Required:
+    - X-Admin-API-Key: Admin authentication key
+    """
+    return {"subsystems": sorted(_subsystem_stats())}
+
+
+@router.get("/mt/stats/{subsystem}")
+async def get_subsystem_stats(subsystem: str, _: bool = Depends(verify_admin_api_key)):
+    """Get one subsystem's process-wide statistics (X-Admin-API-Key required)"""
+    getter = _subsystem_stats().get(subsystem)
+    if getter is None:
+        raise HTTPException(status_code=404, detail=f"Unknown subsystem: {subsystem}")
+    return getter()
+
+
+@router.get("/mt/cache-stats")
+async def get_query_cache_stats(_: bool = Depends(verify_admin_api_key)):
+    """
+    Get answer cache statistics (hits, misses, evictions, entry count)
+
+    Other subsystems report at /mt/stats/{subsystem}.
+    """
+    return _subsystem_stats()["answer_cache"]()
+
+
+@router.get("/mt/llm-stats")
+async def get_llm_router_stats(
+    tenant_id: Optional[str] = Query(None, description="Only this tenant's token usage (all tenants if omitted)"),
+    _: bool = Depends(verify_admin_api_key)
+):
+    """
+    Get LLM provider routing statistics: per-provider latency histograms,
+    circuit breaker state, hedges sent / won and failovers, and LLM token
+    usage per stage
+    """
+    from app.services.llm_usage import llm_usage
+
+    stats = _subsystem_stats()
+    result = stats["llm_router"]()
+    result["openrouter_transport"] = stats["openrouter_transport"]()
+    result["usage"] = llm_usage.get_stats(tenant_id)
+    return result
+
+
+@router.get("/mt/sql-validation-stats")
+async def get_sql_validation_stats(_: bool = Depends(verify_admin_api_key)):
+    """
+    Get SQL pre-flight validation statistics: statements validated, rejected
+    (gateway executions prevented), repaired, and rejections by error code
+    """
+    return _subsystem_stats()["sql_validation"]()
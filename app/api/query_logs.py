@@ -99,7 +99,7 @@ async def get_query_analytics(
     - Total queries
     - Success/error counts
     - Average execution time
-    - Token usage
+    - Token usage (logged totals, plus per-stage LLM usage since process start)
 
     Query Parameters:
     - start_date: Filter by start date (ISO format)
@@ -38,6 +38,27 @@ class Settings(BaseSettings):
     openrouter_base_url: str = Field(default="https://openrouter.ai/api/v1", env="OPENROUTER_BASE_URL")
     llm_provider: str = Field(default="gemini", env="LLM_PROVIDER")  # "gemini" (primary) or "openrouter" (backup)
 
+    # Pooled HTTP transport for OpenRouter (keep-alive / HTTP/2, retries with jittered backoff)
+    llm_http2: bool = Field(default=True, env="LLM_HTTP2")  # Only used if the h2 package is installed
+    llm_http_max_connections: int = Field(default=20, env="LLM_HTTP_MAX_CONNECTIONS")
+    llm_http_max_keepalive: int = Field(default=10, env="LLM_HTTP_MAX_KEEPALIVE")
+    llm_http_keepalive_expiry: float = Field(default=60.0, env="LLM_HTTP_KEEPALIVE_EXPIRY")
+    llm_http_timeout: float = Field(default=60.0, env="LLM_HTTP_TIMEOUT")
+    llm_http_connect_timeout: float = Field(default=10.0, env="LLM_HTTP_CONNECT_TIMEOUT")
+    llm_http_max_retries: int = Field(default=2, env="LLM_HTTP_MAX_RETRIES")
+    llm_http_backoff_base: float = Field(default=0.5, env="LLM_HTTP_BACKOFF_BASE")
+    llm_http_backoff_max: float = Field(default=8.0, env="LLM_HTTP_BACKOFF_MAX")
+
+    # Provider router: hedge to the other provider past the primary's p95 latency,
+    # fail over on errors, circuit breaker per provider on repeated timeouts / 5xx
+    llm_hedging_enabled: bool = Field(default=True, env="LLM_HEDGING_ENABLED")
+    llm_hedge_default_delay_ms: int = Field(default=4000, env="LLM_HEDGE_DEFAULT_DELAY_MS")  # Until p95 is known
+    llm_hedge_min_delay_ms: int = Field(default=500, env="LLM_HEDGE_MIN_DELAY_MS")
+    llm_hedge_min_samples: int = Field(default=20, env="LLM_HEDGE_MIN_SAMPLES")
+    llm_attempt_timeout: float = Field(default=60.0, env="LLM_ATTEMPT_TIMEOUT")
+    llm_breaker_failure_threshold: int = Field(default=5, env="LLM_BREAKER_FAILURE_THRESHOLD")
+    llm_breaker_reset_seconds: float = Field(default=30.0, env="LLM_BREAKER_RESET_SECONDS")
+
     # ==================== Database ====================
     db_driver: str = Field(default="ODBC Driver 17 for SQL Server", env="DB_DRIVER")
     db_server: str = Field(..., env="DB_SERVER")
@@ -117,6 +138,14 @@ class Settings(BaseSettings):
         env="EMBEDDING_MODEL"
     )
     embedding_device: str = Field(default="cpu", env="EMBEDDING_DEVICE")
+    # Texts combined into one encode call from concurrently queued requests (shared model registry)
+    embedding_encoder_max_batch_size: int = Field(default=64, env="EMBEDDING_ENCODER_MAX_BATCH_SIZE")
+    # Local model runtime: "torch" (sentence-transformers) or "onnx" (onnxruntime on CPU)
+    local_embedding_backend: str = Field(default="torch", env="LOCAL_EMBEDDING_BACKEND")
+    # ONNX export directory, dynamic int8 weight quantization, intra-op threads (0 = onnxruntime default)
+    onnx_embedding_dir: str = Field(default="./data/onnx_models", env="ONNX_EMBEDDING_DIR")
+    onnx_embedding_quantize: bool = Field(default=True, env="ONNX_EMBEDDING_QUANTIZE")
+    onnx_embedding_threads: int = Field(default=0, env="ONNX_EMBEDDING_THREADS")
 
     # Google Embedding Configuration
     google_embedding_model: str = Field(
@@ -127,10 +156,62 @@ class Settings(BaseSettings):
         default="retrieval_document",
         env="GOOGLE_EMBEDDING_TASK_TYPE"
     )
+    # Texts per batchEmbedContents request (API maximum: 100) and batch requests in flight
+    google_embedding_batch_size: int = Field(default=100, env="GOOGLE_EMBEDDING_BATCH_SIZE")
+    google_embedding_max_concurrency: int = Field(default=4, env="GOOGLE_EMBEDDING_MAX_CONCURRENCY")
+    # Per-batch retries on 429 / 5xx / timeouts (full-jitter exponential backoff)
+    google_embedding_max_retries: int = Field(default=3, env="GOOGLE_EMBEDDING_MAX_RETRIES")
+    google_embedding_backoff_base: float = Field(default=0.5, env="GOOGLE_EMBEDDING_BACKOFF_BASE")
+    google_embedding_backoff_max: float = Field(default=8.0, env="GOOGLE_EMBEDDING_BACKOFF_MAX")
+
+    # ==================== Embedding Cache ====================
+    # Persistent content-addressed cache of document embeddings shared by all indexers
+    embedding_cache_enabled: bool = Field(default=True, env="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_dir: str = Field(default="./data/embedding_cache", env="EMBEDDING_CACHE_DIR")
+    # Rows per (model, task type) before the cache stops growing (384-dim rows: ~1.5 KB each)
+    embedding_cache_max_rows: int = Field(default=200000, env="EMBEDDING_CACHE_MAX_ROWS")
+
+    # ==================== Agent Execution ====================
+    # Worker threads for blocking agent stages (RAG retrieval, sync LLM SDKs, platform DB logging)
+    agent_executor_workers: int = Field(default=16, env="AGENT_EXECUTOR_WORKERS")
+    # Start schema/few-shot retrieval alongside the clarity check (discarded if clarification is needed)
+    agent_speculative_retrieval: bool = Field(default=True, env="AGENT_SPECULATIVE_RETRIEVAL")
+    # Rows per "rows" event on /api/chat/mt/query/stream
+    mt_stream_batch_size: int = Field(default=100, env="MT_STREAM_BATCH_SIZE")
+    # Zero-LLM SQL templates (JSON, or YAML with PyYAML installed)
+    sql_templates_path: str = Field(default="./data/sql_templates.json", env="SQL_TEMPLATES_PATH")
+    # Share one LLM call between concurrent requests with an identical SQL-generation prompt
+    agent_llm_coalescing: bool = Field(default=True, env="AGENT_LLM_COALESCING")
+    # Validate generated SQL against the known catalog before sending it to the gateway
+    sql_preflight_validation: bool = Field(default=True, env="SQL_PREFLIGHT_VALIDATION")
+    # Full table/view/column catalog (written by scripts/analyze_database.py)
+    sql_validator_catalog_path: str = Field(default="./data/database_analysis.json", env="SQL_VALIDATOR_CATALOG_PATH")
+    # Seconds a tenant's SchemaCache-derived catalog is reused
+    sql_validator_schema_ttl: int = Field(default=600, env="SQL_VALIDATOR_SCHEMA_TTL")
+
+    # ==================== Prompt Budget ====================
+    # Tokens for retrieved schema docs + few-shot examples in the SQL prompt (ranked by retrieval score)
+    prompt_context_token_budget: int = Field(default=6000, env="PROMPT_CONTEXT_TOKEN_BUDGET")
+    # Reuse the static instruction prefix through provider-side context caching
+    # (Gemini cached content / OpenRouter cache_control); falls back to plain prompts on failure
+    prompt_prefix_caching: bool = Field(default=False, env="PROMPT_PREFIX_CACHING")
+    prompt_prefix_cache_ttl: int = Field(default=3600, env="PROMPT_PREFIX_CACHE_TTL")
+
+    # ==================== History Compaction ====================
+    # Older turns are folded into a per-session rolling summary + SQL / entity ID facts
+    history_compaction_enabled: bool = Field(default=True, env="HISTORY_COMPACTION_ENABLED")
+    # Turns (question + answer) rendered verbatim in SQL prompts
+    history_recent_turns: int = Field(default=3, env="HISTORY_RECENT_TURNS")
+    # Summary lines kept per session (older ones are only counted)
+    history_summary_max_turns: int = Field(default=20, env="HISTORY_SUMMARY_MAX_TURNS")
+    history_compactor_max_sessions: int = Field(default=1000, env="HISTORY_COMPACTOR_MAX_SESSIONS")
+    history_compactor_ttl_seconds: int = Field(default=3600, env="HISTORY_COMPACTOR_TTL_SECONDS")
 
     # ==================== LangGraph ====================
     langgraph_max_iterations: int = Field(default=10, env="LANGGRAPH_MAX_ITERATIONS")
     langgraph_timeout: int = Field(default=60, env="LANGGRAPH_TIMEOUT")
+    # Chatbot clarity + intent: "combined" = one triage LLM call, "parallel" = separate clarity and intent calls
+    chatbot_triage_mode: str = Field(default="combined", env="CHATBOT_TRIAGE_MODE")
 
     # ==================== Security & Authentication ====================
     secret_key: str = Field(..., env="SECRET_KEY")
@@ -176,6 +257,8 @@ class Settings(BaseSettings):
     # ==================== Action Execution ====================
     require_action_confirmation: bool = Field(default=True, env="REQUIRE_ACTION_CONFIRMATION")
     action_timeout_seconds: int = Field(default=300, env="ACTION_TIMEOUT_SECONDS")
+    # Rule-parser confidence at or above which the LLM classification call is skipped
+    action_rule_confidence_threshold: float = Field(default=0.85, env="ACTION_RULE_CONFIDENCE_THRESHOLD")
 
     # ==================== Oryggi Access Control API ====================
     # API endpoint for the Oryggi Access Control system
@@ -323,6 +406,58 @@ class Settings(BaseSettings):
     # ==================== Cache ====================
     enable_cache: bool = Field(default=True, env="ENABLE_CACHE")
     cache_ttl_seconds: int = Field(default=3600, env="CACHE_TTL_SECONDS")
+    cache_max_entries: int = Field(default=1000, env="CACHE_MAX_ENTRIES")
+    # Result sets go stale much faster than generated SQL
+    cache_store_results: bool = Field(default=True, env="CACHE_STORE_RESULTS")
+    cache_result_ttl_seconds: int = Field(default=60, env="CACHE_RESULT_TTL_SECONDS")
+    cache_max_result_rows: int = Field(default=1000, env="CACHE_MAX_RESULT_ROWS")
+
+    # ==================== Query Result Cache ====================
+    # Result sets cached in QueryRouter.execute_query, keyed by tenant database + canonical SQL hash
+    result_cache_enabled: bool = Field(default=True, env="RESULT_CACHE_ENABLED")
+    # Estimated memory budget across all cached result sets (LRU eviction)
+    result_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="RESULT_CACHE_MAX_BYTES")
+    result_cache_max_entry_bytes: int = Field(default=8 * 1024 * 1024, env="RESULT_CACHE_MAX_ENTRY_BYTES")
+    # TTLs by the tables a statement reads: punch/attendance views, other tables, lookup masters
+    result_cache_volatile_ttl: int = Field(default=30, env="RESULT_CACHE_VOLATILE_TTL")
+    result_cache_default_ttl: int = Field(default=300, env="RESULT_CACHE_DEFAULT_TTL")
+    result_cache_lookup_ttl: int = Field(default=3600, env="RESULT_CACHE_LOOKUP_TTL")
+
+    # ==================== Result Cursors ====================
+    # /mt/query returns the first page plus a cursor; later pages come from /mt/results/{cursor_id}
+    result_cursors_enabled: bool = Field(default=True, env="RESULT_CURSORS_ENABLED")
+    result_cursor_page_size: int = Field(default=100, env="RESULT_CURSOR_PAGE_SIZE")
+    # Rows kept in memory per cursor (read in the background for results without ORDER BY)
+    result_cursor_spill_rows: int = Field(default=10000, env="RESULT_CURSOR_SPILL_ROWS")
+    result_cursor_max_total_rows: int = Field(default=200000, env="RESULT_CURSOR_MAX_TOTAL_ROWS")
+    result_cursor_max_cursors: int = Field(default=200, env="RESULT_CURSOR_MAX_CURSORS")
+    result_cursor_idle_ttl_seconds: int = Field(default=600, env="RESULT_CURSOR_IDLE_TTL_SECONDS")
+
+    # ==================== Query Cost Guard ====================
+    # Estimate generated SQL with SHOWPLAN_XML before executing it (MSSQL only, fails open)
+    cost_guard_enabled: bool = Field(default=False, env="COST_GUARD_ENABLED")
+    # Estimated subtree cost thresholds: inject TOP / date bounds, ask to narrow, run in background
+    cost_guard_bound_cost: float = Field(default=50.0, env="COST_GUARD_BOUND_COST")
+    cost_guard_narrow_cost: float = Field(default=500.0, env="COST_GUARD_NARROW_COST")
+    cost_guard_background_cost: float = Field(default=5000.0, env="COST_GUARD_BACKGROUND_COST")
+    # Injected bounds
+    cost_guard_top_rows: int = Field(default=1000, env="COST_GUARD_TOP_ROWS")
+    cost_guard_date_window_days: int = Field(default=31, env="COST_GUARD_DATE_WINDOW_DAYS")
+    # Estimated plans are cached per SQL hash
+    cost_guard_estimate_timeout: int = Field(default=10, env="COST_GUARD_ESTIMATE_TIMEOUT")
+    cost_guard_estimate_ttl: int = Field(default=900, env="COST_GUARD_ESTIMATE_TTL")
+    # Timeout for queries moved to the background
+    cost_guard_background_timeout: int = Field(default=600, env="COST_GUARD_BACKGROUND_TIMEOUT")
+
+    # ==================== Follow-up Result Snapshots ====================
+    # Last result per session, reused by follow-up questions ("which of them are in IT")
+    result_snapshot_enabled: bool = Field(default=True, env="RESULT_SNAPSHOT_ENABLED")
+    # Larger results keep only their key (Ecode) column
+    result_snapshot_max_rows: int = Field(default=5000, env="RESULT_SNAPSHOT_MAX_ROWS")
+    # Follow-ups over more keys than this filter through the previous query, not an IN (...) list
+    result_snapshot_max_inline_keys: int = Field(default=1000, env="RESULT_SNAPSHOT_MAX_INLINE_KEYS")
+    result_snapshot_max_sessions: int = Field(default=500, env="RESULT_SNAPSHOT_MAX_SESSIONS")
+    result_snapshot_ttl_seconds: int = Field(default=1800, env="RESULT_SNAPSHOT_TTL_SECONDS")
 
     # ==================== PostgreSQL Configuration (Conversation Memory - Phase 3) ====================
     use_postgres_for_conversations: bool = Field(default=True, env="USE_POSTGRES_FOR_CONVERSATIONS")
@@ -366,6 +501,12 @@ class Settings(BaseSettings):
     # RAG Schema Configuration
     chroma_persist_dir: str = Field(default="./data/chroma_db", env="CHROMA_PERSIST_DIR")
     chroma_collection_name: str = Field(default="database_schema", env="CHROMA_COLLECTION_NAME")
+    # Schema retrieval backend: "chroma" (persistent client) or "numpy" (in-process exact
+    # top-k over a memory-mapped copy of the collection, rebuilt when the collection changes)
+    schema_retrieval_backend: str = Field(default="chroma", env="SCHEMA_RETRIEVAL_BACKEND")
+    schema_vector_index_path: str = Field(default="./data/schema_vector_index", env="SCHEMA_VECTOR_INDEX_PATH")
+    # How often a loaded index is checked against the collection (reindexes by other workers)
+    schema_vector_index_check_seconds: int = Field(default=30, env="SCHEMA_VECTOR_INDEX_CHECK_SECONDS")
 
     # ==================== Testing ====================
     testing: bool = Field(default=False, env="TESTING")
@@ -3,7 +3,7 @@ Tenant Database Connection Manager
 Handles dynamic connections to tenant databases for multi-tenant queries
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from sqlalchemy import create_engine, text, pool
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
@@ -208,6 +208,91 @@ class TenantDatabaseManager:
             logger.error(f"Tenant query execution failed: {str(e)}")
             raise
 
+    def iter_query_batches(
+        self,
+        tenant_database: TenantDatabase,
+        query: str,
+        params: Optional[dict] = None,
+        batch_size: int = 100,
+        max_rows: Optional[int] = None
+    ) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        """
+        Execute a SQL query and yield rows in batches as they are fetched
+
+        The connection stays open until the generator is exhausted or closed.
+
+        Args:
+            tenant_database: TenantDatabase model instance
+            query: SQL query string
+            params: Optional query parameters
+            batch_size: Rows per batch
+            max_rows: Stop after this many rows (no limit if None)
+
+        Yields:
+            Tuples of (column names, batch of row dictionaries). At least one
+            batch is yielded, so callers always receive the column names.
+        """
+        engine = self._pool.get_engine(tenant_database)
+
+        try:
+            with engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True)
+                if params:
+                    result = conn.execute(text(query), params)
+                else:
+                    result = conn.execute(text(query))
+
+                columns = list(result.keys())
+                fetched = 0
+                while True:
+                    size = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+                    rows = result.fetchmany(size) if size > 0 else []
+                    if not rows:
+                        if fetched == 0:
+                            yield columns, []
+                        break
+
+                    fetched += len(rows)
+                    yield columns, [dict(zip(columns, row)) for row in rows]
+
+                logger.debug(f"Tenant query streamed {fetched} rows")
+
+        except Exception as e:
+            logger.error(f"Tenant query execution failed: {str(e)}")
+            raise
+
+    def get_showplan_xml(
+        self,
+        tenant_database: TenantDatabase,
+        query: str,
+    ) -> Optional[str]:
+        """
+        Get the estimated execution plan of a query without running it (MSSQL)
+
+        SHOWPLAN_XML is a session setting, so the connection is invalidated
+        rather than returned to the pool if it cannot be switched off again.
+
+        Args:
+            tenant_database: TenantDatabase model instance
+            query: SQL query string
+
+        Returns:
+            Showplan XML document, or None if the database returned no plan
+        """
+        engine = self._pool.get_engine(tenant_database)
+
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+            try:
+                row = conn.exec_driver_sql(query).fetchone()
+                return row[0] if row else None
+            finally:
+                try:
+                    conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+                except Exception as e:
+                    logger.warning(f"Could not reset SHOWPLAN_XML, discarding connection: {e}")
+                    conn.invalidate()
+
     def execute_query_single(
         self,
         tenant_database: TenantDatabase,
@@ -5,7 +5,7 @@ Manages WebSocket connections from on-premises gateway agents.
 Provides connection pooling, session management, and health monitoring.
 """
 
-from typing import Dict, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Optional, Any, Callable, Awaitable
 from datetime import datetime, timedelta
 from uuid import uuid4
 import asyncio
@@ -58,6 +58,7 @@ class GatewayConnection:
         tenant_id: str,
         agent_version: str,
         agent_hostname: Optional[str] = None,
+        capabilities: Optional[List[str]] = None,
     ):
         self.websocket = websocket
         self.session_id = session_id
@@ -65,6 +66,7 @@ class GatewayConnection:
         self.tenant_id = tenant_id
         self.agent_version = agent_version
         self.agent_hostname = agent_hostname
+        self.capabilities = set(capabilities or [])
         self.connected_at = datetime.utcnow()
         self.last_heartbeat = datetime.utcnow()
         self.db_status = DatabaseStatus.CONNECTED
@@ -92,6 +94,7 @@ class GatewayConnection:
         max_rows: int = 1000,
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
+        estimate_only: bool = False,
     ) -> QueryResponse:
         """
         Execute a SQL query through the gateway agent
@@ -102,6 +105,8 @@ class GatewayConnection:
             max_rows: Maximum rows to return
             user_id: User who initiated the query
             conversation_id: Associated conversation ID
+            estimate_only: Return the estimated plan cost instead of executing
+                (only for agents advertising the "estimate_plan" capability)
 
         Returns:
             QueryResponse with results or error
@@ -120,6 +125,7 @@ class GatewayConnection:
             max_rows=max_rows,
             user_id=user_id,
             conversation_id=conversation_id,
+            estimate_only=estimate_only,
         )
 
         # Create future for response
@@ -438,6 +444,7 @@ class GatewayConnectionManager:
                 tenant_id=tenant_id,
                 agent_version=auth_request.agent_version,
                 agent_hostname=auth_request.agent_hostname,
+                capabilities=auth_request.capabilities,
             )
 
             self._connections[database_id] = connection
@@ -489,6 +496,11 @@ class GatewayConnectionManager:
 
         return True
 
+    def supports(self, database_id: str, capability: str) -> bool:
+        """Check if the connected agent for the database advertises a protocol capability"""
+        connection = self.get_connection(database_id)
+        return bool(connection and capability in connection.capabilities)
+
     async def execute_query(
         self,
         database_id: str,
@@ -497,6 +509,7 @@ class GatewayConnectionManager:
         max_rows: int = 1000,
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
+        estimate_only: bool = False,
     ) -> QueryResponse:
         """
         Execute a query through the gateway for a specific database
@@ -508,6 +521,7 @@ class GatewayConnectionManager:
             max_rows: Max rows to return
             user_id: User who initiated query
             conversation_id: Associated conversation
+            estimate_only: Return the estimated plan cost instead of executing
 
         Returns:
             QueryResponse with results
@@ -529,6 +543,7 @@ class GatewayConnectionManager:
             max_rows=max_rows,
             user_id=user_id,
             conversation_id=conversation_id,
+            estimate_only=estimate_only,
         )
 
     async def execute_api_request(
@@ -5,7 +5,8 @@ Routes SQL queries to either the gateway agent or direct connection
 based on database configuration and gateway availability.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
+import asyncio
 from loguru import logger
 
 from app.gateway.connection_manager import gateway_manager
@@ -17,6 +18,25 @@ from app.gateway.exceptions import (
 )
 from app.database.tenant_connection import tenant_db_manager
 from app.models.platform import TenantDatabase
+from app.services.query_cost_guard import QueryCostEstimate, parse_showplan_xml
+from app.services.sql_result_cache import sql_result_cache
+
+
+def batch_rows(
+    rows: List[Dict[str, Any]],
+    batch_size: int,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+    """
+    Split an already-fetched result set into (columns, rows) batches
+
+    Always yields at least one batch so consumers receive the column names.
+    """
+    columns = list(rows[0].keys()) if rows else []
+    if not rows:
+        yield columns, []
+        return
+    for i in range(0, len(rows), batch_size):
+        yield columns, rows[i:i + batch_size]
 
 
 class ConnectionMode:
@@ -52,10 +72,14 @@ class QueryRouter:
         max_rows: int = 1000,
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
+        bypass_cache: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Execute a query using the appropriate connection method
 
+        Results of unparameterized statements are served from / stored in the
+        SQL result cache (table-aware TTLs) unless bypass_cache is set.
+
         Args:
             tenant_database: TenantDatabase model instance
             query: SQL query string
@@ -64,6 +88,7 @@ class QueryRouter:
             max_rows: Maximum rows to return
             user_id: User who initiated query
             conversation_id: Associated conversation
+            bypass_cache: Skip the result cache lookup (the fresh result is still stored)
 
         Returns:
             List of result rows as dictionaries
@@ -76,11 +101,23 @@ class QueryRouter:
         database_id = str(tenant_database.id)
         connection_mode = getattr(tenant_database, "connection_mode", ConnectionMode.AUTO)
 
-        # Determine connection strategy
-        use_gateway = self._should_use_gateway(tenant_database, connection_mode)
+        use_cache = sql_result_cache.enabled and not params
+        if use_cache:
+            if bypass_cache:
+                sql_result_cache.record_bypass()
+            else:
+                cached = sql_result_cache.get(database_id, query, max_rows)
+                if cached is not None:
+                    logger.debug(f"Result cache hit for database {database_id} ({len(cached)} rows)")
+                    self.audit_cached_read(database_id, query, len(cached), user_id, conversation_id)
+                    return cached
+
+        # Determine connection strategy (may probe the direct connection, so
+        # keep it off the event loop)
+        use_gateway = await asyncio.to_thread(self._should_use_gateway, tenant_database, connection_mode)
 
         if use_gateway:
-            return await self._execute_via_gateway(
+            rows = await self._execute_via_gateway(
                 database_id=database_id,
                 query=query,
                 timeout=timeout,
@@ -88,12 +125,183 @@ class QueryRouter:
                 user_id=user_id,
                 conversation_id=conversation_id,
             )
+            complete = len(rows) < max_rows
         else:
-            return self._execute_direct(
+            # Direct connections use blocking pyodbc/SQLAlchemy calls
+            rows = await asyncio.to_thread(
+                self._execute_direct,
                 tenant_database=tenant_database,
                 query=query,
                 params=params,
             )
+            # The direct path does not apply max_rows, so it always has every row
+            complete = True
+
+        if use_cache:
+            sql_result_cache.set(database_id, query, rows, max_rows=max_rows, complete=complete)
+        return rows
+
+    async def stream_query(
+        self,
+        tenant_database: TenantDatabase,
+        query: str,
+        params: Optional[dict] = None,
+        timeout: int = 60,
+        max_rows: int = 1000,
+        batch_size: int = 100,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        bypass_cache: bool = False,
+    ) -> AsyncIterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        """
+        Execute a query and yield (columns, rows) batches as they arrive
+
+        Direct connections fetch batch by batch from the cursor. The gateway
+        protocol returns a query's rows in a single QueryResponse, so gateway
+        results are yielded in batches once that response arrives.
+
+        Uses the SQL result cache like execute_query: a cached result is
+        replayed in batches, and a result streamed to the end is stored.
+
+        Args:
+            tenant_database: TenantDatabase model instance
+            query: SQL query string
+            params: Query parameters (for direct connection)
+            timeout: Query timeout in seconds
+            max_rows: Maximum rows to return
+            batch_size: Rows per batch
+            user_id: User who initiated query
+            conversation_id: Associated conversation
+            bypass_cache: Skip the result cache lookup (the fresh result is still stored)
+
+        Yields:
+            Tuples of (column names, batch of row dictionaries)
+        """
+        database_id = str(tenant_database.id)
+        connection_mode = getattr(tenant_database, "connection_mode", ConnectionMode.AUTO)
+
+        use_cache = sql_result_cache.enabled and not params
+        if use_cache:
+            if bypass_cache:
+                sql_result_cache.record_bypass()
+            else:
+                cached = sql_result_cache.get(database_id, query, max_rows)
+                if cached is not None:
+                    logger.debug(f"Result cache hit for database {database_id} ({len(cached)} rows)")
+                    self.audit_cached_read(database_id, query, len(cached), user_id, conversation_id)
+                    for batch in batch_rows(cached, batch_size):
+                        yield batch
+                    return
+
+        use_gateway = await asyncio.to_thread(self._should_use_gateway, tenant_database, connection_mode)
+
+        if use_gateway:
+            rows = await self._execute_via_gateway(
+                database_id=database_id,
+                query=query,
+                timeout=timeout,
+                max_rows=max_rows,
+                user_id=user_id,
+                conversation_id=conversation_id,
+            )
+            if use_cache:
+                sql_result_cache.set(database_id, query, rows, max_rows=max_rows, complete=len(rows) < max_rows)
+            for batch in batch_rows(rows, batch_size):
+                yield batch
+            return
+
+        # Each fetchmany() blocks, so pull batches through a worker thread
+        batches = self._direct_manager.iter_query_batches(
+            tenant_database=tenant_database,
+            query=query,
+            params=params,
+            batch_size=batch_size,
+            max_rows=max_rows,
+        )
+        rows = []
+        fetch = None
+        try:
+            while True:
+                # Shielded, so a cancelled consumer leaves the fetch running to
+                # completion instead of abandoning the worker inside the generator
+                fetch = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                batch = await asyncio.shield(fetch)
+                if batch is None:
+                    break
+                if use_cache:
+                    rows.extend(batch[1])
+                yield batch
+            # Only a result read to the end is cached (not one the consumer abandoned)
+            if use_cache:
+                sql_result_cache.set(database_id, query, rows, max_rows=max_rows, complete=len(rows) < max_rows)
+        finally:
+            # Release the connection if the consumer stopped early (also shielded:
+            # the cursor must be closed even if the consumer is cancelled again)
+            await asyncio.shield(self._close_batches(batches, fetch))
+
+    @staticmethod
+    async def _close_batches(batches: Iterator, fetch: Optional[asyncio.Future]):
+        """
+        Close a direct-connection batch generator once no fetch is running in it
+
+        Closing while a worker thread is still inside next() would raise
+        "generator already executing" and leave the cursor open.
+        """
+        if fetch is not None:
+            await asyncio.wait({fetch})
+            if not fetch.cancelled():
+                # The consumer is gone; a late fetch error has nowhere to go
+                fetch.exception()
+        await asyncio.to_thread(batches.close)
+
+    async def estimate_query_cost(
+        self,
+        tenant_database: TenantDatabase,
+        query: str,
+        timeout: int = 10,
+    ) -> Optional[QueryCostEstimate]:
+        """
+        Get the estimated plan cost of a query without executing it (MSSQL only)
+
+        Gateway agents that do not advertise the "estimate_plan" capability
+        (older versions) are never sent an estimate request.
+
+        Args:
+            tenant_database: TenantDatabase model instance
+            query: SQL query string
+            timeout: Timeout in seconds for compiling the plan
+
+        Returns:
+            QueryCostEstimate, or None if no estimate is available
+        """
+        if getattr(tenant_database, "db_type", "mssql") != "mssql":
+            return None
+
+        database_id = str(tenant_database.id)
+        connection_mode = getattr(tenant_database, "connection_mode", ConnectionMode.AUTO)
+        use_gateway = await asyncio.to_thread(self._should_use_gateway, tenant_database, connection_mode)
+
+        if use_gateway:
+            if not self._gateway_manager.supports(database_id, "estimate_plan"):
+                return None
+            response = await self._gateway_manager.execute_query(
+                database_id=database_id,
+                sql_query=query,
+                timeout=timeout,
+                max_rows=1,
+                estimate_only=True,
+            )
+            if response.status != QueryStatus.SUCCESS or not response.rows:
+                logger.debug(f"No plan estimate from gateway {database_id}: {response.error_message}")
+                return None
+            row = response.rows[0]
+            return QueryCostEstimate(
+                estimated_cost=float(row.get("estimated_cost") or 0),
+                estimated_rows=float(row.get("estimated_rows") or 0),
+            )
+
+        showplan_xml = await asyncio.to_thread(self._direct_manager.get_showplan_xml, tenant_database, query)
+        return parse_showplan_xml(showplan_xml) if showplan_xml else None
 
     def _should_use_gateway(
         self,
@@ -154,6 +362,34 @@ class QueryRouter:
                     },
                 )
 
+    def audit_cached_read(
+        self,
+        database_id: str,
+        query: str,
+        row_count: int,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        source: str = "result_cache",
+    ):
+        """
+        Write the audit record for rows served without reaching the database
+
+        The gateway agent audits every query it runs (with user and
+        conversation); a cached result never gets there, so it is recorded here.
+
+        Args:
+            database_id: Tenant database the rows belong to
+            query: SQL statement the rows answer
+            row_count: Rows returned
+            user_id: User who initiated query
+            conversation_id: Associated conversation
+            source: Cache the rows came from
+        """
+        logger.bind(AUDIT=True).info(
+            f"AUDIT: read cached query [database={database_id}, user={user_id}, "
+            f"conversation={conversation_id}, source={source}, rows={row_count}] {query}"
+        )
+
     async def _execute_via_gateway(
         self,
         database_id: str,
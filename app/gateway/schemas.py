@@ -121,6 +121,10 @@ class AuthRequest(GatewayMessage):
     agent_version: str = Field(..., description="Version of the gateway agent")
     agent_hostname: Optional[str] = Field(None, description="Hostname of agent machine")
     agent_os: Optional[str] = Field(None, description="Operating system")
+    capabilities: List[str] = Field(
+        default_factory=list,
+        description="Optional protocol features the agent supports (e.g. estimate_plan)",
+    )
 
 
 class AuthResponse(GatewayMessage):
@@ -146,6 +150,10 @@ class QueryRequest(GatewayMessage):
     max_rows: int = Field(default=1000, description="Maximum rows to return")
     user_id: Optional[str] = Field(None, description="User who initiated the query")
     conversation_id: Optional[str] = Field(None, description="Associated conversation")
+    estimate_only: bool = Field(
+        default=False,
+        description="Return the estimated plan cost (estimated_cost, estimated_rows) instead of executing",
+    )
 
 
 class QueryResponse(GatewayMessage):
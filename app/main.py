@@ -131,6 +131,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}")
 
+    try:
+        from app.services.llm_transport import llm_transport
+        await llm_transport.aclose()
+    except Exception as e:
+        logger.error(f"Error closing LLM transport: {str(e)}")
+
     logger.info("=" * 80)
 
 
@@ -5,10 +5,13 @@ Features: ChromaDB vector storage, sentence transformers, RBAC enforcement
 """
 
 import uuid
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
 from datetime import datetime
 from app.memory.conversation_store import ConversationStore
 
+if TYPE_CHECKING:
+    from app.rag.embedding_context import EmbeddingContext
+
 # Optional ChromaDB and sentence transformers imports
 try:
     import chromadb
@@ -84,8 +87,11 @@ class MemoryRetriever:
         else:
             self.conversation_store = ConversationStore()
 
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(embedding_model)
+        # Initialize embedding model (shared with the schema / few-shot retrievers)
+        from app.rag.embedding_models import embedding_model_registry, local_index_suffix
+
+        self.embedding_model_name = embedding_model
+        self.embedding_model = embedding_model_registry.get(embedding_model)
         self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()
 
         # Determine ChromaDB mode from environment if not specified
@@ -104,6 +110,9 @@ class MemoryRetriever:
         if collection_name == "conversation_memory":
             collection_name = os.getenv("CHROMADB_COLLECTION_NAME", "conversation_memory")
 
+        # Each local embedding backend keeps its own collection (as with the FAISS indexes)
+        collection_name += local_index_suffix()
+
         # Initialize ChromaDB client based on mode
         self.chroma_mode = chroma_mode
 
@@ -152,6 +161,27 @@ class MemoryRetriever:
         """
         return self.embedding_model.encode(text).tolist()
 
+    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embedding vectors for several texts in one batch,
+        reusing vectors from the persistent embedding cache.
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            One embedding vector per text
+        """
+        from app.rag.embedding_cache import embedding_cache
+        from app.rag.embedding_context import sentence_transformer_key
+
+        return embedding_cache.embed(
+            sentence_transformer_key(self.embedding_model_name),
+            "document",
+            texts,
+            lambda missing: self.embedding_model.encode(missing).tolist(),
+        )
+
     def _format_conversation_text(self, message: Dict[str, Any]) -> str:
         """
         Format conversation message for embedding.
@@ -198,7 +228,6 @@ class MemoryRetriever:
 
         # Prepare documents for ChromaDB
         documents = []
-        embeddings = []
         metadatas = []
         ids = []
 
@@ -210,9 +239,6 @@ class MemoryRetriever:
             # Format text for embedding
             text = self._format_conversation_text(msg)
 
-            # Generate embedding
-            embedding = self._generate_embedding(text)
-
             # Generate unique ID
             doc_id = str(uuid.uuid4())
 
@@ -229,15 +255,14 @@ class MemoryRetriever:
 
             # Add to batch
             documents.append(text)
-            embeddings.append(embedding)
             metadatas.append(metadata)
             ids.append(doc_id)
 
-        # Add to ChromaDB
+        # Embed the whole batch at once and add to ChromaDB
         if documents:
             self.collection.add(
                 documents=documents,
-                embeddings=embeddings,
+                embeddings=self._generate_embeddings(documents),
                 metadatas=metadatas,
                 ids=ids
             )
@@ -250,7 +275,8 @@ class MemoryRetriever:
         user_id: str,
         n_results: int = 5,
         session_id: Optional[str] = None,
-        message_type: Optional[str] = None
+        message_type: Optional[str] = None,
+        embedding_context: Optional["EmbeddingContext"] = None
     ) -> List[Dict[str, Any]]:
         """
         Perform semantic search on conversation history.
@@ -263,12 +289,21 @@ class MemoryRetriever:
             n_results: Number of results to return
             session_id: Optional filter by session
             message_type: Optional filter by message type ('user' or 'assistant')
+            embedding_context: Optional request-scoped context that shares the
+                query vector with other retrievers using the same model
 
         Returns:
             List of search results with metadata and similarity scores
         """
-        # Generate query embedding
-        query_embedding = self._generate_embedding(query)
+        # Generate query embedding (reused from the request context when available)
+        if embedding_context is not None:
+            from app.rag.embedding_context import sentence_transformer_key
+            query_embedding = embedding_context.get(
+                sentence_transformer_key(self.embedding_model_name),
+                self._generate_embedding
+            )
+        else:
+            query_embedding = self._generate_embedding(query)
 
         # Build where filter for RBAC
         where_filter = {"user_id": user_id}
@@ -307,7 +342,8 @@ class MemoryRetriever:
         query: str,
         user_id: str,
         n_results: int = 3,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        embedding_context: Optional["EmbeddingContext"] = None
     ) -> str:
         """
         Get relevant conversation context for a query.
@@ -319,6 +355,7 @@ class MemoryRetriever:
             user_id: User identifier (RBAC)
             n_results: Number of relevant messages to retrieve
             session_id: Optional filter by session
+            embedding_context: Optional request-scoped embedding context
 
         Returns:
             Formatted context string for RAG augmentation
@@ -328,7 +365,8 @@ class MemoryRetriever:
             query=query,
             user_id=user_id,
             n_results=n_results,
-            session_id=session_id
+            session_id=session_id,
+            embedding_context=embedding_context
         )
 
         if not results:
@@ -18,6 +18,37 @@ class ChatQueryRequest(BaseModel):
     session_id: Optional[str] = Field(None, description="Session ID for conversation continuity (auto-generated if not provided)")
 
 
+class ResultCursorInfo(BaseModel):
+    """
+    Handle for the rest of a paged result set
+
+    Fetch later pages from GET /api/chat/mt/results/{cursor_id}.
+    """
+    cursor_id: str = Field(..., description="Opaque result cursor handle")
+    page_size: int = Field(..., description="Rows per page")
+    rows_available: int = Field(..., description="Rows held server-side for this cursor")
+    total_rows: Optional[int] = Field(None, description="Total rows, if the whole result set was fetched")
+    has_more: bool = Field(..., description="Whether rows exist past the first page")
+    expires_in_seconds: int = Field(..., description="Idle time after which the cursor expires")
+    status: str = Field(default="ready", description="ready, pending (query still running in the background) or failed")
+
+
+class ResultPage(BaseModel):
+    """
+    One page of a result cursor
+    """
+    cursor_id: str = Field(..., description="Result cursor handle")
+    status: str = Field(default="ready", description="ready, pending (poll again later) or failed")
+    error: Optional[str] = Field(None, description="Error message of a failed background query")
+    columns: List[str] = Field(default_factory=list, description="Result column names")
+    rows: List[Dict[str, Any]] = Field(default_factory=list, description="Rows in this page")
+    offset: int = Field(..., description="Index of the first row in this page")
+    limit: int = Field(..., description="Requested page size")
+    next_offset: Optional[int] = Field(None, description="Offset of the next page (None on the last page)")
+    has_more: bool = Field(..., description="Whether more rows follow this page")
+    total_rows: Optional[int] = Field(None, description="Total rows, if known")
+
+
 class ChatQueryResponse(BaseModel):
     """
     Response model for chat query endpoint
@@ -36,6 +67,12 @@ class ChatQueryResponse(BaseModel):
     success: bool = Field(..., description="Whether query succeeded")
     error: Optional[str] = Field(None, description="Error message if failed")
     results: Optional[List[Dict[str, Any]]] = Field(None, description="Structured query results for table display")
+    timings: Optional[Dict[str, int]] = Field(None, description="Per-stage pipeline timings in milliseconds")
+    cursor: Optional[ResultCursorInfo] = Field(None, description="Cursor for results past the first page")
+    applied_limits: List[str] = Field(
+        default_factory=list,
+        description="Bounds the cost guard added to the SQL (date window, TOP) - results may be incomplete"
+    )
 
     # Clarification fields - for handling unclear prompts
     needs_clarification: bool = Field(default=False, description="Whether the query needs clarification")
@@ -50,7 +87,7 @@ class SchemaIndexRequest(BaseModel):
     """
     Request model for schema indexing endpoint
     """
-    force_reindex: bool = Field(default=False, description="Force full re-indexing")
+    force_reindex: bool = Field(default=False, description="Re-embed unchanged documents too")
 
 
 class SchemaIndexResponse(BaseModel):
@@ -61,3 +98,9 @@ class SchemaIndexResponse(BaseModel):
     embeddings_count: int = Field(..., description="Number of embeddings created")
     tables_count: int = Field(..., description="Number of tables indexed")
     message: str = Field(..., description="Status message")
+    added: int = Field(default=0, description="Documents embedded for the first time")
+    updated: int = Field(default=0, description="Changed documents re-embedded")
+    removed: int = Field(default=0, description="Documents deleted (no longer in the schema)")
+    skipped: int = Field(default=0, description="Unchanged documents left as they were")
+    failed: int = Field(default=0, description="Documents that could not be embedded (retried on the next sync)")
+    failed_ids: List[str] = Field(default_factory=list, description="IDs of the documents that could not be embedded")
@@ -3,16 +3,22 @@ ChromaDB Manager for RAG System
 Handles vector store operations for database schema embeddings
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 import chromadb
 from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from loguru import logger
+import hashlib
+import json
 import os
-import google.generativeai as genai
-from chromadb import Documents, EmbeddingFunction, Embeddings
+import threading
+import time
 
 from app.config import settings
+from app.rag.embedding_cache import CachedEmbeddingFunction, EmbeddingBatchError
+from app.rag.embedding_context import EmbeddingContext, sentence_transformer_key
+from app.rag.embedding_models import SharedEmbeddingFunction, embedding_model_registry, local_index_suffix
+from app.rag.google_embeddings import GoogleEmbeddingFunction
+from app.rag.vector_index import NumpyVectorIndex, UnsupportedFilterError, corpus_fingerprint
 
 
 class ChromaDBManager:
@@ -22,39 +28,8 @@ class ChromaDBManager:
     Stores table schemas, column information, and example queries
     """
 
-    class GoogleEmbeddingFunction(EmbeddingFunction):
-        """
-        Custom embedding function for Google Generative AI
-        """
-        def __init__(self, api_key: str, model_name: str, task_type: str = "retrieval_document"):
-            genai.configure(api_key=api_key)
-            self.model_name = model_name
-            self.task_type = task_type
-
-        def __call__(self, input: Documents) -> Embeddings:
-            # Batch embed with Google's API
-            embeddings = []
-            # Google API handles batching, but we might want to chunk if too large
-            # For now, simple iteration or direct list pass if supported
-            # The genai.embed_content supports a single content or list? 
-            # It seems it supports single content mostly in current SDK versions or list.
-            # Let's iterate to be safe and handle errors per item if needed, 
-            # or use batch method if available. 
-            # Actually, let's use a loop for safety and error handling.
-            
-            for text in input:
-                try:
-                    result = genai.embed_content(
-                        model=self.model_name,
-                        content=text,
-                        task_type=self.task_type
-                    )
-                    embeddings.append(result['embedding'])
-                except Exception as e:
-                    logger.error(f"Google embedding failed for text: {text[:50]}... Error: {e}")
-                    # Return zero vector or raise? Raising is better to catch issues.
-                    raise e
-            return embeddings
+    # Kept as an attribute for callers that reference ChromaDBManager.GoogleEmbeddingFunction
+    GoogleEmbeddingFunction = GoogleEmbeddingFunction
 
     def __init__(self):
         """Initialize ChromaDB client and collection"""
@@ -62,6 +37,14 @@ class ChromaDBManager:
         self.collection: Optional[chromadb.Collection] = None
         self.embedding_function = None
         self._initialized = False
+        # In-process copy of the collection (SCHEMA_RETRIEVAL_BACKEND=numpy)
+        self.vector_index: Optional[NumpyVectorIndex] = None
+        self._vector_index_lock = threading.Lock()
+        # When the loaded index was last compared with the collection
+        self._vector_index_checked_at = 0.0
+        # Pre-sync copy of the collection served to queries while a sync writes
+        self._sync_snapshot: Optional[NumpyVectorIndex] = None
+        self._sync_lock = threading.Lock()
 
     def initialize(self):
         """
@@ -89,9 +72,9 @@ class ChromaDBManager:
                 )
             else:
                 logger.info(f"Using Sentence Transformers: {settings.embedding_model}")
-                self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                    model_name=settings.embedding_model,
-                    device=settings.embedding_device
+                self.embedding_function = CachedEmbeddingFunction(
+                    SharedEmbeddingFunction(embedding_model_registry.get(settings.embedding_model)),
+                    model=sentence_transformer_key(settings.embedding_model),
                 )
 
             # Create persistent ChromaDB client
@@ -105,7 +88,7 @@ class ChromaDBManager:
 
             # Get or create collection
             self.collection = self.client.get_or_create_collection(
-                name=settings.chroma_collection_name,
+                name=self.collection_name,
                 embedding_function=self.embedding_function,
                 metadata={"description": "Database schema embeddings for RAG"}
             )
@@ -117,6 +100,41 @@ class ChromaDBManager:
             logger.error(f"[ERROR] ChromaDB initialization failed: {str(e)}")
             raise
 
+    @property
+    def collection_name(self) -> str:
+        """
+        Name of the schema collection
+
+        Like the FAISS indexes, each local embedding backend keeps its own
+        collection: ONNX vectors are not interchangeable with torch ones.
+        """
+        if settings.embedding_provider == "google":
+            return settings.chroma_collection_name
+        return f"{settings.chroma_collection_name}{local_index_suffix()}"
+
+    @property
+    def embedding_key(self) -> str:
+        """Identity of the embedding model used for this collection"""
+        if settings.embedding_provider == "google":
+            return f"google:{settings.google_embedding_model}:{settings.google_embedding_task_type}"
+        return sentence_transformer_key(settings.embedding_model)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query exactly as collection.query(query_texts=...) would
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        if not self._initialized:
+            raise RuntimeError("ChromaDB not initialized")
+        # Questions are memoized per request by EmbeddingContext, not persisted
+        embed = getattr(self.embedding_function, "embed_uncached", self.embedding_function)
+        return embed([text])[0]
+
     def add_schema_embeddings(
         self,
         documents: List[str],
@@ -145,17 +163,169 @@ class ChromaDBManager:
                 metadatas=metadatas,
                 ids=ids
             )
+            self.vector_index = None
             logger.info(f"[OK] Added {len(documents)} schema embeddings")
 
         except Exception as e:
             logger.error(f"[ERROR] Failed to add embeddings: {str(e)}")
             raise
 
+    def sync_schema_embeddings(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        id_prefixes: Optional[Sequence[str]] = None,
+        remove_missing: bool = True,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Bring the collection in line with a complete set of schema documents
+
+        Each document's content hash (text + metadata + embedding model) is
+        stored in its metadata; only new or changed documents are embedded and
+        upserted, and documents no longer present are deleted. Embeddings are
+        computed before the collection is touched, and until the writes finish
+        queries in this process are answered from a snapshot of the previous
+        contents, so they never see a half-synced or empty index. Documents
+        whose embedding fails are left as they were (the next sync retries
+        them); the rest are written.
+
+        Args:
+            documents: Schema text descriptions
+            metadatas: Metadata dict per document
+            ids: Unique ID per document
+            id_prefixes: Only existing IDs with these prefixes are candidates
+                for removal (documents owned by other indexers are kept)
+            remove_missing: Delete owned documents that are not in `ids`
+            force: Re-embed and upsert unchanged documents too
+
+        Returns:
+            Dict with counts: added, updated, removed, skipped, failed
+            (plus failed_ids, the documents that could not be embedded)
+        """
+        if not self._initialized:
+            raise RuntimeError("ChromaDB not initialized")
+
+        with self._sync_lock:
+            desired: Dict[str, tuple] = {}
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                metadata = dict(metadata)
+                metadata["content_hash"] = self._content_hash(document, metadata)
+                desired[doc_id] = (document, metadata)
+
+            existing = self.collection.get(include=["metadatas"])
+            existing_hashes = {
+                doc_id: (metadata or {}).get("content_hash")
+                for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+            }
+
+            added = [doc_id for doc_id in desired if doc_id not in existing_hashes]
+            updated = [
+                doc_id for doc_id in desired
+                if doc_id in existing_hashes
+                and (force or existing_hashes[doc_id] != desired[doc_id][1]["content_hash"])
+            ]
+            removed = [
+                doc_id for doc_id in existing_hashes
+                if doc_id not in desired and (id_prefixes is None or doc_id.startswith(tuple(id_prefixes)))
+            ] if remove_missing else []
+
+            changed = added + updated
+            failed_ids: List[str] = []
+            embeddings = []
+            if changed:
+                # Embed first - the slow part runs while the old contents keep serving
+                try:
+                    embeddings = self.embedding_function([desired[doc_id][0] for doc_id in changed])
+                except EmbeddingBatchError as e:
+                    failed = set(e.failed_indexes)
+                    failed_ids = [changed[i] for i in sorted(failed)]
+                    embeddings = [vector for i, vector in enumerate(e.embeddings) if i not in failed]
+                    changed = [doc_id for i, doc_id in enumerate(changed) if i not in failed]
+                    logger.error(f"[ERROR] Could not embed {len(failed_ids)} schema document(s): {failed_ids}")
+
+            counts = {
+                "added": len([doc_id for doc_id in added if doc_id not in failed_ids]),
+                "updated": len([doc_id for doc_id in updated if doc_id not in failed_ids]),
+                "removed": len(removed),
+                "skipped": len(desired) - len(added) - len(updated),
+                "failed": len(failed_ids),
+                "failed_ids": failed_ids
+            }
+
+            if changed or removed:
+                self._sync_snapshot = self._snapshot_index()
+                try:
+                    if changed:
+                        self.collection.upsert(
+                            ids=changed,
+                            documents=[desired[doc_id][0] for doc_id in changed],
+                            metadatas=[desired[doc_id][1] for doc_id in changed],
+                            embeddings=embeddings
+                        )
+                    if removed:
+                        self.collection.delete(ids=removed)
+                finally:
+                    self.vector_index = None
+                    self._sync_snapshot = None
+
+            logger.info(
+                f"[OK] Schema embeddings synced: {counts['added']} added, {counts['updated']} updated, "
+                f"{counts['removed']} removed, {counts['skipped']} unchanged, {counts['failed']} failed"
+            )
+            return counts
+
+    def get_documents(self, ids: List[str]) -> Dict[str, tuple]:
+        """
+        Get stored documents by ID
+
+        Args:
+            ids: Document IDs (missing ones are left out of the result)
+
+        Returns:
+            Dict of ID -> (document, metadata)
+        """
+        if not self._initialized:
+            raise RuntimeError("ChromaDB not initialized")
+        if not ids:
+            return {}
+        items = self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        return {
+            doc_id: (document, metadata or {})
+            for doc_id, document, metadata in zip(items["ids"], items["documents"], items["metadatas"])
+        }
+
+    def _content_hash(self, document: str, metadata: Dict[str, Any]) -> str:
+        """Hash of everything that determines a stored document and its vector"""
+        payload = json.dumps(
+            [self.embedding_key, document, {k: v for k, v in metadata.items() if k != "content_hash"}],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _snapshot_index(self) -> Optional[NumpyVectorIndex]:
+        """In-process copy of the current collection (None if it cannot be built)"""
+        if self.vector_index is not None:
+            return self.vector_index
+        try:
+            items = self.collection.get(include=["embeddings", "documents", "metadatas"])
+            if not items["ids"]:
+                return None
+            return NumpyVectorIndex.build(
+                items["ids"], items["documents"], items["metadatas"], items["embeddings"]
+            )
+        except Exception as e:
+            logger.warning(f"Could not snapshot schema collection before sync: {e}")
+            return None
+
     def query_schemas(
         self,
         query_text: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        embedding_context: Optional[EmbeddingContext] = None
     ) -> Dict[str, Any]:
         """
         Query vector store for relevant schemas
@@ -164,6 +334,8 @@ class ChromaDBManager:
             query_text: Natural language query
             n_results: Number of results to return
             filter_metadata: Optional metadata filter
+            embedding_context: Optional request-scoped context; the query vector
+                is taken from (or stored in) it instead of re-embedding
 
         Returns:
             Dict with keys: 'documents', 'metadatas', 'distances'
@@ -178,11 +350,36 @@ class ChromaDBManager:
             raise RuntimeError("ChromaDB not initialized")
 
         try:
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=n_results,
-                where=filter_metadata
-            )
+            vector_index = self._sync_snapshot or self._get_vector_index()
+            if vector_index is not None:
+                if embedding_context is not None:
+                    query_embedding = embedding_context.get(self.embedding_key, self.embed_query)
+                else:
+                    query_embedding = self.embed_query(query_text)
+                try:
+                    results = vector_index.query(query_embedding, n_results, where=filter_metadata)
+                    logger.info(f"[OK] Retrieved {len(results['documents'])} relevant schemas (in-process index)")
+                    return {
+                        "documents": results["documents"],
+                        "metadatas": results["metadatas"],
+                        "distances": results["distances"]
+                    }
+                except UnsupportedFilterError as e:
+                    logger.debug(f"In-process index cannot apply filter ({e}) - querying ChromaDB")
+
+            if embedding_context is not None:
+                query_embedding = embedding_context.get(self.embedding_key, self.embed_query)
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=filter_metadata
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=[query_text],
+                    n_results=n_results,
+                    where=filter_metadata
+                )
 
             logger.info(f"[OK] Retrieved {len(results['documents'][0])} relevant schemas")
             return {
@@ -206,6 +403,7 @@ class ChromaDBManager:
         try:
             # Get all IDs
             all_items = self.collection.get()
+            self.vector_index = None
             if all_items["ids"]:
                 self.collection.delete(ids=all_items["ids"])
                 logger.info(f"[OK] Deleted {len(all_items['ids'])} embeddings")
@@ -216,6 +414,66 @@ class ChromaDBManager:
             logger.error(f"[ERROR] Delete failed: {str(e)}")
             raise
 
+    def _get_vector_index(self) -> Optional[NumpyVectorIndex]:
+        """
+        Get the in-process index, loading or rebuilding it if the collection changed
+
+        A loaded index is compared with the collection at most every
+        SCHEMA_VECTOR_INDEX_CHECK_SECONDS, so a reindex by another worker
+        process is picked up without a restart. Queries arriving while one
+        thread checks keep using the loaded index.
+
+        Returns:
+            NumpyVectorIndex, or None when the ChromaDB backend is configured
+            (or the index cannot be built)
+        """
+        if settings.schema_retrieval_backend != "numpy":
+            return None
+        if self.vector_index is not None and not self._vector_index_due():
+            return self.vector_index
+
+        if not self._vector_index_lock.acquire(blocking=self.vector_index is None):
+            return self.vector_index
+        try:
+            if self.vector_index is not None and not self._vector_index_due():
+                return self.vector_index
+            try:
+                current = self.collection.get(include=["documents", "metadatas"])
+                # Synced documents carry their content hash; hash the text of the rest
+                contents = [
+                    (metadata or {}).get("content_hash")
+                    or hashlib.sha256((document or "").encode("utf-8")).hexdigest()
+                    for document, metadata in zip(current["documents"], current["metadatas"])
+                ]
+                fingerprint = corpus_fingerprint(current["ids"], self.embedding_key, contents)
+                self._vector_index_checked_at = time.monotonic()
+                if self.vector_index is not None and self.vector_index.fingerprint == fingerprint:
+                    return self.vector_index
+                if self.vector_index is not None:
+                    logger.info("Schema collection changed since the in-process index was loaded - reloading")
+                index = NumpyVectorIndex.load(settings.schema_vector_index_path)
+                if index is None or index.fingerprint != fingerprint:
+                    items = self.collection.get(include=["embeddings", "documents", "metadatas"])
+                    index = NumpyVectorIndex.build(
+                        items["ids"], items["documents"], items["metadatas"], items["embeddings"] or [],
+                        fingerprint=fingerprint
+                    )
+                    index.save(settings.schema_vector_index_path)
+                    # Serve from the memory-mapped copy like every other worker
+                    index = NumpyVectorIndex.load(settings.schema_vector_index_path) or index
+                    logger.info(f"[OK] Built in-process schema index ({len(index)} embeddings)")
+                self.vector_index = index
+            except Exception as e:
+                logger.warning(f"In-process schema index unavailable ({e}) - querying ChromaDB")
+                return None
+            return self.vector_index
+        finally:
+            self._vector_index_lock.release()
+
+    def _vector_index_due(self) -> bool:
+        """Whether the loaded index should be compared with the collection again"""
+        return time.monotonic() - self._vector_index_checked_at >= settings.schema_vector_index_check_seconds
+
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         Get collection statistics
@@ -231,6 +489,7 @@ class ChromaDBManager:
 
         return {
             "count": count,
+            "retrieval_backend": settings.schema_retrieval_backend,
             "sample_ids": sample["ids"],
             "sample_documents": sample["documents"][:3] if sample["documents"] else []
         }
@@ -0,0 +1,334 @@
+"""
+Persistent Embedding Cache
+
+Content-addressed on-disk cache of embedding vectors shared by every indexer:
+SchemaIndexer (ChromaDB), FewShotManager / FAISSManager (FAISS), AutoEmbedder
+(per-tenant onboarding) and MemoryRetriever (conversation memory).
+
+All Oryggi tenants share the same schema, so most onboarding and reindex
+embeddings are texts that were already embedded once. Vectors are keyed by
+(model, task_type, sha256(text)); only cache misses reach the model / API.
+
+Storage, one pair of files per (model, task_type) under EMBEDDING_CACHE_DIR:
+- <name>.f32: row-major float32 matrix, memory-mapped for reads
+- <name>.idx: sha256 digest of row i's text at bytes [32 * i, 32 * i + 32)
+- <name>.json: model, task type and vector dimension
+
+Both data files are append-only. Vectors are written before their index
+entries, so a torn write is dropped on the next load. Appends take an advisory
+file lock where fcntl is available, and every lookup picks up rows appended by
+other processes (uvicorn workers, onboarding jobs). A namespace stops growing
+at EMBEDDING_CACHE_MAX_ROWS rows.
+
+Example:
+    vectors = embedding_cache.embed("google:models/text-embedding-004", "retrieval_document",
+                                    texts, compute=embed_uncached)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from langchain_core.embeddings import Embeddings as LangChainEmbeddings
+from loguru import logger
+
+from app.config import settings
+
+# fcntl is POSIX-only - without it appends are serialised within this process only
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    fcntl = None
+    HAS_FCNTL = False
+
+
+DIGEST_SIZE = 32
+
+
+class EmbeddingBatchError(Exception):
+    """Raised when some texts could not be embedded (the rest were)"""
+
+    def __init__(self, message: str, failed_indexes: List[int], embeddings: List[Optional[List[float]]]):
+        super().__init__(message)
+        self.failed_indexes = failed_indexes
+        self.embeddings = embeddings
+
+
+def text_digest(text: str) -> bytes:
+    """Content address of a text"""
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).digest()
+
+
+class _Namespace:
+    """Vectors of one (model, task_type), backed by a memory-mapped matrix + index file"""
+
+    def __init__(self, directory: str, model: str, task_type: str):
+        self.model = model
+        self.task_type = task_type
+        readable = re.sub(r"[^A-Za-z0-9]+", "_", f"{model}_{task_type}").strip("_")[-60:]
+        suffix = hashlib.sha256(f"{model}\0{task_type}".encode("utf-8")).hexdigest()[:12]
+        base = os.path.join(directory, f"{readable}-{suffix}")
+        self.vectors_path = base + ".f32"
+        self.index_path = base + ".idx"
+        self.meta_path = base + ".json"
+
+        self.dim: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        self.count = 0
+        self._index_bytes = 0
+        self._matrix: Optional[np.memmap] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.full_logged = False
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+            self.refresh()
+
+    def refresh(self):
+        """Pick up rows appended since the last look (by this or another process)"""
+        if self.dim is None or not os.path.exists(self.index_path):
+            return
+        index_bytes = os.path.getsize(self.index_path)
+        if index_bytes == self._index_bytes:
+            return
+
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        with open(self.index_path, "rb") as f:
+            f.seek(self.count * DIGEST_SIZE)
+            tail = f.read(index_bytes - self.count * DIGEST_SIZE)
+        # Ignore a partially written index entry, or one whose vector is missing
+        new_rows = min(len(tail) // DIGEST_SIZE, vector_rows - self.count)
+        for offset in range(max(0, new_rows)):
+            digest = tail[offset * DIGEST_SIZE:(offset + 1) * DIGEST_SIZE]
+            self.rows.setdefault(digest, self.count + offset)
+        self.count += max(0, new_rows)
+        self._index_bytes = self.count * DIGEST_SIZE
+
+    def vector(self, row: int) -> List[float]:
+        if self._matrix is None or self._matrix.shape[0] <= row:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        return self._matrix[row].tolist()
+
+    def append(self, digests: List[bytes], vectors: np.ndarray, max_rows: int) -> int:
+        """Append new rows (caller holds the process lock); returns rows written"""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "task_type": self.task_type, "dim": self.dim}, f)
+        if vectors.shape[1] != self.dim:
+            logger.warning(
+                f"[EMBED_CACHE] {self.model}: vector dimension {vectors.shape[1]} != cached {self.dim}, not caching"
+            )
+            return 0
+
+        with open(self.index_path, "ab") as index_file, open(self.vectors_path, "ab") as vectors_file:
+            if HAS_FCNTL:
+                fcntl.flock(index_file.fileno(), fcntl.LOCK_EX)
+            try:
+                # Another process may have appended (some of) these rows meanwhile
+                self.refresh()
+                keep = [i for i, digest in enumerate(digests) if digest not in self.rows]
+                keep = keep[:max(0, max_rows - self.count)]
+                if not keep:
+                    return 0
+                # Drop the tail of a torn write so rows stay aligned with index entries
+                index_file.truncate(self.count * DIGEST_SIZE)
+                vectors_file.truncate(self.count * self.dim * 4)
+                vectors_file.write(np.ascontiguousarray(vectors[keep], dtype=np.float32).tobytes())
+                vectors_file.flush()
+                index_file.write(b"".join(digests[i] for i in keep))
+                index_file.flush()
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(index_file.fileno(), fcntl.LOCK_UN)
+
+        self.refresh()
+        return len(keep)
+
+
+class EmbeddingCache:
+    """
+    Thread-safe content-addressed embedding cache (memory-mapped, persistent)
+
+    Example:
+        vectors = embedding_cache.embed(model_key, "document", texts, compute=model.embed)
+    """
+
+    def __init__(self, directory: str, max_rows: int = 200000, enabled: bool = True):
+        """
+        Initialize embedding cache
+
+        Args:
+            directory: Cache directory (created on first write)
+            max_rows: Rows per (model, task_type) before the cache stops growing
+            enabled: Master switch (disabled = always compute)
+        """
+        self.directory = directory
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._namespaces: Dict[tuple, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, model: str, task_type: str) -> _Namespace:
+        key = (model, task_type)
+        namespace = self._namespaces.get(key)
+        if namespace is None:
+            namespace = self._namespaces[key] = _Namespace(self.directory, model, task_type)
+        return namespace
+
+    def embed(
+        self,
+        model: str,
+        task_type: str,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Sequence[float]]],
+    ) -> List[List[float]]:
+        """
+        Embed texts, computing only those not in the cache
+
+        Args:
+            model: Embedding model identity (see EmbeddingContext keys)
+            task_type: Task type / role the vectors were computed for
+            texts: Texts to embed
+            compute: Embeds a list of texts (called once, with the unique misses)
+
+        Returns:
+            One vector per text, in order
+
+        Raises:
+            EmbeddingBatchError: If compute could embed only some texts; the
+                vectors that were computed are cached first, and the error
+                carries every vector obtained (indexes refer to `texts`)
+        """
+        texts = list(texts)
+        if not self.enabled or not texts:
+            return [list(vector) for vector in compute(texts)] if texts else []
+
+        digests = [text_digest(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+
+        with self._lock:
+            namespace = self._namespace(model, task_type)
+            namespace.refresh()
+            for i, digest in enumerate(digests):
+                row = namespace.rows.get(digest)
+                if row is None:
+                    missing.setdefault(digest, []).append(i)
+                else:
+                    results[i] = namespace.vector(row)
+            namespace.hits += len(texts) - sum(len(indexes) for indexes in missing.values())
+            namespace.misses += sum(len(indexes) for indexes in missing.values())
+
+        partial_error: Optional[EmbeddingBatchError] = None
+        if missing:
+            miss_digests = list(missing)
+            try:
+                computed = list(compute([texts[missing[d][0]] for d in miss_digests]))
+            except EmbeddingBatchError as e:
+                # Keep what did succeed - the retry only needs the failed texts
+                partial_error, computed = e, list(e.embeddings)
+
+            done = [i for i, vector in enumerate(computed) if vector is not None]
+            for i in done:
+                for row in missing[miss_digests[i]]:
+                    results[row] = np.asarray(computed[i], dtype=np.float32).tolist()
+
+            if done:
+                with self._lock:
+                    try:
+                        namespace.append(
+                            [miss_digests[i] for i in done],
+                            np.asarray([computed[i] for i in done], dtype=np.float32),
+                            self.max_rows,
+                        )
+                    except OSError as e:
+                        logger.warning(f"[EMBED_CACHE] Could not persist {len(done)} vector(s): {e}")
+                    if namespace.count >= self.max_rows and not namespace.full_logged:
+                        namespace.full_logged = True
+                        logger.warning(f"[EMBED_CACHE] {model} cache is full ({self.max_rows} rows)")
+
+        if partial_error is not None:
+            failed_indexes = [i for i, vector in enumerate(results) if vector is None]
+            raise EmbeddingBatchError(str(partial_error), failed_indexes=failed_indexes, embeddings=results)
+
+        logger.debug(
+            f"[EMBED_CACHE] {model}: {len(texts) - len(missing)} hit(s), {len(missing)} computed"
+        )
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (hit rate per model / task type)"""
+        with self._lock:
+            namespaces = {
+                f"{ns.model}|{ns.task_type}": {
+                    "rows": ns.count,
+                    "dim": ns.dim,
+                    "hits": ns.hits,
+                    "misses": ns.misses,
+                    "hit_rate": round(ns.hits / (ns.hits + ns.misses), 3) if ns.hits + ns.misses else 0.0,
+                }
+                for ns in self._namespaces.values()
+            }
+        hits = sum(ns["hits"] for ns in namespaces.values())
+        misses = sum(ns["misses"] for ns in namespaces.values())
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "namespaces": namespaces,
+        }
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """ChromaDB embedding function that consults the embedding cache first"""
+
+    def __init__(self, inner: EmbeddingFunction, model: str, task_type: str = "document",
+                 cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.model = model
+        self.task_type = task_type
+        self.cache = cache or embedding_cache
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.cache.embed(self.model, self.task_type, input, self.embed_uncached)
+
+    def embed_uncached(self, input: Documents) -> Embeddings:
+        """Embed texts with the wrapped function, bypassing the cache"""
+        return self.inner(input)
+
+
+class CachedEmbeddings(LangChainEmbeddings):
+    """LangChain embeddings whose document embeddings go through the embedding cache"""
+
+    def __init__(self, inner: LangChainEmbeddings, model: str, cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.model = model
+        self.cache = cache or embedding_cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.cache.embed(self.model, "document", texts, self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Question vectors are memoized per request by EmbeddingContext instead
+        return self.inner.embed_query(text)
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache(
+    directory=settings.embedding_cache_dir,
+    max_rows=settings.embedding_cache_max_rows,
+    enabled=settings.embedding_cache_enabled,
+)
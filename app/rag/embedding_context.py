@@ -0,0 +1,108 @@
+"""
+Request-scoped Embedding Context
+
+One user question is searched against several vector stores per request:
+- ChromaDB schema collection (SentenceTransformer or Google embeddings)
+- FAISS few-shot index (HuggingFace embeddings)
+- Conversation memory (SentenceTransformer)
+
+An EmbeddingContext holds the question text and memoizes its vector per
+embedding model, so each model encodes the question at most once per request
+even when retrievers run concurrently in worker threads. Retrievers that share
+a model (e.g. Chroma and FAISS both on all-MiniLM-L6-v2) share the vector.
+
+Example:
+    ctx = EmbeddingContext(question)
+    chroma_manager.query_schemas(question, embedding_context=ctx)
+    few_shot_manager.get_relevant_examples(question, embedding_context=ctx)
+"""
+
+import threading
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+from app.config import settings
+
+
+def sentence_transformer_key(model_name: str) -> str:
+    """
+    Embedding key for a SentenceTransformer model
+
+    "sentence-transformers/all-MiniLM-L6-v2" and "all-MiniLM-L6-v2" load the
+    same weights, so they map to the same key. Vectors from the ONNX backend
+    (int8 weights in particular) are not interchangeable with torch ones, so
+    the backend is part of the key.
+    """
+    key = f"sentence-transformers:{model_name.split('/')[-1]}"
+    if settings.local_embedding_backend == "onnx":
+        key += ":onnx-int8" if settings.onnx_embedding_quantize else ":onnx"
+    return key
+
+
+class EmbeddingContext:
+    """
+    Per-request memo of question embeddings keyed by embedding model
+
+    Thread-safe: concurrent lookups for the same model wait for a single
+    encode; lookups for different models run in parallel.
+    """
+
+    def __init__(self, text: str):
+        """
+        Initialize context for one question
+
+        Args:
+            text: The question text every retriever searches with
+        """
+        self.text = text
+        self._vectors: Dict[str, List[float]] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.computed = 0
+        self.reused = 0
+
+    def get(self, key: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """
+        Get the question vector for an embedding model, computing it once
+
+        Args:
+            key: Embedding model identity (see sentence_transformer_key)
+            embed: Function that embeds a single text with that model
+
+        Returns:
+            Embedding vector
+        """
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self.reused += 1
+                return vector
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished the encode while we waited
+            vector = self._vectors.get(key)
+            if vector is not None:
+                with self._lock:
+                    self.reused += 1
+                return vector
+
+            # Plain floats - numpy scalars are rejected by some vector store clients
+            vector = [float(x) for x in embed(self.text)]
+            with self._lock:
+                self._vectors[key] = vector
+                self.computed += 1
+
+        logger.debug(f"[EMBED_CTX] Computed question embedding for {key}")
+        return vector
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get embedding reuse statistics for this request"""
+        with self._lock:
+            return {
+                "models": len(self._vectors),
+                "computed": self.computed,
+                "reused": self.reused,
+            }
@@ -0,0 +1,280 @@
+"""
+Shared Embedding Model Registry
+
+FAISSManager, FewShotManager, ChromaDBManager and MemoryRetriever all embed
+with the same SentenceTransformer (all-MiniLM-L6-v2 by default). Each used to
+load its own copy, which cost startup time and resident memory per copy.
+The registry loads each (model, device) once per process and hands out a
+SharedEncoder for it.
+
+A SharedEncoder owns its model on one worker thread, which makes it safe to
+call from any thread. Callers enqueue texts. Whatever is queued while the
+model is busy is encoded together in the next model.encode call (up to
+EMBEDDING_ENCODER_MAX_BATCH_SIZE texts), so concurrent single-question
+encodes become one batch without adding a wait timer.
+
+Models load with sentence-transformers, or with onnxruntime when
+LOCAL_EMBEDDING_BACKEND=onnx (see app/rag/onnx_embeddings.py).
+
+Adapters:
+- SharedEmbeddingFunction: ChromaDB embedding function
+- SharedEmbeddings: LangChain Embeddings (FAISS vector stores)
+- SharedEncoder.encode: SentenceTransformer-style encode (MemoryRetriever)
+
+Example:
+    encoder = embedding_model_registry.get("sentence-transformers/all-MiniLM-L6-v2")
+    vectors = encoder.embed(["doc 1", "doc 2"])
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from langchain_core.embeddings import Embeddings as LangChainEmbeddings
+from loguru import logger
+
+from app.config import settings
+from app.rag.embedding_context import sentence_transformer_key
+
+
+def load_sentence_transformer(model_name: str, device: str) -> Any:
+    """Load a SentenceTransformer (imported here: torch is only loaded if a model is)"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise RuntimeError(
+            "sentence-transformers is not installed. Install it with: pip install sentence-transformers"
+        )
+    return SentenceTransformer(model_name, device=device)
+
+
+def load_configured_model(model_name: str, device: str) -> Any:
+    """Load a model with the configured local backend (LOCAL_EMBEDDING_BACKEND)"""
+    if settings.local_embedding_backend == "onnx":
+        from app.rag.onnx_embeddings import load_onnx_model
+        return load_onnx_model(model_name, device)
+    return load_sentence_transformer(model_name, device)
+
+
+def local_index_suffix() -> str:
+    """
+    Suffix for on-disk indexes built with the local model
+
+    Vectors from the ONNX backend are not interchangeable with torch ones,
+    so each backend keeps its own FAISS indexes.
+    """
+    if settings.local_embedding_backend == "onnx":
+        return "_onnx_int8" if settings.onnx_embedding_quantize else "_onnx"
+    return ""
+
+
+class _EncodeRequest:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class SharedEncoder:
+    """
+    Thread-safe encoder around one loaded model, batching concurrent requests
+
+    Example:
+        vectors = encoder.embed(["doc 1", "doc 2"])
+    """
+
+    def __init__(self, model: Any, name: str, device: str, max_batch_size: int = 64, load_seconds: float = 0.0):
+        """
+        Initialize shared encoder
+
+        Args:
+            model: Loaded model with a SentenceTransformer-style encode()
+            name: Model identity (see sentence_transformer_key)
+            device: Device the model runs on
+            max_batch_size: Texts combined into one encode call from queued requests
+            load_seconds: Time the model took to load (reported in stats)
+        """
+        self.model = model
+        self.name = name
+        self.device = device
+        self.max_batch_size = max(1, max_batch_size)
+        self.load_seconds = load_seconds
+
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.requests = 0
+        self.texts_encoded = 0
+        self.encode_calls = 0
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts (blocks until the worker has encoded them)
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text
+        """
+        return self._encode_array(list(texts)).tolist()
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """SentenceTransformer.encode equivalent: 1-D for one string, 2-D for a list"""
+        if isinstance(sentences, str):
+            return self._encode_array([sentences])[0]
+        return self._encode_array(list(sentences))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def _encode_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        request = _EncodeRequest(texts)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future.result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"encoder:{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            # Take whatever queued up while the previous batch was encoding
+            while size < self.max_batch_size:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = np.asarray(self.model.encode(texts), dtype=np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.texts_encoded += len(texts)
+                self.encode_calls += 1
+
+            start = 0
+            for request in batch:
+                request.future.set_result(vectors[start:start + len(request.texts)])
+                start += len(request.texts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get encoder statistics"""
+        with self._stats_lock:
+            return {
+                "model": self.name,
+                "device": self.device,
+                "load_seconds": round(self.load_seconds, 3),
+                "requests": self.requests,
+                "texts_encoded": self.texts_encoded,
+                "encode_calls": self.encode_calls,
+                "requests_per_encode": round(self.requests / self.encode_calls, 2) if self.encode_calls else 0.0,
+            }
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry: one loaded model per (model, device)
+
+    Example:
+        encoder = embedding_model_registry.get(settings.embedding_model)
+    """
+
+    def __init__(self, loader: Optional[Callable[[str, str], Any]] = None, max_batch_size: Optional[int] = None):
+        """
+        Initialize registry
+
+        Args:
+            loader: Loads a model from (model_name, device) (default: configured backend)
+            max_batch_size: Texts per combined encode call
+        """
+        self._loader = loader or load_configured_model
+        self.max_batch_size = max_batch_size or settings.embedding_encoder_max_batch_size
+        self._encoders: Dict[tuple, SharedEncoder] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, device: Optional[str] = None) -> SharedEncoder:
+        """
+        Get the shared encoder for a model, loading it on first use
+
+        Args:
+            model_name: SentenceTransformer model name (with or without org prefix)
+            device: Device (default: EMBEDDING_DEVICE)
+
+        Returns:
+            SharedEncoder
+        """
+        device = device or settings.embedding_device
+        key = (sentence_transformer_key(model_name), device)
+        with self._lock:
+            encoder = self._encoders.get(key)
+            if encoder is None:
+                start = time.perf_counter()
+                model = self._loader(model_name, device)
+                load_seconds = time.perf_counter() - start
+                encoder = SharedEncoder(model, key[0], device, self.max_batch_size, load_seconds)
+                self._encoders[key] = encoder
+                logger.info(f"[OK] Loaded embedding model {model_name} on {device} in {load_seconds:.2f}s")
+            return encoder
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get loaded models and their encoder statistics"""
+        with self._lock:
+            encoders = list(self._encoders.values())
+        return {
+            "models_loaded": len(encoders),
+            "encoders": [encoder.get_stats() for encoder in encoders],
+        }
+
+
+class SharedEmbeddingFunction(EmbeddingFunction):
+    """ChromaDB embedding function backed by a shared encoder"""
+
+    def __init__(self, encoder: SharedEncoder):
+        self.encoder = encoder
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.encoder.embed(list(input))
+
+
+class SharedEmbeddings(LangChainEmbeddings):
+    """LangChain embeddings backed by a shared encoder"""
+
+    def __init__(self, encoder: SharedEncoder):
+        self.encoder = encoder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encoder.embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encoder.embed([text])[0]
+
+
+# Global embedding model registry instance
+embedding_model_registry = EmbeddingModelRegistry()
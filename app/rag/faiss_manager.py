@@ -5,7 +5,6 @@ Handles vector store operations for database schema embeddings
 
 from typing import List, Dict, Any, Optional
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 try:
     from langchain.schema import Document
 except ImportError:
@@ -15,6 +14,9 @@ import os
 import pickle
 
 from app.config import settings
+from app.rag.embedding_cache import CachedEmbeddings
+from app.rag.embedding_models import SharedEmbeddings, embedding_model_registry, local_index_suffix
+from app.rag.embedding_context import sentence_transformer_key
 
 
 class FAISSManager:
@@ -26,10 +28,10 @@ class FAISSManager:
     def __init__(self):
         """Initialize FAISS manager"""
         self.vectorstore: Optional[FAISS] = None
-        self.embeddings: Optional[HuggingFaceEmbeddings] = None
+        self.embeddings: Optional[CachedEmbeddings] = None
         self._initialized = False
-        self.index_path = settings.faiss_index_path
-        self.metadata_path = f"{settings.faiss_index_path}/metadata.pkl"
+        self.index_path = f"{settings.faiss_index_path}{local_index_suffix()}"
+        self.metadata_path = f"{self.index_path}/metadata.pkl"
 
     def initialize(self):
         """
@@ -48,9 +50,10 @@ class FAISSManager:
             os.makedirs(self.index_path, exist_ok=True)
 
             # Initialize embedding function
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=settings.embedding_model,
-                model_kwargs={"device": settings.embedding_device}
+            # Shared model (loaded once per process); document vectors go through the embedding cache
+            self.embeddings = CachedEmbeddings(
+                SharedEmbeddings(embedding_model_registry.get(settings.embedding_model)),
+                model=sentence_transformer_key(settings.embedding_model),
             )
 
             # Try to load existing index
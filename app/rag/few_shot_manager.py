@@ -5,7 +5,6 @@ Retrieves relevant SQL query examples to enhance prompt engineering
 
 from typing import List, Dict, Any, Optional
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 try:
     from langchain.schema import Document
 except ImportError:
@@ -15,6 +14,9 @@ import json
 import os
 
 from app.config import settings
+from app.rag.embedding_cache import CachedEmbeddings
+from app.rag.embedding_models import SharedEmbeddings, embedding_model_registry, local_index_suffix
+from app.rag.embedding_context import EmbeddingContext, sentence_transformer_key
 
 
 class FewShotManager:
@@ -27,10 +29,10 @@ class FewShotManager:
         """Initialize Few-Shot Manager"""
         self.examples: List[Dict[str, Any]] = []
         self.vectorstore: Optional[FAISS] = None
-        self.embeddings: Optional[HuggingFaceEmbeddings] = None
+        self.embeddings: Optional[CachedEmbeddings] = None
         self._initialized = False
         self.examples_path = "./data/few_shot_examples.json"
-        self.index_path = f"{settings.faiss_index_path}/few_shot"
+        self.index_path = f"{settings.faiss_index_path}/few_shot{local_index_suffix()}"
 
     def initialize(self):
         """
@@ -49,9 +51,10 @@ class FewShotManager:
             logger.info(f"Loaded {len(self.examples)} few-shot examples")
 
             # Initialize embedding function (reuse same as schema embeddings)
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=settings.embedding_model,
-                model_kwargs={"device": settings.embedding_device}
+            # Shared model (loaded once per process); document vectors go through the embedding cache
+            self.embeddings = CachedEmbeddings(
+                SharedEmbeddings(embedding_model_registry.get(settings.embedding_model)),
+                model=sentence_transformer_key(settings.embedding_model),
             )
 
             # Try to load existing index
@@ -132,10 +135,16 @@ class FewShotManager:
         self.vectorstore.save_local(self.index_path)
         logger.info(f"[OK] Saved few-shot index to {self.index_path}")
 
+    @property
+    def embedding_key(self) -> str:
+        """Identity of the embedding model used for the FAISS index"""
+        return sentence_transformer_key(settings.embedding_model)
+
     def get_relevant_examples(
         self,
         question: str,
-        n_results: int = 3
+        n_results: int = 3,
+        embedding_context: Optional[EmbeddingContext] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve most relevant few-shot examples for a question
@@ -143,6 +152,8 @@ class FewShotManager:
         Args:
             question: User's natural language question
             n_results: Number of examples to retrieve (default: 3)
+            embedding_context: Optional request-scoped context; the question
+                vector is taken from (or stored in) it instead of re-embedding
 
         Returns:
             List of relevant example dictionaries
@@ -163,10 +174,17 @@ class FewShotManager:
 
         try:
             # Perform similarity search
-            results = self.vectorstore.similarity_search_with_score(
-                question,
-                k=n_results
-            )
+            if embedding_context is not None:
+                query_embedding = embedding_context.get(self.embedding_key, self.embeddings.embed_query)
+                results = self.vectorstore.similarity_search_with_score_by_vector(
+                    query_embedding,
+                    k=n_results
+                )
+            else:
+                results = self.vectorstore.similarity_search_with_score(
+                    question,
+                    k=n_results
+                )
 
             relevant_examples = []
             for doc, score in results:
@@ -281,6 +299,10 @@ class FewShotManager:
         else:
             logger.warning("Embeddings not initialized, call initialize() first")
 
+        # New examples change the SQL the LLM generates - drop cached answers
+        from app.services.query_cache import query_cache
+        query_cache.invalidate()
+
 
 # Global few-shot manager instance
 few_shot_manager = FewShotManager()
@@ -0,0 +1,223 @@
+"""
+Google Embedding Function
+
+ChromaDB embedding function for Google Generative AI embeddings, shared by
+ChromaDBManager (global schema collection) and AutoEmbedder (per-tenant
+onboarding collections).
+
+Texts are embedded with the batch API (one batchEmbedContents request per
+GOOGLE_EMBEDDING_BATCH_SIZE texts instead of one request per text), with up to
+GOOGLE_EMBEDDING_MAX_CONCURRENCY batches in flight. Each batch is retried
+with full-jitter exponential backoff on transient errors (429 / 5xx /
+timeouts). A batch rejected for any other reason is split in half and
+retried, down to single texts, so one bad input does not fail its
+neighbours. Texts that cannot be embedded are reported together in an
+EmbeddingBatchError that carries the embeddings that did succeed.
+
+Texts already in the persistent embedding cache are not sent at all; after a
+partial failure the cache keeps the vectors that succeeded, so a retry only
+sends the texts that failed.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import google.generativeai as genai
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from google.api_core import exceptions as google_exceptions
+from loguru import logger
+
+from app.config import settings
+from app.rag.embedding_cache import EmbeddingBatchError, EmbeddingCache, embedding_cache
+
+
+# Texts per batchEmbedContents request accepted by the API
+MAX_API_BATCH_SIZE = 100
+
+# Errors worth retrying (rate limits, server errors, timeouts, dropped connections)
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class GoogleEmbeddingFunction(EmbeddingFunction):
+    """
+    Batched, concurrent Google embedding function with per-batch retries
+
+    Example:
+        embed = GoogleEmbeddingFunction(api_key, "models/text-embedding-004")
+        vectors = embed(["doc 1", "doc 2"])
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model_name: str,
+        task_type: str = "retrieval_document",
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        embed_content: Optional[Callable[..., Dict[str, Any]]] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        """
+        Initialize embedding function
+
+        Args:
+            api_key: Google API key (None = keep the current genai configuration)
+            model_name: Embedding model
+            task_type: Embedding task type
+            batch_size: Texts per request (capped at the API limit of 100)
+            max_concurrency: Batch requests in flight
+            max_retries: Retries per batch on transient errors
+            backoff_base: First retry delay cap in seconds (doubles per retry)
+            backoff_max: Maximum retry delay in seconds
+            embed_content: genai.embed_content replacement (tests / benchmarks)
+            cache: Embedding cache consulted before the API (default: the shared cache)
+        """
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.task_type = task_type
+        self.batch_size = max(1, min(batch_size or settings.google_embedding_batch_size, MAX_API_BATCH_SIZE))
+        self.max_concurrency = max(1, max_concurrency or settings.google_embedding_max_concurrency)
+        self.max_retries = settings.google_embedding_max_retries if max_retries is None else max_retries
+        self.backoff_base = settings.google_embedding_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.google_embedding_backoff_max if backoff_max is None else backoff_max
+        self._embed_content = embed_content or genai.embed_content
+        self.cache = cache or embedding_cache
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.texts_embedded = 0
+        self.requests_sent = 0
+        self.retries = 0
+        self.batch_splits = 0
+        self.failed_texts = 0
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.cache.embed(f"google:{self.model_name}", self.task_type, input, self.embed_uncached)
+
+    def embed_uncached(self, input: Documents) -> Embeddings:
+        """Embed texts with the API, bypassing the embedding cache"""
+        texts = list(input)
+        if not texts:
+            return []
+
+        batches = [
+            (start, texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) == 1 or self.max_concurrency == 1:
+            outcomes = [self._embed_with_split(batch) for _, batch in batches]
+        else:
+            outcomes = list(self._get_executor().map(lambda item: self._embed_with_split(item[1]), batches))
+
+        embeddings: List[Optional[List[float]]] = []
+        failed_indexes: List[int] = []
+        errors: List[BaseException] = []
+        for (start, _), (batch_embeddings, batch_errors) in zip(batches, outcomes):
+            for offset, (embedding, error) in enumerate(zip(batch_embeddings, batch_errors)):
+                embeddings.append(embedding)
+                if error is not None:
+                    failed_indexes.append(start + offset)
+                    errors.append(error)
+
+        with self._stats_lock:
+            self.texts_embedded += len(texts) - len(failed_indexes)
+            self.failed_texts += len(failed_indexes)
+
+        if failed_indexes:
+            for index, error in list(zip(failed_indexes, errors))[:5]:
+                logger.error(f"Google embedding failed for text: {texts[index][:50]}... Error: {error}")
+            raise EmbeddingBatchError(
+                f"Google embedding failed for {len(failed_indexes)} of {len(texts)} text(s): {errors[0]}",
+                failed_indexes=failed_indexes,
+                embeddings=embeddings,
+            )
+        return embeddings
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="google_embed"
+                )
+            return self._executor
+
+    def _embed_with_split(
+        self, texts: Sequence[str]
+    ) -> Tuple[List[Optional[List[float]]], List[Optional[BaseException]]]:
+        """
+        Embed one batch, bisecting it on failure to isolate the texts that fail
+
+        Returns:
+            (embedding or None per text, error or None per text)
+        """
+        try:
+            return self._embed_batch(texts), [None] * len(texts)
+        except RETRYABLE_ERRORS as e:
+            # Retries exhausted on rate limits / outages - smaller requests would not help
+            return [None] * len(texts), [e] * len(texts)
+        except Exception as e:
+            if len(texts) == 1:
+                return [None], [e]
+            with self._stats_lock:
+                self.batch_splits += 1
+            logger.warning(f"Google embedding batch of {len(texts)} failed ({e}) - retrying as two halves")
+
+        middle = len(texts) // 2
+        left_embeddings, left_errors = self._embed_with_split(texts[:middle])
+        right_embeddings, right_errors = self._embed_with_split(texts[middle:])
+        return left_embeddings + right_embeddings, left_errors + right_errors
+
+    def _embed_batch(self, texts: Sequence[str]) -> List[List[float]]:
+        """One batchEmbedContents request, retried with backoff on transient errors"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._stats_lock:
+                    self.requests_sent += 1
+                result = self._embed_content(model=self.model_name, content=list(texts), task_type=self.task_type)
+                embeddings = result["embedding"]
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+                return embeddings
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                with self._stats_lock:
+                    self.retries += 1
+                logger.warning(
+                    f"Google embedding batch failed ({e}) - retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+                )
+                time.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get embedding request statistics"""
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "batch_size": self.batch_size,
+                "max_concurrency": self.max_concurrency,
+                "texts_embedded": self.texts_embedded,
+                "requests_sent": self.requests_sent,
+                "retries": self.retries,
+                "batch_splits": self.batch_splits,
+                "failed_texts": self.failed_texts,
+            }
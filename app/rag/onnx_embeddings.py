@@ -0,0 +1,281 @@
+"""
+ONNX Embedding Backend
+
+CPU runtime for the local sentence-transformer model (LOCAL_EMBEDDING_BACKEND=onnx).
+The configured EMBEDDING_MODEL is exported once to ONNX, optionally with
+dynamic int8 weight quantization, and run with onnxruntime. Tokenization
+uses the Rust `tokenizers` library directly: one encode_batch call per batch,
+with texts sorted by length so batches carry little padding.
+
+OnnxEmbeddingModel has the SentenceTransformer encode() interface, so the
+shared model registry (app/rag/embedding_models.py) hands it to every local
+embedding consumer: FewShotManager and FAISSManager (in place of
+HuggingFaceEmbeddings), ChromaDBManager and MemoryRetriever.
+
+Exporting needs sentence-transformers (with torch), plus onnx for
+quantization. Serving needs only onnxruntime and tokenizers.
+
+Export ahead of deployment (otherwise the first load exports):
+    python -m app.rag.onnx_embeddings --model sentence-transformers/all-MiniLM-L6-v2 --quantize
+"""
+
+import argparse
+import json
+import os
+import re
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+# Optional runtime dependencies (only needed when LOCAL_EMBEDDING_BACKEND=onnx)
+try:
+    import onnxruntime as ort
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    ort = None
+    HAS_ONNXRUNTIME = False
+
+try:
+    from tokenizers import Tokenizer
+    HAS_TOKENIZERS = True
+except ImportError:
+    Tokenizer = None
+    HAS_TOKENIZERS = False
+
+
+CONFIG_FILE = "embedding_config.json"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+SUPPORTED_POOLING = ("mean", "cls", "max")
+
+
+def onnx_model_dir(model_name: str, base_dir: Optional[str] = None) -> str:
+    """Directory holding the exported files for a model"""
+    return os.path.join(base_dir or settings.onnx_embedding_dir, re.sub(r"[^A-Za-z0-9._-]+", "_", model_name))
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, Any]:
+    """
+    Export a sentence-transformer model to ONNX (transformer only; pooling runs in NumPy)
+
+    Args:
+        model_name: SentenceTransformer model name
+        output_dir: Directory for model.onnx, model_int8.onnx, tokenizer.json and config
+        quantize: Also write a dynamic int8-quantized model
+
+    Returns:
+        Embedding config (pooling, normalize, max_seq_length, dimension, inputs)
+
+    Raises:
+        RuntimeError: If sentence-transformers / torch (or onnx, for quantization) are missing
+    """
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+    except ImportError:
+        raise RuntimeError(
+            "Exporting to ONNX needs sentence-transformers with torch. "
+            "Install it with: pip install sentence-transformers"
+        )
+
+    logger.info(f"Exporting {model_name} to ONNX in {output_dir}...")
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    pooling_mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+    if pooling_mode not in SUPPORTED_POOLING:
+        raise RuntimeError(f"Unsupported pooling mode for ONNX export: {pooling_mode}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    transformer.tokenizer.save_pretrained(output_dir)
+    if not os.path.exists(os.path.join(output_dir, TOKENIZER_FILE)):
+        raise RuntimeError(f"{model_name} has no fast tokenizer (tokenizer.json)")
+
+    sample = transformer.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    auto_model = transformer.auto_model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    config = {
+        "model": model_name,
+        "pooling": pooling_mode,
+        "normalize": any(isinstance(module, Normalize) for module in model),
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "inputs": input_names,
+        "pad_token": transformer.tokenizer.pad_token,
+    }
+    with open(os.path.join(output_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    if quantize:
+        quantize_onnx_model(output_dir)
+    logger.info(f"[OK] Exported {model_name} to ONNX ({'int8 + fp32' if quantize else 'fp32'})")
+    return config
+
+
+def quantize_onnx_model(model_dir: str):
+    """Write model_int8.onnx: dynamic int8 weight quantization of model.onnx"""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise RuntimeError("Quantization needs onnx and onnxruntime. Install them with: pip install onnx onnxruntime")
+    quantize_dynamic(
+        os.path.join(model_dir, MODEL_FILE),
+        os.path.join(model_dir, QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+    )
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model on onnxruntime with SentenceTransformer's encode() interface
+
+    Example:
+        model = OnnxEmbeddingModel.from_directory("./data/onnx_models/all-MiniLM-L6-v2")
+        vectors = model.encode(["doc 1", "doc 2"])
+    """
+
+    def __init__(self, session: Any, tokenizer: Any, config: Dict[str, Any], batch_size: int = 32):
+        """
+        Initialize model
+
+        Args:
+            session: onnxruntime InferenceSession (returns last_hidden_state)
+            tokenizer: tokenizers.Tokenizer
+            config: Embedding config written by export_onnx_model
+            batch_size: Texts per session run
+        """
+        self.session = session
+        self.tokenizer = tokenizer
+        self.config = config
+        self.batch_size = max(1, batch_size)
+        self.pooling = config.get("pooling", "mean")
+        self.normalize = bool(config.get("normalize", False))
+        self.inputs = config.get("inputs", ["input_ids", "attention_mask"])
+
+        pad_token = config.get("pad_token") or "[PAD]"
+        pad_id = tokenizer.token_to_id(pad_token)
+        self.tokenizer.enable_truncation(max_length=int(config.get("max_seq_length", 256)))
+        self.tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token=pad_token)
+
+    @classmethod
+    def from_directory(cls, model_dir: str, quantized: bool = True, threads: int = 0) -> "OnnxEmbeddingModel":
+        """
+        Load an exported model
+
+        Args:
+            model_dir: Directory written by export_onnx_model
+            quantized: Use the int8 model when it exists
+            threads: onnxruntime intra-op threads (0 = onnxruntime default)
+
+        Returns:
+            OnnxEmbeddingModel
+        """
+        if not HAS_ONNXRUNTIME or not HAS_TOKENIZERS:
+            raise RuntimeError(
+                "The ONNX embedding backend needs onnxruntime and tokenizers. "
+                "Install them with: pip install onnxruntime tokenizers"
+            )
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not quantized or not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, MODEL_FILE)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        config["model_file"] = os.path.basename(model_path)
+        return cls(session, Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE)), config)
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        """SentenceTransformer.encode equivalent: 1-D for one string, 2-D for a list"""
+        if isinstance(sentences, str):
+            return self._encode([sentences])[0]
+        return self._encode(list(sentences))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.config["dimension"])
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        output = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Length-sorted batches: similar lengths pad to similar sizes
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            encodings = self.tokenizer.encode_batch([texts[row] for row in rows])
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": attention_mask,
+            }
+            if "token_type_ids" in self.inputs:
+                feeds["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+            output[rows] = self._pool(hidden, attention_mask)
+        return output
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        elif self.pooling == "max":
+            masked = np.where(attention_mask[:, :, None] > 0, hidden, -np.inf)
+            pooled = masked.max(axis=1)
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def load_onnx_model(model_name: str, device: str) -> OnnxEmbeddingModel:
+    """
+    Registry loader: load the exported model, exporting it on first use
+
+    Args:
+        model_name: SentenceTransformer model name
+        device: Must be "cpu" (onnxruntime runs on the CPU provider here)
+
+    Returns:
+        OnnxEmbeddingModel
+    """
+    if device != "cpu":
+        logger.warning(f"ONNX embedding backend runs on CPU (EMBEDDING_DEVICE={device} ignored)")
+    model_dir = onnx_model_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, CONFIG_FILE)):
+        export_onnx_model(model_name, model_dir, quantize=settings.onnx_embedding_quantize)
+    elif settings.onnx_embedding_quantize and not os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE)):
+        quantize_onnx_model(model_dir)
+    return OnnxEmbeddingModel.from_directory(
+        model_dir, quantized=settings.onnx_embedding_quantize, threads=settings.onnx_embedding_threads
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a sentence-transformer model to ONNX")
+    parser.add_argument("--model", default=settings.embedding_model)
+    parser.add_argument("--output-dir", default=None, help="Default: ONNX_EMBEDDING_DIR/<model>")
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamic int8 model")
+    args = parser.parse_args()
+    print(json.dumps(export_onnx_model(args.model, args.output_dir or onnx_model_dir(args.model), args.quantize), indent=2))
@@ -3,11 +3,15 @@ Schema Enricher
 Uses LLM to generate rich, semantic descriptions of database schemas
 """
 
-from typing import Dict, Any, List
+import hashlib
+import json
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import google.generativeai as genai
 from loguru import logger
 
 from app.config import settings
+from app.services.llm_usage import llm_usage
 
 
 # Domain-specific keyword hints to improve semantic retrieval
@@ -32,6 +36,22 @@ class SchemaEnricher:
         genai.configure(api_key=settings.gemini_api_key)
         self.model = genai.GenerativeModel(settings.gemini_model)
 
+    @staticmethod
+    def metadata_hash(table_metadata: Dict[str, Any]) -> str:
+        """
+        Hash of everything an enriched description is generated from
+
+        The LLM description itself changes from run to run, so reindexing
+        compares this hash (extracted metadata, keyword hints, enrichment
+        model) to decide whether a table needs enriching again.
+        """
+        payload = json.dumps(
+            [settings.gemini_model, KEYWORD_HINTS.get(table_metadata.get("table_name"), []), table_metadata],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def enrich_table(self, table_metadata: Dict[str, Any]) -> str:
         """
         Generate rich semantic description for a table
@@ -50,6 +70,7 @@ class SchemaEnricher:
             prompt = self._build_enrichment_prompt(table_metadata)
 
             # Generate description
+            started_at = time.perf_counter()
             response = self.model.generate_content(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -57,6 +78,7 @@ class SchemaEnricher:
                     max_output_tokens=500
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="schema_enrichment")
 
             enriched_description = response.text.strip()
             logger.info(f"[OK] Generated description for {table_name}")
@@ -244,6 +266,52 @@ COLUMNS ({len(columns)} total):
         logger.info(f"[OK] Enriched {len(enriched_tables)} tables")
         return enriched_tables
 
+    def enrich_changed_tables(
+        self,
+        tables_metadata: List[Dict[str, Any]],
+        previous: Optional[Dict[str, Tuple[str, str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Enrich only the tables whose metadata changed since the last run
+
+        Args:
+            tables_metadata: List of table metadata dicts from SchemaExtractor
+            previous: full_name -> (metadata_hash, enriched_description) from
+                the last run; tables with a matching hash keep that description
+
+        Returns:
+            List of dicts like enrich_all_tables(), plus 'metadata_hash' and
+            'reused' (True when the previous description was kept)
+        """
+        previous = previous or {}
+        hashes = [self.metadata_hash(table_meta) for table_meta in tables_metadata]
+        changed = [
+            table_meta for table_meta, metadata_hash in zip(tables_metadata, hashes)
+            if previous.get(table_meta["full_name"], (None, None))[0] != metadata_hash
+        ]
+        enriched_by_name = {
+            enriched["full_name"]: enriched
+            for enriched in (self.enrich_all_tables(changed) if changed else [])
+        }
+
+        results = []
+        for table_meta, metadata_hash in zip(tables_metadata, hashes):
+            full_name = table_meta["full_name"]
+            if full_name in enriched_by_name:
+                results.append({**enriched_by_name[full_name], "metadata_hash": metadata_hash, "reused": False})
+            else:
+                results.append({
+                    "table_name": table_meta["table_name"],
+                    "full_name": full_name,
+                    "enriched_description": previous[full_name][1],
+                    "metadata": table_meta,
+                    "metadata_hash": metadata_hash,
+                    "reused": True
+                })
+
+        logger.info(f"[OK] {len(changed)} tables enriched, {len(results) - len(changed)} unchanged")
+        return results
+
 
 # Singleton instance
 schema_enricher = SchemaEnricher()
@@ -10,6 +10,7 @@ import json
 from app.database import db_manager
 from app.rag.faiss_manager import faiss_manager
 from app.rag.chroma_manager import chroma_manager
+from app.rag.embedding_cache import embedding_cache
 from app.rag.view_definitions import VIEW_DEFINITIONS, get_all_view_names, DEPRECATED_TABLES
 from app.rag.view_schema_enricher import view_enricher
 from app.rag.table_definitions import (
@@ -27,6 +28,8 @@ class SchemaIndexer:
         """Initialize schema indexer"""
         self.tables_info: List[Dict[str, Any]] = []
         self.views_info: List[Dict[str, Any]] = []
+        # Counts from the last sync: added, updated, removed, skipped
+        self.last_sync: Dict[str, Any] = {}
 
     def extract_schema(self, views_only: bool = False) -> List[Dict[str, Any]]:
         """
@@ -271,12 +274,18 @@ class SchemaIndexer:
             "row_count": len(sample_data)
         }
 
-    def create_embeddings(self) -> int:
+    def create_embeddings(self, force: bool = False) -> int:
         """
         Create and store embeddings for views and tables (VIEW-FIRST)
 
+        Only new or changed documents are embedded; views and tables that no
+        longer exist are removed (see ChromaDBManager.sync_schema_embeddings).
+
+        Args:
+            force: Re-embed unchanged documents too
+
         Returns:
-            Number of embeddings created
+            Number of schema documents indexed
         """
         logger.info("=" * 80)
         logger.info("CREATING EMBEDDINGS (VIEW-FIRST ARCHITECTURE)")
@@ -349,16 +358,18 @@ class SchemaIndexer:
 
         logger.info(f"  {enriched_count} tables with enriched documentation")
 
-        # STEP 3: Add to ChromaDB
-        logger.info(f"Adding {len(documents)} embeddings to ChromaDB...")
-        chroma_manager.add_schema_embeddings(
+        # STEP 3: Sync ChromaDB (embed only new / changed documents)
+        logger.info(f"Syncing {len(documents)} schema documents to ChromaDB...")
+        self.last_sync = chroma_manager.sync_schema_embeddings(
             documents=documents,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            id_prefixes=("view_", "table_"),
+            force=force
         )
 
         logger.info("=" * 80)
-        logger.info(f"[YES] EMBEDDINGS CREATED: {len(documents)} total")
+        logger.info(f"[YES] EMBEDDINGS SYNCED: {len(documents)} total")
         logger.info(f"   - {len(self.views_info)} views (enriched documentation)")
         logger.info(f"   - {len(self.tables_info)} tables (basic documentation)")
         logger.info("=" * 80)
@@ -459,42 +470,55 @@ class SchemaIndexer:
             f"Use this for queries about {column_name.lower()} data."
         )
 
-    def reindex(self, views_only: bool = False):
+    def reindex(self, views_only: bool = False, force: bool = False) -> Dict[str, Any]:
         """
-        Delete existing embeddings and re-index database schema
-        Use this when schema changes
+        Re-index database schema incrementally
+        Use this when schema changes - queries keep working during the reindex
 
         Args:
-            views_only: If True, only index views (ignore base tables)
+            views_only: If True, only index views (base tables are removed)
+            force: Re-embed unchanged documents too
+
+        Returns:
+            Dict with counts: total, added, updated, removed, skipped, failed
+            (plus failed_ids)
         """
         logger.info("=" * 80)
         logger.info("RE-INDEXING DATABASE SCHEMA (VIEW-FIRST)")
         logger.info("=" * 80)
 
-        # Delete all existing embeddings
-        chroma_manager.delete_all()
+        cache_before = embedding_cache.get_stats()
 
-        # Extract and index with VIEW-FIRST strategy
+        # Extract and sync with VIEW-FIRST strategy
         self.extract_schema(views_only=views_only)
-        count = self.create_embeddings()
+        count = self.create_embeddings(force=force)
 
+        cache_after = embedding_cache.get_stats()
         logger.info("=" * 80)
-        logger.info(f"[YES] RE-INDEXING COMPLETE: {count} embeddings created")
+        logger.info(f"[YES] RE-INDEXING COMPLETE: {count} schema documents")
+        logger.info(
+            f"Embedding cache: {cache_after['hits'] - cache_before['hits']} reused, "
+            f"{cache_after['misses'] - cache_before['misses']} computed"
+        )
         logger.info("=" * 80)
-        return count
+        return {"total": count, **self.last_sync}
 
 
 # Global schema indexer instance
 schema_indexer = SchemaIndexer()
 
 
-def index_database_schema(views_only: bool = False):
+def index_database_schema(views_only: bool = False, force: bool = False):
     """
     Convenience function to index database schema (VIEW-FIRST)
     Called during application startup or manually
 
     Args:
         views_only: If True, only index critical views (ignore base tables)
+        force: Re-embed unchanged documents too
+
+    Returns:
+        Number of schema documents indexed (sync counts in schema_indexer.last_sync)
     """
     logger.info("=" * 80)
     logger.info("INDEXING DATABASE SCHEMA (VIEW-FIRST ARCHITECTURE)")
@@ -511,7 +535,7 @@ def index_database_schema(views_only: bool = False):
 
         # Extract and index with VIEW-FIRST strategy
         schema_indexer.extract_schema(views_only=views_only)
-        count = schema_indexer.create_embeddings()
+        count = schema_indexer.create_embeddings(force=force)
 
         # Show stats
         stats = chroma_manager.get_collection_stats()
@@ -522,6 +546,7 @@ def index_database_schema(views_only: bool = False):
         logger.info(f"  Critical views: {len([v for v in schema_indexer.views_info if v.get('is_critical')])}")
         logger.info(f"  Other views: {len([v for v in schema_indexer.views_info if not v.get('is_critical')])}")
         logger.info(f"  Base tables: {len(schema_indexer.tables_info)}")
+        logger.info(f"  Sync: {schema_indexer.last_sync}")
         logger.info("=" * 80)
 
         return count
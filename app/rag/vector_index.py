@@ -0,0 +1,299 @@
+"""
+In-process Vector Index
+
+Exact cosine top-k over a small corpus (the global schema collection is a few
+hundred documents), as an alternative to querying ChromaDB's persistent client
+(SQLite + HNSW) on every request.
+
+- Embeddings are L2-normalized once and kept in one contiguous float32 matrix,
+  so a query is a single matrix-vector product plus argpartition
+- Metadata filters (Chroma "where" syntax: equality, $eq/$ne/$in/$nin,
+  $and/$or) are evaluated with boolean masks, precomputed per
+  (key, value) for low-cardinality keys and memoized for the rest
+- Saved as a raw float32 file plus a JSON sidecar holding the matrix's
+  checksum; loading memory-maps the matrix, so worker processes share the
+  same pages, and rejects a matrix the sidecar does not describe
+
+Distances are squared L2 between the normalized vectors (2 - 2 * cosine),
+the same scale ChromaDB's default "l2" space reports for unit-length
+embeddings.
+
+Example:
+    index = NumpyVectorIndex.build(ids, documents, metadatas, embeddings)
+    index.save("./data/schema_vector_index")
+    index = NumpyVectorIndex.load("./data/schema_vector_index")
+    results = index.query(query_embedding, n_results=5, where={"type": "view"})
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Keys with at most this many distinct values get their masks built at load time
+MAX_PRECOMPUTED_VALUES = 32
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+
+
+class UnsupportedFilterError(ValueError):
+    """Raised for a where filter the in-process index cannot evaluate"""
+
+
+def corpus_fingerprint(
+    ids: Sequence[str],
+    embedding_key: str,
+    contents: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Identity of an indexed corpus: embedding model + document IDs + contents
+
+    Args:
+        ids: Document IDs
+        embedding_key: Embedding model identity
+        contents: Per-document content identity (a content hash or the text
+            itself), so a document rewritten under the same ID changes the
+            fingerprint
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256(embedding_key.encode("utf-8"))
+    contents = contents if contents is not None else [""] * len(ids)
+    for doc_id, content in sorted(zip(ids, contents)):
+        digest.update(b"\0" + doc_id.encode("utf-8") + b"\1" + (content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _checksum(matrix: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(matrix).tobytes()).hexdigest()
+
+
+def _mask_key(key: str, value: Any) -> tuple:
+    # True == 1 in Python, but not in a metadata filter
+    return key, type(value).__name__, value
+
+
+class NumpyVectorIndex:
+    """
+    Immutable exact top-k index over normalized embeddings
+
+    Thread-safe for queries; rebuild a new index to change its contents.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        matrix: np.ndarray,
+        fingerprint: str = "",
+    ):
+        """
+        Initialize index over an already-normalized matrix
+
+        Args:
+            ids: Document IDs
+            documents: Document texts
+            metadatas: Metadata dict per document
+            matrix: (n, dim) float32 matrix of unit-length rows (array or memmap)
+            fingerprint: Corpus identity (see corpus_fingerprint)
+        """
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.matrix = matrix
+        self.fingerprint = fingerprint
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self._precompute_masks()
+
+    @classmethod
+    def build(
+        cls,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        fingerprint: str = "",
+    ) -> "NumpyVectorIndex":
+        """
+        Build an index from raw embeddings (normalized here)
+
+        Returns:
+            NumpyVectorIndex
+        """
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(list(ids), list(documents), list(metadatas), matrix / norms, fingerprint)
+
+    def save(self, path: str):
+        """
+        Write the matrix and sidecar to a directory (replacing any previous index)
+
+        Args:
+            path: Index directory
+        """
+        os.makedirs(path, exist_ok=True)
+        vectors_tmp = os.path.join(path, VECTORS_FILE + ".tmp")
+        index_tmp = os.path.join(path, INDEX_FILE + ".tmp")
+        matrix = np.ascontiguousarray(self.matrix, dtype=np.float32)
+        matrix.tofile(vectors_tmp)
+        with open(index_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "checksum": _checksum(matrix),
+                "count": len(self.ids),
+                "dim": self.dim,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas,
+            }, f)
+        # The two files are replaced one after the other; load() checks the
+        # checksum, so a reader in between never pairs a matrix with the wrong sidecar
+        os.replace(vectors_tmp, os.path.join(path, VECTORS_FILE))
+        os.replace(index_tmp, os.path.join(path, INDEX_FILE))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["NumpyVectorIndex"]:
+        """
+        Load a saved index, memory-mapping its matrix
+
+        Args:
+            path: Index directory
+
+        Returns:
+            NumpyVectorIndex, or None if no complete index is saved there (or
+            the matrix and sidecar come from different saves)
+        """
+        index_path = os.path.join(path, INDEX_FILE)
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        if not os.path.exists(index_path) or not os.path.exists(vectors_path):
+            return None
+
+        with open(index_path, encoding="utf-8") as f:
+            sidecar = json.load(f)
+        count, dim = sidecar["count"], sidecar["dim"]
+        if os.path.getsize(vectors_path) != count * dim * 4:
+            return None
+        matrix = (
+            np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+            if count else np.zeros((0, dim), dtype=np.float32)
+        )
+        # Checked on the mapped pages, so a save replacing the file meanwhile cannot slip in
+        if sidecar.get("checksum") != _checksum(matrix):
+            return None
+        return cls(sidecar["ids"], sidecar["documents"], sidecar["metadatas"], matrix, sidecar["fingerprint"])
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(
+        self,
+        embedding: Sequence[float],
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, List[Any]]:
+        """
+        Exact cosine top-k
+
+        Args:
+            embedding: Query vector (normalized here)
+            n_results: Number of results
+            where: Optional Chroma-style metadata filter
+
+        Returns:
+            Dict with keys: 'ids', 'documents', 'metadatas', 'distances' (best first)
+
+        Raises:
+            UnsupportedFilterError: If the filter uses an unsupported operator
+        """
+        candidates = np.flatnonzero(self._where_mask(where)) if where else None
+        available = len(self.ids) if candidates is None else len(candidates)
+        k = min(n_results, available)
+        if k <= 0:
+            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        scores = matrix @ query
+
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        rows = top if candidates is None else candidates[top]
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "documents": [self.documents[row] for row in rows],
+            "metadatas": [self.metadatas[row] for row in rows],
+            "distances": (2.0 - 2.0 * scores[top]).tolist(),
+        }
+
+    def _precompute_masks(self):
+        values_by_key: Dict[str, set] = {}
+        for metadata in self.metadatas:
+            for key, value in metadata.items():
+                values_by_key.setdefault(key, set()).add(_mask_key(key, value))
+        for key, mask_keys in values_by_key.items():
+            if len(mask_keys) <= MAX_PRECOMPUTED_VALUES:
+                for _, _, value in mask_keys:
+                    self._value_mask(key, value)
+
+    def _value_mask(self, key: str, value: Any) -> np.ndarray:
+        mask_key = _mask_key(key, value)
+        mask = self._masks.get(mask_key)
+        if mask is None:
+            mask = np.fromiter(
+                (
+                    key in metadata and _mask_key(key, metadata[key]) == mask_key
+                    for metadata in self.metadatas
+                ),
+                dtype=bool,
+                count=len(self.metadatas),
+            )
+            # Concurrent queries may both build it - same result either way
+            self._masks[mask_key] = mask
+        return mask
+
+    def _where_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._where_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(len(self.ids), dtype=bool)
+                for clause in condition:
+                    any_mask |= self._where_mask(clause)
+                mask &= any_mask
+            elif key.startswith("$"):
+                raise UnsupportedFilterError(f"Unsupported filter operator: {key}")
+            elif isinstance(condition, dict):
+                for operator, value in condition.items():
+                    mask &= self._operator_mask(key, operator, value)
+            else:
+                mask &= self._value_mask(key, condition)
+        return mask
+
+    def _operator_mask(self, key: str, operator: str, value: Any) -> np.ndarray:
+        if operator == "$eq":
+            return self._value_mask(key, value)
+        if operator == "$ne":
+            return ~self._value_mask(key, value)
+        if operator in ("$in", "$nin"):
+            any_mask = np.zeros(len(self.ids), dtype=bool)
+            for item in value:
+                any_mask |= self._value_mask(key, item)
+            return any_mask if operator == "$in" else ~any_mask
+        raise UnsupportedFilterError(f"Unsupported filter operator: {operator}")
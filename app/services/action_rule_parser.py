@@ -0,0 +1,663 @@
+"""
+Action Rule Parser
+Deterministic, confidence-scored classifier for access-control commands.
+
+Runs before the LLM in ActionOrchestrator. Clear commands like
+"block EMP001" or "terminate ecode 2374" are resolved in microseconds;
+the LLM is only consulted when the parser's confidence is below
+settings.action_rule_confidence_threshold.
+
+Two tiers:
+1. Command grammar - anchored patterns for complete, unambiguous commands
+   (confidence 0.8-0.95 depending on how the target was identified)
+2. Keyword classifier - the former ActionOrchestrator._classify_action_fallback
+   (specific actions checked before generic ones, confidence <= 0.6). Used
+   as the answer when the LLM is unavailable.
+
+Labeled corpus: data/action_classification_corpus.json
+Benchmark: python -m tests.action_parser_benchmark
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Pattern
+
+from loguru import logger
+
+
+# Confidence by how the command's target was identified
+ID_TARGET_CONFIDENCE = 0.95      # Employee code / ECode / number
+MARKED_NAME_CONFIDENCE = 0.9     # Name introduced by "employee" / "user"
+BARE_NAME_CONFIDENCE = 0.8       # Bare word(s) after the verb ("block cv")
+KEYWORD_CONFIDENCE = 0.6         # Keyword classifier with a target
+KEYWORD_NO_TARGET_CONFIDENCE = 0.4
+NO_MATCH_CONFIDENCE = 0.0
+
+# Words that end a name (so "blacklist employee John for fraud" keeps the reason apart)
+_STOP = r"(?:for|because|due|with|from|to|on|at|in|and|access|ecode|code|has|is|please|the|all|card|using)\b"
+_NAME = rf"(?!{_STOP})[A-Za-z][A-Za-z.-]*(?:\s+(?!{_STOP})[A-Za-z][A-Za-z.-]*){{0,2}}"
+_IDENT = r"[A-Za-z]{1,10}[-_]?\d{2,}|\d{3,}"
+
+# Keyword tier: wording that undoes a blacklist / block ("remove John from blacklist")
+_UNBLACKLIST = re.compile(
+    r"\bun-?blacklist|\bwhitelist\b|\bremove\s+(?:the\s+)?blacklist\b"
+    r"|\b(?:remove|take|delete|drop|clear|lift)\b.*\b(?:from|off)\s+(?:the\s+)?blacklist\b"
+)
+_UNBLOCK = re.compile(r"\bun-?block\b")
+
+_PREFIX = r"^\s*(?:(?:please|kindly|can\s+you|could\s+you)\s+)?"
+_SUFFIX = r"\s*(?:,?\s*please)?\s*[.!?]*\s*$"
+_MARK_REQ = r"(?:the\s+)?(?:employee|user|staff)\s+(?:named\s+)?"
+_MARK = (
+    r"(?:(?:the\s+)?(?:employee|user|emp|staff)\s+)?"
+    r"(?:(?:with\s+)?(?:ecode|e-code|emp\s*code|code|id)\s*[:#=]?\s*)?"
+)
+_REASON = r"(?:\s*,?\s+(?:for|because(?:\s+of)?|due\s+to|reason\s*:?)\s+(?P<reason>.+?))?"
+
+# Target that may be an ID, an "employee <name>" or a bare name
+_TARGET = rf"(?:{_MARK}(?P<id>{_IDENT})\b|{_MARK_REQ}(?P<name>{_NAME})|(?P<bare>{_NAME}))"
+# ECode-based actions: numeric ECode or "employee <name>"
+_ECODE_TARGET = rf"(?:{_MARK}(?P<id>\d{{3,}})\b|{_MARK_REQ}(?P<name>{_NAME}))"
+
+
+@dataclass
+class CommandRule:
+    """An anchored command pattern and how to turn its match into params"""
+    name: str
+    action_type: str
+    pattern: Pattern
+    build: Callable[[re.Match], Dict[str, Any]]
+
+
+def _target_confidence(match: re.Match) -> float:
+    groups = match.groupdict()
+    if groups.get("id"):
+        return ID_TARGET_CONFIDENCE
+    if groups.get("name"):
+        return MARKED_NAME_CONFIDENCE
+    return BARE_NAME_CONFIDENCE
+
+
+def _target_user_id(match: re.Match) -> str:
+    groups = match.groupdict()
+    target = groups.get("id") or groups.get("name") or groups.get("bare")
+    return target.upper() if groups.get("id") and not target.isdigit() else target.strip()
+
+
+def _ecode_params(match: re.Match, action: str) -> Dict[str, Any]:
+    """Params for ECode-based actions (activate / blacklist / terminate)"""
+    params: Dict[str, Any] = {"action": action}
+    if match.group("id"):
+        params["ecode"] = int(match.group("id"))
+    else:
+        params["employee_name"] = match.group("name").strip()
+    reason = match.groupdict().get("reason")
+    if reason:
+        params["reason"] = reason.strip()
+    return params
+
+
+def _compile(*parts: str) -> Pattern:
+    return re.compile("".join(parts), re.IGNORECASE)
+
+
+def _build_rules() -> List[CommandRule]:
+    def ecode_rule(name, action_type, pattern, action):
+        return CommandRule(name, action_type, pattern,
+                           lambda m: _ecode_params(m, action(m) if callable(action) else action))
+
+    def access_rule(name, action_type, pattern, **extra):
+        return CommandRule(name, action_type, pattern,
+                           lambda m: {"target_user_id": _target_user_id(m), **extra})
+
+    def terminate_action(m):
+        verb = m.group("verb").lower().replace(" ", "").replace("-", "")
+        return "terminate" if verb == "terminate" else "un_terminate"
+
+    def activation_action(m):
+        verb = m.group("verb").lower().replace("-", "")
+        return "activate" if verb in ("activate", "enable") else "deactivate"
+
+    def biometric_params(m):
+        biometric = m.group("bio").lower()
+        params = {
+            "employee_id": _target_user_id(m),
+            "biometric_type": "finger" if biometric.startswith("finger") else biometric,
+        }
+        if m.group("terminal"):
+            params["terminal_name"] = m.group("terminal")
+        return params
+
+    return [
+        # Phase 8 - Employee Blacklist
+        ecode_rule("unblacklist", "employee_blacklist", _compile(
+            _PREFIX, r"(?:un-?blacklist|remove\s+from\s+(?:the\s+)?blacklist)\s+", _ECODE_TARGET, _REASON, _SUFFIX
+        ), "remove_blacklist"),
+        ecode_rule("remove_from_blacklist", "employee_blacklist", _compile(
+            _PREFIX, r"(?:remove|take)\s+", _ECODE_TARGET, r"\s+(?:from|off)\s+(?:the\s+)?blacklist", _REASON, _SUFFIX
+        ), "remove_blacklist"),
+        ecode_rule("blacklist", "employee_blacklist", _compile(
+            _PREFIX, r"blacklist\s+", _ECODE_TARGET, _REASON, _SUFFIX
+        ), "blacklist"),
+        ecode_rule("add_to_blacklist", "employee_blacklist", _compile(
+            _PREFIX, r"add\s+", _ECODE_TARGET, r"\s+to\s+(?:the\s+)?blacklist", _REASON, _SUFFIX
+        ), "blacklist"),
+
+        # Phase 9 - Employee Terminate
+        ecode_rule("terminate", "employee_terminate", _compile(
+            _PREFIX, r"(?P<verb>un-?terminate|un\s+terminate|reinstate|terminate)\s+", _ECODE_TARGET, _REASON, _SUFFIX
+        ), terminate_action),
+        CommandRule("resigned", "employee_terminate", _compile(
+            _PREFIX, _ECODE_TARGET, r"\s+has\s+(?P<reason>resigned|left)",
+            r"(?:\s*,?\s*(?:please\s+)?terminate(?:\s+(?:him|her|them))?)?", _SUFFIX
+        ), lambda m: _ecode_params(m, "terminate")),
+
+        # Phase 7 - Employee Action (Activate/Deactivate)
+        ecode_rule("activation", "employee_action", _compile(
+            _PREFIX, r"(?P<verb>de-?activate|activate|enable|disable)\s+", _ECODE_TARGET, _REASON, _SUFFIX
+        ), activation_action),
+
+        # Biometric enrollment
+        CommandRule("biometric_enrollment", "trigger_biometric_enrollment", _compile(
+            _PREFIX, r"(?:enroll|trigger|start|begin|capture)\s+(?P<bio>face|palm|fingerprint|finger)\s+",
+            r"(?:biometrics?\s+)?(?:enrollment\s+)?(?:for\s+)?", _TARGET,
+            r"(?:\s+(?:on|at)\s+(?:terminal\s+|device\s+)?(?P<terminal>[A-Za-z0-9_-]+))?", _SUFFIX
+        ), biometric_params),
+
+        # Card enrollment
+        CommandRule("enroll_card", "enroll_card", _compile(
+            _PREFIX, r"(?:enroll|assign|issue)\s+card\s+(?:number\s+|no\.?\s+)?(?P<card>\d{4,})\s+(?:to|for)\s+",
+            _TARGET, _SUFFIX
+        ), lambda m: {"employee_id": _target_user_id(m), "card_number": m.group("card"), "access_scope": "card_only"}),
+
+        # Database backup
+        CommandRule("database_backup", "database_backup", _compile(
+            _PREFIX, r"(?:(?:take|run|do|start)\s+an?\s+)?(?:(?:full\s+)?(?:database|db)\s+backup|",
+            r"backup\s+(?:the\s+)?(?:oryggi\s+)?(?:database|db)(?:\s+oryggi)?)", _SUFFIX
+        ), lambda m: {"database_name": "Oryggi", "backup_type": "full"}),
+
+        # Phase 5 - Access control
+        access_rule("list_access", "list_access", _compile(
+            _PREFIX, r"(?:list|show|display|get|check)\s+(?:me\s+)?(?:the\s+)?(?:current\s+)?access(?:\s+permissions?)?\s+(?:for|of)\s+",
+            _TARGET, _SUFFIX
+        ), include_inactive=False),
+        access_rule("what_access", "list_access", _compile(
+            _PREFIX, r"what\s+access\s+does\s+", _TARGET, r"\s+have", _SUFFIX
+        ), include_inactive=False),
+        access_rule("grant_access", "grant_access", _compile(
+            _PREFIX, r"(?:grant|give)\s+(?:access\s+)?(?:to\s+)?", _TARGET, r"(?:\s+access)?", _SUFFIX
+        )),
+        access_rule("block_access", "block_access", _compile(
+            _PREFIX, r"(?:block|deny)\s+(?:access\s+)?(?:(?:to|for|of)\s+)?", _TARGET, r"(?:'s)?(?:\s+access)?", _SUFFIX
+        )),
+        access_rule("revoke_access", "revoke_access", _compile(
+            _PREFIX, r"(?:revoke\s+(?:access\s+)?(?:(?:for|from|of)\s+)?|remove\s+access\s+(?:for|from|of)\s+)",
+            _TARGET, r"(?:'s)?(?:\s+access)?", _SUFFIX
+        )),
+    ]
+
+
+class ActionRuleParser:
+    """
+    Confidence-scored access-control command parser
+
+    Example:
+        result = action_rule_parser.parse("terminate ecode 2374")
+        # {"action_type": "employee_terminate",
+        #  "action_params": {"action": "terminate", "ecode": 2374},
+        #  "confidence": 0.95, "rule": "terminate"}
+    """
+
+    def __init__(self):
+        """Compile command rules"""
+        self.rules = _build_rules()
+
+    def parse(self, question: str) -> Dict[str, Any]:
+        """
+        Classify an access-control request without an LLM
+
+        Args:
+            question: User's request
+
+        Returns:
+            Dict with action_type, action_params, confidence (0-1) and rule
+        """
+        for rule in self.rules:
+            match = rule.pattern.match(question)
+            if match:
+                result = {
+                    "action_type": rule.action_type,
+                    "action_params": rule.build(match),
+                    "confidence": _target_confidence(match),
+                    "rule": rule.name,
+                }
+                logger.debug(
+                    f"[ACTION_PARSER] Command rule '{rule.name}': {result['action_type']} "
+                    f"(confidence={result['confidence']})"
+                )
+                return result
+
+        result = self._classify_keywords(question)
+        if result["action_type"] == "none":
+            result["confidence"] = NO_MATCH_CONFIDENCE
+        elif any(v is not None for v in result["action_params"].values()):
+            result["confidence"] = KEYWORD_CONFIDENCE
+        else:
+            result["confidence"] = KEYWORD_NO_TARGET_CONFIDENCE
+        result["rule"] = "keywords"
+        return result
+
+    def _classify_keywords(self, question: str) -> Dict[str, Any]:
+        """
+        Keyword-based action classifier (formerly ActionOrchestrator._classify_action_fallback)
+
+        Specific actions (blacklist, terminate, biometrics, authentication,
+        activation) are checked before the generic grant / block / revoke /
+        list keywords, which they contain ("blacklist" contains "list").
+        """
+        question_lower = question.lower()
+        target_user_id = None
+
+        # Try multiple patterns to extract target user
+        # Pattern 1: "employee EMP999" or "to employee EMP999" - employee code pattern
+        emp_code_match = re.search(r'employee\s+([A-Za-z]{2,4}\d{2,})', question, re.IGNORECASE)
+        if emp_code_match:
+            target_user_id = emp_code_match.group(1).upper()
+
+        # Pattern 2: "emp XXX" or "user XXX" (as standalone words, not part of "employee")
+        if not target_user_id:
+            user_id_match = re.search(r'\b(?:emp|user)\b\s*[-_]?\s*(\d+|[a-z]+\d+)', question_lower)
+            if user_id_match:
+                target_user_id = user_id_match.group(1).upper()
+
+        # Pattern 3: "to XXX" or "for XXX" - extract what comes after (but not "to employee")
+        if not target_user_id:
+            # Match "grant access to ADITYA SINGH" or "block access for 2424130187"
+            to_match = re.search(r'(?:to|for)\s+(?!employee\b)([a-zA-Z0-9\s]+?)(?:\s+access|\s+from|\s*$)', question, re.IGNORECASE)
+            if to_match:
+                target_user_id = to_match.group(1).strip()
+
+        # Pattern 4: Just a number (employee code) anywhere in the string
+        if not target_user_id:
+            number_match = re.search(r'\b(\d{3,})\b', question)  # 3+ digit numbers are likely employee codes
+            if number_match:
+                target_user_id = number_match.group(1)
+
+        # Pattern 5: Employee code pattern anywhere (EMP001, EMP999, etc.)
+        if not target_user_id:
+            code_match = re.search(r'\b([A-Za-z]{2,4}\d{3,})\b', question)
+            if code_match:
+                target_user_id = code_match.group(1).upper()
+
+        # Pattern 6: Name at the end - "grant access ADITYA SINGH" or "block ADITYA SINGH"
+        if not target_user_id:
+            # Match capitalized words at end that look like names
+            name_match = re.search(r'(?:grant|block|revoke|list)\s+(?:access\s+)?(?:to\s+)?([A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*)\s*$', question)
+            if name_match:
+                target_user_id = name_match.group(1).strip()
+
+        logger.info(f"[ACTION_PARSER] Keyword extracted target_user_id: {target_user_id}")
+
+        # Phase 8 - Employee Blacklist (Blacklist/Remove from Blacklist)
+        if re.search(r"\b(?:un-?)?blacklist\b|\bwhitelist\b", question_lower):
+            # Determine action - negating wording first, so "remove John from
+            # blacklist" is never read as a blacklist request
+            if _UNBLACKLIST.search(question_lower):
+                action = "remove_blacklist"
+            else:
+                action = "blacklist"
+
+            # Try to extract ecode (numeric employee ID)
+            ecode = None
+            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
+            if ecode_match:
+                ecode = int(ecode_match.group(1))
+            else:
+                # Try to find any number that looks like an ecode
+                number_match = re.search(r'\b(\d{3,})\b', question)
+                if number_match:
+                    ecode = int(number_match.group(1))
+
+            # Try to extract employee name if no ecode
+            employee_name = None
+            if not ecode:
+                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
+                if name_match:
+                    employee_name = name_match.group(1).strip()
+
+            # Try to extract reason for blacklisting
+            reason = None
+            reason_match = re.search(r'(?:for|reason|because)\s+(.+?)(?:\.|$)', question, re.IGNORECASE)
+            if reason_match:
+                reason = reason_match.group(1).strip()
+
+            logger.info(f"[ACTION_PARSER] Keyword employee_blacklist: action={action}, ecode={ecode}, name={employee_name}, reason={reason}")
+            return {
+                "action_type": "employee_blacklist",
+                "action_params": {
+                    "action": action,
+                    "ecode": ecode,
+                    "employee_name": employee_name,
+                    "reason": reason
+                }
+            }
+
+        # Phase 9 - Employee Terminate (Terminate/Un-terminate)
+        elif any(kw in question_lower for kw in ['terminate employee', 'terminate user', 'un-terminate employee', 'unterminate employee',
+                                                   'reinstate employee', 'un terminate', 'has resigned', 'has left']):
+            # Determine action
+            if any(kw in question_lower for kw in ['un-terminate', 'unterminate', 'un terminate', 'reinstate']):
+                action = "un_terminate"
+            else:
+                action = "terminate"
+
+            # Try to extract ecode (numeric employee ID)
+            ecode = None
+            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
+            if ecode_match:
+                ecode = int(ecode_match.group(1))
+            else:
+                # Try to find any number that looks like an ecode
+                number_match = re.search(r'\b(\d{3,})\b', question)
+                if number_match:
+                    ecode = int(number_match.group(1))
+
+            # Try to extract employee name if no ecode
+            employee_name = None
+            if not ecode:
+                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
+                if name_match:
+                    employee_name = name_match.group(1).strip()
+
+            # Try to extract reason for termination
+            reason = None
+            reason_match = re.search(r'(?:for|reason|because|due to)\s+(.+?)(?:\.|$)', question, re.IGNORECASE)
+            if reason_match:
+                reason = reason_match.group(1).strip()
+            elif 'resign' in question_lower:
+                reason = "Resignation"
+
+            logger.info(f"[ACTION_PARSER] Keyword employee_terminate: action={action}, ecode={ecode}, name={employee_name}, reason={reason}")
+            return {
+                "action_type": "employee_terminate",
+                "action_params": {
+                    "action": action,
+                    "ecode": ecode,
+                    "employee_name": employee_name,
+                    "reason": reason
+                }
+            }
+
+        # IMPORTANT: Check biometric enrollment BEFORE manage_authentication
+        # because auth keywords like 'palm', 'face', 'finger' overlap
+        elif any(kw in question_lower for kw in ['enroll biometric', 'biometric enrollment', 'trigger enrollment',
+                                                   'enroll face', 'enroll palm', 'enroll finger', 'enroll fingerprint',
+                                                   'start enrollment', 'begin enrollment', 'capture biometric',
+                                                   'face enrollment', 'palm enrollment', 'finger enrollment',
+                                                   'fingerprint enrollment', 'biometric capture']):
+            # Determine biometric type
+            biometric_type = "face"  # default
+            if any(kw in question_lower for kw in ['palm']):
+                biometric_type = "palm"
+            elif any(kw in question_lower for kw in ['finger', 'fingerprint']):
+                biometric_type = "finger"
+            elif any(kw in question_lower for kw in ['all biometric', 'all biometrics']):
+                biometric_type = "all"
+
+            # Try to extract terminal name
+            terminal_name = None
+            terminal_match = re.search(r'(?:on|at|terminal|device)\s+([A-Za-z0-9_-]+)', question, re.IGNORECASE)
+            if terminal_match:
+                terminal_name = terminal_match.group(1)
+
+            logger.info(f"[ACTION_PARSER] Keyword biometric_enrollment: employee={target_user_id}, type={biometric_type}, terminal={terminal_name}")
+            return {
+                "action_type": "trigger_biometric_enrollment",
+                "action_params": {
+                    "employee_id": target_user_id,
+                    "biometric_type": biometric_type,
+                    "terminal_name": terminal_name
+                }
+            }
+
+        elif any(kw in question_lower for kw in ['add authentication', 'remove authentication', 'add fingerprint', 'remove fingerprint',
+                                                   'add face', 'remove face', 'add card auth', 'remove card auth',
+                                                   'manage authentication', 'authentication type', 'set authentication',
+                                                   'enable fingerprint', 'disable fingerprint', 'enable face', 'disable face',
+                                                   'fusion', 'palm', 'card only', 'face only', 'finger only']):
+            # Determine action (add or remove)
+            action = "remove" if any(kw in question_lower for kw in ['remove', 'disable', 'delete']) else "add"
+
+            # Determine authentication type - prefer named types over numeric codes
+            auth_type = None
+            auth_type_name = None
+
+            # Check for authentication type names (more user-friendly)
+            # These map to API's authentication type names
+            auth_type_mappings = {
+                # Name-based mappings (priority)
+                'fusion': 'Fusion',
+                'palm': 'Palm',
+                'palm only': 'Palm Only',
+                'face only': 'Face Only',
+                'finger only': 'Finger Only',
+                'fingerprint only': 'Finger Only',
+                'card only': 'Card Only',
+                'card + face': 'Card + Face',
+                'card+face': 'Card + Face',
+                'card and face': 'Card + Face',
+                'card + finger': 'Card + Finger',
+                'card+finger': 'Card + Finger',
+                'card and finger': 'Card + Finger',
+                'card + fingerprint': 'Card + Finger',
+                'card+fingerprint': 'Card + Finger',
+                'card and fingerprint': 'Card + Finger',
+                'card + palm': 'Card + Palm',
+                'card+palm': 'Card + Palm',
+                'card and palm': 'Card + Palm',
+            }
+
+            # Try to find authentication type name from keywords
+            for keyword, type_name in auth_type_mappings.items():
+                if keyword in question_lower:
+                    auth_type_name = type_name
+                    logger.info(f"[ACTION_PARSER] Keyword found auth_type_name: {auth_type_name} from keyword: {keyword}")
+                    break
+
+            # If no name found, fall back to numeric detection
+            if not auth_type_name:
+                if any(kw in question_lower for kw in ['fingerprint', 'finger']):
+                    auth_type = 2
+                elif any(kw in question_lower for kw in ['face', 'facial']):
+                    auth_type = 5
+                elif any(kw in question_lower for kw in ['card']):
+                    auth_type = 1001
+                else:
+                    # Default to Card Only if nothing specified
+                    auth_type = 1001
+
+            logger.info(f"[ACTION_PARSER] Keyword manage_authentication: employee={target_user_id}, action={action}, auth_type_name={auth_type_name}, auth_type={auth_type}")
+
+            # Build params - prefer auth_type_name if available
+            params = {
+                "employee_id": target_user_id,
+                "action": action,
+            }
+            if auth_type_name:
+                params["authentication_type_name"] = auth_type_name
+            else:
+                params["authentication_type"] = auth_type
+
+            return {
+                "action_type": "manage_authentication",
+                "action_params": params
+            }
+
+        # Phase 7 - Employee Action (Activate/Deactivate)
+        elif any(kw in question_lower for kw in ['activate employee', 'deactivate employee', 'enable employee', 'disable employee',
+                                                   'activate user', 'deactivate user', 'activate ecode', 'deactivate ecode']):
+            # Determine action
+            action = "activate" if any(kw in question_lower for kw in ['activate', 'enable']) else "deactivate"
+
+            # Try to extract ecode (numeric employee ID)
+            ecode = None
+            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
+            if ecode_match:
+                ecode = int(ecode_match.group(1))
+            else:
+                # Try to find any number that looks like an ecode
+                number_match = re.search(r'\b(\d{3,})\b', question)
+                if number_match:
+                    ecode = int(number_match.group(1))
+
+            # Try to extract employee name if no ecode
+            employee_name = None
+            if not ecode:
+                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
+                if name_match:
+                    employee_name = name_match.group(1).strip()
+
+            logger.info(f"[ACTION_PARSER] Keyword employee_action: action={action}, ecode={ecode}, name={employee_name}")
+            return {
+                "action_type": "employee_action",
+                "action_params": {
+                    "action": action,
+                    "ecode": ecode,
+                    "employee_name": employee_name
+                }
+            }
+
+        elif any(kw in question_lower for kw in ['grant', 'give', 'allow', 'provide access']):
+            return {
+                "action_type": "grant_access",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        # "unblock" restores access - checked before 'block', which it contains
+        elif _UNBLOCK.search(question_lower):
+            return {
+                "action_type": "grant_access",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        elif any(kw in question_lower for kw in ['block', 'deny', 'stop', 'prevent']):
+            return {
+                "action_type": "block_access",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        elif any(kw in question_lower for kw in ['revoke', 'remove', 'delete permission']):
+            return {
+                "action_type": "revoke_access",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        elif re.search(r"\b(?:list|show|what access|permissions)\b", question_lower):
+            return {
+                "action_type": "list_access",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        # Phase 6 - Extended Access Control Actions Fallback
+        elif any(kw in question_lower for kw in ['enroll employee', 'add employee', 'new employee', 'create employee', 'register employee']):
+            # Try to extract employee details
+            emp_name = None
+            corp_emp_code = None
+
+            # Try to extract name after "enroll employee" or "add employee"
+            # Stop at keywords like "with", "code", "in", "to", "for"
+            name_match = re.search(r'(?:enroll|add|new|create|register)\s+(?:a\s+)?(?:new\s+)?employee\s+(?:named?\s+)?([A-Za-z]+(?:\s+[A-Za-z]+)?)(?:\s+(?:with|code|in|to|for|department)|$)', question, re.IGNORECASE)
+            if name_match:
+                emp_name = name_match.group(1).strip()
+
+            # Try to extract employee code (pattern like EMP001, EMP999, etc.)
+            code_match = re.search(r'(?:code|with code|employee code|emp code)?\s*([A-Z]{2,4}[-_]?\d{3,})', question, re.IGNORECASE)
+            if code_match:
+                corp_emp_code = code_match.group(1).upper()
+            else:
+                # Try just a code pattern
+                code_match = re.search(r'\b([A-Z]{2,4}\d{3,})\b', question, re.IGNORECASE)
+                if code_match:
+                    corp_emp_code = code_match.group(1).upper()
+
+            logger.info(f"[ACTION_PARSER] Keyword enroll_employee: name={emp_name}, code={corp_emp_code}")
+            return {
+                "action_type": "enroll_employee",
+                "action_params": {
+                    "emp_name": emp_name,
+                    "corp_emp_code": corp_emp_code
+                }
+            }
+
+        elif any(kw in question_lower for kw in ['enroll card', 'assign card', 'issue card', 'card enrollment']):
+            # Try to extract card number and employee ID
+            card_number = None
+            employee_id = target_user_id
+
+            # Try to extract card number
+            card_match = re.search(r'card\s*(?:number|no|#)?\s*[:=]?\s*(\d{6,})', question, re.IGNORECASE)
+            if card_match:
+                card_number = card_match.group(1)
+            else:
+                # Look for long number (card numbers are usually 8+ digits)
+                card_match = re.search(r'\b(\d{8,})\b', question)
+                if card_match:
+                    card_number = card_match.group(1)
+
+            logger.info(f"[ACTION_PARSER] Keyword enroll_card: employee={employee_id}, card={card_number}")
+            return {
+                "action_type": "enroll_card",
+                "action_params": {
+                    "employee_id": employee_id,
+                    "card_number": card_number,
+                    "access_scope": "card_only"
+                }
+            }
+
+        elif any(kw in question_lower for kw in ['register visitor', 'add visitor', 'new visitor', 'visitor registration', 'create visitor']):
+            # Try to extract visitor name
+            first_name = None
+            last_name = None
+
+            name_match = re.search(r'(?:visitor|register)\s+(?:named?\s+)?([A-Za-z]+)(?:\s+([A-Za-z]+))?', question, re.IGNORECASE)
+            if name_match:
+                first_name = name_match.group(1)
+                last_name = name_match.group(2) if name_match.group(2) else None
+
+            logger.info(f"[ACTION_PARSER] Keyword register_visitor: first_name={first_name}, last_name={last_name}")
+            return {
+                "action_type": "register_visitor",
+                "action_params": {
+                    "first_name": first_name,
+                    "last_name": last_name
+                }
+            }
+
+        elif any(kw in question_lower for kw in ['temporary card', 'temp card', 'visitor card']):
+            return {
+                "action_type": "assign_temporary_card",
+                "action_params": {"target_user_id": target_user_id}
+            }
+
+        elif any(kw in question_lower for kw in ['database backup', 'backup database', 'db backup', 'backup oryggi', 'backup the database']):
+            return {
+                "action_type": "database_backup",
+                "action_params": {"database_name": "Oryggi", "backup_type": "full"}
+            }
+
+        elif any(kw in question_lower for kw in ['door access', 'manage door', 'grant door', 'block door']):
+            # Determine if grant or block
+            action = "grant" if "grant" in question_lower else "block"
+            return {
+                "action_type": "manage_door_access",
+                "action_params": {
+                    "employee_id": target_user_id,
+                    "action": action
+                }
+            }
+
+        return {"action_type": "none", "action_params": {}}
+
+
+# Global action rule parser instance
+action_rule_parser = ActionRuleParser()
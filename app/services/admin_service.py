@@ -22,6 +22,7 @@ from app.models.platform.gateway import GatewaySession, GatewayQueryLog, Session
 from app.database.platform_connection import platform_db
 # Import gateway_manager at module level (not inside loops)
 from app.gateway.connection_manager import gateway_manager
+from app.services.llm_usage import llm_usage
 
 logger = logging.getLogger(__name__)
 
@@ -515,7 +516,8 @@ class AdminService:
                 top_tenants = db.query(
                     Tenant.name,
                     Tenant.slug,
-                    func.count(GatewayQueryLog.id).label('query_count')
+                    func.count(GatewayQueryLog.id).label('query_count'),
+                    func.sum(GatewayQueryLog.tokens_used).label('tokens_used')
                 ).join(
                     GatewayQueryLog, GatewayQueryLog.tenant_id == Tenant.id
                 ).filter(
@@ -548,9 +550,15 @@ class AdminService:
                             "name": tenant.name,
                             "slug": tenant.slug,
                             "query_count": tenant.query_count,
+                            "tokens_used": tenant.tokens_used or 0,
                         }
                         for tenant in top_tenants
                     ],
+                    # Per-stage LLM usage since process start (not persisted)
+                    "llm_usage": {
+                        **llm_usage.get_stats(),
+                        "tokens_by_tenant": llm_usage.get_tenant_totals(),
+                    },
                     "period": {
                         "start_date": start_date.isoformat(),
                         "end_date": end_date.isoformat(),
@@ -576,6 +584,7 @@ class AdminService:
                     "tenants_with_activity": 0,
                 },
                 "top_tenants": [],
+                "llm_usage": llm_usage.get_stats(),
                 "error": str(e)
             }
 
@@ -8,35 +8,11 @@ import os
 from typing import Dict, List, Any, Optional
 import chromadb
 from chromadb.config import Settings
-import google.generativeai as genai
-from chromadb import Documents, EmbeddingFunction, Embeddings
 from loguru import logger
 
 from app.config import settings
-
-
-class GoogleEmbeddingFunction(EmbeddingFunction):
-    """Custom embedding function for Google Generative AI"""
-
-    def __init__(self, api_key: str, model_name: str, task_type: str = "retrieval_document"):
-        genai.configure(api_key=api_key)
-        self.model_name = model_name
-        self.task_type = task_type
-
-    def __call__(self, input: Documents) -> Embeddings:
-        embeddings = []
-        for text in input:
-            try:
-                result = genai.embed_content(
-                    model=self.model_name,
-                    content=text,
-                    task_type=self.task_type
-                )
-                embeddings.append(result['embedding'])
-            except Exception as e:
-                logger.error(f"Embedding failed: {e}")
-                raise
-        return embeddings
+from app.rag.embedding_cache import EmbeddingBatchError, embedding_cache
+from app.rag.google_embeddings import GoogleEmbeddingFunction
 
 
 class AutoEmbedder:
@@ -96,16 +72,19 @@ class AutoEmbedder:
                 "schema_collection": "tenant_123_schema",
                 "fewshot_collection": "tenant_123_fewshots",
                 "schema_count": 50,
-                "fewshot_count": 50
+                "fewshot_count": 50,
+                "failed_ids": []    # documents that could not be embedded
             }
         """
         logger.info(f"Creating embeddings for tenant: {tenant_id}")
+        cache_before = embedding_cache.get_stats()
 
         result = {
             "schema_collection": "",
             "fewshot_collection": "",
             "schema_count": 0,
-            "fewshot_count": 0
+            "fewshot_count": 0,
+            "failed_ids": []
         }
 
         # Create schema collection
@@ -115,7 +94,8 @@ class AutoEmbedder:
             collection_name=schema_collection_name,
             schema=schema,
             analysis=analysis,
-            tenant_id=tenant_id
+            tenant_id=tenant_id,
+            failed_ids=result["failed_ids"]
         )
 
         # Create few-shot collection
@@ -124,10 +104,16 @@ class AutoEmbedder:
         result["fewshot_count"] = await self._create_fewshot_embeddings(
             collection_name=fewshot_collection_name,
             few_shots=few_shots,
-            tenant_id=tenant_id
+            tenant_id=tenant_id,
+            failed_ids=result["failed_ids"]
         )
 
-        logger.info(f"Embeddings created: {result}")
+        cache_after = embedding_cache.get_stats()
+        logger.info(
+            f"Embeddings created: {result} (embedding cache: "
+            f"{cache_after['hits'] - cache_before['hits']} reused, "
+            f"{cache_after['misses'] - cache_before['misses']} computed)"
+        )
         return result
 
     async def _create_schema_embeddings(
@@ -135,9 +121,10 @@ class AutoEmbedder:
         collection_name: str,
         schema: Dict[str, Any],
         analysis: Dict[str, Any],
-        tenant_id: str
+        tenant_id: str,
+        failed_ids: Optional[List[str]] = None
     ) -> int:
-        """Create embeddings for schema information"""
+        """Create embeddings for schema information (IDs that fail to embed go to failed_ids)"""
 
         # Delete existing collection if exists
         try:
@@ -240,33 +227,19 @@ Base Tables: {', '.join(base_tables) if base_tables else 'Unknown'}"""
             ids.append(f"{tenant_id}_vocabulary")
 
         # Batch add to collection
-        if documents:
-            # Add in batches to avoid token limits
-            batch_size = 50
-            for i in range(0, len(documents), batch_size):
-                batch_docs = documents[i:i+batch_size]
-                batch_meta = metadatas[i:i+batch_size]
-                batch_ids = ids[i:i+batch_size]
-
-                try:
-                    collection.add(
-                        documents=batch_docs,
-                        metadatas=batch_meta,
-                        ids=batch_ids
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to add batch {i}: {e}")
-
-        logger.info(f"Created {len(documents)} schema embeddings in {collection_name}")
-        return len(documents)
+        count = self._add_in_batches(collection, documents, metadatas, ids, failed_ids)
+
+        logger.info(f"Created {count} schema embeddings in {collection_name}")
+        return count
 
     async def _create_fewshot_embeddings(
         self,
         collection_name: str,
         few_shots: List[Dict[str, str]],
-        tenant_id: str
+        tenant_id: str,
+        failed_ids: Optional[List[str]] = None
     ) -> int:
-        """Create embeddings for few-shot examples"""
+        """Create embeddings for few-shot examples (IDs that fail to embed go to failed_ids)"""
 
         # Delete existing collection if exists
         try:
@@ -311,24 +284,72 @@ Base Tables: {', '.join(base_tables) if base_tables else 'Unknown'}"""
             ids.append(f"{tenant_id}_fs_{i}")
 
         # Batch add
-        if documents:
-            batch_size = 50
-            for i in range(0, len(documents), batch_size):
-                batch_docs = documents[i:i+batch_size]
-                batch_meta = metadatas[i:i+batch_size]
-                batch_ids = ids[i:i+batch_size]
-
-                try:
-                    collection.add(
-                        documents=batch_docs,
-                        metadatas=batch_meta,
-                        ids=batch_ids
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to add few-shot batch {i}: {e}")
-
-        logger.info(f"Created {len(documents)} few-shot embeddings in {collection_name}")
-        return len(documents)
+        count = self._add_in_batches(collection, documents, metadatas, ids, failed_ids)
+
+        logger.info(f"Created {count} few-shot embeddings in {collection_name}")
+        return count
+
+    def _add_in_batches(
+        self,
+        collection,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        failed_ids: Optional[List[str]] = None,
+        batch_size: int = 50
+    ) -> int:
+        """
+        Embed and add documents in batches, keeping the ones that embed when others fail
+
+        Args:
+            collection: Target ChromaDB collection
+            documents: Document texts
+            metadatas: Metadata dict per document
+            ids: Unique ID per document
+            failed_ids: Collects the IDs that could not be embedded or added
+            batch_size: Documents per add (avoids token limits)
+
+        Returns:
+            Number of documents added
+        """
+        failed_ids = failed_ids if failed_ids is not None else []
+        added = 0
+        for i in range(0, len(documents), batch_size):
+            batch_docs = documents[i:i+batch_size]
+            batch_meta = metadatas[i:i+batch_size]
+            batch_ids = ids[i:i+batch_size]
+
+            try:
+                embeddings = self.embedding_function(batch_docs)
+            except EmbeddingBatchError as e:
+                # Keep the documents that did embed
+                failed = set(e.failed_indexes)
+                failed_ids.extend(batch_ids[j] for j in sorted(failed))
+                logger.warning(f"Failed to embed {len(failed)} document(s) in batch {i}: {e}")
+                keep = [j for j in range(len(batch_ids)) if j not in failed]
+                batch_docs = [batch_docs[j] for j in keep]
+                batch_meta = [batch_meta[j] for j in keep]
+                batch_ids = [batch_ids[j] for j in keep]
+                embeddings = [e.embeddings[j] for j in keep]
+            except Exception as e:
+                failed_ids.extend(batch_ids)
+                logger.warning(f"Failed to embed batch {i}: {e}")
+                continue
+
+            if not batch_ids:
+                continue
+            try:
+                collection.add(
+                    documents=batch_docs,
+                    metadatas=batch_meta,
+                    ids=batch_ids,
+                    embeddings=embeddings
+                )
+                added += len(batch_ids)
+            except Exception as e:
+                failed_ids.extend(batch_ids)
+                logger.warning(f"Failed to add batch {i}: {e}")
+        return added
 
     def query_schema(
         self,
@@ -11,6 +11,7 @@ OryggiDB Problem:
 
 import json
 import re
+import time
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import google.generativeai as genai
@@ -18,6 +19,7 @@ from loguru import logger
 from sqlalchemy import create_engine, text
 
 from app.config import settings
+from app.services.llm_usage import llm_usage
 
 
 # Organization Type Patterns - learned from actual OryggiDB deployments
@@ -476,6 +478,7 @@ Return ONLY a JSON object:
 Return ONLY valid JSON, no markdown."""
 
         try:
+            started_at = time.perf_counter()
             response = await self.model.generate_content_async(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -483,6 +486,7 @@ Return ONLY valid JSON, no markdown."""
                     max_output_tokens=500
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="onboarding")
 
             response_text = response.text
             if "```json" in response_text:
@@ -10,11 +10,13 @@ generic "How many employees in the system?"
 
 import json
 import re
+import time
 from typing import Dict, List, Any, Optional
 import google.generativeai as genai
 from loguru import logger
 
 from app.config import settings
+from app.services.llm_usage import llm_usage
 
 
 class AutoFewShotGenerator:
@@ -188,6 +190,7 @@ Generate {count} unique, realistic examples covering different complexity levels
 Return ONLY valid JSON, no markdown or explanations."""
 
         try:
+            started_at = time.perf_counter()
             response = await self.model.generate_content_async(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -195,6 +198,7 @@ Return ONLY valid JSON, no markdown or explanations."""
                     max_output_tokens=4000
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="onboarding")
 
             response_text = response.text
 
@@ -417,6 +421,7 @@ Return as JSON array:
 Return ONLY valid JSON."""
 
         try:
+            started_at = time.perf_counter()
             response = await self.model.generate_content_async(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -424,6 +429,7 @@ Return ONLY valid JSON."""
                     max_output_tokens=2000
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="onboarding")
 
             response_text = response.text
             if "```json" in response_text:
@@ -6,11 +6,13 @@ Automatically detects organization type, modules, and relationships
 
 import json
 import re
+import time
 from typing import Dict, Any, List
 import google.generativeai as genai
 from loguru import logger
 
 from app.config import settings
+from app.services.llm_usage import llm_usage
 
 
 class LLMSchemaAnalyzer:
@@ -100,6 +102,7 @@ Important:
 - Return ONLY valid JSON, no markdown formatting"""
 
         try:
+            started_at = time.perf_counter()
             response = await self.model.generate_content_async(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -107,6 +110,7 @@ Important:
                     max_output_tokens=4000
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="onboarding")
 
             # Parse JSON response
             response_text = response.text
@@ -299,6 +303,7 @@ Columns: {', '.join(col_strs)}
 Provide a clear, concise description."""
 
         try:
+            started_at = time.perf_counter()
             response = await self.model.generate_content_async(
                 prompt,
                 generation_config=genai.GenerationConfig(
@@ -306,6 +311,7 @@ Provide a clear, concise description."""
                     max_output_tokens=200
                 )
             )
+            llm_usage.record_gemini(response, started_at, stage="onboarding")
             return response.text.strip()
         except Exception as e:
             logger.warning(f"Failed to generate description for {table_name}: {e}")
@@ -6,16 +6,21 @@ This service uses a hybrid approach:
 1. Fast heuristics for obvious unclear cases (no LLM call)
 2. LLM-based assessment for nuanced cases
 3. Smart question generation with selectable options
+
+triage() combines clarity assessment, intent classification and clarification
+options into a single LLM round trip for the chatbot orchestrator.
 """
 
 import re
 import json
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Callable, Awaitable
 from pydantic import BaseModel, Field
 from loguru import logger
 import google.generativeai as genai
 
 from app.config import settings
+from app.services.llm_usage import llm_usage
 
 
 class ClarityAssessment(BaseModel):
@@ -34,6 +39,14 @@ class ClarificationQuestion(BaseModel):
     context_hint: Optional[str] = Field(default=None, description="Additional context for the question")
 
 
+class TriageResult(BaseModel):
+    """Combined clarity + intent result from a single triage call"""
+    assessment: ClarityAssessment = Field(description="Clarity verdict (heuristic or LLM)")
+    intent: Optional[Dict[str, Any]] = Field(default=None, description="intent / report_format / email_recipient, None if not classified")
+    clarification: Optional[ClarificationQuestion] = Field(default=None, description="Clarifying question when unclear, if the LLM supplied one")
+    llm_calls: int = Field(default=0, description="LLM calls made (0 or 1)")
+
+
 class ClarificationState(BaseModel):
     """Track clarification state for a session"""
     original_question: str = Field(description="The original unclear question")
@@ -110,6 +123,16 @@ class ClarityAssessor:
         self.model = genai.GenerativeModel(settings.gemini_model)
         logger.info("[CLARITY] ClarityAssessor initialized")
 
+    @staticmethod
+    def _parse_json_response(result_text: str) -> Dict[str, Any]:
+        """Parse a JSON LLM response, stripping markdown code fences"""
+        result_text = result_text.strip()
+        if "```json" in result_text:
+            result_text = result_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_text:
+            result_text = result_text.split("```")[1].split("```")[0].strip()
+        return json.loads(result_text)
+
     def _check_heuristics(self, question: str) -> Optional[ClarityAssessment]:
         """
         Fast heuristic checks for obvious clear AND unclear cases.
@@ -332,16 +355,10 @@ Return ONLY valid JSON (no markdown):
   "possible_intents": ["what user might want 1", "what user might want 2"]
 }}"""
 
-        response = self.model.generate_content(prompt)
-        result_text = response.text.strip()
-
-        # Clean up response
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-
-        result = json.loads(result_text)
+        started_at = time.perf_counter()
+        response = await self.model.generate_content_async(prompt)
+        llm_usage.record_gemini(response, started_at, stage="clarity")
+        result = self._parse_json_response(response.text)
 
         # Apply threshold
         is_clear = result.get("is_clear", True) and result.get("confidence", 1.0) >= self.CLARITY_THRESHOLD
@@ -354,6 +371,160 @@ Return ONLY valid JSON (no markdown):
             possible_intents=result.get("possible_intents", [])
         )
 
+    # Intent values accepted from the triage call
+    TRIAGE_INTENTS = ("query", "report", "email", "combined")
+
+    def _build_triage_prompt(self, question: str, conversation_history: List[Dict] = None) -> str:
+        """Prompt asking for clarity, intent and clarification options in one JSON object"""
+        context_str = ""
+        if conversation_history:
+            recent = conversation_history[-5:]  # Last 5 messages
+            context_str = "\n".join([
+                f"- {msg.get('role', 'user')}: {msg.get('content', '')[:100]}"
+                for msg in recent
+            ])
+            context_str = f"\nRECENT CONVERSATION:\n{context_str}\n"
+
+        return f"""Triage this user request for an enterprise database chatbot.
+
+USER REQUEST: "{question}"
+{context_str}
+CONTEXT: The chatbot can:
+- Query employee/HR data from SQL database
+- Generate Excel reports
+- Send emails with data/reports
+- Manage access control (grant/revoke permissions)
+
+TASK 1 - CLARITY:
+A request is UNCLEAR if it is missing WHO / WHAT / WHEN, uses pronouns without
+clear references, could mean multiple different things, or is a fragment.
+A request is CLEAR if the intent is obvious (even if brief, like "employee count")
+or context from the conversation makes it clear.
+
+TASK 2 - INTENT:
+- "query" - User wants data/answer (e.g., "How many employees?")
+- "report" - User wants a generated report (e.g., "Create Excel spreadsheet of...")
+- "email" - User wants to send data via email (e.g., "Email me...")
+- "combined" - Report and email (e.g., "Generate a report and email it to manager@company.com")
+report_format: "pdf" or "excel" if a report is requested, else null
+email_recipient: email address from the request, "user_email" for "email me" / "send to me", else null
+
+TASK 3 - CLARIFICATION (only if unclear):
+Ask ONE clear, friendly question and give 3-4 SPECIFIC actionable options the
+system can execute. Use null and [] when the request is clear.
+
+Return ONLY valid JSON (no markdown):
+{{
+  "is_clear": true/false,
+  "confidence": 0.0-1.0,
+  "reason": "brief explanation if unclear",
+  "missing_info": ["missing details"],
+  "possible_intents": ["what user might want"],
+  "intent": "query|report|email|combined",
+  "report_format": "pdf|excel|null",
+  "email_recipient": "email@example.com|user_email|null",
+  "clarification_question": "Your clarifying question here?",
+  "clarification_options": ["Specific actionable option 1", "Specific actionable option 2"]
+}}"""
+
+    async def _gemini_complete(self, prompt: str) -> str:
+        started_at = time.perf_counter()
+        response = await self.model.generate_content_async(prompt)
+        llm_usage.record_gemini(response, started_at)
+        return response.text
+
+    async def triage(
+        self,
+        question: str,
+        conversation_history: List[Dict] = None,
+        llm_complete: Optional[Callable[[str], Awaitable[str]]] = None
+    ) -> TriageResult:
+        """
+        Assess clarity and classify intent with at most one LLM call.
+
+        _check_heuristics() runs first as a zero-LLM pre-filter:
+        - Heuristically UNCLEAR: returned without any LLM call (intent is not
+          needed since the user will be asked to clarify)
+        - Heuristically CLEAR: the triage call still runs for the intent, but
+          the heuristic verdict wins
+        - Undecided: the LLM decides clarity, intent and clarification options
+
+        Args:
+            question: The user's input
+            conversation_history: Previous messages for context
+            llm_complete: Async prompt -> text callable (defaults to Gemini)
+
+        Returns:
+            TriageResult; intent is None if the LLM call failed
+        """
+        logger.info(f"[CLARITY:TRIAGE] Triaging: '{question}'")
+
+        heuristic_result = self._check_heuristics(question)
+        if heuristic_result is not None and not heuristic_result.is_clear:
+            logger.info(f"[CLARITY:TRIAGE] Heuristic result: unclear, reason={heuristic_result.reason}")
+            return TriageResult(assessment=heuristic_result)
+
+        try:
+            complete = llm_complete or self._gemini_complete
+            with llm_usage.stage("clarity"):
+                result = self._parse_json_response(
+                    await complete(self._build_triage_prompt(question, conversation_history))
+                )
+        except Exception as e:
+            logger.error(f"[CLARITY:TRIAGE] Triage call failed: {e}")
+            # Fallback: assume clear if LLM fails (don't block user)
+            return TriageResult(
+                assessment=heuristic_result or ClarityAssessment(
+                    is_clear=True,
+                    confidence=0.5,
+                    reason="llm_fallback",
+                    missing_info=[],
+                    possible_intents=[]
+                ),
+                llm_calls=1
+            )
+
+        intent = result.get("intent")
+        intent_result = {
+            "intent": intent if intent in self.TRIAGE_INTENTS else "query",
+            "report_format": result.get("report_format") if result.get("report_format") not in (None, "null") else None,
+            "email_recipient": result.get("email_recipient") if result.get("email_recipient") not in (None, "null") else None,
+        }
+
+        if heuristic_result is not None:
+            assessment = heuristic_result
+        else:
+            try:
+                confidence = min(1.0, max(0.0, float(result.get("confidence", 1.0))))
+            except (TypeError, ValueError):
+                confidence = 0.5
+            assessment = ClarityAssessment(
+                # Apply threshold
+                is_clear=result.get("is_clear", True) and confidence >= self.CLARITY_THRESHOLD,
+                confidence=confidence,
+                reason=result.get("reason"),
+                missing_info=result.get("missing_info") or [],
+                possible_intents=result.get("possible_intents") or []
+            )
+
+        clarification = None
+        if not assessment.is_clear and result.get("clarification_question"):
+            clarification = ClarificationQuestion(
+                question=result["clarification_question"],
+                options=(result.get("clarification_options") or [])[:4]  # Max 4 options
+            )
+
+        logger.info(
+            f"[CLARITY:TRIAGE] is_clear={assessment.is_clear}, confidence={assessment.confidence}, "
+            f"intent={intent_result['intent']}"
+        )
+        return TriageResult(
+            assessment=assessment,
+            intent=intent_result,
+            clarification=clarification,
+            llm_calls=1
+        )
+
     async def generate_clarifying_question(
         self,
         question: str,
@@ -411,16 +582,10 @@ Return ONLY valid JSON (no markdown):
 }}"""
 
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-
-            # Clean up response
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-
-            result = json.loads(result_text)
+            started_at = time.perf_counter()
+            response = await self.model.generate_content_async(prompt)
+            llm_usage.record_gemini(response, started_at, stage="clarity")
+            result = self._parse_json_response(response.text)
 
             return ClarificationQuestion(
                 question=result.get("question", "Could you please provide more details?"),
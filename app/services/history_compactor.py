@@ -0,0 +1,370 @@
+"""
+Conversation History Compaction
+
+Keeps the conversation history part of the SQL prompts bounded.
+
+The SQL agents used to render the raw session history into every prompt, so
+prompt size (and with it LLM latency and cost) grew with the session. The
+compactor splits the history into:
+- the last HISTORY_RECENT_TURNS turns, rendered verbatim as before
+- everything older, folded into a per-session digest:
+  - a rolling summary, one line per earlier exchange (at most
+    HISTORY_SUMMARY_MAX_TURNS lines, older lines are counted, not kept)
+  - structured facts of the latest earlier turns: SQL, result IDs, row count
+  - key entity IDs (Ecodes from results and questions) seen in the session
+
+Digests are cached per (session_id, user_id) and updated incrementally: each
+request folds only the messages that left the verbatim window since the last
+request. The summary is extractive (question + first line of the answer), so
+compaction itself never calls the LLM.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+
+# Marker the chat API appends to assistant messages (followed by [SQL_QUERY] / [RESULT_IDS] / [RESULT_COUNT] lines)
+FOLLOWUP_CONTEXT_MARKER = "---CONTEXT_FOR_FOLLOWUP---"
+
+# Earlier turns whose SQL / result IDs are kept as structured facts
+MAX_SQL_FACTS = 5
+
+# Result IDs kept per earlier turn, and entity IDs kept per session
+MAX_RESULT_IDS_PER_TURN = 20
+MAX_ENTITY_IDS = 100
+
+# Characters kept from an earlier question / answer in its summary line
+SUMMARY_SNIPPET_CHARS = 150
+
+# "employee 2374", "ecode: 1001", "card no 55012"
+_ENTITY_ID_RE = re.compile(
+    r"\b(?:employee|emp|ecode|e-code|staff|card|visitor)\s*(?:no\.?|number|id|#)?\s*[:#]?\s*(\d{2,})\b",
+    re.IGNORECASE,
+)
+
+
+def parse_followup_context(content: str) -> Tuple[str, Optional[str], Optional[str], Optional[int]]:
+    """
+    Split an assistant message into its answer and follow-up context
+
+    Args:
+        content: Stored assistant message
+
+    Returns:
+        (answer text, SQL query, comma-separated result IDs, result count)
+    """
+    if FOLLOWUP_CONTEXT_MARKER not in content:
+        return content, None, None, None
+
+    answer, _, context = content.partition(FOLLOWUP_CONTEXT_MARKER)
+    sql_query = result_ids = None
+    result_count = None
+    for line in context.split("\n"):
+        line = line.strip()
+        if line.startswith("[SQL_QUERY]:"):
+            sql_query = line[len("[SQL_QUERY]:"):].strip() or None
+        elif line.startswith("[RESULT_IDS]:"):
+            result_ids = line[len("[RESULT_IDS]:"):].strip() or None
+        elif line.startswith("[RESULT_COUNT]:"):
+            count = line[len("[RESULT_COUNT]:"):].strip()
+            result_count = int(count) if count.isdigit() else None
+    return answer.strip(), sql_query, result_ids, result_count
+
+
+def _snippet(text: str, limit: int = SUMMARY_SNIPPET_CHARS) -> str:
+    """First line of text, truncated"""
+    line = " ".join(text.strip().split("\n", 1)[0].split())
+    return line if len(line) <= limit else line[:limit].rstrip() + "..."
+
+
+def _message_key(message: Dict[str, Any]) -> str:
+    """Stable identity of a stored message"""
+    if message.get("conversation_id") is not None:
+        return str(message["conversation_id"])
+    content = message.get("message_content") or ""
+    digest = hashlib.sha1(content.encode("utf-8", errors="replace")).hexdigest()[:16]
+    return f"{message.get('timestamp')}:{message.get('message_type')}:{digest}"
+
+
+@dataclass
+class TurnFacts:
+    """Structured facts of one earlier turn"""
+    question: str
+    sql_query: Optional[str] = None
+    result_ids: Optional[str] = None
+    result_count: Optional[int] = None
+
+
+@dataclass
+class HistoryDigest:
+    """Rolling digest of a session's messages older than the verbatim window"""
+    summary: List[str] = field(default_factory=list)
+    omitted_turns: int = 0
+    facts: List[TurnFacts] = field(default_factory=list)
+    entity_ids: List[str] = field(default_factory=list)
+    folded_messages: int = 0
+    last_key: Optional[str] = None
+    pending_question: Optional[str] = None
+    updated_at: float = 0.0
+
+
+@dataclass
+class CompactHistory:
+    """History as rendered into a prompt: digest of older turns + recent messages"""
+    recent: List[Dict[str, Any]]
+    summary: List[str] = field(default_factory=list)
+    omitted_turns: int = 0
+    facts: List[TurnFacts] = field(default_factory=list)
+    entity_ids: List[str] = field(default_factory=list)
+    folded_messages: int = 0
+
+    @property
+    def has_digest(self) -> bool:
+        return bool(self.summary or self.facts)
+
+    def last_fact(self) -> Optional[TurnFacts]:
+        """Latest earlier turn that produced SQL"""
+        return next((fact for fact in reversed(self.facts) if fact.sql_query), None)
+
+    def render_digest(self) -> str:
+        """Prompt block for the folded turns ("" when nothing was folded)"""
+        if not self.has_digest:
+            return ""
+
+        block = "EARLIER IN THIS CONVERSATION (summarized):\n"
+        if self.omitted_turns:
+            block += f"- ({self.omitted_turns} earlier exchange(s) not shown)\n"
+        for line in self.summary:
+            block += f"- {line}\n"
+
+        facts = [fact for fact in self.facts if fact.sql_query or fact.result_ids]
+        if facts:
+            block += "\nEARLIER QUERIES:\n"
+            for fact in facts:
+                block += f"- Q: {_snippet(fact.question, 100)}\n"
+                if fact.sql_query:
+                    block += f"  SQL USED: {fact.sql_query}\n"
+                if fact.result_ids:
+                    count = f" of {fact.result_count}" if fact.result_count else ""
+                    block += f"  RESULT IDS (ECodes): {fact.result_ids}{count}\n"
+
+        if self.entity_ids:
+            block += f"\nENTITY IDS MENTIONED EARLIER: {', '.join(self.entity_ids)}\n"
+        return block + "\n"
+
+
+class HistoryCompactor:
+    """
+    Thread-safe per-session history compactor with incremental digests
+
+    Example:
+        compact = history_compactor.compact(conversation_history)
+        prompt += compact.render_digest()
+        for msg in compact.recent: ...
+    """
+
+    def __init__(
+        self,
+        recent_turns: int = 3,
+        max_summary_turns: int = 20,
+        max_sessions: int = 1000,
+        ttl_seconds: int = 3600,
+        enabled: bool = True,
+    ):
+        """
+        Initialize history compactor
+
+        Args:
+            recent_turns: Turns (question + answer) kept verbatim
+            max_summary_turns: Summary lines kept per session
+            max_sessions: Digests kept before LRU eviction
+            ttl_seconds: Digest lifetime since its last update
+            enabled: Master switch (disabled = full history verbatim)
+        """
+        self.enabled = enabled
+        self.recent_turns = recent_turns
+        self.max_summary_turns = max_summary_turns
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._digests: "OrderedDict[Tuple[str, str], HistoryDigest]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.compactions = 0
+        self.messages_folded = 0
+        self.digest_hits = 0
+        self.rebuilds = 0
+        self.evictions = 0
+
+    def compact(
+        self,
+        history: Optional[List[Dict[str, Any]]],
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> CompactHistory:
+        """
+        Split history into a digest of older turns and the recent messages
+
+        Args:
+            history: Session messages, oldest first
+            session_id: Digest cache key (default: taken from the messages)
+            user_id: Digest cache key (default: taken from the messages)
+
+        Returns:
+            CompactHistory (everything in `recent` when nothing needs folding)
+        """
+        history = list(history or [])
+        split = self._split_index(history)
+        if not self.enabled or split == 0:
+            return CompactHistory(recent=history)
+
+        older, recent = history[:split], history[split:]
+        session_id = session_id or history[0].get("session_id")
+        user_id = user_id or history[0].get("user_id")
+        key = (str(session_id), str(user_id)) if session_id else None
+
+        with self._lock:
+            self.compactions += 1
+            digest = self._cached_digest(key)
+            start = self._resume_index(digest, older) if digest else None
+            if start is None:
+                if digest is not None:
+                    self.rebuilds += 1
+                digest, start = HistoryDigest(), 0
+            elif start == len(older):
+                self.digest_hits += 1
+
+            for message in older[start:]:
+                self._fold(digest, message)
+            self.messages_folded += len(older) - start
+            digest.updated_at = time.time()
+
+            if key is not None:
+                self._digests.pop(key, None)
+                self._digests[key] = digest
+                while len(self._digests) > self.max_sessions:
+                    self._digests.popitem(last=False)
+                    self.evictions += 1
+
+            compact = CompactHistory(
+                recent=recent,
+                summary=list(digest.summary),
+                omitted_turns=digest.omitted_turns,
+                facts=list(digest.facts),
+                entity_ids=list(digest.entity_ids),
+                folded_messages=digest.folded_messages,
+            )
+
+        if start < len(older):
+            logger.debug(
+                f"[HISTORY] Folded {len(older) - start} message(s) into the digest "
+                f"({digest.folded_messages} folded, {len(recent)} verbatim)"
+            )
+        return compact
+
+    def _split_index(self, history: List[Dict[str, Any]]) -> int:
+        """Index of the first verbatim message (recent window starts on a user message)"""
+        user_indexes = [i for i, msg in enumerate(history) if msg.get("message_type") == "user"]
+        if len(user_indexes) <= self.recent_turns:
+            return 0
+        return user_indexes[-self.recent_turns] if self.recent_turns > 0 else len(history)
+
+    def _cached_digest(self, key: Optional[Tuple[str, str]]) -> Optional[HistoryDigest]:
+        """Live digest for a session (lock held)"""
+        if key is None:
+            return None
+        digest = self._digests.get(key)
+        if digest is not None and time.time() - digest.updated_at > self.ttl_seconds:
+            self._digests.pop(key, None)
+            return None
+        return digest
+
+    @staticmethod
+    def _resume_index(digest: HistoryDigest, older: List[Dict[str, Any]]) -> Optional[int]:
+        """Index of the first message the digest has not folded, or None if it no longer lines up"""
+        if digest.last_key is None:
+            return None
+        for index in range(len(older) - 1, -1, -1):
+            if _message_key(older[index]) == digest.last_key:
+                return index + 1
+        return None
+
+    def _fold(self, digest: HistoryDigest, message: Dict[str, Any]):
+        """Fold one message into the digest"""
+        digest.folded_messages += 1
+        digest.last_key = _message_key(message)
+        content = message.get("message_content") or ""
+        msg_type = message.get("message_type")
+
+        if msg_type == "user":
+            if digest.pending_question:
+                # Unanswered question (e.g. clarification) - keep it on its own
+                self._add_summary(digest, f'Q: "{_snippet(digest.pending_question)}" (no answer)')
+            digest.pending_question = content
+            self._add_entity_ids(digest, _ENTITY_ID_RE.findall(content))
+            return
+        if msg_type != "assistant":
+            return
+
+        answer, sql_query, result_ids, result_count = parse_followup_context(content)
+        question = digest.pending_question or ""
+        digest.pending_question = None
+
+        rows = f" ({result_count} rows)" if result_count is not None else ""
+        self._add_summary(digest, f'Q: "{_snippet(question)}" -> A: {_snippet(answer)}{rows}')
+
+        if result_ids:
+            ids = [value.strip() for value in result_ids.split(",") if value.strip()]
+            self._add_entity_ids(digest, ids[:MAX_RESULT_IDS_PER_TURN])
+            result_ids = ",".join(ids[:MAX_RESULT_IDS_PER_TURN])
+        if sql_query or result_ids:
+            digest.facts.append(TurnFacts(question, sql_query, result_ids, result_count))
+            del digest.facts[:-MAX_SQL_FACTS]
+
+    def _add_summary(self, digest: HistoryDigest, line: str):
+        digest.summary.append(line)
+        overflow = len(digest.summary) - self.max_summary_turns
+        if overflow > 0:
+            del digest.summary[:overflow]
+            digest.omitted_turns += overflow
+
+    @staticmethod
+    def _add_entity_ids(digest: HistoryDigest, ids: List[str]):
+        for value in ids:
+            if value in digest.entity_ids:
+                digest.entity_ids.remove(value)
+            digest.entity_ids.append(value)
+        del digest.entity_ids[:-MAX_ENTITY_IDS]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get history compactor statistics"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._digests),
+                "recent_turns": self.recent_turns,
+                "compactions": self.compactions,
+                "messages_folded": self.messages_folded,
+                "digest_hits": self.digest_hits,
+                "rebuilds": self.rebuilds,
+                "evictions": self.evictions,
+            }
+
+
+# Global history compactor instance
+history_compactor = HistoryCompactor(
+    recent_turns=settings.history_recent_turns,
+    max_summary_turns=settings.history_summary_max_turns,
+    max_sessions=settings.history_compactor_max_sessions,
+    ttl_seconds=settings.history_compactor_ttl_seconds,
+    enabled=settings.history_compaction_enabled,
+)
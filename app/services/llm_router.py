@@ -0,0 +1,491 @@
+"""
+LLM Provider Router
+
+Routes SQL-generation calls across Gemini and OpenRouter instead of pinning
+every request to the provider chosen at startup.
+
+- Hedging: if the primary has not answered by its observed p95 latency, the
+  same prompt is sent to the secondary and whichever answers first wins
+  (the loser is cancelled)
+- Failover: if a provider fails outright, the next one is tried immediately
+- Circuit breaker: repeated timeouts / 5xx responses open a provider's
+  breaker so requests skip it until a probe succeeds after the reset window.
+  If every provider's breaker is open the primary is still tried, so a
+  single-provider setup degrades to its old behaviour rather than failing fast
+- Per-provider latency histograms (see get_stats)
+
+Used by:
+- RAGSQLAgent (async and sync paths)
+- TenantSQLAgent
+"""
+
+import asyncio
+import bisect
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.config import settings
+
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+class LLMRouterError(Exception):
+    """Raised when no provider could produce a response"""
+
+
+@dataclass(frozen=True)
+class LLMResponse:
+    """Response text and the provider / model that produced it"""
+    text: str
+    provider: str
+    model: Optional[str] = None
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    Whether an error counts against a provider's circuit breaker
+
+    Timeouts and 5xx / 408 responses do; client errors (bad request, safety
+    blocks, empty responses) do not, since the other provider would not fix them.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)):
+        return True
+    # LLMTransportError.status_code / google.api_core exceptions' .code
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and (status >= 500 or status == 408)
+
+
+class LatencyHistogram:
+    """Cumulative latency buckets plus a recent-sample window for quantiles"""
+
+    def __init__(self, window: int = 500):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            self.count += 1
+            self.total_ms += latency_ms
+            self._recent.append(latency_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile over the recent window, or None if empty"""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS_MS, self.bucket_counts)}
+        buckets["le_inf"] = self.bucket_counts[-1]
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "buckets": buckets,
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after failure_threshold provider failures in a row;
+    open -> half_open once reset_timeout has passed (one probe allowed);
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_started = now
+                return True
+            if self.state == "half_open" and now - self._probe_started >= self.reset_timeout:
+                # The previous probe never reported back (e.g. lost a hedge race)
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class _ProviderStats:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.latency = LatencyHistogram()
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+
+
+class LLMProviderRouter:
+    """
+    Hedged, circuit-broken dispatch across LLM providers
+
+    Callers pass one zero-argument callable per configured provider, so each
+    agent keeps its own prompt formatting and SDK objects.
+
+    Example:
+        response = await llm_router.generate(
+            {
+                "gemini": lambda: self._generate_sql_gemini(prompt),
+                "openrouter": lambda: self._generate_sql_openrouter(prompt),
+            },
+            primary="gemini",
+            models={"gemini": settings.gemini_model, "openrouter": settings.openrouter_model},
+        )
+        sql, answered_by = response.text, response.model
+    """
+
+    def __init__(
+        self,
+        hedging_enabled: bool = True,
+        hedge_default_delay_ms: float = 4000,
+        hedge_min_delay_ms: float = 500,
+        hedge_min_samples: int = 20,
+        attempt_timeout: float = 60.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize router
+
+        Args:
+            hedging_enabled: Send hedge requests (failover on errors is always on)
+            hedge_default_delay_ms: Hedge delay until a provider has enough samples
+            hedge_min_delay_ms: Lower bound for the p95-based hedge delay
+            hedge_min_samples: Samples needed before trusting a provider's p95
+            attempt_timeout: Per-attempt timeout in seconds (async path)
+            failure_threshold: Consecutive provider failures that open a breaker
+            reset_timeout: Seconds a breaker stays open before a probe
+            max_workers: Threads for the sync path
+        """
+        self.hedging_enabled = hedging_enabled
+        self.hedge_default_delay_ms = hedge_default_delay_ms
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedge_min_samples = hedge_min_samples
+        self.attempt_timeout = attempt_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_workers = max_workers
+
+        self._providers: Dict[str, _ProviderStats] = {}
+        self._providers_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    # ==================== Provider state ====================
+
+    def _provider(self, name: str) -> _ProviderStats:
+        with self._providers_lock:
+            if name not in self._providers:
+                self._providers[name] = _ProviderStats(self.failure_threshold, self.reset_timeout)
+            return self._providers[name]
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """
+        Seconds to wait on a provider before hedging, or None if hedging is off
+
+        Uses the provider's observed p95 once it has enough samples.
+        """
+        if not self.hedging_enabled:
+            return None
+        latency = self._provider(name).latency
+        delay_ms = self.hedge_default_delay_ms
+        if latency.samples >= self.hedge_min_samples:
+            delay_ms = max(self.hedge_min_delay_ms, latency.quantile(0.95))
+        return delay_ms / 1000
+
+    def _candidates(self, names: List[str], primary: str) -> List[str]:
+        """Primary first, then the rest in caller order"""
+        if primary in names:
+            return [primary] + [n for n in names if n != primary]
+        return list(names)
+
+    def _next_allowed(self, remaining: List[str]) -> Optional[str]:
+        while remaining:
+            name = remaining.pop(0)
+            if self._provider(name).breaker.allow_request():
+                return name
+            logger.warning(f"[LLM_ROUTER] Skipping {name}: circuit open")
+        return None
+
+    def _record_success(self, name: str, started: float):
+        provider = self._provider(name)
+        provider.latency.observe((time.perf_counter() - started) * 1000)
+        provider.successes += 1
+        provider.breaker.record_success()
+
+    def _record_error(self, name: str, error: BaseException):
+        provider = self._provider(name)
+        provider.failures += 1
+        if is_provider_failure(error):
+            provider.breaker.record_failure()
+        logger.warning(f"[LLM_ROUTER] {name} failed: {error}")
+
+    def _record_outcome(
+        self, name: str, launched: List[str], hedged: bool, text: str, models: Optional[Dict[str, str]]
+    ) -> LLMResponse:
+        if name != launched[0]:
+            if hedged:
+                self.hedge_wins += 1
+            logger.info(f"[LLM_ROUTER] Answered by {name} (launched: {', '.join(launched)})")
+        return LLMResponse(text=text, provider=name, model=(models or {}).get(name))
+
+    # ==================== Async path ====================
+
+    async def _attempt(self, name: str, call: Callable[[], Awaitable[str]]) -> str:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(), timeout=self.attempt_timeout)
+        except asyncio.CancelledError:
+            self._provider(name).cancelled += 1
+            raise
+        except Exception as e:
+            self._record_error(name, e)
+            raise
+        self._record_success(name, started)
+        return result
+
+    async def generate(
+        self,
+        calls: Dict[str, Callable[[], Awaitable[str]]],
+        primary: str,
+        models: Optional[Dict[str, str]] = None,
+    ) -> LLMResponse:
+        """
+        Run an LLM call with hedging, failover and circuit breaking
+
+        Args:
+            calls: Provider name -> zero-argument coroutine factory
+            primary: Preferred provider
+            models: Provider name -> model name, reported back on the response
+
+        Returns:
+            First successful response, with the provider (and model) that won
+
+        Raises:
+            The last provider error if every launched provider failed
+        """
+        self.requests += 1
+        order = self._candidates(list(calls), primary)
+        remaining = list(order)
+        # Every breaker open: try the primary anyway rather than failing fast
+        name = self._next_allowed(remaining) or order[0]
+
+        pending: Dict[asyncio.Task, str] = {}
+        launched: List[str] = []
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch(provider: str):
+            launched.append(provider)
+            pending[asyncio.ensure_future(self._attempt(provider, calls[provider]))] = provider
+
+        launch(name)
+        try:
+            while pending:
+                timeout = self.hedge_delay(launched[-1]) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedge = self._next_allowed(remaining)
+                    if hedge:
+                        self.hedges_sent += 1
+                        hedged = True
+                        logger.info(f"[LLM_ROUTER] {launched[-1]} slower than {timeout:.2f}s - hedging to {hedge}")
+                        launch(hedge)
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        return self._record_outcome(provider, launched, hedged, task.result(), models)
+                    last_error = task.exception()
+
+                if not pending:
+                    fallback = self._next_allowed(remaining)
+                    if fallback:
+                        self.failovers += 1
+                        logger.info(f"[LLM_ROUTER] Failing over to {fallback}")
+                        launch(fallback)
+        finally:
+            # Cancel the losers and let them unwind (cancellation is prompt for
+            # HTTP calls; a thread-backed call is abandoned, not interrupted)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise last_error or LLMRouterError("No LLM provider available")
+
+    # ==================== Sync path ====================
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._providers_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm_router")
+            return self._executor
+
+    def _attempt_sync(self, name: str, call: Callable[[], str]) -> str:
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            self._record_error(name, e)
+            raise
+        self._record_success(name, started)
+        return result
+
+    def generate_sync(
+        self,
+        calls: Dict[str, Callable[[], str]],
+        primary: str,
+        models: Optional[Dict[str, str]] = None,
+    ) -> LLMResponse:
+        """
+        Blocking variant of generate() for sync call sites
+
+        Attempts run in worker threads. A losing attempt cannot be interrupted
+        mid-call; its result is discarded when it finishes.
+        """
+        self.requests += 1
+        executor = self._get_executor()
+        order = self._candidates(list(calls), primary)
+        remaining = list(order)
+        # Every breaker open: try the primary anyway rather than failing fast
+        name = self._next_allowed(remaining) or order[0]
+
+        pending: Dict[Future, str] = {}
+        launched: List[str] = []
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch(provider: str):
+            launched.append(provider)
+            # Run under the caller's context variables (LLM usage attribution)
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, self._attempt_sync, provider, calls[provider])] = provider
+
+        launch(name)
+        try:
+            while pending:
+                timeout = self.hedge_delay(launched[-1]) if remaining else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    hedge = self._next_allowed(remaining)
+                    if hedge:
+                        self.hedges_sent += 1
+                        hedged = True
+                        logger.info(f"[LLM_ROUTER] {launched[-1]} slower than {timeout:.2f}s - hedging to {hedge}")
+                        launch(hedge)
+                    continue
+
+                for future in done:
+                    provider = pending.pop(future)
+                    if future.exception() is None:
+                        return self._record_outcome(provider, launched, hedged, future.result(), models)
+                    last_error = future.exception()
+
+                if not pending:
+                    fallback = self._next_allowed(remaining)
+                    if fallback:
+                        self.failovers += 1
+                        logger.info(f"[LLM_ROUTER] Failing over to {fallback}")
+                        launch(fallback)
+        finally:
+            for future in pending:
+                future.cancel()
+
+        raise last_error or LLMRouterError("No LLM provider available")
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get router statistics with per-provider latency histograms"""
+        with self._providers_lock:
+            providers = dict(self._providers)
+        return {
+            "requests": self.requests,
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {
+                name: {
+                    "successes": p.successes,
+                    "failures": p.failures,
+                    "cancelled": p.cancelled,
+                    "breaker": p.breaker.state,
+                    "breaker_trips": p.breaker.trips,
+                    "hedge_delay_ms": round(self.hedge_delay(name) * 1000) if self.hedging_enabled else None,
+                    "latency": p.latency.get_stats(),
+                }
+                for name, p in providers.items()
+            },
+        }
+
+
+# Global LLM provider router instance
+llm_router = LLMProviderRouter(
+    hedging_enabled=settings.llm_hedging_enabled,
+    hedge_default_delay_ms=settings.llm_hedge_default_delay_ms,
+    hedge_min_delay_ms=settings.llm_hedge_min_delay_ms,
+    hedge_min_samples=settings.llm_hedge_min_samples,
+    attempt_timeout=settings.llm_attempt_timeout,
+    failure_threshold=settings.llm_breaker_failure_threshold,
+    reset_timeout=settings.llm_breaker_reset_seconds,
+    max_workers=settings.agent_executor_workers,
+)
@@ -0,0 +1,419 @@
+"""
+LLM HTTP Transport
+
+Shared, long-lived HTTP clients for OpenRouter chat completions.
+
+Opening a new requests.post() connection per question costs a fresh TCP + TLS
+handshake (150-300 ms from our region). This module keeps pooled keep-alive
+connections (HTTP/2 when the optional `h2` package is installed) and applies a
+single retry policy with jittered exponential backoff.
+
+Used by:
+- RAGSQLAgent (sync and async paths)
+- TenantSQLAgent
+- ChatbotOrchestrator intent classifier (when llm_provider=openrouter)
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.config import settings
+from app.services.llm_usage import llm_usage
+
+# HTTP/2 is optional - httpx needs the h2 package for it
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+
+# Status codes worth retrying (rate limiting and transient upstream failures)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMTransportError(Exception):
+    """Raised when an LLM HTTP call fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OpenRouterTransport:
+    """
+    Pooled OpenRouter client with retries
+
+    Example:
+        content = await llm_transport.complete(
+            prompt="Generate SQL for ...",
+            system="You are an expert SQL query generator...",
+        )
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        http2: bool = True,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        """
+        Initialize transport (clients are created lazily on first use)
+
+        Args:
+            base_url: OpenRouter API base URL
+            api_key: OpenRouter API key
+            model: Default model for completions
+            max_connections: Pool size limit
+            max_keepalive_connections: Idle connections kept open
+            keepalive_expiry: Seconds an idle connection stays open
+            timeout: Default per-call read timeout in seconds
+            connect_timeout: Connect timeout in seconds
+            max_retries: Retries after the first attempt
+            backoff_base: Base delay for exponential backoff
+            backoff_max: Cap for a single backoff delay
+            http2: Use HTTP/2 if the h2 package is available
+            transport: Optional httpx transport override (e.g. httpx.MockTransport)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http2 = http2 and HAS_HTTP2
+        self._transport = transport
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+
+        # One async client per event loop (an AsyncClient's connections belong to its loop)
+        self._async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+
+        self.requests_sent = 0
+        self.retries = 0
+
+    # ==================== Client management ====================
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://oryggi.ai",
+            "X-Title": "OryggiAI SQL Agent",
+        }
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared async client for the running event loop
+
+        An AsyncClient's connections belong to the loop that opened them, so
+        each loop gets its own client (e.g. tests). Clients left behind by
+        other loops are released when a new one is created.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            self._release_stale_async_clients(loop)
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers(),
+                limits=self.limits,
+                timeout=self._timeout(None),
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._async_clients[loop] = client
+            logger.info(f"[LLM_TRANSPORT] Created pooled async client (http2={self.http2})")
+        return client
+
+    def _release_stale_async_clients(self, current_loop: asyncio.AbstractEventLoop):
+        """
+        Close clients owned by other event loops
+
+        A client on a loop that is still running (in another thread) is closed
+        on that loop. A closed loop can no longer run aclose(), so its client
+        is only dropped and its sockets are freed with it. Clients on idle
+        loops that may run again are kept until aclose().
+        """
+        for loop, client in list(self._async_clients.items()):
+            if loop is current_loop:
+                continue
+            if loop.is_closed() or client.is_closed:
+                del self._async_clients[loop]
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                del self._async_clients[loop]
+
+    def _get_sync_client(self) -> httpx.Client:
+        """Get the shared sync client (for callers running in worker threads)"""
+        with self._sync_lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                self._sync_client = httpx.Client(
+                    base_url=self.base_url,
+                    headers=self._headers(),
+                    limits=self.limits,
+                    timeout=self._timeout(None),
+                    http2=self.http2,
+                    transport=self._transport,
+                )
+                logger.info(f"[LLM_TRANSPORT] Created pooled sync client (http2={self.http2})")
+            return self._sync_client
+
+    async def aclose(self):
+        """Close pooled clients (called on application shutdown)"""
+        current_loop = asyncio.get_running_loop()
+        for loop, client in list(self._async_clients.items()):
+            if client.is_closed or loop.is_closed():
+                continue
+            if loop is current_loop:
+                await client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+        self._async_clients.clear()
+        if self._sync_client is not None and not self._sync_client.is_closed:
+            self._sync_client.close()
+        logger.info("[LLM_TRANSPORT] Closed pooled clients")
+
+    # ==================== Retry policy ====================
+
+    def _backoff_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Full-jitter exponential backoff, honouring Retry-After when present
+
+        Args:
+            attempt: Zero-based retry attempt
+            response: Failed response (for Retry-After)
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+    ) -> Dict[str, Any]:
+        return {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens or settings.gemini_max_tokens,
+        }
+
+    @staticmethod
+    def _check_response(response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code != 200:
+            raise LLMTransportError(
+                f"OpenRouter API error: {response.status_code} - {response.text}",
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    # ==================== Public API ====================
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        POST /chat/completions with retries
+
+        Returns:
+            Raw OpenRouter JSON response
+
+        Raises:
+            LLMTransportError: On non-retryable errors or when retries are exhausted
+        """
+        client = self._get_async_client()
+        payload = self._build_payload(messages, model, temperature, max_tokens)
+        started_at = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                self.requests_sent += 1
+                response = await client.post("/chat/completions", json=payload, timeout=self._timeout(timeout))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    result = self._check_response(response)
+                    llm_usage.record_openrouter(result, started_at)
+                    return result
+                error = LLMTransportError(
+                    f"OpenRouter API error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                )
+            except httpx.TimeoutException:
+                error = LLMTransportError("OpenRouter API request timed out", status_code=408)
+            except httpx.TransportError as e:
+                error = LLMTransportError(f"OpenRouter connection failed: {e}")
+
+            if attempt >= self.max_retries:
+                raise error
+
+            delay = self._backoff_delay(attempt, response)
+            self.retries += 1
+            logger.warning(f"[LLM_TRANSPORT] {error} - retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def chat_completion_sync(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Blocking variant of chat_completion() for sync call sites"""
+        client = self._get_sync_client()
+        payload = self._build_payload(messages, model, temperature, max_tokens)
+        started_at = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                self.requests_sent += 1
+                response = client.post("/chat/completions", json=payload, timeout=self._timeout(timeout))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    result = self._check_response(response)
+                    llm_usage.record_openrouter(result, started_at)
+                    return result
+                error = LLMTransportError(
+                    f"OpenRouter API error: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                )
+            except httpx.TimeoutException:
+                error = LLMTransportError("OpenRouter API request timed out", status_code=408)
+            except httpx.TransportError as e:
+                error = LLMTransportError(f"OpenRouter connection failed: {e}")
+
+            if attempt >= self.max_retries:
+                raise error
+
+            delay = self._backoff_delay(attempt, response)
+            self.retries += 1
+            logger.warning(f"[LLM_TRANSPORT] {error} - retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    @staticmethod
+    def extract_content(result: Dict[str, Any]) -> str:
+        """Pull the assistant message text out of a chat completion response"""
+        if "choices" not in result or len(result["choices"]) == 0:
+            raise LLMTransportError("OpenRouter returned empty response")
+
+        content = result["choices"][0]["message"]["content"]
+        if not content:
+            raise LLMTransportError("OpenRouter returned empty content")
+
+        return content.strip()
+
+    @staticmethod
+    def _messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def complete(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Single-prompt completion returning the response text"""
+        result = await self.chat_completion(
+            self._messages(prompt, system),
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+        )
+        return self.extract_content(result)
+
+    def complete_sync(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Blocking variant of complete()"""
+        result = self.chat_completion_sync(
+            self._messages(prompt, system),
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+        )
+        return self.extract_content(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get transport statistics"""
+        return {
+            "http2": self.http2,
+            "requests_sent": self.requests_sent,
+            "async_clients": len(self._async_clients),
+            "retries": self.retries,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+        }
+
+
+# Global OpenRouter transport instance
+llm_transport = OpenRouterTransport(
+    base_url=settings.openrouter_base_url,
+    api_key=settings.openrouter_api_key,
+    model=settings.openrouter_model,
+    max_connections=settings.llm_http_max_connections,
+    max_keepalive_connections=settings.llm_http_max_keepalive,
+    keepalive_expiry=settings.llm_http_keepalive_expiry,
+    timeout=settings.llm_http_timeout,
+    connect_timeout=settings.llm_http_connect_timeout,
+    max_retries=settings.llm_http_max_retries,
+    backoff_base=settings.llm_http_backoff_base,
+    backoff_max=settings.llm_http_backoff_max,
+    http2=settings.llm_http2,
+)
@@ -0,0 +1,266 @@
+"""
+LLM Usage Accounting
+
+Token and latency accounting for every LLM call, attributed to tenant,
+request and pipeline stage (sql_generation, sql_repair, clarity, intent,
+action_classification, onboarding, ...).
+
+Recording points:
+- OpenRouter: OpenRouterTransport records the `usage` block of every chat
+  completion, so all callers of llm_transport are covered
+- Gemini: call sites pass the response to record_gemini(), which reads
+  `usage_metadata` (prompt_token_count / candidates_token_count)
+
+Attribution uses context variables, so nothing has to be threaded through
+the call chain:
+- stage: `with llm_usage.stage("intent"):` around a call, or `stage=` when recording
+- request: `await llm_usage.track(usage, "sql_generation", coro)` runs one
+  awaitable with a RequestUsage accumulator attached; TenantSQLAgent writes
+  the accumulated total into GatewayQueryLog.tokens_used
+- tenant: the request's tenant, else TenantContext's current tenant
+
+Tasks created while a stage / request is active (LLM router hedges, to_thread
+calls) inherit it, since asyncio copies the context at task creation.
+
+Per-(tenant, stage) totals since process start are kept in memory and
+exposed by get_stats() for the analytics and admin dashboard endpoints.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+
+
+# Stage recorded when a call site does not name one
+DEFAULT_STAGE = "other"
+
+
+@dataclass
+class StageUsage:
+    """Token / latency totals for one stage"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: int = 0
+    max_latency_ms: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int, latency_ms: int):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "latency_ms": self.latency_ms,
+            "avg_latency_ms": round(self.latency_ms / self.calls, 1) if self.calls else 0.0,
+            "max_latency_ms": self.max_latency_ms,
+        }
+
+
+@dataclass
+class RequestUsage:
+    """LLM usage accumulated over one request"""
+    tenant_id: Optional[str] = None
+    stages: Dict[str, StageUsage] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(stage.total_tokens for stage in self.stages.values())
+
+    @property
+    def llm_calls(self) -> int:
+        return sum(stage.calls for stage in self.stages.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_tokens": self.total_tokens,
+            "llm_calls": self.llm_calls,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+
+_current_stage: ContextVar[Optional[str]] = ContextVar("llm_usage_stage", default=None)
+_current_request: ContextVar[Optional[RequestUsage]] = ContextVar("llm_usage_request", default=None)
+
+
+def _current_tenant_id() -> Optional[str]:
+    """Tenant of the current request context, if any"""
+    # No import here: if the middleware module is not loaded, no tenant was ever set
+    tenant_context = sys.modules.get("app.middleware.tenant_context")
+    if tenant_context is None:
+        return None
+    tenant_id = tenant_context.TenantContext.get_tenant_id()
+    return str(tenant_id) if tenant_id else None
+
+
+class LLMUsageTracker:
+    """
+    Thread-safe per-(tenant, stage) LLM token and latency totals
+
+    Example:
+        usage = llm_usage.new_request(tenant_id)
+        response = await llm_usage.track(usage, "sql_generation", self._generate_sql(prompt))
+        log_tokens(usage.total_tokens)
+    """
+
+    def __init__(self):
+        self._totals: Dict[Tuple[str, str], StageUsage] = {}
+        self._lock = threading.Lock()
+
+    # ==================== Attribution ====================
+
+    @staticmethod
+    def new_request(tenant_id: Any = None) -> RequestUsage:
+        """Create an accumulator for one request"""
+        return RequestUsage(tenant_id=str(tenant_id) if tenant_id else None)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Attribute LLM calls made inside the block to a stage"""
+        token = _current_stage.set(name)
+        try:
+            yield
+        finally:
+            _current_stage.reset(token)
+
+    async def track(self, usage: Optional[RequestUsage], stage: str, awaitable: Awaitable) -> Any:
+        """
+        Await one pipeline step with its LLM calls attributed to a request and stage
+
+        Args:
+            usage: Request accumulator (None = stage attribution only)
+            stage: Stage name
+            awaitable: Step to run
+
+        Returns:
+            The awaitable's result
+        """
+        stage_token = _current_stage.set(stage)
+        request_token = _current_request.set(usage) if usage is not None else None
+        try:
+            return await awaitable
+        finally:
+            if request_token is not None:
+                _current_request.reset(request_token)
+            _current_stage.reset(stage_token)
+
+    # ==================== Recording ====================
+
+    def record(
+        self,
+        provider: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_ms: int,
+        stage: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Record one LLM call
+
+        Args:
+            provider: gemini, openrouter
+            prompt_tokens: Input tokens reported by the provider
+            completion_tokens: Output tokens reported by the provider
+            latency_ms: Wall time of the call
+            stage: Stage name (default: the current stage)
+            model: Model name, for the debug log
+        """
+        stage = stage or _current_stage.get() or DEFAULT_STAGE
+        request = _current_request.get()
+        tenant_id = (request.tenant_id if request else None) or _current_tenant_id() or "platform"
+
+        with self._lock:
+            self._totals.setdefault((tenant_id, stage), StageUsage()).add(
+                prompt_tokens, completion_tokens, latency_ms
+            )
+            if request is not None:
+                request.stages.setdefault(stage, StageUsage()).add(prompt_tokens, completion_tokens, latency_ms)
+
+        logger.debug(
+            f"[LLM_USAGE] {stage} via {provider}{f' ({model})' if model else ''}: "
+            f"prompt={prompt_tokens}, completion={completion_tokens}, {latency_ms}ms, tenant={tenant_id}"
+        )
+
+    def record_openrouter(self, result: Dict[str, Any], started_at: float, stage: Optional[str] = None):
+        """Record an OpenRouter chat completion from its `usage` block"""
+        usage = result.get("usage") or {}
+        self.record(
+            "openrouter",
+            int(usage.get("prompt_tokens") or 0),
+            int(usage.get("completion_tokens") or 0),
+            int((time.perf_counter() - started_at) * 1000),
+            stage=stage,
+            model=result.get("model"),
+        )
+
+    def record_gemini(self, response: Any, started_at: float, stage: Optional[str] = None):
+        """Record a Gemini generate_content response from its usage_metadata"""
+        metadata = getattr(response, "usage_metadata", None)
+        self.record(
+            "gemini",
+            int(getattr(metadata, "prompt_token_count", 0) or 0),
+            int(getattr(metadata, "candidates_token_count", 0) or 0),
+            int((time.perf_counter() - started_at) * 1000),
+            stage=stage,
+        )
+
+    # ==================== Stats ====================
+
+    def get_stats(self, tenant_id: Any = None) -> Dict[str, Any]:
+        """
+        LLM usage per stage since process start, costliest stage first
+
+        Args:
+            tenant_id: Only this tenant (None = all tenants combined)
+
+        Returns:
+            Dict with total_tokens, llm_calls and per-stage totals
+        """
+        tenant_filter = str(tenant_id) if tenant_id else None
+        stages: Dict[str, StageUsage] = {}
+        with self._lock:
+            for (tenant, stage), totals in self._totals.items():
+                if tenant_filter and tenant != tenant_filter:
+                    continue
+                merged = stages.setdefault(stage, StageUsage())
+                merged.calls += totals.calls
+                merged.prompt_tokens += totals.prompt_tokens
+                merged.completion_tokens += totals.completion_tokens
+                merged.latency_ms += totals.latency_ms
+                merged.max_latency_ms = max(merged.max_latency_ms, totals.max_latency_ms)
+
+        ranked = sorted(stages.items(), key=lambda item: (item[1].total_tokens, item[1].latency_ms), reverse=True)
+        return {
+            "total_tokens": sum(stage.total_tokens for stage in stages.values()),
+            "llm_calls": sum(stage.calls for stage in stages.values()),
+            "stages": {name: stage.to_dict() for name, stage in ranked},
+        }
+
+    def get_tenant_totals(self) -> Dict[str, int]:
+        """Total tokens per tenant since process start"""
+        totals: Dict[str, int] = {}
+        with self._lock:
+            for (tenant, _), stage in self._totals.items():
+                totals[tenant] = totals.get(tenant, 0) + stage.total_tokens
+        return totals
+
+
+# Global LLM usage tracker instance
+llm_usage = LLMUsageTracker()
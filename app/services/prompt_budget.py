@@ -0,0 +1,119 @@
+"""
+Prompt Token Budget
+
+Token estimation and budgeted selection of retrieved context for the SQL
+generation prompt.
+
+The SQL prompt is a large static instruction block followed by per-request
+context. Retrieval returns a fixed number of schema documents and few-shot
+examples regardless of their size, so a handful of wide views could push the
+prompt past what the model handles well (and what we want to pay for). The
+dynamic context is therefore assembled under PROMPT_CONTEXT_TOKEN_BUDGET:
+items are taken in retrieval-rank order (schema documents and examples
+interleaved by relative rank) until the budget is spent; items that do not
+fit are dropped and logged.
+
+Token counts use tiktoken's cl100k_base encoding when the package is
+installed, otherwise a 4-characters-per-token estimate. Neither matches the
+Gemini tokenizer exactly - the counts are for budgeting and logging, exact
+usage comes back from the provider.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from loguru import logger
+
+# tiktoken is optional - fall back to a character-based estimate
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+    HAS_TIKTOKEN = True
+except Exception:
+    _ENCODING = None
+    HAS_TIKTOKEN = False
+
+
+# Characters per token for the fallback estimate (English prose and SQL)
+CHARS_PER_TOKEN = 4
+
+# Kinds listed first win rank ties
+_KIND_ORDER = ("schema", "example")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of tokens in a prompt fragment
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Token count (exact for cl100k_base with tiktoken, estimated otherwise)
+    """
+    if not text:
+        return 0
+    if HAS_TIKTOKEN:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ContextItem:
+    """One retrieved prompt fragment competing for the token budget"""
+    kind: str               # schema, example
+    text: str               # as rendered in the prompt (determines the cost)
+    distance: float         # retrieval distance (lower is more relevant)
+    payload: Any = None     # original document / example
+    tokens: int = 0
+
+    def __post_init__(self):
+        if not self.tokens:
+            self.tokens = estimate_tokens(self.text)
+
+
+def fit_context(items: List[ContextItem], budget: int) -> Tuple[List[ContextItem], List[ContextItem]]:
+    """
+    Select the most relevant context items that fit in a token budget
+
+    Items are ranked by distance within their kind, and kinds are merged by
+    relative rank (the 2nd of 3 examples ranks with the 4th of 10 schema
+    documents). Items are then taken greedily; one that does not fit is
+    skipped, so a smaller lower-ranked item may still get in.
+
+    Args:
+        items: Candidate context items
+        budget: Tokens available for them
+
+    Returns:
+        (kept items in rank order per kind, dropped items)
+    """
+    by_kind: Dict[str, List[ContextItem]] = {}
+    for item in items:
+        by_kind.setdefault(item.kind, []).append(item)
+
+    ranked: List[Tuple[float, int, int, ContextItem]] = []
+    for kind, kind_items in by_kind.items():
+        kind_items.sort(key=lambda item: item.distance)
+        kind_index = _KIND_ORDER.index(kind) if kind in _KIND_ORDER else len(_KIND_ORDER)
+        for rank, item in enumerate(kind_items):
+            ranked.append((rank / len(kind_items), kind_index, rank, item))
+    ranked.sort(key=lambda entry: entry[:3])
+
+    used = 0
+    kept_ids = set()
+    dropped: List[ContextItem] = []
+    for _, _, _, item in ranked:
+        if used + item.tokens <= budget:
+            used += item.tokens
+            kept_ids.add(id(item))
+        else:
+            dropped.append(item)
+
+    kept = [item for kind in by_kind for item in by_kind[kind] if id(item) in kept_ids]
+    if dropped:
+        logger.info(
+            f"[PROMPT] Dropped {len(dropped)} context item(s) over the {budget}-token budget: "
+            + ", ".join(f"{item.kind}({item.tokens})" for item in dropped)
+        )
+    return kept, dropped
@@ -0,0 +1,294 @@
+"""
+Query Answer Cache
+
+Tenant-scoped cache for the NL->SQL pipeline used by TenantSQLAgent.
+Repeated questions ("how many active employees") skip clarity checks,
+RAG retrieval and the LLM call entirely.
+
+Entries are keyed by (normalized question, tenant database, user role) and,
+for elliptical questions that may lean on the previous answer ("what about
+last month?"), a digest of that answer. They hold:
+- The generated SQL (valid for CACHE_TTL_SECONDS)
+- Optionally the result set (valid for CACHE_RESULT_TTL_SECONDS, usually much shorter)
+
+Eviction is LRU once CACHE_MAX_ENTRIES is reached. The cache is invalidated
+whenever few-shot examples are reloaded, since new examples change the SQL
+the LLM would produce.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+
+CacheKey = Tuple[str, str, str, str]
+
+# Questions that only make sense after an earlier answer ("what about last month?",
+# "and for HR?", "in March?"). Pronoun follow-ups bypass the cache altogether.
+ELLIPTICAL_FOLLOWUP_PATTERN = re.compile(
+    r"^\s*(?:(?:what|how)\s+about|what\s+if|and|also|but|now|then|only|just|same|instead"
+    r"|for|in|from|during|since|by|with|without|last|this|next|yesterday|today)\b",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class CachedAnswer:
+    """A cached SQL generation (and optionally its result set)"""
+    sql_query: str
+    created_at: float
+    results: Optional[List[Dict[str, Any]]] = None
+    results_cached_at: Optional[float] = None
+    applied_limits: List[str] = field(default_factory=list)
+    hits: int = 0
+
+
+class QueryCache:
+    """
+    Thread-safe LRU + TTL cache for generated SQL and result sets
+
+    Example:
+        key = query_cache.make_key("How many active employees?", tenant_db.id, "ADMIN")
+        cached = query_cache.get(key)
+        if cached is None:
+            sql = generate(...)
+            results = execute(sql)
+            query_cache.set(key, sql, results)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: int = 3600,
+        result_ttl_seconds: int = 60,
+        max_result_rows: int = 1000,
+        store_results: bool = True,
+    ):
+        """
+        Initialize query cache
+
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl_seconds: Lifetime of a cached SQL query
+            result_ttl_seconds: Lifetime of a cached result set
+            max_result_rows: Result sets larger than this are not cached
+            store_results: Whether result sets are cached at all
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_result_rows = max_result_rows
+        self.store_results = store_results
+
+        self._entries: "OrderedDict[CacheKey, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.result_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """
+        Normalize a question so trivially different phrasings share a key
+
+        Lowercases, collapses whitespace and strips trailing punctuation.
+        """
+        normalized = " ".join(question.lower().split())
+        return re.sub(r"[\s?.!]+$", "", normalized)
+
+    @staticmethod
+    def may_be_followup(question: str) -> bool:
+        """Check if a question is elliptical and so depends on the previous answer"""
+        return bool(ELLIPTICAL_FOLLOWUP_PATTERN.search(question))
+
+    @staticmethod
+    def history_digest(conversation_history: Optional[List[Dict[str, Any]]]) -> str:
+        """
+        Digest of the last assistant turn (its answer and SQL)
+
+        Follow-ups ("what about last month?") are resolved against the previous
+        answer, so the same question only shares an entry after the same answer.
+        A conversation without an earlier answer gives an empty digest.
+        """
+        for message in reversed(conversation_history or []):
+            if message.get("message_type") == "assistant":
+                content = message.get("message_content") or ""
+                return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        return ""
+
+    def make_key(
+        self,
+        question: str,
+        tenant_database_id: Any,
+        user_role: str,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+    ) -> CacheKey:
+        """
+        Build a cache key scoped to tenant database and role
+
+        Standalone questions share one entry across (and within) conversations;
+        only elliptical follow-ups are also scoped to the previous answer.
+        """
+        return (
+            self.normalize_question(question),
+            str(tenant_database_id),
+            (user_role or "").upper(),
+            self.history_digest(conversation_history) if self.may_be_followup(question) else "",
+        )
+
+    def get(self, key: CacheKey) -> Optional[CachedAnswer]:
+        """
+        Look up a cached answer
+
+        Expired SQL entries are dropped. An expired result set is cleared
+        but the SQL is still returned so the caller can skip the LLM.
+
+        Returns:
+            CachedAnswer or None on miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if now - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            if entry.results is not None and now - entry.results_cached_at > self.result_ttl_seconds:
+                entry.results = None
+                entry.results_cached_at = None
+
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            if entry.results is not None:
+                self.result_hits += 1
+
+            return entry
+
+    def contains(self, key: CacheKey) -> bool:
+        """Check for a live entry without touching LRU order or counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.time() - entry.created_at <= self.ttl_seconds
+
+    def discard(self, key: CacheKey):
+        """Drop a single entry (e.g. cached SQL that failed to execute)"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def set(
+        self,
+        key: CacheKey,
+        sql_query: str,
+        results: Optional[List[Dict[str, Any]]] = None,
+        applied_limits: Optional[List[str]] = None,
+    ):
+        """
+        Store a generated SQL query and (optionally) its result set
+
+        Args:
+            key: Key from make_key()
+            sql_query: Generated SQL
+            results: Result rows; ignored if result caching is disabled or too large
+            applied_limits: Bounds the cost guard added to sql_query (reported again on hits)
+        """
+        now = time.time()
+        cache_results = (
+            self.store_results
+            and results is not None
+            and len(results) <= self.max_result_rows
+        )
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.sql_query == sql_query:
+                # Refresh results only - keep original SQL age
+                entry.results = results if cache_results else None
+                entry.results_cached_at = now if cache_results else None
+                if applied_limits:
+                    entry.applied_limits = list(applied_limits)
+                self._entries.move_to_end(key)
+                return
+
+            self._entries[key] = CachedAnswer(
+                sql_query=sql_query,
+                created_at=now,
+                results=results if cache_results else None,
+                results_cached_at=now if cache_results else None,
+                applied_limits=list(applied_limits or []),
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tenant_database_id: Any = None) -> int:
+        """
+        Invalidate cached entries
+
+        Args:
+            tenant_database_id: Only drop entries for this database (all if None)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if tenant_database_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                db_id = str(tenant_database_id)
+                stale = [k for k in self._entries if k[1] == db_id]
+                for k in stale:
+                    del self._entries[k]
+                removed = len(stale)
+            self.invalidations += 1
+
+        logger.info(f"[QUERY_CACHE] Invalidated {removed} entries")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.enable_cache,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "result_hits": self.result_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+                "result_ttl_seconds": self.result_ttl_seconds,
+            }
+
+
+# Global query cache instance
+query_cache = QueryCache(
+    max_entries=settings.cache_max_entries,
+    ttl_seconds=settings.cache_ttl_seconds,
+    result_ttl_seconds=settings.cache_result_ttl_seconds,
+    max_result_rows=settings.cache_max_result_rows,
+    store_results=settings.cache_store_results,
+)
@@ -0,0 +1,440 @@
+"""
+Query Cost Guard
+
+Optional pre-execution check of LLM-generated SQL against SQL Server's
+estimated plan (SET SHOWPLAN_XML ON - nothing is executed). Queries such as
+a multi-year scan of vw_RawPunchDetail otherwise tie up the tenant's
+on-prem SQL Server and the gateway until the 60s timeout.
+
+Decisions, by estimated subtree cost (COST_GUARD_* settings):
+- below BOUND_COST:        run as generated
+- BOUND_COST..NARROW_COST: inject TOP (n) and, for punch / attendance
+                           sources without a date filter, a recent-date bound
+- NARROW_COST..BACKGROUND_COST: try the date bound; if the bounded query is
+                           still expensive, ask the user to narrow the question
+- above BACKGROUND_COST:   run as a background job whose rows land in a
+                           result cursor (/api/chat/mt/results/{cursor_id})
+
+Estimates are cached per (tenant database, canonical SQL hash). The guard
+fails open: if no estimate is available (older gateway agent, non-MSSQL
+database, showplan permission missing) the query runs unchanged.
+"""
+
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.services.sql_result_cache import SQLResultCache, ResultKey
+from app.services.sql_tokenizer import Token, tokenize
+
+
+# Date column to bound, per punch / attendance source (lower-case name)
+DATE_BOUND_COLUMNS = {
+    "vw_rawpunchdetail": "ATDate",
+    "vw_completeattendancereport": "ATDate",
+    "vw_attendanceregister": "ATDate",
+    "attendanceregister": "ATDate",
+    "machinerawpunch": "PunchTime",
+    "machinepunch": "PunchTime",
+    "view_machinerawpunchwithmachineandemployee": "PunchTime",
+    "view_mpunch": "PunchTime",
+}
+
+_AGGREGATES = frozenset({"COUNT", "COUNT_BIG", "SUM", "AVG", "MIN", "MAX"})
+_CLAUSE_ENDS = frozenset({"GROUP", "HAVING", "ORDER", "OPTION", "UNION", "EXCEPT", "INTERSECT"})
+_NOT_ALIAS = _CLAUSE_ENDS | {"WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "ON", "WITH", "APPLY"}
+
+
+# ==================== Showplan ====================
+
+@dataclass
+class QueryCostEstimate:
+    """Optimizer estimate for one statement"""
+    estimated_cost: float
+    estimated_rows: float
+    source: str = "showplan"   # showplan, cache
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "estimated_cost": round(self.estimated_cost, 4),
+            "estimated_rows": round(self.estimated_rows, 1),
+            "source": self.source,
+        }
+
+
+def parse_showplan_xml(showplan_xml: str) -> Optional[QueryCostEstimate]:
+    """
+    Read the estimated cost and row count from a SHOWPLAN_XML document
+
+    Args:
+        showplan_xml: Plan returned under SET SHOWPLAN_XML ON
+
+    Returns:
+        Summed StatementSubTreeCost and the largest StatementEstRows, or None
+        if the plan has no statements
+    """
+    try:
+        root = ET.fromstring(showplan_xml)
+    except ET.ParseError as e:
+        logger.warning(f"[COST_GUARD] Unreadable showplan: {e}")
+        return None
+
+    cost, rows, found = 0.0, 0.0, False
+    for element in root.iter():
+        if not element.tag.endswith("StmtSimple") or "StatementSubTreeCost" not in element.attrib:
+            continue
+        found = True
+        cost += float(element.attrib.get("StatementSubTreeCost", 0))
+        rows = max(rows, float(element.attrib.get("StatementEstRows", 0)))
+    return QueryCostEstimate(estimated_cost=cost, estimated_rows=rows) if found else None
+
+
+# ==================== Rewrites ====================
+
+def _top_level(tokens: List[Token]) -> List[Tuple[int, Token]]:
+    return [(i, t) for i, t in enumerate(tokens) if t.depth == 0]
+
+
+def inject_top(sql_query: str, top_rows: int) -> Optional[str]:
+    """
+    Add TOP (n) to a plain SELECT
+
+    Returns:
+        Rewritten SQL, or None if the statement is not a single SELECT, already
+        limits its rows, or is an ungrouped aggregate (one row anyway)
+    """
+    tokens = tokenize(sql_query)
+    if not tokens or tokens[0].upper != "SELECT":
+        return None
+    top_level = [t.upper for _, t in _top_level(tokens)]
+    if {"TOP", "OFFSET", "FETCH", "UNION", "EXCEPT", "INTERSECT", "INTO"} & set(top_level):
+        return None
+
+    from_index = next((i for i, t in _top_level(tokens) if t.upper == "FROM"), len(tokens))
+    select_list = tokens[1:from_index]
+    is_aggregate = any(
+        t.upper in _AGGREGATES and i + 1 < len(select_list) and select_list[i + 1].value == "("
+        for i, t in enumerate(select_list)
+    )
+    if is_aggregate and "GROUP" not in top_level:
+        return None
+
+    anchor = tokens[0]
+    if len(tokens) > 1 and tokens[1].upper in ("DISTINCT", "ALL"):
+        anchor = tokens[1]
+    return f"{sql_query[:anchor.end]} TOP ({int(top_rows)}){sql_query[anchor.end:]}"
+
+
+def _outer_joined(top_level: List[Tuple[int, Token]], position: int) -> bool:
+    """Whether the source after top_level[position] (FROM / JOIN) can be NULL-extended"""
+    if top_level[position][1].upper == "JOIN":
+        previous = [t.upper for _, t in top_level[max(0, position - 2):position]]
+        if {"LEFT", "RIGHT", "FULL"} & set(previous):
+            return True
+    # A later RIGHT / FULL join NULL-extends everything joined before it
+    return any(t.upper in ("RIGHT", "FULL") for _, t in top_level[position + 1:])
+
+
+def inject_date_bound(sql_query: str, window_days: int) -> Optional[Tuple[str, str]]:
+    """
+    Restrict a punch / attendance source to the last window_days days
+
+    Only applied to a single SELECT that reads one of DATE_BOUND_COLUMNS's
+    sources at the top level and never mentions that source's date column.
+    Sources on the nullable side of an outer join are skipped: a predicate
+    in the top-level WHERE would turn that join into an inner join (and an
+    anti-join such as "employees with no punches" into an empty result).
+
+    Returns:
+        (rewritten SQL, bounded column description), or None
+    """
+    tokens = tokenize(sql_query)
+    if not tokens or tokens[0].upper != "SELECT":
+        return None
+    top_level = _top_level(tokens)
+    if any(t.upper in ("UNION", "EXCEPT", "INTERSECT") for _, t in top_level):
+        return None
+
+    for position, (i, token) in enumerate(top_level):
+        if token.upper not in ("FROM", "JOIN") or i + 1 >= len(tokens):
+            continue
+        if _outer_joined(top_level, position):
+            continue
+        j = i + 1
+        while j + 2 < len(tokens) and tokens[j + 1].value == "." and tokens[j + 2].kind in ("word", "ident"):
+            j += 2
+        column = DATE_BOUND_COLUMNS.get(tokens[j].value.lower())
+        if column is None:
+            continue
+        if any(t.value.lower() == column.lower() for t in tokens):
+            return None
+
+        # Qualify the predicate with the alias, if the source has one
+        qualifier = tokens[j].value
+        k = j + 1
+        if k < len(tokens) and tokens[k].upper == "AS":
+            k += 1
+        if k < len(tokens) and (
+            tokens[k].kind == "ident" or (tokens[k].kind == "word" and tokens[k].upper not in _NOT_ALIAS)
+        ):
+            qualifier = tokens[k].value
+
+        predicate = f"[{qualifier}].[{column}] >= DATEADD(DAY, -{int(window_days)}, CAST(GETDATE() AS DATE))"
+        where = next((t for _, t in top_level if t.upper == "WHERE"), None)
+        clause_end = next(
+            (t for _, t in top_level[position:] if t.upper in _CLAUSE_ENDS and (where is None or t.start > where.start)),
+            None,
+        )
+        end = clause_end.start if clause_end else len(sql_query.rstrip().rstrip(";"))
+        if where is not None:
+            condition = sql_query[where.end:end].strip()
+            rewritten = f"{sql_query[:where.end]} {predicate} AND ({condition}) {sql_query[end:]}"
+        else:
+            rewritten = f"{sql_query[:end].rstrip()} WHERE {predicate} {sql_query[end:]}"
+        return rewritten.strip(), f"{tokens[j].value}.{column} (last {int(window_days)} days)"
+
+    return None
+
+
+# ==================== Guard ====================
+
+@dataclass
+class CostDecision:
+    """What to do with a generated statement"""
+    action: str                  # allow, bound, narrow, background
+    sql_query: str               # statement to run (rewritten for "bound")
+    estimate: Optional[QueryCostEstimate] = None
+    applied: List[str] = field(default_factory=list)
+    message: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "action": self.action,
+            "estimate": self.estimate.to_dict() if self.estimate else None,
+            "applied": self.applied,
+            "message": self.message,
+        }
+
+
+class QueryCostGuard:
+    """
+    Estimated-cost gate in front of query execution
+
+    Example:
+        decision = await query_cost_guard.check(tenant_db, sql)
+        if decision.action in ("allow", "bound"):
+            rows = await query_router.execute_query(tenant_db, decision.sql_query)
+    """
+
+    def __init__(
+        self,
+        bound_cost: float = 50.0,
+        narrow_cost: float = 500.0,
+        background_cost: float = 5000.0,
+        top_rows: int = 1000,
+        date_window_days: int = 31,
+        estimate_timeout: int = 10,
+        estimate_ttl_seconds: int = 900,
+        max_estimates: int = 2000,
+    ):
+        """
+        Initialize cost guard
+
+        Args:
+            bound_cost: Estimated cost above which TOP / date bounds are injected
+            narrow_cost: Estimated cost above which the user is asked to narrow the question
+            background_cost: Estimated cost above which the query runs in the background
+            top_rows: Row limit injected as TOP (n)
+            date_window_days: Window of the injected date bound
+            estimate_timeout: Seconds to wait for an estimated plan
+            estimate_ttl_seconds: How long a cached estimate stays valid
+            max_estimates: Cached estimates before LRU eviction
+        """
+        self.bound_cost = bound_cost
+        self.narrow_cost = narrow_cost
+        self.background_cost = background_cost
+        self.top_rows = top_rows
+        self.date_window_days = date_window_days
+        self.estimate_timeout = estimate_timeout
+        self.estimate_ttl_seconds = estimate_ttl_seconds
+        self.max_estimates = max_estimates
+
+        self._estimates: "OrderedDict[ResultKey, Tuple[QueryCostEstimate, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.estimate_hits = 0
+        self.estimate_failures = 0
+        self.decisions: Dict[str, int] = {"allow": 0, "bound": 0, "narrow": 0, "background": 0}
+
+    # ==================== Estimates ====================
+
+    async def estimate(self, tenant_database, sql_query: str) -> Optional[QueryCostEstimate]:
+        """
+        Estimated plan cost for a statement (cached per SQL hash)
+
+        Args:
+            tenant_database: TenantDatabase the statement targets
+            sql_query: SQL statement
+
+        Returns:
+            QueryCostEstimate, or None if no estimate could be obtained
+        """
+        key = SQLResultCache.make_key(tenant_database.id, sql_query)
+        with self._lock:
+            cached = self._estimates.get(key)
+            if cached and time.time() - cached[1] <= self.estimate_ttl_seconds:
+                self._estimates.move_to_end(key)
+                self.estimate_hits += 1
+                return QueryCostEstimate(cached[0].estimated_cost, cached[0].estimated_rows, source="cache")
+
+        from app.gateway.query_router import query_router
+
+        try:
+            estimate = await query_router.estimate_query_cost(
+                tenant_database=tenant_database,
+                query=sql_query,
+                timeout=self.estimate_timeout,
+            )
+        except Exception as e:
+            logger.warning(f"[COST_GUARD] Estimate failed (running unguarded): {e}")
+            estimate = None
+
+        if estimate is None:
+            self.estimate_failures += 1
+            return None
+
+        with self._lock:
+            self._estimates[key] = (estimate, time.time())
+            self._estimates.move_to_end(key)
+            while len(self._estimates) > self.max_estimates:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    # ==================== Decisions ====================
+
+    def _bound(self, sql_query: str) -> Tuple[str, List[str]]:
+        """Apply the date bound and TOP injection where they fit"""
+        applied = []
+        dated = inject_date_bound(sql_query, self.date_window_days)
+        if dated:
+            sql_query, description = dated
+            applied.append(f"date bound on {description}")
+        topped = inject_top(sql_query, self.top_rows)
+        if topped:
+            sql_query = topped
+            applied.append(f"TOP ({self.top_rows})")
+        return sql_query, applied
+
+    async def check(self, tenant_database, sql_query: str, allow_background: bool = True) -> CostDecision:
+        """
+        Decide whether a statement runs as is, bounded, narrowed or in the background
+
+        Args:
+            tenant_database: TenantDatabase the statement targets
+            sql_query: Generated SQL statement
+            allow_background: Whether the caller can run the query in the background
+                (otherwise the most expensive band asks the user to narrow instead)
+
+        Returns:
+            CostDecision
+        """
+        self.checks += 1
+        estimate = await self.estimate(tenant_database, sql_query)
+        decision = self._decide(sql_query, estimate, allow_background)
+
+        if decision.action == "narrow" and decision.applied:
+            # The date bound may bring the query back under the narrow threshold
+            bounded_estimate = await self.estimate(tenant_database, decision.sql_query)
+            if bounded_estimate is not None and bounded_estimate.estimated_cost < self.narrow_cost:
+                decision = CostDecision("bound", decision.sql_query, bounded_estimate, decision.applied)
+            else:
+                decision = CostDecision("narrow", sql_query, estimate, message=self._narrow_message(estimate))
+
+        self.decisions[decision.action] += 1
+        if decision.action != "allow":
+            logger.info(
+                f"[COST_GUARD] {decision.action}: estimated cost "
+                f"{estimate.estimated_cost:.1f}, rows {estimate.estimated_rows:.0f}, applied={decision.applied}"
+            )
+        return decision
+
+    def _decide(
+        self,
+        sql_query: str,
+        estimate: Optional[QueryCostEstimate],
+        allow_background: bool = True,
+    ) -> CostDecision:
+        if estimate is None or estimate.estimated_cost < self.bound_cost:
+            return CostDecision("allow", sql_query, estimate)
+
+        if estimate.estimated_cost >= self.background_cost and allow_background:
+            return CostDecision(
+                "background", sql_query, estimate,
+                message=(
+                    "This query is expected to take a while, so it is running in the background. "
+                    "The results will be available from the result link once it finishes."
+                ),
+            )
+
+        bounded_sql, applied = self._bound(sql_query)
+        if estimate.estimated_cost < self.narrow_cost:
+            return CostDecision("bound" if applied else "allow", bounded_sql, estimate, applied)
+
+        # Expensive: only a date bound can help (TOP alone does not avoid the scan)
+        if any(a.startswith("date bound") for a in applied):
+            return CostDecision("narrow", bounded_sql, estimate, applied)
+        return CostDecision("narrow", sql_query, estimate, message=self._narrow_message(estimate))
+
+    def _narrow_message(self, estimate: QueryCostEstimate) -> str:
+        return (
+            f"This query would scan about {estimate.estimated_rows:,.0f} rows. "
+            "Could you narrow it down, for example to a date range, department or employee?"
+        )
+
+    def narrow_options(self) -> List[str]:
+        """Clarification options offered with a "narrow" decision"""
+        return [
+            "Only the last 7 days",
+            f"Only the last {self.date_window_days} days",
+            "Only my department",
+            f"Just the first {self.top_rows} rows",
+        ]
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cost guard statistics"""
+        with self._lock:
+            cached_estimates = len(self._estimates)
+        return {
+            "enabled": settings.cost_guard_enabled,
+            "checks": self.checks,
+            "decisions": dict(self.decisions),
+            "estimate_cache_hits": self.estimate_hits,
+            "estimate_failures": self.estimate_failures,
+            "cached_estimates": cached_estimates,
+            "thresholds": {
+                "bound_cost": self.bound_cost,
+                "narrow_cost": self.narrow_cost,
+                "background_cost": self.background_cost,
+            },
+        }
+
+
+# Global query cost guard instance
+query_cost_guard = QueryCostGuard(
+    bound_cost=settings.cost_guard_bound_cost,
+    narrow_cost=settings.cost_guard_narrow_cost,
+    background_cost=settings.cost_guard_background_cost,
+    top_rows=settings.cost_guard_top_rows,
+    date_window_days=settings.cost_guard_date_window_days,
+    estimate_timeout=settings.cost_guard_estimate_timeout,
+    estimate_ttl_seconds=settings.cost_guard_estimate_ttl,
+)
@@ -18,6 +18,7 @@ from sqlalchemy import select, func, desc
 
 from app.models.platform.gateway import GatewayQueryLog, QueryStatus
 from app.database.platform_connection import platform_db, get_platform_session
+from app.services.llm_usage import llm_usage
 
 logger = logging.getLogger(__name__)
 
@@ -281,6 +282,7 @@ class QueryLoggingService:
                     GatewayQueryLog.tokens_used.isnot(None)
                 ).scalar()
                 total_tokens = tokens_result or 0
+                logged_with_tokens = base_query.filter(GatewayQueryLog.tokens_used.isnot(None)).count()
 
                 return {
                     "total_queries": total_queries,
@@ -289,6 +291,9 @@ class QueryLoggingService:
                     "success_rate": (success_count / total_queries * 100) if total_queries > 0 else 0,
                     "avg_execution_time_ms": round(float(avg_execution_time), 2),
                     "total_tokens_used": total_tokens,
+                    "avg_tokens_per_query": round(total_tokens / logged_with_tokens, 1) if logged_with_tokens else 0,
+                    # Per-stage LLM usage since process start (not persisted)
+                    "llm_usage": llm_usage.get_stats(tenant_id),
                 }
 
         except Exception as e:
@@ -300,6 +305,8 @@ class QueryLoggingService:
                 "success_rate": 0,
                 "avg_execution_time_ms": 0,
                 "total_tokens_used": 0,
+                "avg_tokens_per_query": 0,
+                "llm_usage": llm_usage.get_stats(tenant_id),
             }
 
 
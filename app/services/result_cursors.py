@@ -0,0 +1,431 @@
+"""
+Result Cursors
+
+Server-side pagination for /api/chat/mt/query results. Instead of returning
+up to 1000 rows in one response, the agent fetches only the first page (plus
+one row, to tell whether more follow) and returns it with a cursor handle;
+later pages are fetched from /api/chat/mt/results/{cursor_id}.
+
+Each cursor holds a spill of the result set in memory. Pages inside the
+spill are served from memory. Pages past it are fetched with an OFFSET/FETCH
+(or LIMIT/OFFSET) rewrite of the original SQL - only for statements with a
+top-level ORDER BY, since anything else has no stable row order to page
+through. For those, the agent reserves the cursor and reads the spill (at
+most RESULT_CURSOR_SPILL_ROWS rows) in the background.
+
+Memory is bounded:
+- rows per cursor: RESULT_CURSOR_SPILL_ROWS
+- rows across all cursors: RESULT_CURSOR_MAX_TOTAL_ROWS (LRU eviction)
+- open cursors: RESULT_CURSOR_MAX_CURSORS (LRU eviction)
+Cursors idle for RESULT_CURSOR_IDLE_TTL_SECONDS expire.
+
+A cursor can also be reserved before its query has run (expensive queries
+moved to the background by the cost guard). It stays "pending" until
+fulfil() or fail() is called, then behaves like any other cursor. A cursor
+left pending (e.g. its task was cancelled) expires once
+COST_GUARD_BACKGROUND_TIMEOUT plus the idle TTL has passed.
+
+Pages read from the database are audited for the cursor's owner and
+conversation, like the query that opened it.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from app.config import settings
+from app.services.sql_tokenizer import tokenize
+
+
+@dataclass
+class ResultCursor:
+    """An open result set owned by one user"""
+    cursor_id: str
+    tenant_database_id: str
+    owner_id: str
+    sql_query: str
+    db_type: str
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    complete: bool          # rows holds the entire result set
+    seekable: bool          # pages past the spill can be fetched by rewriting the SQL
+    page_size: int
+    created_at: float
+    last_access: float
+    status: str = "ready"   # ready, pending (query still running), failed
+    error: Optional[str] = None
+    conversation_id: Optional[str] = None
+
+    def info(self, idle_ttl_seconds: int) -> Dict[str, Any]:
+        """Cursor summary returned alongside the first page"""
+        return {
+            "cursor_id": self.cursor_id,
+            "page_size": self.page_size,
+            "rows_available": len(self.rows),
+            "total_rows": len(self.rows) if self.complete else None,
+            "has_more": (
+                self.status == "pending" or len(self.rows) > self.page_size or (not self.complete and self.seekable)
+            ),
+            "expires_in_seconds": idle_ttl_seconds,
+            "status": self.status,
+        }
+
+
+def paged_sql(sql_query: str, offset: int, limit: int, db_type: str = "mssql") -> Optional[str]:
+    """
+    Rewrite a SELECT to return one page, if it has a stable row order
+
+    Args:
+        sql_query: Original (validated) SELECT statement
+        offset: Rows to skip
+        limit: Rows to return
+        db_type: Tenant database type
+
+    Returns:
+        Paged SQL, or None if the statement has no top-level ORDER BY or
+        already limits its rows (TOP / OFFSET / LIMIT)
+    """
+    tokens = tokenize(sql_query)
+    top_level = [t.upper for t in tokens if t.depth == 0 and t.kind == "word"]
+    has_order_by = any(a == "ORDER" and b == "BY" for a, b in zip(top_level, top_level[1:]))
+    if not has_order_by or {"TOP", "OFFSET", "FETCH", "LIMIT"} & set(top_level):
+        return None
+
+    sql_query = sql_query.strip().rstrip(";")
+    if db_type.lower() == "mssql":
+        return f"{sql_query} OFFSET {int(offset)} ROWS FETCH NEXT {int(limit)} ROWS ONLY"
+    return f"{sql_query} LIMIT {int(limit)} OFFSET {int(offset)}"
+
+
+class ResultCursorStore:
+    """
+    Bounded, expiring in-memory store of result cursors
+
+    Example:
+        cursor = result_cursor_store.open(tenant_db.id, user_id, sql, "mssql", rows, complete=True, page_size=100)
+        page = await result_cursor_store.fetch_page(cursor, offset=100, limit=100)
+    """
+
+    def __init__(
+        self,
+        max_cursors: int = 200,
+        max_total_rows: int = 200000,
+        spill_rows: int = 10000,
+        idle_ttl_seconds: int = 600,
+        pending_timeout_seconds: int = 600,
+    ):
+        """
+        Initialize cursor store
+
+        Args:
+            max_cursors: Open cursors before LRU eviction
+            max_total_rows: Spilled rows across all cursors before LRU eviction
+            spill_rows: Rows kept per cursor (read in the background for unordered results)
+            idle_ttl_seconds: Idle time after which a cursor expires
+            pending_timeout_seconds: Extra time a pending cursor is kept (its
+                query's timeout) before the idle TTL applies
+        """
+        self.max_cursors = max_cursors
+        self.max_total_rows = max_total_rows
+        self.spill_rows = spill_rows
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.pending_timeout_seconds = pending_timeout_seconds
+
+        self._cursors: "OrderedDict[str, ResultCursor]" = OrderedDict()
+        self._total_rows = 0
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.pages_served = 0
+        self.pages_from_database = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ==================== Lifecycle ====================
+
+    def open(
+        self,
+        tenant_database_id: Any,
+        owner_id: str,
+        sql_query: str,
+        db_type: str,
+        rows: List[Dict[str, Any]],
+        complete: bool,
+        page_size: int,
+        conversation_id: Optional[str] = None,
+    ) -> ResultCursor:
+        """
+        Register a result set and return its cursor
+
+        Args:
+            tenant_database_id: Database the query ran against
+            owner_id: User allowed to read the cursor
+            sql_query: SQL that produced the rows
+            db_type: Tenant database type (selects the paging rewrite)
+            rows: Fetched rows (truncated to spill_rows)
+            complete: Whether rows is the entire result set
+            page_size: Default page size for later fetches
+            conversation_id: Conversation audited with pages read from the database
+
+        Returns:
+            The new ResultCursor
+        """
+        if len(rows) > self.spill_rows:
+            rows, complete = rows[:self.spill_rows], False
+
+        now = time.monotonic()
+        cursor = ResultCursor(
+            cursor_id=secrets.token_urlsafe(16),
+            tenant_database_id=str(tenant_database_id),
+            owner_id=str(owner_id),
+            sql_query=sql_query,
+            db_type=db_type or "mssql",
+            columns=list(rows[0].keys()) if rows else [],
+            rows=rows,
+            complete=complete,
+            seekable=not complete and paged_sql(sql_query, 0, 1, db_type or "mssql") is not None,
+            page_size=page_size,
+            created_at=now,
+            last_access=now,
+            conversation_id=conversation_id,
+        )
+
+        with self._lock:
+            self._purge_expired(now)
+            self._cursors[cursor.cursor_id] = cursor
+            self._total_rows += len(rows)
+            self.opened += 1
+            while len(self._cursors) > 1 and (
+                len(self._cursors) > self.max_cursors or self._total_rows > self.max_total_rows
+            ):
+                self._remove(next(iter(self._cursors)))
+                self.evictions += 1
+
+        logger.info(
+            f"[CURSOR] Opened {cursor.cursor_id[:8]} ({len(rows)} rows, "
+            f"complete={cursor.complete}, seekable={cursor.seekable})"
+        )
+        return cursor
+
+    def reserve(
+        self,
+        tenant_database_id: Any,
+        owner_id: str,
+        sql_query: str,
+        db_type: str,
+        page_size: int,
+        conversation_id: Optional[str] = None,
+    ) -> ResultCursor:
+        """
+        Open a pending cursor for a query that is still running
+
+        Args:
+            tenant_database_id: Database the query runs against
+            owner_id: User allowed to read the cursor
+            sql_query: SQL being executed
+            db_type: Tenant database type
+            page_size: Default page size for later fetches
+            conversation_id: Conversation audited with pages read from the database
+
+        Returns:
+            The pending ResultCursor (complete it with fulfil() or fail())
+        """
+        cursor = self.open(
+            tenant_database_id, owner_id, sql_query, db_type, [], complete=False, page_size=page_size,
+            conversation_id=conversation_id,
+        )
+        cursor.status = "pending"
+        return cursor
+
+    def fulfil(self, cursor_id: str, rows: List[Dict[str, Any]], complete: bool) -> bool:
+        """
+        Store the rows of a pending cursor's query
+
+        Args:
+            cursor_id: Cursor from reserve()
+            rows: Fetched rows (truncated to spill_rows)
+            complete: Whether rows is the entire result set
+
+        Returns:
+            False if the cursor was evicted or closed meanwhile
+        """
+        if len(rows) > self.spill_rows:
+            rows, complete = rows[:self.spill_rows], False
+
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None:
+                return False
+            cursor.rows = rows
+            cursor.columns = list(rows[0].keys()) if rows else []
+            cursor.complete = complete
+            cursor.seekable = not complete and paged_sql(cursor.sql_query, 0, 1, cursor.db_type) is not None
+            cursor.status = "ready"
+            cursor.last_access = time.monotonic()
+            self._total_rows += len(rows)
+            while len(self._cursors) > 1 and self._total_rows > self.max_total_rows:
+                oldest = next(iter(self._cursors))
+                if oldest == cursor_id:
+                    break
+                self._remove(oldest)
+                self.evictions += 1
+
+        logger.info(f"[CURSOR] Fulfilled {cursor_id[:8]} ({len(rows)} rows, complete={complete})")
+        return True
+
+    def fail(self, cursor_id: str, error: str) -> bool:
+        """Mark a pending cursor's query as failed"""
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None:
+                return False
+            cursor.status = "failed"
+            cursor.error = error
+            cursor.last_access = time.monotonic()
+            return True
+
+    def get(self, cursor_id: str, owner_id: str) -> Optional[ResultCursor]:
+        """
+        Look up a live cursor owned by owner_id (refreshes its idle timer)
+
+        Returns:
+            ResultCursor, or None if unknown, expired or owned by someone else
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None or cursor.owner_id != str(owner_id):
+                return None
+            cursor.last_access = now
+            self._cursors.move_to_end(cursor_id)
+            return cursor
+
+    def close(self, cursor_id: str, owner_id: str) -> bool:
+        """Release a cursor before it expires"""
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None or cursor.owner_id != str(owner_id):
+                return False
+            self._remove(cursor_id)
+            return True
+
+    def _remove(self, cursor_id: str):
+        cursor = self._cursors.pop(cursor_id)
+        self._total_rows -= len(cursor.rows)
+
+    def _purge_expired(self, now: float):
+        expired = [
+            cursor_id for cursor_id, cursor in self._cursors.items()
+            if now - cursor.last_access > self.idle_ttl_seconds + (
+                self.pending_timeout_seconds if cursor.status == "pending" else 0
+            )
+        ]
+        for cursor_id in expired:
+            self._remove(cursor_id)
+            self.expirations += 1
+
+    # ==================== Paging ====================
+
+    def needs_database(self, cursor: ResultCursor, offset: int, limit: int) -> bool:
+        """Whether this page lies past the spill and must be fetched from the database"""
+        return cursor.seekable and offset + limit > len(cursor.rows)
+
+    async def fetch_page(
+        self,
+        cursor: ResultCursor,
+        offset: int,
+        limit: Optional[int] = None,
+        tenant_database=None,
+    ) -> Dict[str, Any]:
+        """
+        Return one page of a cursor's result set
+
+        Args:
+            cursor: Cursor from get()
+            offset: First row (0-based)
+            limit: Page size (defaults to the cursor's page size)
+            tenant_database: TenantDatabase, required when needs_database() is True
+
+        Returns:
+            Dict with cursor_id, status, columns, rows, offset, limit, next_offset,
+            has_more, total_rows (and error for a failed cursor)
+        """
+        limit = limit or cursor.page_size
+
+        if cursor.status != "ready":
+            return {
+                "cursor_id": cursor.cursor_id,
+                "status": cursor.status,
+                "error": cursor.error,
+                "offset": offset,
+                "limit": limit,
+                "has_more": cursor.status == "pending",
+            }
+
+        if self.needs_database(cursor, offset, limit) and tenant_database is not None:
+            from app.gateway.query_router import query_router
+
+            rows = await query_router.execute_query(
+                tenant_database=tenant_database,
+                query=paged_sql(cursor.sql_query, offset, limit, cursor.db_type),
+                timeout=60,
+                max_rows=limit,
+                user_id=cursor.owner_id,
+                conversation_id=cursor.conversation_id,
+            )
+            self.pages_from_database += 1
+            has_more = len(rows) == limit
+        else:
+            rows = cursor.rows[offset:offset + limit]
+            has_more = offset + limit < len(cursor.rows) or (not cursor.complete and cursor.seekable)
+
+        self.pages_served += 1
+        return {
+            "cursor_id": cursor.cursor_id,
+            "status": cursor.status,
+            "columns": cursor.columns,
+            "rows": rows,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + len(rows) if has_more and rows else None,
+            "has_more": bool(has_more and rows),
+            "total_rows": len(cursor.rows) if cursor.complete else None,
+        }
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cursor store statistics"""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "open_cursors": len(self._cursors),
+                "pending_cursors": sum(1 for cursor in self._cursors.values() if cursor.status == "pending"),
+                "spilled_rows": self._total_rows,
+                "max_cursors": self.max_cursors,
+                "max_total_rows": self.max_total_rows,
+                "spill_rows": self.spill_rows,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "pending_timeout_seconds": self.pending_timeout_seconds,
+                "opened": self.opened,
+                "pages_served": self.pages_served,
+                "pages_from_database": self.pages_from_database,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Global result cursor store instance
+result_cursor_store = ResultCursorStore(
+    max_cursors=settings.result_cursor_max_cursors,
+    max_total_rows=settings.result_cursor_max_total_rows,
+    spill_rows=settings.result_cursor_spill_rows,
+    idle_ttl_seconds=settings.result_cursor_idle_ttl_seconds,
+    pending_timeout_seconds=settings.cost_guard_background_timeout,
+)
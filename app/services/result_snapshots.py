@@ -0,0 +1,379 @@
+"""
+Follow-up Result Snapshots
+
+Per-session snapshot of the last query result, used by RAGSQLAgent to answer
+follow-up questions ("which of them are in IT", "are they hostlers") without
+regex-parsing the previous SQL and re-running it.
+
+A snapshot is column-oriented and compact: integer and float columns are
+stored in array.array buffers, text columns as tuples of interned strings.
+It keeps the column names, the key column (Ecode / ID) values and - for
+result sets up to RESULT_SNAPSHOT_MAX_ROWS rows - every column value, so a
+follow-up can be:
+1. Filtered locally, when it only restricts the previous rows by values
+   already present in them (no database round trip, no LLM call)
+2. Generated with a complete Ecode IN (...) list taken from the snapshot, or -
+   above RESULT_SNAPSHOT_MAX_INLINE_KEYS keys - filtered through the previous
+   query as a subquery
+3. Handled by the existing history-based path, when there is no snapshot
+
+Snapshots are keyed by (session_id, user_id), expire after
+RESULT_SNAPSHOT_TTL_SECONDS and are evicted LRU beyond
+RESULT_SNAPSHOT_MAX_SESSIONS. A snapshot is only used while it belongs to the
+conversation's latest answer: after a failed or non-query turn the latest
+answer carries different (or no) SQL, and get_current() ignores it.
+"""
+
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.services.history_compactor import parse_followup_context
+
+
+# Identifier columns, in preference order (same order the chat API uses for [RESULT_IDS])
+KEY_COLUMNS = ("Ecode", "ECode", "ecode", "ID", "Id", "id", "EmployeeId", "StudentId")
+
+# Text columns with more distinct values than this are not matched against questions
+MAX_FILTER_DISTINCT = 100
+
+# Words a pure "restrict the previous rows" follow-up may contain besides the filter values
+FOLLOWUP_FILLER_WORDS = frozenset({
+    "which", "who", "whom", "what", "how", "many", "much", "of", "them", "they", "those", "these",
+    "their", "are", "is", "was", "were", "in", "from", "the", "a", "an", "at", "among", "amongst",
+    "show", "list", "give", "me", "only", "just", "filter", "belong", "belongs", "belonging", "to",
+    "work", "works", "working", "part", "with", "and", "having", "has", "have", "do", "does",
+    "count", "number", "all", "any", "please", "out", "under", "for", "one", "ones",
+})
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _column_words(column: str) -> List[str]:
+    """Split DeptName / Dept_Name into lower-case words"""
+    spaced = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", " ", column).replace("_", " ")
+    return _WORD_RE.findall(spaced.lower())
+
+
+def _pack_column(values: List[Any]) -> Sequence:
+    """Store a column in the most compact sequence that round-trips its values"""
+    if values and all(type(v) is int for v in values):
+        try:
+            return array("q", values)
+        except OverflowError:
+            pass
+    if values and all(type(v) is float for v in values):
+        return array("d", values)
+    return tuple(sys.intern(v) if type(v) is str else v for v in values)
+
+
+def strip_order_by(sql_query: str) -> str:
+    """Remove a trailing top-level ORDER BY (not allowed in a derived table without TOP / OFFSET)"""
+    sql_query = sql_query.strip().rstrip(";")
+    for match in reversed(list(re.finditer(r"\bORDER\s+BY\b", sql_query, re.IGNORECASE))):
+        prefix = sql_query[:match.start()]
+        if prefix.count("(") != prefix.count(")"):
+            continue
+        if re.search(r"\bTOP\b", prefix, re.IGNORECASE) or re.search(r"\bOFFSET\b", sql_query[match.end():], re.IGNORECASE):
+            return sql_query
+        return prefix.strip()
+    return sql_query
+
+
+@dataclass
+class ResultSnapshot:
+    """Compact column-oriented copy of one query result"""
+    sql_query: str
+    columns: List[str]
+    row_count: int
+    data: Dict[str, Sequence]       # column -> values (empty when truncated)
+    key_column: Optional[str]
+    keys: Sequence                  # key column values (all rows)
+    truncated: bool                 # data holds only the key column
+    created_at: float
+    history_sql: str = ""           # SQL as the conversation history stores it (unscoped, one line)
+
+    def key_values(self) -> Optional[List[str]]:
+        """Key column values as strings, or None if the result had no key column"""
+        if not self.key_column:
+            return None
+        return [str(v) for v in self.keys if v is not None]
+
+    def key_subquery(self) -> Optional[str]:
+        """SELECT of the key column over the previous query, or None if it cannot be nested"""
+        sql_query = strip_order_by(self.sql_query)
+        if not self.key_column or re.match(r"\s*WITH\b", sql_query, re.IGNORECASE):
+            return None
+        return f"SELECT prev.[{self.key_column}] FROM ({sql_query}) AS prev"
+
+    def rows(self, indices: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Rebuild row dictionaries (all rows, or the given row indices)"""
+        if self.truncated:
+            return []
+        indices = range(self.row_count) if indices is None else indices
+        return [{column: self.data[column][i] for column in self.columns} for i in indices]
+
+    def match_filters(self, question: str) -> Optional[List[Tuple[str, Any]]]:
+        """
+        Find the (column, value) equality filters a follow-up asks for
+
+        Only text columns with few distinct values are considered, values made
+        up of filler words only ("In", "Out") are never matched, and the
+        question must contain nothing else besides follow-up filler words and
+        column-name words - anything more ("...who joined after 2020") needs SQL.
+
+        Args:
+            question: Follow-up question
+
+        Returns:
+            List of (column, value) filters, or None if the question cannot be
+            answered by filtering this snapshot
+        """
+        if self.truncated or not self.row_count:
+            return None
+
+        question_lower = question.lower()
+        filters: List[Tuple[str, Any]] = []
+        matched_spans: List[Tuple[int, int]] = []
+        column_words = set()
+
+        for column in self.columns:
+            column_words.update(_column_words(column))
+            if column == self.key_column:
+                continue
+            values = self.data[column]
+            if isinstance(values, array):
+                continue
+            distinct = {v for v in values if isinstance(v, str) and len(v.strip()) >= 2}
+            if not distinct or len(distinct) > MAX_FILTER_DISTINCT:
+                continue
+
+            best = None
+            for value in distinct:
+                value_text = value.strip()
+                if all(word in FOLLOWUP_FILLER_WORDS for word in _WORD_RE.findall(value_text.lower())):
+                    # "In" / "Out" / "All" would match the question's own filler words
+                    continue
+                if value_text.isupper() and len(value_text) <= 3:
+                    # Short acronyms ("IT", "HR") must match case, so the pronoun "it" does not
+                    match = re.search(rf"(?<!\w){re.escape(value_text)}(?!\w)", question)
+                else:
+                    match = re.search(rf"(?<!\w){re.escape(value_text.lower())}(?!\w)", question_lower)
+                if match and (best is None or len(value) > len(best[0])):
+                    best = (value, match.span())
+            if best:
+                filters.append((column, best[0]))
+                matched_spans.append(best[1])
+
+        if not filters:
+            return None
+
+        remaining = question_lower
+        for start, end in sorted(matched_spans, reverse=True):
+            remaining = remaining[:start] + " " + remaining[end:]
+        leftover = [
+            word for word in _WORD_RE.findall(remaining)
+            if word not in FOLLOWUP_FILLER_WORDS and word not in column_words
+        ]
+        if leftover:
+            logger.debug(f"[SNAPSHOT] Follow-up needs SQL, unmatched words: {leftover}")
+            return None
+        return filters
+
+    def filter_rows(self, filters: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows whose columns equal every filter value (case-insensitive for text)"""
+        wanted = [(self.data[column], str(value).strip().lower()) for column, value in filters]
+        indices = [
+            i for i in range(self.row_count)
+            if all(isinstance(values[i], str) and values[i].strip().lower() == value for values, value in wanted)
+        ]
+        return self.rows(indices)
+
+    def filtered_sql(self, filters: List[Tuple[str, Any]]) -> str:
+        """SQL equivalent of filter_rows(), recorded as the follow-up's query"""
+        conditions = " AND ".join(
+            f"prev.[{column}] = N'{str(value).replace(chr(39), chr(39) * 2)}'" for column, value in filters
+        )
+        return f"SELECT * FROM ({strip_order_by(self.sql_query)}) AS prev WHERE {conditions}"
+
+
+class ResultSnapshotStore:
+    """
+    Thread-safe LRU + TTL store of per-session result snapshots
+
+    Example:
+        result_snapshot_store.record(session_id, user_id, sql, results)
+        snapshot = result_snapshot_store.get_current(session_id, user_id, conversation_history)
+    """
+
+    def __init__(self, max_sessions: int = 500, max_rows: int = 5000, ttl_seconds: int = 1800, enabled: bool = True):
+        """
+        Initialize snapshot store
+
+        Args:
+            max_sessions: Sessions kept before LRU eviction
+            max_rows: Larger results keep only their key column
+            ttl_seconds: Snapshot lifetime
+            enabled: Master switch
+        """
+        self.enabled = enabled
+        self.max_sessions = max_sessions
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+
+        self._snapshots: "OrderedDict[Tuple[str, str], ResultSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+        self.local_answers = 0
+        self.key_reuses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def record(
+        self,
+        session_id: Optional[str],
+        user_id: str,
+        sql_query: str,
+        results: List[Dict[str, Any]],
+        history_sql: Optional[str] = None,
+    ) -> Optional[ResultSnapshot]:
+        """
+        Snapshot a query result for the session's next follow-up
+
+        Args:
+            session_id: Conversation session (nothing is recorded without one)
+            user_id: User the (already scoped) result belongs to
+            sql_query: SQL that produced the rows
+            results: Result rows
+            history_sql: SQL the turn reports in the conversation history, if it
+                differs from sql_query (e.g. before data scoping)
+
+        Returns:
+            The stored ResultSnapshot, or None
+        """
+        if not self.enabled or not session_id:
+            return None
+
+        columns = list(results[0].keys()) if results else []
+        key_column = next((c for c in KEY_COLUMNS if c in columns), None)
+        truncated = len(results) > self.max_rows
+        data: Dict[str, Sequence] = {}
+        if not truncated:
+            data = {column: _pack_column([row.get(column) for row in results]) for column in columns}
+        keys = data[key_column] if key_column and not truncated else (
+            _pack_column([row.get(key_column) for row in results]) if key_column else ()
+        )
+
+        snapshot = ResultSnapshot(
+            sql_query=sql_query,
+            columns=columns,
+            row_count=len(results),
+            data=data,
+            key_column=key_column,
+            keys=keys,
+            truncated=truncated,
+            created_at=time.time(),
+            history_sql=" ".join((history_sql or sql_query).split()),
+        )
+
+        key = (str(session_id), str(user_id))
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._snapshots[key] = snapshot
+            self.recorded += 1
+            while len(self._snapshots) > self.max_sessions:
+                self._snapshots.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def get(self, session_id: Optional[str], user_id: str) -> Optional[ResultSnapshot]:
+        """Get the session's live snapshot, or None"""
+        if not self.enabled or not session_id:
+            return None
+        key = (str(session_id), str(user_id))
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None or time.time() - snapshot.created_at > self.ttl_seconds:
+                self._snapshots.pop(key, None)
+                self.misses += 1
+                return None
+            self._snapshots.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+    def get_current(
+        self,
+        session_id: Optional[str],
+        user_id: str,
+        conversation_history: Optional[List[Dict[str, Any]]],
+    ) -> Optional[ResultSnapshot]:
+        """
+        Get the session's snapshot if it is the result of the latest answer
+
+        Args:
+            session_id: Conversation session
+            user_id: User the snapshot belongs to
+            conversation_history: Stored messages, newest last
+
+        Returns:
+            ResultSnapshot, or None when there is none or the latest assistant
+            turn reports different (or no) SQL
+        """
+        snapshot = self.get(session_id, user_id)
+        if snapshot is None:
+            return None
+
+        latest_sql = None
+        for message in reversed(conversation_history or []):
+            if message.get("message_type") == "assistant":
+                _, latest_sql, _, _ = parse_followup_context(message.get("message_content") or "")
+                break
+        if latest_sql is None or " ".join(latest_sql.split()) != snapshot.history_sql:
+            with self._lock:
+                self.stale += 1
+            logger.debug("[SNAPSHOT] Snapshot is not from the latest turn - ignored")
+            return None
+        return snapshot
+
+    def record_use(self, local_answer: bool):
+        """Count a follow-up served from a snapshot (locally, or via its key list)"""
+        if local_answer:
+            self.local_answers += 1
+        else:
+            self.key_reuses += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot store statistics"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._snapshots),
+                "max_sessions": self.max_sessions,
+                "recorded": self.recorded,
+                "hits": self.hits,
+                "misses": self.misses,
+                "local_answers": self.local_answers,
+                "key_reuses": self.key_reuses,
+                "evictions": self.evictions,
+                "stale": self.stale,
+            }
+
+
+# Global result snapshot store instance
+result_snapshot_store = ResultSnapshotStore(
+    max_sessions=settings.result_snapshot_max_sessions,
+    max_rows=settings.result_snapshot_max_rows,
+    ttl_seconds=settings.result_snapshot_ttl_seconds,
+    enabled=settings.result_snapshot_enabled,
+)
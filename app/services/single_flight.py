@@ -0,0 +1,129 @@
+"""
+Single-Flight Request Coalescing
+
+Collapses concurrent identical async calls into one execution. When several
+users in a tenant ask the same question at the same moment (dashboard
+refresh, team meeting), the first request runs the LLM call and the others
+await the same task instead of paying for their own.
+
+Semantics:
+- Only calls that overlap in time are coalesced; results are not cached
+- An exception from the shared call is raised in every waiting caller
+- A cancelled caller stops waiting without affecting the others; the shared
+  call is cancelled only when every caller has gone away
+"""
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict
+
+from loguru import logger
+
+
+@dataclass
+class _InFlightCall:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key
+
+    Must be used from a single event loop at a time (calls from another loop
+    start their own execution rather than awaiting a foreign task).
+
+    Example:
+        sql = await llm_single_flight.do(
+            SingleFlight.make_key(model, prompt),
+            lambda: self._call_llm(prompt),
+        )
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize coalescer
+
+        Args:
+            name: Label used in logs and stats
+        """
+        self.name = name
+        self._calls: Dict[str, _InFlightCall] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash call identity (e.g. model, temperature, prompt) into a key"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _forget(self, key: str, call: _InFlightCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _on_done(self, key: str, call: _InFlightCall, task: asyncio.Task):
+        self._forget(key, call)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func() once for all concurrent callers with the same key
+
+        Args:
+            key: Call identity (see make_key)
+            func: Zero-argument coroutine factory; only the first caller's runs
+
+        Returns:
+            The shared result
+
+        Raises:
+            Whatever func() raised, in every waiting caller
+        """
+        loop = asyncio.get_running_loop()
+        self.calls += 1
+
+        call = self._calls.get(key)
+        if call is None or call.task.done() or call.task.get_loop() is not loop:
+            call = _InFlightCall(task=loop.create_task(func()))
+            call.task.add_done_callback(lambda task, key=key, call=call: self._on_done(key, call, task))
+            self._calls[key] = call
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"[SINGLE_FLIGHT:{self.name}] Joined in-flight call ({call.waiters} already waiting)")
+
+        call.waiters += 1
+        try:
+            # shield() so one caller's cancellation does not cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller went away - stop the work and let new callers start fresh
+                self._forget(key, call)
+                call.task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "llm_calls_saved": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._calls),
+        }
+
+
+# Global coalescer for SQL-generation LLM calls
+llm_single_flight = SingleFlight("llm")
@@ -0,0 +1,422 @@
+"""
+SQL Result Cache
+
+Tenant-scoped cache of query results in front of QueryRouter.execute_query.
+Unlike the answer cache (keyed by the natural-language question), entries
+here are keyed by (tenant database, SHA-256 of the canonicalized SQL), so any
+caller that runs the same statement - a re-asked question, a report, an
+export, a dashboard refresh - shares one database round trip.
+
+Canonicalization drops comments and brackets, collapses whitespace and
+lower-cases keywords and function names, so formatting differences between
+LLM generations do not split the cache. Identifiers, aliases and string
+literals keep their case: SQL Server names result columns as written, so
+"AS TotalEmployees" and "AS totalemployees" return differently keyed rows.
+
+Freshness is table-aware. Each statement's TTL is the shortest TTL of the
+tables / views it reads:
+- volatile (punches, attendance, logs, visitors, alerts...) and access
+  control (authentication relations, permissions, blacklists, cards - the
+  chatbot's own actions change these): RESULT_CACHE_VOLATILE_TTL
+- lookup masters (DesignationMaster, DeptMaster, ShiftMaster...): RESULT_CACHE_LOOKUP_TTL
+- everything else, including employee tables / views: RESULT_CACHE_DEFAULT_TTL
+
+ActionOrchestrator drops a tenant's entries after every successful
+data-changing action, so a grant / revoke / blacklist is visible to the
+next question immediately.
+
+Memory is bounded by RESULT_CACHE_MAX_BYTES (estimated JSON size of the
+rows) with LRU eviction. Parameterized queries and non-deterministic
+statements (NEWID, RAND) are never cached, and callers that need fresh data
+pass bypass_cache=True to execute_query.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.services.sql_tokenizer import skip_parens, tokenize
+from app.services.sql_validator import SQL_KEYWORDS
+
+
+ResultKey = Tuple[str, str]
+
+# Tables whose rows change continuously (punch / attendance / event data)
+VOLATILE_TABLE_PATTERN = re.compile(
+    r"punch|attendance|today|log|in_?out|event|alert|alarm|visitor|vistor|parking|vehicle|transaction",
+    re.IGNORECASE,
+)
+
+# Access-control tables the chatbot's own actions (grant, revoke, blacklist,
+# terminate...) write to
+ACCESS_TABLE_PATTERN = re.compile(
+    r"authenticat|authori[sz]|access|permission|blacklist|block|card|enrol",
+    re.IGNORECASE,
+)
+
+# Reference tables that change only through admin configuration
+LOOKUP_TABLE_PATTERN = re.compile(
+    r"designation|dept|department|section|branch|compa|grade|categor|shift|holiday|terminal|reader|location",
+    re.IGNORECASE,
+)
+
+# Functions whose result differs on every execution
+NON_DETERMINISTIC_FUNCTIONS = frozenset({"NEWID", "RAND", "NEWSEQUENTIALID", "CRYPT_GEN_RANDOM"})
+
+# Rows sampled when estimating a result set's size
+_SIZE_SAMPLE_ROWS = 20
+
+
+def canonicalize_sql(sql_query: str) -> str:
+    """
+    Normalize a statement so formatting-only differences share a cache key
+
+    Args:
+        sql_query: SQL statement
+
+    Returns:
+        Space-joined tokens with keywords / function names lower-cased
+    """
+    tokens = tokenize(sql_query)
+    parts = []
+    for i, token in enumerate(tokens):
+        is_function = i + 1 < len(tokens) and tokens[i + 1].value == "("
+        if token.kind == "word" and (token.upper in SQL_KEYWORDS or is_function):
+            parts.append(token.value.lower())
+        else:
+            parts.append(token.value)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
+
+
+def referenced_tables(sql_query: str) -> Set[str]:
+    """
+    Names of the tables / views a statement reads (schema prefix dropped)
+
+    CTE names are excluded, since they are not catalog objects.
+    """
+    tokens = tokenize(sql_query)
+    cte_names = {
+        tokens[i].value.lower()
+        for i in range(1, len(tokens) - 2)
+        if (tokens[i - 1].upper == "WITH" or tokens[i - 1].value == ",")
+        and tokens[i].kind in ("word", "ident")
+        and tokens[i + 1].upper == "AS"
+        and tokens[i + 2].value == "("
+    }
+
+    tables: Set[str] = set()
+    for i, token in enumerate(tokens):
+        if token.upper not in ("FROM", "JOIN"):
+            continue
+        j = i + 1
+        # FROM a, b, (SELECT ...) c: every comma-separated entry is read
+        while j < len(tokens):
+            if tokens[j].value == "(":
+                # Derived table - its own FROM is picked up separately
+                j = skip_parens(tokens, j)
+            elif tokens[j].kind in ("word", "ident") and tokens[j].upper not in SQL_KEYWORDS:
+                name = tokens[j].value
+                # dbo.Table / db.dbo.Table
+                while j + 2 < len(tokens) and tokens[j + 1].value == "." and tokens[j + 2].kind in ("word", "ident"):
+                    j += 2
+                    name = tokens[j].value
+                if name.lower() not in cte_names:
+                    tables.add(name)
+                j += 1
+            else:
+                break
+            # Optional alias
+            if j < len(tokens) and tokens[j].upper == "AS":
+                j += 1
+            if j < len(tokens) and tokens[j].kind in ("word", "ident") and tokens[j].upper not in SQL_KEYWORDS:
+                j += 1
+            # Table hints: WITH (NOLOCK)
+            if j + 1 < len(tokens) and tokens[j].upper == "WITH" and tokens[j + 1].value == "(":
+                j = skip_parens(tokens, j + 1)
+            if token.upper == "FROM" and j < len(tokens) and tokens[j].value == ",":
+                j += 1
+                continue
+            break
+    return tables
+
+
+def is_cacheable_sql(sql_query: str) -> bool:
+    """Whether a statement's result is safe to serve again (no NEWID / RAND)"""
+    return not any(token.upper in NON_DETERMINISTIC_FUNCTIONS for token in tokenize(sql_query))
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Approximate memory footprint of a result set, from the JSON size of a sample"""
+    if not rows:
+        return 64
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sample_bytes = len(json.dumps(sample, default=str))
+    return 64 + sample_bytes * len(rows) // len(sample)
+
+
+@dataclass
+class CachedResult:
+    """A cached result set"""
+    rows: List[Dict[str, Any]]
+    max_rows: int           # row limit of the execution that produced rows
+    complete: bool          # rows holds the entire result set
+    size_bytes: int
+    ttl_seconds: int
+    created_at: float
+    hits: int = 0
+
+
+class SQLResultCache:
+    """
+    Thread-safe, byte-budgeted LRU + TTL cache of SQL result sets
+
+    Example:
+        rows = sql_result_cache.get(tenant_db.id, sql, max_rows=1000)
+        if rows is None:
+            rows = execute(sql)
+            sql_result_cache.set(tenant_db.id, sql, rows, max_rows=1000)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 8 * 1024 * 1024,
+        volatile_ttl_seconds: int = 30,
+        default_ttl_seconds: int = 300,
+        lookup_ttl_seconds: int = 3600,
+        enabled: bool = True,
+    ):
+        """
+        Initialize result cache
+
+        Args:
+            max_bytes: Estimated bytes across all entries before LRU eviction
+            max_entry_bytes: Larger result sets are not cached
+            volatile_ttl_seconds: TTL for statements reading punch / attendance data
+            default_ttl_seconds: TTL for statements reading other tables
+            lookup_ttl_seconds: TTL for statements reading only lookup masters
+            enabled: Master switch
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.volatile_ttl_seconds = volatile_ttl_seconds
+        self.default_ttl_seconds = default_ttl_seconds
+        self.lookup_ttl_seconds = lookup_ttl_seconds
+        self.enabled = enabled
+
+        self._cache: "OrderedDict[ResultKey, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.bypasses = 0
+
+    # ==================== Keys / TTL ====================
+
+    @staticmethod
+    def make_key(tenant_database_id: Any, sql_query: str) -> ResultKey:
+        """Build a cache key from the tenant database and canonical SQL hash"""
+        digest = hashlib.sha256(canonicalize_sql(sql_query).encode("utf-8")).hexdigest()
+        return (str(tenant_database_id), digest)
+
+    def table_ttl(self, table_name: str) -> int:
+        """TTL for results read from one table / view"""
+        name = table_name.lower()
+        if VOLATILE_TABLE_PATTERN.search(name) or ACCESS_TABLE_PATTERN.search(name):
+            return self.volatile_ttl_seconds
+        if "employee" in name:
+            return self.default_ttl_seconds
+        if LOOKUP_TABLE_PATTERN.search(name) or name.endswith("master"):
+            return self.lookup_ttl_seconds
+        return self.default_ttl_seconds
+
+    def ttl_for(self, sql_query: str) -> int:
+        """TTL for a statement: the shortest TTL of the tables it reads"""
+        tables = referenced_tables(sql_query)
+        if not tables:
+            return self.volatile_ttl_seconds
+        return min(self.table_ttl(table) for table in tables)
+
+    # ==================== Get / Set ====================
+
+    def get(self, tenant_database_id: Any, sql_query: str, max_rows: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a fresh result set
+
+        Args:
+            tenant_database_id: Database the query runs against
+            sql_query: SQL statement
+            max_rows: Row limit of the current execution
+
+        Returns:
+            Up to max_rows rows, or None on a miss (also when the cached run
+            was truncated at a lower row limit)
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(tenant_database_id, sql_query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry.created_at > entry.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if not entry.complete and entry.max_rows < max_rows:
+                self.misses += 1
+                return None
+
+            self._cache.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry.rows[:max_rows]
+
+    def set(
+        self,
+        tenant_database_id: Any,
+        sql_query: str,
+        rows: List[Dict[str, Any]],
+        max_rows: int = 1000,
+        complete: Optional[bool] = None,
+    ) -> bool:
+        """
+        Store a result set
+
+        Args:
+            tenant_database_id: Database the query ran against
+            sql_query: SQL statement
+            rows: Result rows
+            max_rows: Row limit the statement ran with
+            complete: Whether rows is the entire result set (default: fewer than max_rows rows)
+
+        Returns:
+            True if the result was cached
+        """
+        if not self.enabled:
+            return False
+
+        if not is_cacheable_sql(sql_query):
+            self.skipped += 1
+            return False
+
+        size_bytes = estimate_size(rows)
+        if size_bytes > self.max_entry_bytes:
+            self.skipped += 1
+            logger.debug(f"[RESULT_CACHE] Not caching {len(rows)} rows (~{size_bytes} bytes)")
+            return False
+
+        key = self.make_key(tenant_database_id, sql_query)
+        entry = CachedResult(
+            rows=list(rows),
+            max_rows=max_rows,
+            complete=len(rows) < max_rows if complete is None else complete,
+            size_bytes=size_bytes,
+            ttl_seconds=self.ttl_for(sql_query),
+            created_at=time.time(),
+        )
+
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = entry
+            self._bytes += size_bytes
+            self.stores += 1
+            while len(self._cache) > 1 and self._bytes > self.max_bytes:
+                self._remove(next(iter(self._cache)))
+                self.evictions += 1
+
+        return True
+
+    def record_bypass(self):
+        """Count an execution that skipped the cache on request"""
+        self.bypasses += 1
+
+    def _remove(self, key: ResultKey):
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size_bytes
+
+    # ==================== Invalidation / Stats ====================
+
+    def invalidate(self, tenant_database_id: Any = None) -> int:
+        """
+        Drop cached results
+
+        Args:
+            tenant_database_id: Only drop this database's entries (None = all)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if tenant_database_id is None:
+                removed = len(self._cache)
+                self._cache.clear()
+                self._bytes = 0
+            else:
+                database_id = str(tenant_database_id)
+                keys = [key for key in self._cache if key[0] == database_id]
+                for key in keys:
+                    self._remove(key)
+                removed = len(keys)
+            self.invalidations += 1
+
+        logger.info(f"[RESULT_CACHE] Invalidated {removed} entries")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "skipped": self.skipped,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "bypasses": self.bypasses,
+                "ttl_seconds": {
+                    "volatile": self.volatile_ttl_seconds,
+                    "default": self.default_ttl_seconds,
+                    "lookup": self.lookup_ttl_seconds,
+                },
+            }
+
+
+# Global SQL result cache instance
+sql_result_cache = SQLResultCache(
+    max_bytes=settings.result_cache_max_bytes,
+    max_entry_bytes=settings.result_cache_max_entry_bytes,
+    volatile_ttl_seconds=settings.result_cache_volatile_ttl,
+    default_ttl_seconds=settings.result_cache_default_ttl,
+    lookup_ttl_seconds=settings.result_cache_lookup_ttl,
+    enabled=settings.result_cache_enabled,
+)
@@ -0,0 +1,286 @@
+"""
+SQL Template Registry
+
+Data-driven zero-LLM fast path for question patterns the LLM consistently
+gets wrong (face / fingerprint / card access, data removed from devices).
+
+Templates live in data/sql_templates.json (YAML is also accepted when
+PyYAML is installed). Each entry defines:
+- keywords: any of these phrases in the question selects the template
+- parameters: optional conditions extracted from the question
+    - patterns + exclude + condition: first regex capture that is not excluded
+      is substituted into condition as {value} (single quotes doubled, so a
+      capture cannot end a string literal)
+    - choices: first choice whose keywords appear supplies its condition
+- conditions: WHERE conditions in order; "{name}" entries are filled from
+  parameters and dropped when the parameter did not match
+- sql: SQL body with a {conditions} placeholder
+
+All template keywords are compiled into a single automaton, so selecting a
+template costs one scan of the question regardless of how many templates
+are registered. Templates keep file order as priority.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+# YAML template files are optional
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+
+@dataclass
+class TemplateParameter:
+    """A condition extracted from the question"""
+    name: str
+    patterns: List[Pattern] = field(default_factory=list)
+    exclude: frozenset = frozenset()
+    condition: str = ""
+    choices: List[Tuple[Tuple[str, ...], str]] = field(default_factory=list)
+
+    def extract(self, question: str, question_lower: str) -> Optional[str]:
+        """
+        Resolve this parameter's SQL condition for a question
+
+        Returns:
+            Condition string, or None if the parameter does not apply
+        """
+        for pattern in self.patterns:
+            match = pattern.search(question)
+            if match:
+                value = match.group(1)
+                if value.lower() not in self.exclude:
+                    return self.condition.format(value=value.replace("'", "''"))
+
+        for keywords, condition in self.choices:
+            if any(kw in question_lower for kw in keywords):
+                return condition
+
+        return None
+
+
+@dataclass
+class SQLTemplate:
+    """A compiled SQL template"""
+    name: str
+    keywords: List[str]
+    parameters: Dict[str, TemplateParameter]
+    conditions: List[str]
+    sql: str
+    explanation: str
+    tables: List[str]
+
+    def render(self, question: str) -> Dict[str, Any]:
+        """
+        Build the SQL for a question that selected this template
+
+        Returns:
+            Dict in the same shape as RAGSQLAgent.generate_sql()
+        """
+        question_lower = question.lower()
+        conditions = []
+        for condition in self.conditions:
+            if condition.startswith("{") and condition.endswith("}"):
+                parameter = self.parameters.get(condition[1:-1])
+                value = parameter.extract(question, question_lower) if parameter else None
+                if value:
+                    conditions.append(value)
+            else:
+                conditions.append(condition)
+
+        sql_query = self.sql.replace("{conditions}", "\n    AND ".join(conditions))
+
+        return {
+            "sql_query": sql_query.strip(),
+            "explanation": self.explanation,
+            "context_used": list(self.tables),
+            "tables_referenced": list(self.tables),
+            "template_used": self.name,
+        }
+
+
+class SQLTemplateRegistry:
+    """
+    Registry of SQL templates matched in a single pass
+
+    Example:
+        result = sql_template_registry.match("Who has face access on SUBWAY devices?")
+        if result:
+            sql = result["sql_query"]
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize registry (templates are loaded lazily on first match)
+
+        Args:
+            path: JSON or YAML template file
+        """
+        self.path = path
+        self.templates: List[SQLTemplate] = []
+        self._keyword_automaton: Optional[Pattern] = None
+        self._keyword_templates: Dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self.matches = 0
+        self.misses = 0
+
+    # ==================== Loading ====================
+
+    def _read_file(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            logger.warning(f"[TEMPLATE] Template file not found: {self.path}")
+            return {"templates": []}
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            if self.path.endswith((".yaml", ".yml")):
+                if not HAS_YAML:
+                    raise RuntimeError("PyYAML is required for YAML template files: pip install pyyaml")
+                return yaml.safe_load(f) or {"templates": []}
+            return json.load(f)
+
+    @staticmethod
+    def _compile_parameter(name: str, spec: Dict[str, Any]) -> TemplateParameter:
+        return TemplateParameter(
+            name=name,
+            patterns=[re.compile(p, re.IGNORECASE) for p in spec.get("patterns", [])],
+            exclude=frozenset(word.lower() for word in spec.get("exclude", [])),
+            condition=spec.get("condition", ""),
+            choices=[
+                (tuple(kw.lower() for kw in choice["keywords"]), choice["condition"])
+                for choice in spec.get("choices", [])
+            ],
+        )
+
+    def load_templates(self, templates: List[Dict[str, Any]]):
+        """
+        Compile template definitions and rebuild the keyword automaton
+
+        Args:
+            templates: Template dicts in file format
+        """
+        compiled = [
+            SQLTemplate(
+                name=t["name"],
+                keywords=[kw.lower() for kw in t["keywords"]],
+                parameters={
+                    name: self._compile_parameter(name, spec)
+                    for name, spec in t.get("parameters", {}).items()
+                },
+                conditions=t.get("conditions", []),
+                sql=t["sql"],
+                explanation=t.get("explanation", f"Generated using {t['name']} template"),
+                tables=t.get("tables", []),
+            )
+            for t in templates
+        ]
+
+        # Keyword -> best (lowest index) template. The automaton reports one
+        # keyword per position (the longest), so a keyword also carries the
+        # priority of any shorter keyword that is its prefix.
+        keyword_templates: Dict[str, int] = {}
+        for index, template in enumerate(compiled):
+            for kw in template.keywords:
+                keyword_templates.setdefault(kw, index)
+        for kw in keyword_templates:
+            for other, index in keyword_templates.items():
+                if kw != other and kw.startswith(other) and index < keyword_templates[kw]:
+                    keyword_templates[kw] = index
+
+        automaton = None
+        if keyword_templates:
+            alternation = "|".join(
+                re.escape(kw) for kw in sorted(keyword_templates, key=len, reverse=True)
+            )
+            # Zero-width lookahead so overlapping keywords are all reported
+            automaton = re.compile(f"(?=({alternation}))")
+
+        with self._lock:
+            self.templates = compiled
+            self._keyword_templates = keyword_templates
+            self._keyword_automaton = automaton
+            self._loaded = True
+
+        logger.info(f"[TEMPLATE] Loaded {len(compiled)} SQL templates ({len(keyword_templates)} keywords)")
+
+    def reload(self):
+        """Reload templates from disk"""
+        self.load_templates(self._read_file().get("templates", []))
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"[TEMPLATE] Failed to load templates from {self.path}: {e}")
+                self.load_templates([])
+
+    # ==================== Matching ====================
+
+    def find_template(self, question: str) -> Optional[SQLTemplate]:
+        """
+        Select the highest-priority template whose keywords appear in the question
+
+        Returns:
+            SQLTemplate or None
+        """
+        self._ensure_loaded()
+        automaton = self._keyword_automaton
+        if automaton is None:
+            return None
+
+        best = None
+        for hit in automaton.finditer(question.lower()):
+            index = self._keyword_templates[hit.group(1)]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+
+        return self.templates[best] if best is not None else None
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Render SQL for a question if any template applies
+
+        Args:
+            question: User's question
+
+        Returns:
+            Dict with sql_query, explanation, context_used, tables_referenced,
+            template_used - or None if no template matches
+        """
+        template = self.find_template(question)
+        if template is None:
+            self.misses += 1
+            return None
+
+        self.matches += 1
+        logger.info(f"[TEMPLATE] Detected {template.name} query - using direct SQL template")
+        return template.render(question)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics"""
+        return {
+            "path": self.path,
+            "templates": [t.name for t in self.templates],
+            "keywords": len(self._keyword_templates),
+            "matches": self.matches,
+            "misses": self.misses,
+        }
+
+
+# Global template registry instance
+sql_template_registry = SQLTemplateRegistry(settings.sql_templates_path)
@@ -0,0 +1,71 @@
+"""
+SQL Tokenizer
+
+Small dependency-free T-SQL lexer shared by the pre-flight validator, result
+cursors and the gateway result cache. It only splits a statement into
+words, identifiers, literals and operators and tracks parenthesis depth;
+keyword handling is left to the caller.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List
+
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>N?'(?:[^']|'')*')
+    | (?P<bracket>\[[^\]]*\])
+    | (?P<quoted>"[^"]*")
+    | (?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+    | (?P<word>[A-Za-z_@\#][\w@\#$]*)
+    | (?P<op><>|!=|>=|<=|\|\||::|[-+*/%=<>(),.;~&|^:])
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+@dataclass
+class Token:
+    """A lexical SQL token (keyword-ness is decided by the caller)"""
+    kind: str    # word, ident (bracketed/quoted), string, number, op, other
+    value: str   # identifier text without brackets, or the raw token
+    depth: int = 0
+    start: int = -1   # offset of the token in the original statement
+    end: int = -1
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper() if self.kind == "word" else ""
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split SQL into tokens, dropping whitespace and comments"""
+    tokens: List[Token] = []
+    depth = 0
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+        if kind in ("ws", "comment"):
+            continue
+        if kind in ("bracket", "quoted"):
+            tokens.append(Token("ident", text[1:-1], depth, match.start(), match.end()))
+            continue
+        if text == ")":
+            depth = max(0, depth - 1)
+        tokens.append(Token(kind, text, depth, match.start(), match.end()))
+        if text == "(":
+            depth += 1
+    return tokens
+
+
+def skip_parens(tokens: List[Token], index: int) -> int:
+    """Given tokens[index] == '(', return the index after the matching ')'"""
+    depth = tokens[index].depth
+    index += 1
+    while index < len(tokens) and not (tokens[index].value == ")" and tokens[index].depth == depth):
+        index += 1
+    return index + 1
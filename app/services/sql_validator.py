@@ -0,0 +1,685 @@
+"""
+SQL Pre-flight Validator
+
+Checks LLM-generated SQL locally, before it costs a gateway round trip and
+a SQL Server error:
+- only a single read-only SELECT (or WITH ... SELECT) statement is allowed
+- every table / view reference must exist in the known Oryggi catalog
+- alias.column references, and bare columns in single-source queries, must
+  exist on the referenced object
+
+The catalog is built from:
+1. TABLE_DEFINITIONS / VIEW_DEFINITIONS (object names)
+2. The reference catalog file (settings.sql_validator_catalog_path,
+   produced by scripts/analyze_database.py) - full column lists
+3. The tenant's SchemaCache records, when onboarding has discovered them
+
+Columns are only checked against objects whose full column list is known,
+and unknown objects only when the tenant's own SchemaCache is loaded (the
+reference file describes the Oryggi schema, not every tenant's). Catalog
+errors (unknown_table, unknown_column) never block execution on their own:
+the agent logs them, or asks for one repair when the catalog is the
+tenant's, and runs the original SQL if the repair does not validate. So a
+missing or stale catalog can cause a missed error but never a false
+rejection.
+
+Errors are structured (SQLValidationIssue) so the agent can feed them into
+a single repair prompt.
+"""
+
+import difflib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.rag.table_definitions import TABLE_DEFINITIONS
+from app.rag.view_definitions import VIEW_DEFINITIONS
+from app.services.sql_tokenizer import Token, skip_parens, tokenize
+
+
+# Statements / clauses that must never reach the gateway
+FORBIDDEN_KEYWORDS = frozenset({
+    "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "EXEC", "EXECUTE", "GRANT", "REVOKE", "DENY", "BACKUP", "RESTORE", "SHUTDOWN",
+    "DBCC", "INTO", "OPENROWSET", "OPENQUERY", "OPENDATASOURCE", "BULK", "KILL",
+    "RECONFIGURE", "USE", "DECLARE", "SET",
+})
+
+# Words that are never column references
+SQL_KEYWORDS = frozenset({
+    "SELECT", "DISTINCT", "TOP", "PERCENT", "TIES", "AS", "FROM", "WHERE", "AND", "OR",
+    "NOT", "IN", "IS", "NULL", "LIKE", "BETWEEN", "ESCAPE", "CASE", "WHEN", "THEN", "ELSE",
+    "END", "GROUP", "BY", "ORDER", "HAVING", "ASC", "DESC", "ON", "JOIN", "INNER", "LEFT",
+    "RIGHT", "OUTER", "FULL", "CROSS", "APPLY", "UNION", "ALL", "EXCEPT", "INTERSECT",
+    "EXISTS", "ANY", "SOME", "WITH", "NOLOCK", "READUNCOMMITTED", "OVER", "PARTITION",
+    "ROWS", "RANGE", "PRECEDING", "FOLLOWING", "CURRENT", "ROW", "UNBOUNDED", "OFFSET",
+    "FETCH", "NEXT", "FIRST", "ONLY", "COLLATE", "PIVOT", "UNPIVOT", "FOR", "OPTION",
+    "RECOMPILE", "MAXDOP", "TRUE", "FALSE", "VALUES", "WITHIN", "LIMIT", "INTERVAL", "ILIKE",
+    # Types (CAST / CONVERT targets)
+    "INT", "BIGINT", "SMALLINT", "TINYINT", "BIT", "DECIMAL", "NUMERIC", "FLOAT", "REAL",
+    "MONEY", "DATE", "TIME", "DATETIME", "DATETIME2", "SMALLDATETIME", "DATETIMEOFFSET",
+    "CHAR", "VARCHAR", "NCHAR", "NVARCHAR", "TEXT", "NTEXT", "MAX", "VARBINARY", "BINARY",
+    "UNIQUEIDENTIFIER", "SQL_VARIANT", "XML",
+})
+
+# Functions called without parentheses (never column references)
+NILADIC_FUNCTIONS = frozenset({
+    "CURRENT_TIMESTAMP", "CURRENT_USER", "SESSION_USER", "SYSTEM_USER", "USER",
+    "CURRENT_DATE", "CURRENT_TIME",
+})
+
+# Errors that come from catalog lookups rather than the statement itself
+CATALOG_ERROR_CODES = frozenset({"unknown_table", "unknown_column"})
+
+# DATEADD / DATEDIFF / DATEPART / DATENAME first arguments
+DATE_PARTS = frozenset({
+    "YEAR", "YY", "YYYY", "QUARTER", "QQ", "Q", "MONTH", "MM", "M", "DAYOFYEAR", "DY", "Y",
+    "DAY", "DD", "D", "WEEK", "WK", "WW", "ISO_WEEK", "ISOWK", "ISOWW", "WEEKDAY", "DW",
+    "HOUR", "HH", "MINUTE", "MI", "N", "SECOND", "SS", "S", "MILLISECOND", "MS",
+    "MICROSECOND", "MCS", "NANOSECOND", "NS", "TZOFFSET", "TZ",
+})
+
+# Keywords that end a FROM-list entry's alias position
+_CLAUSE_KEYWORDS = SQL_KEYWORDS | FORBIDDEN_KEYWORDS
+
+# Keywords that end a SELECT list
+_SELECT_LIST_END = frozenset({
+    "FROM", "INTO", "WHERE", "GROUP", "HAVING", "ORDER", "UNION", "EXCEPT", "INTERSECT", "OPTION", "FOR",
+})
+
+
+# ==================== Results ====================
+
+@dataclass
+class SQLValidationIssue:
+    """One problem found in a statement"""
+    code: str    # not_select, multiple_statements, forbidden_keyword, unknown_table, unknown_column, unknown_alias, empty
+    message: str
+    identifier: Optional[str] = None
+    suggestions: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "code": self.code,
+            "message": self.message,
+            "identifier": self.identifier,
+            "suggestions": self.suggestions,
+        }
+
+
+@dataclass
+class SQLValidationResult:
+    """Outcome of validating one statement"""
+    errors: List[SQLValidationIssue] = field(default_factory=list)
+    tables: List[str] = field(default_factory=list)
+    catalog_complete: bool = False   # checked against the tenant's own SchemaCache
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    @property
+    def has_statement_errors(self) -> bool:
+        """Errors in the statement itself (not catalog lookups) - these always block execution"""
+        return any(issue.code not in CATALOG_ERROR_CODES for issue in self.errors)
+
+    def to_prompt(self) -> str:
+        """Render errors as a bullet list for an LLM repair prompt"""
+        lines = []
+        for issue in self.errors:
+            line = f"- {issue.message}"
+            if issue.suggestions:
+                line += f" (did you mean: {', '.join(issue.suggestions)}?)"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "is_valid": self.is_valid,
+            "errors": [issue.to_dict() for issue in self.errors],
+            "tables": self.tables,
+            "catalog_complete": self.catalog_complete,
+        }
+
+
+class SQLValidationError(ValueError):
+    """Generated SQL failed pre-flight validation (and repair)"""
+
+    def __init__(self, result: SQLValidationResult):
+        self.result = result
+        super().__init__(
+            "Generated SQL failed validation: " + "; ".join(issue.message for issue in result.errors)
+        )
+
+
+# ==================== Catalog ====================
+
+@dataclass
+class CatalogObject:
+    """A table or view and, when known, its complete column list"""
+    name: str
+    columns: Optional[Dict[str, str]] = None   # lower name -> display name
+
+
+class SQLCatalog:
+    """
+    Case-insensitive lookup of known tables / views and their columns
+
+    Unknown objects are only rejected by a complete catalog (the tenant's
+    SchemaCache loaded) - the static definitions and reference file list
+    the Oryggi objects, which other tenants' databases need not have.
+    """
+
+    def __init__(self, objects: Optional[Dict[str, CatalogObject]] = None, complete: bool = False):
+        self.objects: Dict[str, CatalogObject] = objects or {}
+        self.complete = complete
+
+    def add(self, name: str, columns: Optional[List[str]] = None):
+        """
+        Register an object; a known column list replaces an unknown one
+
+        Args:
+            name: Table or view name (without schema)
+            columns: Complete column list, or None if unknown
+        """
+        key = name.lower()
+        existing = self.objects.get(key)
+        column_map = {c.lower(): c for c in columns} if columns is not None else None
+        if existing is None or column_map is not None:
+            self.objects[key] = CatalogObject(name, column_map)
+
+    def merged(self, other: "SQLCatalog") -> "SQLCatalog":
+        """Return a new catalog with other's objects layered over this one's"""
+        combined = SQLCatalog(dict(self.objects), complete=self.complete or other.complete)
+        for obj in other.objects.values():
+            combined.add(obj.name, list(obj.columns.values()) if obj.columns is not None else None)
+        return combined
+
+    def get(self, name: str) -> Optional[CatalogObject]:
+        return self.objects.get(name.lower())
+
+    def suggest_objects(self, name: str) -> List[str]:
+        keys = difflib.get_close_matches(name.lower(), self.objects.keys(), n=3, cutoff=0.6)
+        return [self.objects[key].name for key in keys]
+
+    @staticmethod
+    def suggest_columns(obj: CatalogObject, column: str) -> List[str]:
+        keys = difflib.get_close_matches(column.lower(), obj.columns.keys(), n=3, cutoff=0.6)
+        return [obj.columns[key] for key in keys]
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+
+# ==================== Statement analysis ====================
+
+@dataclass
+class _Source:
+    """A FROM / JOIN source and the names it can be referenced by"""
+    name: Optional[str]             # object name (None for derived tables)
+    alias: Optional[str]
+    obj: Optional[CatalogObject]    # None when columns cannot be checked
+
+
+def _is_name(token: Optional[Token]) -> bool:
+    return token is not None and (token.kind == "ident" or (token.kind == "word" and token.upper not in _CLAUSE_KEYWORDS))
+
+
+class SQLValidator:
+    """
+    Offline pre-flight check for generated SQL
+
+    Example:
+        result = sql_validator.validate("SELECT EmpNme FROM dbo.vw_EmployeeMaster_Vms")
+        if not result.is_valid:
+            repair_hint = result.to_prompt()
+    """
+
+    def __init__(self, catalog_path: str, schema_ttl_seconds: int = 600):
+        """
+        Initialize validator (the reference catalog is loaded lazily)
+
+        Args:
+            catalog_path: JSON catalog written by scripts/analyze_database.py
+            schema_ttl_seconds: How long tenant SchemaCache catalogs are reused
+        """
+        self.catalog_path = catalog_path
+        self.schema_ttl_seconds = schema_ttl_seconds
+        self._base_catalog: Optional[SQLCatalog] = None
+        self._tenant_catalogs: Dict[str, Tuple[float, SQLCatalog]] = {}
+        self._lock = threading.Lock()
+
+        self.validated = 0
+        self.rejected = 0
+        self.repaired = 0
+        self.failed_open = 0
+        self.rejections_by_code: Dict[str, int] = {}
+
+    # ==================== Catalog loading ====================
+
+    def _load_base_catalog(self) -> SQLCatalog:
+        catalog = SQLCatalog()
+        for name in list(TABLE_DEFINITIONS) + list(VIEW_DEFINITIONS):
+            catalog.add(name)
+
+        if os.path.exists(self.catalog_path):
+            try:
+                with open(self.catalog_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # Column lists only: the reference database is not the tenant's,
+                # so the catalog stays incomplete (unknown objects are allowed)
+                for obj in data.get("tables", []) + data.get("views", []):
+                    catalog.add(obj["name"], [c["name"] for c in obj.get("columns", [])] or None)
+            except Exception as e:
+                logger.error(f"[SQL_VALIDATOR] Failed to load catalog {self.catalog_path}: {e}")
+        else:
+            logger.warning(f"[SQL_VALIDATOR] Catalog file not found: {self.catalog_path} (column checks limited)")
+
+        logger.info(f"[SQL_VALIDATOR] Loaded catalog with {len(catalog)} objects")
+        return catalog
+
+    @property
+    def base_catalog(self) -> SQLCatalog:
+        if self._base_catalog is None:
+            with self._lock:
+                if self._base_catalog is None:
+                    self._base_catalog = self._load_base_catalog()
+        return self._base_catalog
+
+    def tenant_catalog(self, platform_db, tenant_db_id) -> SQLCatalog:
+        """
+        Base catalog overlaid with the tenant's SchemaCache records
+
+        Only a tenant with SchemaCache records gets a complete catalog (one
+        that rejects unknown tables); otherwise the base catalog is used.
+
+        Blocking (platform DB query) - call from the agent's executor.
+
+        Args:
+            platform_db: Platform database session
+            tenant_db_id: TenantDatabase id
+
+        Returns:
+            SQLCatalog for this tenant
+        """
+        key = str(tenant_db_id)
+        cached = self._tenant_catalogs.get(key)
+        if cached and time.monotonic() - cached[0] < self.schema_ttl_seconds:
+            return cached[1]
+
+        from app.models.platform import SchemaCache
+
+        tenant = SQLCatalog(complete=True)
+        records = platform_db.query(SchemaCache).filter(SchemaCache.tenant_db_id == tenant_db_id).all()
+        for record in records:
+            try:
+                columns = [c["name"] for c in json.loads(record.column_info or "[]")]
+            except (ValueError, TypeError, KeyError):
+                columns = []
+            tenant.add(record.table_name, columns or None)
+
+        catalog = self.base_catalog.merged(tenant) if len(tenant) else self.base_catalog
+        self._tenant_catalogs[key] = (time.monotonic(), catalog)
+        return catalog
+
+    def invalidate_tenant(self, tenant_db_id):
+        """Drop a tenant's cached catalog (e.g. after schema re-discovery)"""
+        self._tenant_catalogs.pop(str(tenant_db_id), None)
+
+    # ==================== Validation ====================
+
+    def validate(self, sql: str, catalog: Optional[SQLCatalog] = None) -> SQLValidationResult:
+        """
+        Validate one generated statement
+
+        Args:
+            sql: Cleaned SQL from the LLM
+            catalog: Catalog to check against (defaults to the reference catalog)
+
+        Returns:
+            SQLValidationResult with structured errors
+        """
+        catalog = catalog or self.base_catalog
+        result = SQLValidationResult(catalog_complete=catalog.complete)
+        tokens = tokenize(sql)
+
+        self._check_statement(tokens, result)
+        if result.is_valid:
+            sources, ctes = self._collect_sources(tokens, catalog, result)
+            self._check_columns(tokens, sources, ctes, result)
+
+        self.validated += 1
+        if not result.is_valid:
+            self.rejected += 1
+            for issue in result.errors:
+                self.rejections_by_code[issue.code] = self.rejections_by_code.get(issue.code, 0) + 1
+            logger.info(f"[SQL_VALIDATOR] Rejected SQL: {[issue.message for issue in result.errors]}")
+        return result
+
+    def _check_statement(self, tokens: List[Token], result: SQLValidationResult):
+        """Single read-only SELECT statement"""
+        while tokens and tokens[-1].value == ";":
+            tokens.pop()
+        if not tokens:
+            result.errors.append(SQLValidationIssue("empty", "The SQL statement is empty"))
+            return
+
+        if any(t.value == ";" for t in tokens):
+            result.errors.append(SQLValidationIssue(
+                "multiple_statements", "Only a single SQL statement is allowed"
+            ))
+
+        first = tokens[0].upper
+        if first not in ("SELECT", "WITH") and not (tokens[0].value == "(" and len(tokens) > 1 and tokens[1].upper == "SELECT"):
+            result.errors.append(SQLValidationIssue(
+                "not_select", f"Only SELECT queries are allowed (statement starts with {tokens[0].value.upper()})",
+                identifier=tokens[0].value,
+            ))
+
+        for token in tokens:
+            if token.upper in FORBIDDEN_KEYWORDS:
+                result.errors.append(SQLValidationIssue(
+                    "forbidden_keyword", f"{token.upper} is not allowed in a read-only query",
+                    identifier=token.upper,
+                ))
+                break
+
+    def _collect_sources(
+        self,
+        tokens: List[Token],
+        catalog: SQLCatalog,
+        result: SQLValidationResult
+    ) -> Tuple[List[_Source], Set[str]]:
+        """Resolve FROM / JOIN targets, reporting unknown objects"""
+        ctes: Set[str] = set()
+        # WITH name [(cols)] AS (...) [, name AS (...)]
+        if tokens[0].upper == "WITH":
+            i = 1
+            while i < len(tokens) and _is_name(tokens[i]):
+                ctes.add(tokens[i].value.lower())
+                i += 1
+                if i < len(tokens) and tokens[i].value == "(":
+                    i = skip_parens(tokens, i)
+                if i < len(tokens) and tokens[i].upper == "AS":
+                    i += 1
+                if i < len(tokens) and tokens[i].value == "(":
+                    i = skip_parens(tokens, i)
+                if i < len(tokens) and tokens[i].value == ",":
+                    i += 1
+                else:
+                    break
+
+        sources: List[_Source] = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.upper not in ("FROM", "JOIN", "APPLY"):
+                i += 1
+                continue
+            i += 1
+            while i < len(tokens):
+                i = self._read_source(tokens, i, catalog, ctes, sources, result)
+                # FROM a, b (comma-separated sources)
+                if i < len(tokens) and tokens[i].value == "," and token.upper == "FROM":
+                    i += 1
+                    continue
+                break
+
+        result.tables = [s.name for s in sources if s.name and s.name.lower() not in ctes]
+        return sources, ctes
+
+    def _read_source(
+        self,
+        tokens: List[Token],
+        i: int,
+        catalog: SQLCatalog,
+        ctes: Set[str],
+        sources: List[_Source],
+        result: SQLValidationResult
+    ) -> int:
+        name = None
+        obj = None
+        if i < len(tokens) and tokens[i].value == "(":
+            # Derived table - columns are whatever its SELECT produces
+            i = skip_parens(tokens, i)
+        elif i < len(tokens) and _is_name(tokens[i]):
+            parts = [tokens[i].value]
+            i += 1
+            while i + 1 < len(tokens) and tokens[i].value == "." and _is_name(tokens[i + 1]):
+                parts.append(tokens[i + 1].value)
+                i += 2
+            if i < len(tokens) and tokens[i].value == "(":
+                # Table-valued function
+                i = skip_parens(tokens, i)
+            else:
+                name = parts[-1]
+                if name.lower() in ctes or name.startswith(("#", "@")):
+                    pass
+                else:
+                    obj = catalog.get(name)
+                    if obj is None and catalog.complete:
+                        result.errors.append(SQLValidationIssue(
+                            "unknown_table", f"Table or view '{'.'.join(parts)}' does not exist",
+                            identifier=name, suggestions=catalog.suggest_objects(name),
+                        ))
+        else:
+            return i
+
+        alias = None
+        if i < len(tokens) and tokens[i].upper == "AS":
+            i += 1
+        if i < len(tokens) and _is_name(tokens[i]):
+            alias = tokens[i].value
+            i += 1
+        # Table hints: WITH (NOLOCK)
+        if i + 1 < len(tokens) and tokens[i].upper == "WITH" and tokens[i + 1].value == "(":
+            i = skip_parens(tokens, i + 1)
+
+        sources.append(_Source(name, alias, obj if obj is not None and obj.columns is not None else None))
+        return i
+
+    def _check_columns(
+        self,
+        tokens: List[Token],
+        sources: List[_Source],
+        ctes: Set[str],
+        result: SQLValidationResult
+    ):
+        """Check alias.column references and bare columns of single-source queries"""
+        by_alias: Dict[str, _Source] = {}
+        for source in sources:
+            if source.alias:
+                by_alias[source.alias.lower()] = source
+            if source.name:
+                by_alias.setdefault(source.name.lower(), source)
+
+        schema_names = {"dbo", "sys", "information_schema"}
+        source_positions = self._source_name_positions(tokens)
+
+        # Qualified references: x.col
+        for i in range(len(tokens) - 2):
+            if i in source_positions or tokens[i + 1].value != ".":
+                continue
+            if not _is_name(tokens[i]) or i > 0 and tokens[i - 1].value == ".":
+                continue
+            qualifier = tokens[i].value.lower()
+            column_token = tokens[i + 2]
+            if column_token.value == "*" or not _is_name(column_token):
+                continue
+            if i + 3 < len(tokens) and tokens[i + 3].value in (".", "("):
+                continue
+            source = by_alias.get(qualifier)
+            if source is None:
+                if qualifier not in schema_names and qualifier not in ctes:
+                    result.errors.append(SQLValidationIssue(
+                        "unknown_alias", f"'{tokens[i].value}' is not a table or alias in the FROM clause",
+                        identifier=tokens[i].value,
+                    ))
+                continue
+            self._check_column(source, column_token.value, result)
+
+        # Bare columns: only when the whole statement has exactly one source
+        if len(sources) != 1 or sources[0].obj is None:
+            return
+        source = sources[0]
+        names_to_skip = {a.lower() for a in (source.alias, source.name) if a}
+        output_aliases = self._output_aliases(tokens)
+        previous = None
+        for i, token in enumerate(tokens):
+            if (
+                _is_name(token)
+                and i not in source_positions
+                and token.value.lower() not in names_to_skip
+                and token.value.lower() not in output_aliases
+                and token.upper not in DATE_PARTS
+                and token.upper not in NILADIC_FUNCTIONS
+                and not token.value.startswith(("@", "#"))
+                and not (previous is not None and previous.value == ".")
+                and not (i + 1 < len(tokens) and tokens[i + 1].value in (".", "("))
+                and not self._follows_expression(previous)
+            ):
+                self._check_column(source, token.value, result)
+            previous = token
+
+    @staticmethod
+    def _check_column(source: _Source, column: str, result: SQLValidationResult):
+        if source.obj is None or column.lower() in source.obj.columns:
+            return
+        if any(issue.identifier == column and issue.code == "unknown_column" for issue in result.errors):
+            return
+        result.errors.append(SQLValidationIssue(
+            "unknown_column", f"Column '{column}' does not exist in {source.obj.name}",
+            identifier=column, suggestions=SQLCatalog.suggest_columns(source.obj, column),
+        ))
+
+    @staticmethod
+    def _follows_expression(previous: Optional[Token]) -> bool:
+        """A name right after a complete expression is an alias (SELECT COUNT(*) Total, CASE ... END Status)"""
+        if previous is None:
+            return False
+        if previous.value == ")" or previous.kind in ("string", "number") or previous.upper == "END":
+            return True
+        return previous.value == "*" or (
+            previous.kind == "ident" or (previous.kind == "word" and previous.upper not in _CLAUSE_KEYWORDS)
+        )
+
+    @classmethod
+    def _output_aliases(cls, tokens: List[Token]) -> Set[str]:
+        """Names introduced with AS (column aliases, CTE names, CAST targets), = or implicitly"""
+        aliases = cls._implicit_aliases(tokens)
+        for i, token in enumerate(tokens[:-1]):
+            if token.upper == "AS" and _is_name(tokens[i + 1]):
+                aliases.add(tokens[i + 1].value.lower())
+            # T-SQL "SELECT Total = COUNT(*)"
+            if (
+                _is_name(token) and tokens[i + 1].value == "="
+                and i > 0 and (tokens[i - 1].upper in ("SELECT", "DISTINCT") or tokens[i - 1].value == ",")
+                and tokens[i - 1].depth == token.depth
+            ):
+                aliases.add(token.value.lower())
+        return aliases
+
+    @classmethod
+    def _implicit_aliases(cls, tokens: List[Token]) -> Set[str]:
+        """Select-list aliases without AS (COUNT(*) Total, EmpName Name, CASE ... END Status)"""
+        aliases = set()
+        for i, token in enumerate(tokens):
+            if token.upper != "SELECT":
+                continue
+            depth = token.depth
+            j = i + 1
+            # Skip DISTINCT / ALL and TOP n / TOP (n) [PERCENT] [WITH TIES]
+            while j < len(tokens) and tokens[j].upper in ("DISTINCT", "ALL"):
+                j += 1
+            if j < len(tokens) and tokens[j].upper == "TOP":
+                j += 1
+                if j < len(tokens) and tokens[j].value == "(":
+                    j = skip_parens(tokens, j)
+                else:
+                    j += 1
+                while j < len(tokens) and tokens[j].upper in ("PERCENT", "WITH", "TIES"):
+                    j += 1
+            # Walk the select list item by item; the last name of an item is an
+            # alias when it directly follows a complete expression
+            item_start = j
+            while j <= len(tokens):
+                at_end = (
+                    j == len(tokens)
+                    or (tokens[j].depth == depth and tokens[j].upper in _SELECT_LIST_END)
+                    or tokens[j].depth < depth
+                )
+                if at_end or (tokens[j].value == "," and tokens[j].depth == depth):
+                    last = j - 1
+                    if (
+                        last > item_start
+                        and _is_name(tokens[last])
+                        and tokens[last].depth == depth
+                        and tokens[last - 1].value != "."
+                        and tokens[last - 1].upper != "AS"
+                        and cls._follows_expression(tokens[last - 1])
+                    ):
+                        aliases.add(tokens[last].value.lower())
+                    if at_end:
+                        break
+                    item_start = j + 1
+                j += 1
+        return aliases
+
+    @staticmethod
+    def _source_name_positions(tokens: List[Token]) -> Set[int]:
+        """Token indexes that name FROM / JOIN objects, schemas or their aliases"""
+        positions = set()
+        for i, token in enumerate(tokens):
+            if token.upper not in ("FROM", "JOIN", "APPLY"):
+                continue
+            j = i + 1
+            while j < len(tokens):
+                if tokens[j].value == "(":
+                    j = skip_parens(tokens, j)
+                else:
+                    while j < len(tokens) and (_is_name(tokens[j]) or tokens[j].value == "."):
+                        positions.add(j)
+                        j += 1
+                if j < len(tokens) and tokens[j].upper == "AS":
+                    j += 1
+                if j < len(tokens) and _is_name(tokens[j]):
+                    positions.add(j)
+                    j += 1
+                if token.upper == "FROM" and j < len(tokens) and tokens[j].value == ",":
+                    j += 1
+                    continue
+                break
+        return positions
+
+    # ==================== Stats ====================
+
+    def record_repair(self):
+        """Count a statement fixed by the repair prompt"""
+        self.repaired += 1
+
+    def record_fail_open(self):
+        """Count a rejected statement executed anyway (catalog errors only)"""
+        self.failed_open += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get validator statistics"""
+        return {
+            "catalog_objects": len(self._base_catalog) if self._base_catalog else 0,
+            "validated": self.validated,
+            "rejected": self.rejected,
+            "repaired": self.repaired,
+            "failed_open": self.failed_open,
+            "gateway_executions_prevented": self.rejected - self.failed_open,
+            "rejections_by_code": dict(self.rejections_by_code),
+            "tenant_catalogs": len(self._tenant_catalogs),
+        }
+
+
+# Global SQL validator instance
+sql_validator = SQLValidator(settings.sql_validator_catalog_path, settings.sql_validator_schema_ttl)
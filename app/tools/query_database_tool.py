@@ -9,6 +9,7 @@ import time
 
 from app.tools.base_tool import ChatbotTool
 from app.agents.sql_agent import sql_agent
+from app.services.result_snapshots import result_snapshot_store
 from app.middleware.rbac import rbac_middleware
 from app.middleware.audit_logger import audit_logger
 
@@ -74,6 +75,7 @@ class QueryDatabaseTool(ChatbotTool):
         user_role: Optional[str] = None,
         department: Optional[str] = None,
         conversation_history: Optional[List[Dict]] = None,
+        session_id: Optional[str] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -94,6 +96,7 @@ class QueryDatabaseTool(ChatbotTool):
             user_role: Optional user role (fetched from DB if not provided)
             department: Optional department for HR_MANAGER scoping
             conversation_history: Optional list of previous conversation messages for context
+            session_id: Conversation session (the result is kept for follow-up questions)
             **kwargs: Additional parameters
 
         Returns:
@@ -136,7 +139,8 @@ class QueryDatabaseTool(ChatbotTool):
                 sql_result = sql_agent.generate_sql(
                     question=question,
                     user_id=user_id,
-                    conversation_history=conversation_history
+                    conversation_history=conversation_history,
+                    session_id=session_id
                 )
             except Exception as gen_err:
                 logger.error(f"DEBUG: sql_agent.generate_sql FAILED: {type(gen_err).__name__}: {gen_err}")
@@ -148,12 +152,17 @@ class QueryDatabaseTool(ChatbotTool):
             logger.info(f"Generated SQL: {original_sql[:100]}...")
 
             # Step 4: Apply data scoping based on role
-            scoped_sql = self._apply_data_scoping(
-                sql_query=original_sql,
-                user_role=user_role,
-                user_id=user_id,
-                department=department
-            )
+            # (follow-ups answered from the previous, already scoped, result need none)
+            answered_from_snapshot = sql_result.get("results") is not None
+            if answered_from_snapshot:
+                scoped_sql = original_sql
+            else:
+                scoped_sql = self._apply_data_scoping(
+                    sql_query=original_sql,
+                    user_role=user_role,
+                    user_id=user_id,
+                    department=department
+                )
 
             data_scoped = (scoped_sql != original_sql)
             if data_scoped:
@@ -161,8 +170,12 @@ class QueryDatabaseTool(ChatbotTool):
                 logger.debug(f"Scoped SQL: {scoped_sql}")
 
             # Step 5: Execute the scoped query
-            logger.info(f"Executing scoped query...")
-            results = sql_agent.execute_query(scoped_sql)
+            if answered_from_snapshot:
+                results = sql_result["results"]
+            else:
+                logger.info(f"Executing scoped query...")
+                results = sql_agent.execute_query(scoped_sql)
+            result_snapshot_store.record(session_id, user_id, scoped_sql, results, history_sql=original_sql)
 
             # Step 6: Format natural language answer (include SQL query in answer)
             natural_answer = sql_agent._format_answer(question, results, sql_query=scoped_sql)
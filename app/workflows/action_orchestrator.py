@@ -11,7 +11,7 @@ import operator
 from loguru import logger
 import google.generativeai as genai
 import json
-import re
+import time
 
 from app.config import settings
 from app.tools.access_control_tools import (
@@ -45,6 +45,10 @@ from app.middleware.audit_logger import audit_logger
 # Use Gateway-based employee lookup (routes through WebSocket to local DB)
 # This replaces direct pyodbc connection that times out from VM
 from app.services.gateway_employee_lookup import gateway_employee_lookup_service as employee_lookup_service
+from app.services.action_rule_parser import action_rule_parser
+from app.services.llm_usage import llm_usage
+from app.services.query_cache import query_cache
+from app.services.sql_result_cache import sql_result_cache
 
 
 class ActionState(TypedDict):
@@ -103,6 +107,9 @@ class ActionOrchestrator:
         - "Block user EMP002 from Building A" -> block_access (requires confirmation)
     """
 
+    # Actions that only read data (cached query results stay valid)
+    READ_ONLY_ACTIONS = {"list_access", "database_backup"}
+
     # Mapping of action types to tools
     ACTION_TOOLS = {
         # Phase 5 - Original Access Control Tools
@@ -214,7 +221,7 @@ class ActionOrchestrator:
 
     def _classify_action(self, state: ActionState) -> ActionState:
         """
-        Step 1: Classify the action request using Gemini
+        Step 1: Classify the action request (rule parser first, Gemini if unsure)
 
         Extracts:
         - action_type: grant_access, block_access, revoke_access, list_access
@@ -222,6 +229,12 @@ class ActionOrchestrator:
         """
         logger.info(f"[ACTION_ORCHESTRATOR] Classifying action for: {state['question']}")
 
+        parsed = action_rule_parser.parse(state['question'])
+        if parsed["confidence"] >= settings.action_rule_confidence_threshold:
+            state["action_type"] = parsed["action_type"]
+            state["action_params"] = parsed["action_params"]
+            return state
+
         try:
             prompt = f"""Analyze this user request and extract the access control action.
 
@@ -453,7 +466,9 @@ Now classify this request:
 
 JSON Response:"""
 
+            started_at = time.perf_counter()
             response = self.model.generate_content(prompt)
+            llm_usage.record_gemini(response, started_at, stage="action_classification")
             classification = response.text.strip()
 
             # Parse JSON response
@@ -483,399 +498,9 @@ JSON Response:"""
             return state
 
     def _classify_action_fallback(self, question: str) -> Dict[str, Any]:
-        """Fallback keyword-based action classifier"""
-        question_lower = question.lower()
-        target_user_id = None
-
-        # Try multiple patterns to extract target user
-        # Pattern 1: "employee EMP999" or "to employee EMP999" - employee code pattern
-        emp_code_match = re.search(r'employee\s+([A-Za-z]{2,4}\d{2,})', question, re.IGNORECASE)
-        if emp_code_match:
-            target_user_id = emp_code_match.group(1).upper()
-
-        # Pattern 2: "emp XXX" or "user XXX" (as standalone words, not part of "employee")
-        if not target_user_id:
-            user_id_match = re.search(r'\b(?:emp|user)\b\s*[-_]?\s*(\d+|[a-z]+\d+)', question_lower)
-            if user_id_match:
-                target_user_id = user_id_match.group(1).upper()
-
-        # Pattern 3: "to XXX" or "for XXX" - extract what comes after (but not "to employee")
-        if not target_user_id:
-            # Match "grant access to ADITYA SINGH" or "block access for 2424130187"
-            to_match = re.search(r'(?:to|for)\s+(?!employee\b)([a-zA-Z0-9\s]+?)(?:\s+access|\s+from|\s*$)', question, re.IGNORECASE)
-            if to_match:
-                target_user_id = to_match.group(1).strip()
-
-        # Pattern 4: Just a number (employee code) anywhere in the string
-        if not target_user_id:
-            number_match = re.search(r'\b(\d{3,})\b', question)  # 3+ digit numbers are likely employee codes
-            if number_match:
-                target_user_id = number_match.group(1)
-
-        # Pattern 5: Employee code pattern anywhere (EMP001, EMP999, etc.)
-        if not target_user_id:
-            code_match = re.search(r'\b([A-Za-z]{2,4}\d{3,})\b', question)
-            if code_match:
-                target_user_id = code_match.group(1).upper()
-
-        # Pattern 6: Name at the end - "grant access ADITYA SINGH" or "block ADITYA SINGH"
-        if not target_user_id:
-            # Match capitalized words at end that look like names
-            name_match = re.search(r'(?:grant|block|revoke|list)\s+(?:access\s+)?(?:to\s+)?([A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*)\s*$', question)
-            if name_match:
-                target_user_id = name_match.group(1).strip()
-
-        logger.info(f"[ACTION_ORCHESTRATOR] Fallback extracted target_user_id: {target_user_id}")
-
-        if any(kw in question_lower for kw in ['grant', 'give', 'allow', 'provide access']):
-            return {
-                "action_type": "grant_access",
-                "action_params": {"target_user_id": target_user_id}
-            }
-        elif any(kw in question_lower for kw in ['block', 'deny', 'stop', 'prevent']):
-            return {
-                "action_type": "block_access",
-                "action_params": {"target_user_id": target_user_id}
-            }
-        elif any(kw in question_lower for kw in ['revoke', 'remove', 'delete permission']):
-            return {
-                "action_type": "revoke_access",
-                "action_params": {"target_user_id": target_user_id}
-            }
-        elif any(kw in question_lower for kw in ['list', 'show', 'what access', 'permissions']):
-            return {
-                "action_type": "list_access",
-                "action_params": {"target_user_id": target_user_id}
-            }
-
-        # Phase 6 - Extended Access Control Actions Fallback
-        elif any(kw in question_lower for kw in ['enroll employee', 'add employee', 'new employee', 'create employee', 'register employee']):
-            # Try to extract employee details
-            emp_name = None
-            corp_emp_code = None
-
-            # Try to extract name after "enroll employee" or "add employee"
-            # Stop at keywords like "with", "code", "in", "to", "for"
-            name_match = re.search(r'(?:enroll|add|new|create|register)\s+(?:a\s+)?(?:new\s+)?employee\s+(?:named?\s+)?([A-Za-z]+(?:\s+[A-Za-z]+)?)(?:\s+(?:with|code|in|to|for|department)|$)', question, re.IGNORECASE)
-            if name_match:
-                emp_name = name_match.group(1).strip()
-
-            # Try to extract employee code (pattern like EMP001, EMP999, etc.)
-            code_match = re.search(r'(?:code|with code|employee code|emp code)?\s*([A-Z]{2,4}[-_]?\d{3,})', question, re.IGNORECASE)
-            if code_match:
-                corp_emp_code = code_match.group(1).upper()
-            else:
-                # Try just a code pattern
-                code_match = re.search(r'\b([A-Z]{2,4}\d{3,})\b', question, re.IGNORECASE)
-                if code_match:
-                    corp_emp_code = code_match.group(1).upper()
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback enroll_employee: name={emp_name}, code={corp_emp_code}")
-            return {
-                "action_type": "enroll_employee",
-                "action_params": {
-                    "emp_name": emp_name,
-                    "corp_emp_code": corp_emp_code
-                }
-            }
-
-        elif any(kw in question_lower for kw in ['enroll card', 'assign card', 'issue card', 'card enrollment']):
-            # Try to extract card number and employee ID
-            card_number = None
-            employee_id = target_user_id
-
-            # Try to extract card number
-            card_match = re.search(r'card\s*(?:number|no|#)?\s*[:=]?\s*(\d{6,})', question, re.IGNORECASE)
-            if card_match:
-                card_number = card_match.group(1)
-            else:
-                # Look for long number (card numbers are usually 8+ digits)
-                card_match = re.search(r'\b(\d{8,})\b', question)
-                if card_match:
-                    card_number = card_match.group(1)
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback enroll_card: employee={employee_id}, card={card_number}")
-            return {
-                "action_type": "enroll_card",
-                "action_params": {
-                    "employee_id": employee_id,
-                    "card_number": card_number,
-                    "access_scope": "card_only"
-                }
-            }
-
-        elif any(kw in question_lower for kw in ['register visitor', 'add visitor', 'new visitor', 'visitor registration', 'create visitor']):
-            # Try to extract visitor name
-            first_name = None
-            last_name = None
-
-            name_match = re.search(r'(?:visitor|register)\s+(?:named?\s+)?([A-Za-z]+)(?:\s+([A-Za-z]+))?', question, re.IGNORECASE)
-            if name_match:
-                first_name = name_match.group(1)
-                last_name = name_match.group(2) if name_match.group(2) else None
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback register_visitor: first_name={first_name}, last_name={last_name}")
-            return {
-                "action_type": "register_visitor",
-                "action_params": {
-                    "first_name": first_name,
-                    "last_name": last_name
-                }
-            }
-
-        elif any(kw in question_lower for kw in ['temporary card', 'temp card', 'visitor card']):
-            return {
-                "action_type": "assign_temporary_card",
-                "action_params": {"target_user_id": target_user_id}
-            }
-
-        elif any(kw in question_lower for kw in ['database backup', 'backup database', 'db backup', 'backup oryggi', 'backup the database']):
-            return {
-                "action_type": "database_backup",
-                "action_params": {"database_name": "Oryggi", "backup_type": "full"}
-            }
-
-        elif any(kw in question_lower for kw in ['door access', 'manage door', 'grant door', 'block door']):
-            # Determine if grant or block
-            action = "grant" if "grant" in question_lower else "block"
-            return {
-                "action_type": "manage_door_access",
-                "action_params": {
-                    "employee_id": target_user_id,
-                    "action": action
-                }
-            }
-
-        # IMPORTANT: Check biometric enrollment BEFORE manage_authentication
-        # because auth keywords like 'palm', 'face', 'finger' overlap
-        elif any(kw in question_lower for kw in ['enroll biometric', 'biometric enrollment', 'trigger enrollment',
-                                                   'enroll face', 'enroll palm', 'enroll finger', 'enroll fingerprint',
-                                                   'start enrollment', 'begin enrollment', 'capture biometric',
-                                                   'face enrollment', 'palm enrollment', 'finger enrollment',
-                                                   'fingerprint enrollment', 'biometric capture']):
-            # Determine biometric type
-            biometric_type = "face"  # default
-            if any(kw in question_lower for kw in ['palm']):
-                biometric_type = "palm"
-            elif any(kw in question_lower for kw in ['finger', 'fingerprint']):
-                biometric_type = "finger"
-            elif any(kw in question_lower for kw in ['all biometric', 'all biometrics']):
-                biometric_type = "all"
-
-            # Try to extract terminal name
-            terminal_name = None
-            terminal_match = re.search(r'(?:on|at|terminal|device)\s+([A-Za-z0-9_-]+)', question, re.IGNORECASE)
-            if terminal_match:
-                terminal_name = terminal_match.group(1)
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback biometric_enrollment: employee={target_user_id}, type={biometric_type}, terminal={terminal_name}")
-            return {
-                "action_type": "trigger_biometric_enrollment",
-                "action_params": {
-                    "employee_id": target_user_id,
-                    "biometric_type": biometric_type,
-                    "terminal_name": terminal_name
-                }
-            }
-
-        elif any(kw in question_lower for kw in ['add authentication', 'remove authentication', 'add fingerprint', 'remove fingerprint',
-                                                   'add face', 'remove face', 'add card auth', 'remove card auth',
-                                                   'manage authentication', 'authentication type', 'set authentication',
-                                                   'enable fingerprint', 'disable fingerprint', 'enable face', 'disable face',
-                                                   'fusion', 'palm', 'card only', 'face only', 'finger only']):
-            # Determine action (add or remove)
-            action = "remove" if any(kw in question_lower for kw in ['remove', 'disable', 'delete']) else "add"
-
-            # Determine authentication type - prefer named types over numeric codes
-            auth_type = None
-            auth_type_name = None
-
-            # Check for authentication type names (more user-friendly)
-            # These map to API's authentication type names
-            auth_type_mappings = {
-                # Name-based mappings (priority)
-                'fusion': 'Fusion',
-                'palm': 'Palm',
-                'palm only': 'Palm Only',
-                'face only': 'Face Only',
-                'finger only': 'Finger Only',
-                'fingerprint only': 'Finger Only',
-                'card only': 'Card Only',
-                'card + face': 'Card + Face',
-                'card+face': 'Card + Face',
-                'card and face': 'Card + Face',
-                'card + finger': 'Card + Finger',
-                'card+finger': 'Card + Finger',
-                'card and finger': 'Card + Finger',
-                'card + fingerprint': 'Card + Finger',
-                'card+fingerprint': 'Card + Finger',
-                'card and fingerprint': 'Card + Finger',
-                'card + palm': 'Card + Palm',
-                'card+palm': 'Card + Palm',
-                'card and palm': 'Card + Palm',
-            }
-
-            # Try to find authentication type name from keywords
-            for keyword, type_name in auth_type_mappings.items():
-                if keyword in question_lower:
-                    auth_type_name = type_name
-                    logger.info(f"[ACTION_ORCHESTRATOR] Fallback found auth_type_name: {auth_type_name} from keyword: {keyword}")
-                    break
-
-            # If no name found, fall back to numeric detection
-            if not auth_type_name:
-                if any(kw in question_lower for kw in ['fingerprint', 'finger']):
-                    auth_type = 2
-                elif any(kw in question_lower for kw in ['face', 'facial']):
-                    auth_type = 5
-                elif any(kw in question_lower for kw in ['card']):
-                    auth_type = 1001
-                else:
-                    # Default to Card Only if nothing specified
-                    auth_type = 1001
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback manage_authentication: employee={target_user_id}, action={action}, auth_type_name={auth_type_name}, auth_type={auth_type}")
-
-            # Build params - prefer auth_type_name if available
-            params = {
-                "employee_id": target_user_id,
-                "action": action,
-            }
-            if auth_type_name:
-                params["authentication_type_name"] = auth_type_name
-            else:
-                params["authentication_type"] = auth_type
-
-            return {
-                "action_type": "manage_authentication",
-                "action_params": params
-            }
-
-        # Phase 7 - Employee Action (Activate/Deactivate)
-        elif any(kw in question_lower for kw in ['activate employee', 'deactivate employee', 'enable employee', 'disable employee',
-                                                   'activate user', 'deactivate user', 'activate ecode', 'deactivate ecode']):
-            # Determine action
-            action = "activate" if any(kw in question_lower for kw in ['activate', 'enable']) else "deactivate"
-
-            # Try to extract ecode (numeric employee ID)
-            ecode = None
-            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
-            if ecode_match:
-                ecode = int(ecode_match.group(1))
-            else:
-                # Try to find any number that looks like an ecode
-                number_match = re.search(r'\b(\d{3,})\b', question)
-                if number_match:
-                    ecode = int(number_match.group(1))
-
-            # Try to extract employee name if no ecode
-            employee_name = None
-            if not ecode:
-                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
-                if name_match:
-                    employee_name = name_match.group(1).strip()
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback employee_action: action={action}, ecode={ecode}, name={employee_name}")
-            return {
-                "action_type": "employee_action",
-                "action_params": {
-                    "action": action,
-                    "ecode": ecode,
-                    "employee_name": employee_name
-                }
-            }
-
-        # Phase 8 - Employee Blacklist (Blacklist/Remove from Blacklist)
-        elif any(kw in question_lower for kw in ['blacklist employee', 'blacklist user', 'add to blacklist', 'remove from blacklist',
-                                                   'unblacklist employee', 'unblacklist user', 'remove blacklist']):
-            # Determine action
-            if any(kw in question_lower for kw in ['remove from blacklist', 'unblacklist', 'remove blacklist']):
-                action = "remove_blacklist"
-            else:
-                action = "blacklist"
-
-            # Try to extract ecode (numeric employee ID)
-            ecode = None
-            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
-            if ecode_match:
-                ecode = int(ecode_match.group(1))
-            else:
-                # Try to find any number that looks like an ecode
-                number_match = re.search(r'\b(\d{3,})\b', question)
-                if number_match:
-                    ecode = int(number_match.group(1))
-
-            # Try to extract employee name if no ecode
-            employee_name = None
-            if not ecode:
-                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
-                if name_match:
-                    employee_name = name_match.group(1).strip()
-
-            # Try to extract reason for blacklisting
-            reason = None
-            reason_match = re.search(r'(?:for|reason|because)\s+(.+?)(?:\.|$)', question, re.IGNORECASE)
-            if reason_match:
-                reason = reason_match.group(1).strip()
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback employee_blacklist: action={action}, ecode={ecode}, name={employee_name}, reason={reason}")
-            return {
-                "action_type": "employee_blacklist",
-                "action_params": {
-                    "action": action,
-                    "ecode": ecode,
-                    "employee_name": employee_name,
-                    "reason": reason
-                }
-            }
-
-        # Phase 9 - Employee Terminate (Terminate/Un-terminate)
-        elif any(kw in question_lower for kw in ['terminate employee', 'terminate user', 'un-terminate employee', 'unterminate employee',
-                                                   'reinstate employee', 'un terminate', 'has resigned', 'has left']):
-            # Determine action
-            if any(kw in question_lower for kw in ['un-terminate', 'unterminate', 'un terminate', 'reinstate']):
-                action = "un_terminate"
-            else:
-                action = "terminate"
-
-            # Try to extract ecode (numeric employee ID)
-            ecode = None
-            ecode_match = re.search(r'(?:ecode|employee|user)\s*[:=]?\s*(\d+)', question, re.IGNORECASE)
-            if ecode_match:
-                ecode = int(ecode_match.group(1))
-            else:
-                # Try to find any number that looks like an ecode
-                number_match = re.search(r'\b(\d{3,})\b', question)
-                if number_match:
-                    ecode = int(number_match.group(1))
-
-            # Try to extract employee name if no ecode
-            employee_name = None
-            if not ecode:
-                name_match = re.search(r'(?:employee|user)\s+([A-Za-z]+(?:\s+[A-Za-z]+)?)', question, re.IGNORECASE)
-                if name_match:
-                    employee_name = name_match.group(1).strip()
-
-            # Try to extract reason for termination
-            reason = None
-            reason_match = re.search(r'(?:for|reason|because|due to)\s+(.+?)(?:\.|$)', question, re.IGNORECASE)
-            if reason_match:
-                reason = reason_match.group(1).strip()
-            elif 'resign' in question_lower:
-                reason = "Resignation"
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Fallback employee_terminate: action={action}, ecode={ecode}, name={employee_name}, reason={reason}")
-            return {
-                "action_type": "employee_terminate",
-                "action_params": {
-                    "action": action,
-                    "ecode": ecode,
-                    "employee_name": employee_name,
-                    "reason": reason
-                }
-            }
-
-        return {"action_type": "none", "action_params": {}}
+        """Keyword/rule-based action classifier used when the LLM is unavailable"""
+        result = action_rule_parser.parse(question)
+        return {"action_type": result["action_type"], "action_params": result["action_params"]}
 
     def _check_requires_confirmation(self, state: ActionState) -> ActionState:
         """
@@ -1029,6 +654,8 @@ JSON Response:"""
 
             if not result.get("success"):
                 state["error"] = result.get("error")
+            else:
+                self._invalidate_cached_results(action_type)
 
             logger.info(f"[ACTION_ORCHESTRATOR] Action executed: success={state['success']}")
 
@@ -1344,9 +971,25 @@ JSON Response:"""
             }
 
     async def _classify_action_simple(self, question: str) -> Dict[str, Any]:
-        """Classify action using Gemini (simplified without state)"""
+        """
+        Classify action (simplified without state)
+
+        Clear commands are resolved by the rule parser without an LLM call;
+        Gemini is only consulted below settings.action_rule_confidence_threshold.
+        """
+        parsed = action_rule_parser.parse(question)
+        if parsed["confidence"] >= settings.action_rule_confidence_threshold:
+            return {"action_type": parsed["action_type"], "action_params": parsed["action_params"]}
+
         try:
-            prompt = f"""Analyze this user request and extract the access control action.
+            return await self._classify_action_llm(question)
+        except Exception as e:
+            logger.error(f"[ACTION_ORCHESTRATOR] Classification failed: {str(e)}")
+            return {"action_type": parsed["action_type"], "action_params": parsed["action_params"]}
+
+    async def _classify_action_llm(self, question: str) -> Dict[str, Any]:
+        """Classify action using Gemini (async, does not block the event loop)"""
+        prompt = f"""Analyze this user request and extract the access control action.
 
 USER REQUEST:
 {question}
@@ -1429,24 +1072,22 @@ Return ONLY a JSON object:
 
 JSON Response:"""
 
-            response = self.model.generate_content(prompt)
-            classification = response.text.strip()
-
-            logger.info(f"[ACTION_ORCHESTRATOR] Raw Gemini response: {classification[:500]}")
+        started_at = time.perf_counter()
+        response = await self.model.generate_content_async(prompt)
+        llm_usage.record_gemini(response, started_at, stage="action_classification")
+        classification = response.text.strip()
 
-            # Parse JSON response
-            if "```json" in classification:
-                classification = classification.split("```json")[1].split("```")[0].strip()
-            elif "```" in classification:
-                classification = classification.split("```")[1].split("```")[0].strip()
+        logger.info(f"[ACTION_ORCHESTRATOR] Raw Gemini response: {classification[:500]}")
 
-            parsed = json.loads(classification)
-            logger.info(f"[ACTION_ORCHESTRATOR] Parsed classification: {parsed}")
-            return parsed
+        # Parse JSON response
+        if "```json" in classification:
+            classification = classification.split("```json")[1].split("```")[0].strip()
+        elif "```" in classification:
+            classification = classification.split("```")[1].split("```")[0].strip()
 
-        except Exception as e:
-            logger.error(f"[ACTION_ORCHESTRATOR] Classification failed: {str(e)}")
-            return self._classify_action_fallback(question)
+        parsed = json.loads(classification)
+        logger.info(f"[ACTION_ORCHESTRATOR] Parsed classification: {parsed}")
+        return parsed
 
     async def _handle_pending_action_confirmation(
         self,
@@ -1640,6 +1281,8 @@ JSON Response:"""
             actual_error = inner_result.get("error") or result.get("error")
 
             logger.info(f"[ACTION_ORCHESTRATOR] Tool result - wrapper_success={result.get('success')}, actual_success={actual_success}")
+            if actual_success:
+                self._invalidate_cached_results(action_type, database_id)
 
             return {
                 "success": actual_success,
@@ -1652,6 +1295,20 @@ JSON Response:"""
             logger.error(f"[ACTION_ORCHESTRATOR] Execution failed: {str(e)}")
             return {"success": False, "error": str(e), "answer": f"Action failed: {str(e)}"}
 
+    def _invalidate_cached_results(self, action_type: str, database_id: Optional[str] = None):
+        """
+        Drop cached query results the action may have made stale
+
+        Args:
+            action_type: Executed action
+            database_id: Database the action ran against (None = the tool picked
+                one, so every database's entries are dropped)
+        """
+        if action_type in self.READ_ONLY_ACTIONS:
+            return
+        removed = sql_result_cache.invalidate(database_id) + query_cache.invalidate(database_id)
+        logger.info(f"[ACTION_ORCHESTRATOR] {action_type} changed data - dropped {removed} cached results")
+
     def _format_action_result(self, action_type: str, result: Dict[str, Any]) -> str:
         """Format action result into human-readable answer"""
         # Note: result is wrapped by base_tool.run() as {"success": True, "result": {...}, "error": None}
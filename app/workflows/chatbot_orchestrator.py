@@ -9,10 +9,13 @@ from typing import Any, Dict, List, Optional, TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 import operator
 import asyncio
+import time
 from loguru import logger
 import google.generativeai as genai
 
 from app.config import settings
+from app.services.llm_transport import llm_transport
+from app.services.llm_usage import llm_usage
 from app.tools.query_database_tool import query_database_tool
 from app.tools.generate_report_tool import generate_report_tool
 from app.tools.email_tools import send_email_tool
@@ -99,10 +102,15 @@ class ChatbotOrchestrator:
     """
 
     def __init__(self):
-        """Initialize orchestrator with Gemini for intent classification"""
+        """Initialize orchestrator with Gemini (or OpenRouter) for intent classification"""
         genai.configure(api_key=settings.gemini_api_key)
         self.model = genai.GenerativeModel(settings.gemini_model)
 
+        # OpenRouter classification goes through the shared pooled HTTP transport
+        self.use_openrouter = (
+            settings.llm_provider.lower() == "openrouter" and bool(settings.openrouter_api_key)
+        )
+
         # Build LangGraph state machine
         self.workflow = self._build_workflow()
 
@@ -206,8 +214,10 @@ class ChatbotOrchestrator:
 
         PERFORMANCE OPTIMIZED:
         - Uses singleton ConversationStore and caches history in state
-        - Runs clarity assessment AND intent classification in PARALLEL
-          This saves 2-5 seconds by overlapping two LLM calls
+        - Default ("combined" triage mode): clarity, intent and clarification
+          options come from ONE LLM call, with heuristics as a zero-LLM pre-filter
+        - "parallel" triage mode: clarity assessment AND intent classification
+          run as two overlapping LLM calls
         """
         logger.info(f"[ORCHESTRATOR:CLARITY] Assessing clarity for: {state['question']}")
 
@@ -229,44 +239,28 @@ class ChatbotOrchestrator:
                 except Exception as e:
                     logger.warning(f"[ORCHESTRATOR:CLARITY] Failed to get history: {e}")
 
-            # PERFORMANCE OPTIMIZATION: Run clarity and intent classification in PARALLEL
-            # This saves 2-5 seconds by overlapping two LLM calls
-            # Intent result will be used later if clarity passes
-            logger.info("[ORCHESTRATOR:PARALLEL] Running clarity + intent in parallel")
-
-            # Create parallel tasks
-            clarity_task = clarity_assessor.assess_clarity(
-                question=state["question"],
-                conversation_history=conversation_history
-            )
-            intent_task = self._classify_intent_async(state["question"])
-
-            # Run both tasks concurrently
-            assessment, intent_result = await asyncio.gather(
-                clarity_task,
-                intent_task,
-                return_exceptions=True  # Don't fail if one fails
-            )
-
-            # Handle potential exceptions from gather
-            if isinstance(assessment, Exception):
-                logger.error(f"[ORCHESTRATOR:PARALLEL] Clarity assessment failed: {assessment}")
-                # Default to clear on error
-                state["is_clear"] = True
-                state["clarity_confidence"] = 0.5
-                state["needs_clarification"] = False
-                assessment = None
-            else:
+            clarification = None
+            if settings.chatbot_triage_mode.lower() == "combined":
+                # One LLM round trip for clarity + intent + clarification options
+                triage = await clarity_assessor.triage(
+                    question=state["question"],
+                    conversation_history=conversation_history,
+                    llm_complete=self._complete_async
+                )
+                assessment = triage.assessment
+                clarification = triage.clarification
                 state["is_clear"] = assessment.is_clear
                 state["clarity_confidence"] = assessment.confidence
 
-            if isinstance(intent_result, Exception):
-                logger.error(f"[ORCHESTRATOR:PARALLEL] Intent classification failed: {intent_result}")
-                intent_result = None
+                if assessment.is_clear:
+                    intent_result = triage.intent or self._classify_intent_fallback(state["question"])
+                    state["precomputed_intent"] = intent_result
+                    logger.info(
+                        f"[ORCHESTRATOR:TRIAGE] Pre-computed intent: {intent_result.get('intent', 'unknown')} "
+                        f"({triage.llm_calls} LLM call)"
+                    )
             else:
-                # Store pre-computed intent for later use
-                state["precomputed_intent"] = intent_result
-                logger.info(f"[ORCHESTRATOR:PARALLEL] Pre-computed intent: {intent_result.get('intent', 'unknown')}")
+                assessment = await self._assess_clarity_parallel(state, conversation_history)
 
             # Process clarity result if we have it
             if assessment and not assessment.is_clear:
@@ -274,12 +268,13 @@ class ChatbotOrchestrator:
                 logger.info(f"[ORCHESTRATOR:CLARITY] Reason: {assessment.reason}")
                 logger.info(f"[ORCHESTRATOR:CLARITY] Missing: {assessment.missing_info}")
 
-                # Generate clarifying question with options
-                clarification = await clarity_assessor.generate_clarifying_question(
-                    question=state["question"],
-                    assessment=assessment,
-                    previous_clarifications=None  # TODO: Get from session state
-                )
+                # Generate clarifying question with options (unless triage already supplied one)
+                if clarification is None:
+                    clarification = await clarity_assessor.generate_clarifying_question(
+                        question=state["question"],
+                        assessment=assessment,
+                        previous_clarifications=None  # TODO: Get from session state
+                    )
 
                 state["needs_clarification"] = True
                 state["clarification_question"] = clarification.question
@@ -302,6 +297,66 @@ class ChatbotOrchestrator:
             state["needs_clarification"] = False
             return state
 
+    async def _assess_clarity_parallel(
+        self,
+        state: ChatbotState,
+        conversation_history: List[Dict[str, Any]]
+    ) -> Optional[ClarityAssessment]:
+        """
+        Two-call triage (chatbot_triage_mode="parallel"): clarity assessment and
+        intent classification as separate LLM calls run concurrently.
+
+        Stores is_clear / clarity_confidence / precomputed_intent in state.
+
+        Returns:
+            ClarityAssessment, or None if the assessment failed
+        """
+        logger.info("[ORCHESTRATOR:PARALLEL] Running clarity + intent in parallel")
+
+        # Create parallel tasks
+        clarity_task = clarity_assessor.assess_clarity(
+            question=state["question"],
+            conversation_history=conversation_history
+        )
+        intent_task = self._classify_intent_async(state["question"])
+
+        # Run both tasks concurrently
+        assessment, intent_result = await asyncio.gather(
+            clarity_task,
+            intent_task,
+            return_exceptions=True  # Don't fail if one fails
+        )
+
+        # Handle potential exceptions from gather
+        if isinstance(assessment, Exception):
+            logger.error(f"[ORCHESTRATOR:PARALLEL] Clarity assessment failed: {assessment}")
+            # Default to clear on error
+            state["is_clear"] = True
+            state["clarity_confidence"] = 0.5
+            state["needs_clarification"] = False
+            assessment = None
+        else:
+            state["is_clear"] = assessment.is_clear
+            state["clarity_confidence"] = assessment.confidence
+
+        if isinstance(intent_result, Exception):
+            logger.error(f"[ORCHESTRATOR:PARALLEL] Intent classification failed: {intent_result}")
+        else:
+            # Store pre-computed intent for later use
+            state["precomputed_intent"] = intent_result
+            logger.info(f"[ORCHESTRATOR:PARALLEL] Pre-computed intent: {intent_result.get('intent', 'unknown')}")
+
+        return assessment
+
+    async def _complete_async(self, prompt: str) -> str:
+        """Single-prompt completion on the orchestrator's LLM provider"""
+        if self.use_openrouter:
+            return await llm_transport.complete(prompt, temperature=settings.gemini_temperature)
+        started_at = time.perf_counter()
+        response = await self.model.generate_content_async(prompt)
+        llm_usage.record_gemini(response, started_at)
+        return response.text.strip()
+
     def _route_after_clarity(self, state: ChatbotState) -> str:
         """Routing logic after clarity assessment"""
         needs_clarification = state.get("needs_clarification", False)
@@ -470,8 +525,14 @@ Now classify this request:
 
 JSON Response:"""
 
-            response = self.model.generate_content(prompt)
-            classification = response.text.strip()
+            with llm_usage.stage("intent"):
+                if self.use_openrouter:
+                    classification = llm_transport.complete_sync(prompt, temperature=settings.gemini_temperature)
+                else:
+                    started_at = time.perf_counter()
+                    response = self.model.generate_content(prompt)
+                    llm_usage.record_gemini(response, started_at)
+                    classification = response.text.strip()
 
             # Parse JSON response
             import json
@@ -547,9 +608,15 @@ Return ONLY a JSON object with this exact structure:
 
 JSON Response:"""
 
-            # Run blocking LLM call in thread pool
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            classification = response.text.strip()
+            with llm_usage.stage("intent"):
+                if self.use_openrouter:
+                    classification = await llm_transport.complete(prompt, temperature=settings.gemini_temperature)
+                else:
+                    # Run blocking LLM call in thread pool
+                    started_at = time.perf_counter()
+                    response = await asyncio.to_thread(self.model.generate_content, prompt)
+                    llm_usage.record_gemini(response, started_at)
+                    classification = response.text.strip()
 
             # Parse JSON response
             import json
@@ -616,7 +683,8 @@ JSON Response:"""
                 user_role=state["user_role"],
                 question=state["question"],
                 user_id=state["user_id"],
-                conversation_history=conversation_history
+                conversation_history=conversation_history,
+                session_id=state["session_id"]
             )
 
             state["query_result"] = result
@@ -101,6 +101,7 @@ class GatewayConnection:
                 "agent_version": __version__,
                 "agent_hostname": socket.gethostname(),
                 "agent_os": f"{platform.system()} {platform.release()}",
+                "capabilities": ["estimate_plan"],
                 "timestamp": datetime.utcnow().isoformat(),
             }
 
@@ -236,16 +237,20 @@ class GatewayConnection:
         sql_query = message.get("sql_query")
         timeout = message.get("timeout", 60)
         max_rows = message.get("max_rows", 1000)
+        estimate_only = message.get("estimate_only", False)
 
-        logger.info(f"Executing query: {request_id}")
+        logger.info(f"{'Estimating' if estimate_only else 'Executing'} query: {request_id}")
         logger.debug(f"Query: {sql_query[:100]}...")
 
-        # Execute query on local database
-        result = self.database.execute_query(
-            query=sql_query,
-            timeout=timeout,
-            max_rows=max_rows,
-        )
+        # Execute query (or only compile its estimated plan) on local database
+        if estimate_only:
+            result = self.database.estimate_query_cost(query=sql_query, timeout=timeout)
+        else:
+            result = self.database.execute_query(
+                query=sql_query,
+                timeout=timeout,
+                max_rows=max_rows,
+            )
 
         # Build response
         if result["success"]:
@@ -5,6 +5,7 @@ Handles connections to the local SQL Server database.
 """
 
 import pyodbc
+import xml.etree.ElementTree as ET
 from typing import Dict, List, Any, Optional
 from datetime import datetime, date, time
 from decimal import Decimal
@@ -206,6 +207,84 @@ class LocalDatabaseManager:
                 "error_code": "UNEXPECTED_ERROR",
             }
 
+    def estimate_query_cost(
+        self,
+        query: str,
+        timeout: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the optimizer's estimated cost of a query without running it
+
+        Uses SET SHOWPLAN_XML ON. The setting is session-wide, so it is
+        always switched off again; if that fails the connection is dropped
+        and re-established on the next query.
+
+        Args:
+            query: SQL query string
+            timeout: Timeout in seconds for compiling the plan
+
+        Returns:
+            Dict shaped like execute_query with one row:
+            {"estimated_cost": float, "estimated_rows": float}
+        """
+        if not self._connection:
+            if not self.connect():
+                return {
+                    "success": False,
+                    "error": "Not connected to database",
+                    "error_code": "CONNECTION_ERROR",
+                }
+
+        start_time = datetime.utcnow()
+        cursor = None
+
+        try:
+            self._connection.timeout = timeout or self.config.query_timeout
+            cursor = self._connection.cursor()
+            cursor.execute("SET SHOWPLAN_XML ON")
+            try:
+                cursor.execute(query)
+                row = cursor.fetchone()
+            finally:
+                try:
+                    cursor.execute("SET SHOWPLAN_XML OFF")
+                except Exception as e:
+                    logger.warning(f"Could not reset SHOWPLAN_XML, reconnecting: {e}")
+                    self.disconnect()
+
+            cost = 0.0
+            rows = 0.0
+            if row and row[0]:
+                for element in ET.fromstring(row[0]).iter():
+                    if element.tag.rsplit("}", 1)[-1] != "StmtSimple":
+                        continue
+                    cost += float(element.get("StatementSubTreeCost") or 0)
+                    rows = max(rows, float(element.get("StatementEstRows") or 0))
+
+            execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            return {
+                "success": True,
+                "columns": ["estimated_cost", "estimated_rows"],
+                "rows": [{"estimated_cost": cost, "estimated_rows": rows}],
+                "row_count": 1,
+                "execution_time_ms": int(execution_time),
+            }
+
+        except pyodbc.Error as e:
+            logger.error(f"Query estimate error: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_code": e.args[0] if e.args else "QUERY_ERROR",
+            }
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "error_code": "UNEXPECTED_ERROR",
+            }
+
     def test_connection(self) -> Dict[str, Any]:
         """
         Test the database connection
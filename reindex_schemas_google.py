@@ -13,9 +13,14 @@ from app.rag.schema_extractor import schema_extractor
 from app.rag.schema_enricher import schema_enricher
 from app.rag.chroma_manager import chroma_manager
 
-def reindex_schemas_google(limit: int = None, rebuild: bool = False):
+def reindex_schemas_google(limit: int = None, rebuild: bool = False, force: bool = False):
     """
     Extract all database schemas, enrich them, and update ChromaDB index
+
+    Only tables whose extracted metadata changed are enriched again (the LLM
+    description differs on every run, so unchanged tables keep their stored
+    one), only new or changed schema documents are embedded, and tables that
+    no longer exist are removed (unless limit is set).
     """
     # Force Google provider settings for this script if not set in env
     if settings.embedding_provider != "google":
@@ -45,11 +50,24 @@ def reindex_schemas_google(limit: int = None, rebuild: bool = False):
 
         logger.info(f"✓ Extracted metadata for {len(tables_metadata)} tables")
 
-        # Step 2: Enrich schemas with AI-generated descriptions
+        # Step 2: Enrich schemas with AI-generated descriptions (changed tables only,
+        # unless forced - the stored document records the metadata it was enriched from)
         logger.info("\n[2/4] Enriching schemas with AI-generated descriptions...")
-        enriched_tables = schema_enricher.enrich_all_tables(tables_metadata)
+        stored = {} if force else chroma_manager.get_documents(
+            [f"schema_{table_meta['full_name']}" for table_meta in tables_metadata]
+        )
+        previous = {
+            metadata["full_name"]: (metadata["metadata_hash"], document)
+            for document, metadata in stored.values()
+            if metadata.get("metadata_hash") and metadata.get("full_name")
+        }
+        enriched_tables = schema_enricher.enrich_changed_tables(tables_metadata, previous)
+        enriched_count = len([enriched for enriched in enriched_tables if not enriched["reused"]])
 
-        logger.info(f"✓ Generated enriched descriptions for {len(enriched_tables)} tables")
+        logger.info(
+            f"✓ Generated enriched descriptions for {enriched_count} tables "
+            f"({len(enriched_tables) - enriched_count} unchanged)"
+        )
 
         # Step 3: Prepare documents for ChromaDB
         logger.info("\n[3/4] Preparing documents for vector store...")
@@ -67,7 +85,8 @@ def reindex_schemas_google(limit: int = None, rebuild: bool = False):
                 "type": "schema",
                 "table_name": enriched["table_name"],
                 "full_name": enriched["full_name"],
-                "num_columns": len(enriched["metadata"]["columns"])
+                "num_columns": len(enriched["metadata"]["columns"]),
+                "metadata_hash": enriched["metadata_hash"]
             })
 
             # ID is the full table name
@@ -78,10 +97,13 @@ def reindex_schemas_google(limit: int = None, rebuild: bool = False):
         # Step 4: Update ChromaDB index
         logger.info("\n[4/4] Updating ChromaDB vector store...")
         
-        chroma_manager.add_schema_embeddings(
+        sync = chroma_manager.sync_schema_embeddings(
             documents=documents,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            id_prefixes=("schema_",),
+            remove_missing=limit is None,
+            force=force
         )
 
         # Get final stats
@@ -92,15 +114,21 @@ def reindex_schemas_google(limit: int = None, rebuild: bool = False):
         elapsed = (datetime.now() - start_time).total_seconds()
         logger.info("\n" + "=" * 80)
         logger.info("RE-INDEXING COMPLETE")
-        logger.info(f"  Tables processed: {len(enriched_tables)}")
+        logger.info(f"  Tables processed: {len(enriched_tables)} ({enriched_count} enriched)")
         logger.info(f"  Total embeddings: {stats['count']}")
+        logger.info(f"  Added: {sync['added']}, updated: {sync['updated']}, "
+                    f"removed: {sync['removed']}, unchanged: {sync['skipped']}, failed: {sync['failed']}")
+        if sync["failed_ids"]:
+            logger.warning(f"  Not embedded (retried on the next run): {sync['failed_ids']}")
         logger.info(f"  Time elapsed: {elapsed:.2f}s")
         logger.info("=" * 80)
 
         return {
             "success": True,
             "tables_processed": len(enriched_tables),
+            "tables_enriched": enriched_count,
             "total_embeddings": stats['count'],
+            "sync": sync,
             "elapsed_seconds": elapsed
         }
 
@@ -112,10 +140,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Reindex database schemas into ChromaDB with Google Embeddings")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of tables")
     parser.add_argument("--rebuild", action="store_true", help="Rebuild index from scratch")
+    parser.add_argument("--force", action="store_true", help="Re-embed unchanged schemas too")
     
     args = parser.parse_args()
     
-    result = reindex_schemas_google(limit=args.limit, rebuild=args.rebuild)
+    result = reindex_schemas_google(limit=args.limit, rebuild=args.rebuild, force=args.force)
     
     if result and result["success"]:
         print(f"\n✓ Successfully reindexed {result['tables_processed']} tables")
@@ -0,0 +1,124 @@
+"""
+Action Classification Benchmark
+Scores ActionRuleParser against the labeled corpus in
+data/action_classification_corpus.json and times it. With --llm, also
+scores and times the Gemini classifier (ActionOrchestrator._classify_action_llm)
+on the same corpus.
+
+Reported per path:
+- accuracy: action_type and expected action_params all correct
+- fast-path coverage / precision: share of requests the parser answers
+  without the LLM (confidence >= threshold) and how many of those are correct
+
+Usage:
+    python -m tests.action_parser_benchmark [--llm] [iterations]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.config import settings
+from app.services.action_rule_parser import action_rule_parser
+
+
+CORPUS_PATH = Path(__file__).parent.parent / "data" / "action_classification_corpus.json"
+
+
+def load_corpus() -> List[Dict[str, Any]]:
+    """Load the labeled cases"""
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+def is_correct(case: Dict[str, Any], result: Dict[str, Any]) -> bool:
+    """A classification is correct when the type matches and every expected param is present"""
+    if result.get("action_type") != case["action_type"]:
+        return False
+    params = result.get("action_params") or {}
+    return all(params.get(key) == value for key, value in case["action_params"].items())
+
+
+def score_rule_parser(cases: List[Dict[str, Any]], threshold: float) -> Dict[str, Any]:
+    """Accuracy, fast-path coverage and fast-path precision of the rule parser"""
+    correct = fast = fast_correct = 0
+    misses = []
+    for case in cases:
+        result = action_rule_parser.parse(case["question"])
+        ok = is_correct(case, result)
+        correct += ok
+        if result["confidence"] >= threshold:
+            fast += 1
+            fast_correct += ok
+            if not ok:
+                misses.append((case["question"], result))
+    return {
+        "accuracy": correct / len(cases),
+        "fast_path_coverage": fast / len(cases),
+        "fast_path_precision": fast_correct / fast if fast else 1.0,
+        "fast_path_misses": misses,
+    }
+
+
+def time_rule_parser(cases: List[Dict[str, Any]], iterations: int) -> float:
+    """Return mean microseconds per question"""
+    questions = [case["question"] for case in cases]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for question in questions:
+            action_rule_parser.parse(question)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(questions)) * 1_000_000
+
+
+async def score_llm(cases: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Accuracy and mean latency of the Gemini classifier (makes one LLM call per case)"""
+    from app.workflows.action_orchestrator import action_orchestrator
+
+    correct = errors = 0
+    latencies = []
+    for case in cases:
+        start = time.perf_counter()
+        try:
+            result = await action_orchestrator._classify_action_llm(case["question"])
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        correct += is_correct(case, result)
+    return {
+        "accuracy": correct / len(cases),
+        "errors": errors,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def run_benchmark(iterations: int = 200, with_llm: bool = False):
+    """Run the benchmark and print a summary"""
+    cases = load_corpus()
+    threshold = settings.action_rule_confidence_threshold
+    rules = score_rule_parser(cases, threshold)
+    rule_us = time_rule_parser(cases, iterations)
+
+    print("Action Classification Benchmark")
+    print("=" * 60)
+    print(f"Cases: {len(cases)}  Threshold: {threshold}  Iterations: {iterations}")
+    print(f"  Rule parser accuracy:      {rules['accuracy']:6.1%}")
+    print(f"  Fast-path coverage:        {rules['fast_path_coverage']:6.1%}")
+    print(f"  Fast-path precision:       {rules['fast_path_precision']:6.1%}")
+    print(f"  Rule parser latency:       {rule_us:8.2f} us/question")
+    for question, result in rules["fast_path_misses"]:
+        print(f"  MISS: {question!r} -> {result['action_type']} {result['action_params']}")
+
+    if with_llm:
+        llm = asyncio.run(score_llm(cases))
+        print(f"  LLM accuracy:              {llm['accuracy']:6.1%} ({llm['errors']} errors)")
+        print(f"  LLM latency:               {llm['mean_ms']:8.1f} ms/question")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--llm"]
+    run_benchmark(int(args[0]) if args else 200, with_llm="--llm" in sys.argv)
@@ -0,0 +1,90 @@
+"""
+Shared fixtures for the tenant agent tests
+A tenant database record, a TenantSQLAgent with clarity, retrieval and SQL
+generation stubbed out, and the patches process_query needs to run without
+a platform database.
+"""
+
+import uuid
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+AGENT_MODULE = "app.agents.tenant_sql_agent"
+STUB_SQL = "SELECT ECode, EmpName FROM vw_EmployeeMaster_Vms"
+
+
+def _tenant_database(**overrides):
+    fields = {
+        "id": uuid.uuid4(),
+        "tenant_id": uuid.uuid4(),
+        "name": "Test DB",
+        "db_type": "mssql",
+        "connection_mode": "direct_only",
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+@contextmanager
+def _agent_dependencies(execute=None, stream=None, logging_service=None, **settings_overrides):
+    """
+    Patch the agent's settings, query logging and query router
+
+    Args:
+        execute: Replacement for query_router.execute_query
+        stream: Replacement for query_router.stream_query
+        logging_service: Query logging service (a MagicMock by default)
+        **settings_overrides: Settings to patch on top of the defaults
+            (enable_cache, sql_preflight_validation and cost_guard_enabled off)
+
+    Yields:
+        The query logging service
+    """
+    settings = {"enable_cache": False, "sql_preflight_validation": False, "cost_guard_enabled": False}
+    settings.update(settings_overrides)
+    logging_service = logging_service or MagicMock()
+
+    with ExitStack() as stack:
+        for name, value in settings.items():
+            stack.enter_context(patch(f"{AGENT_MODULE}.settings.{name}", value))
+        stack.enter_context(patch(f"{AGENT_MODULE}.get_query_logging_service", return_value=logging_service))
+        if execute is not None:
+            stack.enter_context(patch(f"{AGENT_MODULE}.query_router.execute_query", new=execute))
+        if stream is not None:
+            stack.enter_context(patch(f"{AGENT_MODULE}.query_router.stream_query", new=stream))
+        yield logging_service
+
+
+@pytest.fixture
+def make_tenant_database():
+    """Factory for tenant database records; keyword arguments override fields"""
+    return _tenant_database
+
+
+@pytest.fixture
+def tenant_database():
+    return _tenant_database()
+
+
+@pytest.fixture
+def stub_agent():
+    """TenantSQLAgent that skips clarity and retrieval and always generates STUB_SQL"""
+    from app.agents.tenant_sql_agent import TenantSQLAgent
+    from app.services.llm_router import LLMResponse
+
+    agent = TenantSQLAgent()
+    agent._check_light_clarity = AsyncMock(return_value={"needs_clarification": False})
+    agent._get_global_schema_context = lambda question, n_results=10, embedding_context=None: []
+    agent._get_global_fewshots = lambda question, n_results=5, embedding_context=None: []
+    agent._generate_sql = AsyncMock(return_value=LLMResponse(STUB_SQL, "gemini", "test-model"))
+    return agent
+
+
+@pytest.fixture
+def agent_dependencies():
+    """Context manager patching what process_query touches outside the agent"""
+    return _agent_dependencies
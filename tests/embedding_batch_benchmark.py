@@ -0,0 +1,79 @@
+"""
+Google Embedding Batching Benchmark
+Compares per-text embedding calls with batched, concurrent batch calls
+against a stubbed embedding endpoint (no API key or network needed).
+
+The stub sleeps a fixed round-trip latency per request plus a small
+per-text cost, which is the shape of the real API: reindexing N documents
+one request at a time costs N round trips, batching costs N / batch_size
+round trips spread over max_concurrency connections.
+
+Usage:
+    python -m tests.embedding_batch_benchmark [--docs 300] [--rtt-ms 150]
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.google_embeddings import GoogleEmbeddingFunction
+
+
+class StubEmbeddingEndpoint:
+    """genai.embed_content stand-in with a fixed per-request latency"""
+
+    def __init__(self, rtt_ms: float, per_text_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.per_text = per_text_ms / 1000
+        self.requests = 0
+
+    def __call__(self, model: str, content: Any, task_type: str = None) -> Dict[str, Any]:
+        self.requests += 1
+        texts = content if isinstance(content, list) else [content]
+        time.sleep(self.rtt + self.per_text * len(texts))
+        embeddings = [[float(len(text))] * 8 for text in texts]
+        return {"embedding": embeddings if isinstance(content, list) else embeddings[0]}
+
+
+def embed_one_by_one(endpoint: StubEmbeddingEndpoint, texts: List[str]) -> List[List[float]]:
+    """The previous implementation: one embed_content call per text"""
+    return [endpoint(model="stub", content=text)["embedding"] for text in texts]
+
+
+def run_benchmark(docs: int, rtt_ms: float, per_text_ms: float):
+    texts = [f"Table vw_Example_{n}: columns Ecode, EmpName, Department, ..." for n in range(docs)]
+
+    print("Google Embedding Batching Benchmark")
+    print("=" * 60)
+    print(f"Documents: {docs}, stub round trip: {rtt_ms:.0f} ms, per text: {per_text_ms:.1f} ms")
+
+    endpoint = StubEmbeddingEndpoint(rtt_ms, per_text_ms)
+    start = time.perf_counter()
+    baseline = embed_one_by_one(endpoint, texts)
+    serial_s = time.perf_counter() - start
+    print(f"  One call per text:           {serial_s:7.2f} s  ({endpoint.requests} requests)")
+
+    for batch_size, concurrency in [(100, 1), (50, 4), (100, 4)]:
+        endpoint = StubEmbeddingEndpoint(rtt_ms, per_text_ms)
+        embed = GoogleEmbeddingFunction(
+            None, "stub", batch_size=batch_size, max_concurrency=concurrency, embed_content=endpoint,
+            cache=EmbeddingCache("unused", enabled=False),
+        )
+        start = time.perf_counter()
+        embeddings = embed(texts)
+        elapsed = time.perf_counter() - start
+        assert embeddings == baseline
+        print(
+            f"  batch={batch_size:<3} concurrency={concurrency}:    {elapsed:7.2f} s  "
+            f"({endpoint.requests} requests, {serial_s / elapsed:5.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=150.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.rtt_ms, args.per_text_ms)
@@ -0,0 +1,120 @@
+"""
+Embedding Model Startup Benchmark
+Compares startup time and resident memory of the four embedding consumers
+(FAISSManager, FewShotManager, ChromaDBManager, MemoryRetriever) loading
+their own model copies against sharing one model through the registry
+(app/rag/embedding_models.py).
+
+Each mode runs in a fresh subprocess so RSS is not polluted by the other.
+Uses the real SentenceTransformer when sentence-transformers is installed;
+otherwise a stub with all-MiniLM-L6-v2's parameter count (22.7M float32)
+stands in, which measures memory faithfully but not disk load time.
+
+Usage:
+    python -m tests.embedding_startup_benchmark [--model sentence-transformers/all-MiniLM-L6-v2] [--stub]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+CONSUMERS = ["FAISSManager", "FewShotManager", "ChromaDBManager", "MemoryRetriever"]
+
+# all-MiniLM-L6-v2 parameter count
+STUB_PARAMETERS = 22_700_000
+
+
+class StubModel:
+    """Model-sized weight matrix; encode returns zeros"""
+
+    def __init__(self):
+        self.weights = np.ones(STUB_PARAMETERS, dtype=np.float32)
+
+    def encode(self, texts):
+        return np.zeros((len(texts), 384), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 384
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(mode: str, model_name: str, stub: bool):
+    from app.rag.embedding_models import EmbeddingModelRegistry, load_sentence_transformer
+
+    loader = (lambda name, device: StubModel()) if stub else load_sentence_transformer
+    rss_before = rss_mb()
+    start = time.perf_counter()
+
+    if mode == "separate":
+        # Previous behaviour: every consumer loads its own copy
+        models = [loader(model_name, "cpu") for _ in CONSUMERS]
+    else:
+        registry = EmbeddingModelRegistry(loader=loader)
+        models = [registry.get(model_name, device="cpu") for _ in CONSUMERS]
+    for model in models:
+        model.encode(["warm up"])
+
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": rss_mb() - rss_before,
+    }))
+
+
+def run_benchmark(model_name: str, stub: bool):
+    if not stub:
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            stub = True
+
+    print("Embedding Model Startup Benchmark")
+    print("=" * 70)
+    print(f"Consumers: {', '.join(CONSUMERS)}")
+    print(f"Model: {'stub (22.7M float32 parameters, no disk load)' if stub else model_name}")
+
+    results = {}
+    for mode in ("separate", "shared"):
+        command = [sys.executable, "-m", "tests.embedding_startup_benchmark", "--child", mode, "--model", model_name]
+        if stub:
+            command.append("--stub")
+        output = subprocess.run(command, capture_output=True, text=True, check=True, env=os.environ.copy()).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    for mode, label in [("separate", "One model per consumer"), ("shared", "Shared registry")]:
+        result = results[mode]
+        print(
+            f"  {label:<24} load {result['seconds']:6.2f} s   "
+            f"RSS {result['rss_mb']:7.1f} MB   (+{result['rss_delta_mb']:.1f} MB for models)"
+        )
+    saved = results["separate"]["rss_mb"] - results["shared"]["rss_mb"]
+    print(f"  Saved: {saved:.1f} MB RSS, {results['separate']['seconds'] - results['shared']['seconds']:.2f} s startup")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--stub", action="store_true", help="Use a model-sized stub instead of loading weights")
+    parser.add_argument("--child", choices=["separate", "shared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.model, args.stub)
+    else:
+        run_benchmark(args.model, args.stub)
@@ -0,0 +1,112 @@
+"""
+ONNX Embedding Backend Benchmark
+Recall vs latency of the local embedding runtimes on the few-shot corpus
+(data/few_shot_examples.json):
+
+- torch: sentence-transformers (the reference)
+- onnx fp32: exported model on onnxruntime
+- onnx int8: dynamically quantized export on onnxruntime
+
+Each example is indexed as "question + explanation" (as FewShotManager
+does); each question is then searched leave-one-out against the others.
+Recall@k is the overlap with the torch top-k. Category hit@k (any of the top
+k shares the question's category) is reported as a quality check.
+Latency is single-question encode time (the per-request cost) and the time
+to embed the whole corpus.
+
+Needs sentence-transformers (with torch), onnx and onnxruntime; exports go to
+a temporary directory.
+
+Usage:
+    python -m tests.onnx_embedding_benchmark [--model sentence-transformers/all-MiniLM-L6-v2] [--k 3]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["examples"]
+
+
+def top_k_leave_one_out(documents: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    documents = documents / np.linalg.norm(documents, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ documents.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_benchmark(model_name: str, k: int, corpus_path: str):
+    try:
+        from sentence_transformers import SentenceTransformer
+        import onnx  # noqa: F401
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        print(f"This benchmark needs sentence-transformers, onnx and onnxruntime ({e})")
+        sys.exit(1)
+
+    from app.rag.onnx_embeddings import OnnxEmbeddingModel, export_onnx_model
+
+    examples = load_corpus(corpus_path)
+    documents = [f"{example['question']}\n{example['explanation']}" for example in examples]
+    questions = [example["question"] for example in examples]
+    categories = [example["category"] for example in examples]
+
+    print("ONNX Embedding Backend Benchmark")
+    print("=" * 78)
+    print(f"Model: {model_name}, corpus: {len(examples)} few-shot examples, top-{k} (leave-one-out)")
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_onnx_model(model_name, export_dir, quantize=True)
+        backends = {
+            "torch": SentenceTransformer(model_name, device="cpu"),
+            "onnx fp32": OnnxEmbeddingModel.from_directory(export_dir, quantized=False),
+            "onnx int8": OnnxEmbeddingModel.from_directory(export_dir, quantized=True),
+        }
+
+        reference = None
+        print(f"\n  {'backend':<10} {'recall@' + str(k):>9} {'category hit':>13} "
+              f"{'query p50':>10} {'query p99':>10} {'corpus':>9}")
+        for name, model in backends.items():
+            model.encode(["warm up"])
+
+            start = time.perf_counter()
+            document_vectors = np.asarray(model.encode(documents), dtype=np.float32)
+            corpus_seconds = time.perf_counter() - start
+
+            latencies = []
+            query_vectors = []
+            for question in questions:
+                start = time.perf_counter()
+                query_vectors.append(model.encode([question])[0])
+                latencies.append(time.perf_counter() - start)
+
+            neighbours = top_k_leave_one_out(document_vectors, np.asarray(query_vectors, dtype=np.float32), k)
+            if reference is None:
+                reference = neighbours
+            recall = np.mean([len(set(got) & set(want)) / k for got, want in zip(neighbours, reference)])
+            category_hit = np.mean([
+                any(categories[j] == categories[i] for j in row) for i, row in enumerate(neighbours)
+            ])
+            print(
+                f"  {name:<10} {recall:9.3f} {category_hit:13.3f} "
+                f"{np.percentile(latencies, 50) * 1000:8.2f}ms {np.percentile(latencies, 99) * 1000:8.2f}ms "
+                f"{corpus_seconds:8.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--corpus", default="./data/few_shot_examples.json")
+    args = parser.parse_args()
+    run_benchmark(args.model, args.k, args.corpus)
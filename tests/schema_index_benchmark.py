@@ -0,0 +1,103 @@
+"""
+Schema Retrieval Benchmark
+Compares ChromaDB's persistent client with the in-process NumPy index
+(app/rag/vector_index.py) on a corpus shaped like the global schema
+collection: a few hundred documents, 384-dim embeddings, a "type" metadata
+field used for filtering.
+
+Both backends are queried with precomputed query vectors, so the numbers
+are retrieval latency only (no embedding model). Recall@k is measured
+against exact cosine top-k.
+
+Usage:
+    python -m tests.schema_index_benchmark [--docs 400] [--queries 1000] [--k 5]
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Callable, List
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from app.rag.vector_index import NumpyVectorIndex
+
+
+def percentile_ms(samples: List[float], percentile: float) -> float:
+    return float(np.percentile(samples, percentile) * 1000)
+
+
+def time_queries(run: Callable[[np.ndarray], List[str]], queries: np.ndarray):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(run(query))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def recall(results: List[List[str]], exact: List[List[str]]) -> float:
+    hits = sum(len(set(got) & set(want)) for got, want in zip(results, exact))
+    return hits / max(1, sum(len(want) for want in exact))
+
+
+def run_benchmark(docs: int, queries: int, k: int, dim: int):
+    rng = np.random.default_rng(42)
+    embeddings = rng.standard_normal((docs, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"schema_{n}" for n in range(docs)]
+    documents = [f"View vw_Example_{n}: columns Ecode, EmpName, Department, ..." for n in range(docs)]
+    metadatas = [{"type": "view" if n % 4 == 0 else "table", "table": f"vw_Example_{n}"} for n in range(docs)]
+    # Queries near real documents, like questions near the schema they ask about
+    query_vectors = embeddings[rng.integers(0, docs, queries)] + 0.5 * rng.standard_normal((queries, dim)).astype(np.float32)
+
+    print("Schema Retrieval Benchmark")
+    print("=" * 70)
+    print(f"Documents: {docs}, dim: {dim}, queries: {queries}, top-{k}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        client = chromadb.PersistentClient(path=f"{workdir}/chroma", settings=Settings(anonymized_telemetry=False))
+        collection = client.get_or_create_collection("benchmark", embedding_function=None)
+        collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings.tolist())
+
+        NumpyVectorIndex.build(ids, documents, metadatas, embeddings).save(f"{workdir}/index")
+        index = NumpyVectorIndex.load(f"{workdir}/index")
+
+        for label, where in [("no filter", None), ('where type="view"', {"type": "view"})]:
+            def chroma_query(query):
+                return collection.query(query_embeddings=[query.tolist()], n_results=k, where=where)["ids"][0]
+
+            def numpy_query(query):
+                return index.query(query, n_results=k, where=where)["ids"]
+
+            # Warm both paths (SQLite page cache, HNSW load, mmap faults)
+            chroma_query(query_vectors[0])
+            numpy_query(query_vectors[0])
+
+            chroma_latencies, chroma_results = time_queries(chroma_query, query_vectors)
+            numpy_latencies, numpy_results = time_queries(numpy_query, query_vectors)
+
+            print(f"\n  {label}")
+            for name, latencies, results in [
+                ("ChromaDB persistent client", chroma_latencies, chroma_results),
+                ("NumPy in-process index", numpy_latencies, numpy_results),
+            ]:
+                print(
+                    f"    {name:<28} p50 {percentile_ms(latencies, 50):7.3f} ms   "
+                    f"p99 {percentile_ms(latencies, 99):7.3f} ms   "
+                    f"recall@{k} vs exact {recall(results, numpy_results):.3f}"
+                )
+            speedup = percentile_ms(chroma_latencies, 50) / max(percentile_ms(numpy_latencies, 50), 1e-9)
+            print(f"    p50 speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.queries, args.k, args.dim)
@@ -0,0 +1,105 @@
+"""
+SQL Pre-flight Validator Benchmark
+Counts the statements the validator flags against the reference catalog.
+At runtime these are repaired when the tenant's SchemaCache confirms the
+error, and only logged otherwise (catalog errors fail open).
+
+1. Few-shot set: every SQL example in data/few_shot_examples.json and
+   data/few_shot_sql_examples_views.json. These are fed to the LLM as
+   reference answers, so any rejection is a catalog mismatch the LLM
+   would copy into generated SQL.
+2. With --llm: SQL generated by TenantSQLAgent for each question in
+   sql_quality_benchmark.py (makes one LLM call per question and needs
+   the schema / few-shot vector stores).
+
+Usage:
+    python -m tests.sql_validator_benchmark [--llm]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.services.sql_validator import SQLValidator, sql_validator
+
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+FEW_SHOT_FILES = ["few_shot_examples.json", "few_shot_sql_examples_views.json"]
+
+
+def load_few_shot_sql() -> List[Tuple[str, str]]:
+    """Return (example id, sql) for every few-shot example"""
+    examples = []
+    for filename in FEW_SHOT_FILES:
+        with open(DATA_DIR / filename, encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("examples", []) if isinstance(data, dict) else data
+        for index, entry in enumerate(entries):
+            sql = entry.get("sql") or entry.get("sql_query")
+            if sql:
+                examples.append((entry.get("id") or f"{filename}#{index}", sql))
+    return examples
+
+
+def validate_all(validator: SQLValidator, statements: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Validate statements, returning counts, rejections and mean latency"""
+    rejected = []
+    start = time.perf_counter()
+    for label, sql in statements:
+        result = validator.validate(sql)
+        if not result.is_valid:
+            rejected.append((label, result))
+    elapsed = time.perf_counter() - start
+    return {
+        "total": len(statements),
+        "rejected": rejected,
+        "us_per_statement": elapsed / max(1, len(statements)) * 1_000_000,
+    }
+
+
+async def generate_benchmark_sql() -> List[Tuple[str, str]]:
+    """Generate SQL for the quality benchmark questions with the tenant agent"""
+    from app.agents.tenant_sql_agent import TenantSQLAgent
+    from tests.sql_quality_benchmark import BENCHMARK_CASES
+
+    agent = TenantSQLAgent()
+    statements = []
+    for case in BENCHMARK_CASES:
+        schema_context, few_shot_examples = await agent._start_retrieval(case.question, {})
+        prompt = agent._build_prompt(case.question, schema_context, few_shot_examples)
+        try:
+            statements.append((case.id, agent._clean_sql((await agent._generate_sql(prompt)).text)))
+        except Exception as e:
+            print(f"  {case.id}: generation failed ({e})")
+    return statements
+
+
+def print_report(title: str, report: Dict[str, Any]):
+    print(f"\n{title}")
+    print("-" * 60)
+    print(f"  Statements:                  {report['total']}")
+    print(f"  Flagged by catalog checks:   {len(report['rejected'])}")
+    print(f"  Validation latency:          {report['us_per_statement']:8.1f} us/statement")
+    for label, result in report["rejected"]:
+        print(f"  REJECTED {label}:")
+        for line in result.to_prompt().splitlines():
+            print(f"    {line}")
+
+
+def run_benchmark(with_llm: bool = False):
+    """Run the benchmark and print a summary"""
+    print("SQL Pre-flight Validator Benchmark")
+    print("=" * 60)
+    print(f"Catalog: {sql_validator.catalog_path} ({len(sql_validator.base_catalog)} objects)")
+
+    print_report("Few-shot reference SQL", validate_all(sql_validator, load_few_shot_sql()))
+    if with_llm:
+        statements = asyncio.run(generate_benchmark_sql())
+        print_report("Generated SQL (quality benchmark questions)", validate_all(sql_validator, statements))
+
+
+if __name__ == "__main__":
+    run_benchmark(with_llm="--llm" in sys.argv)
@@ -0,0 +1,74 @@
+"""
+SQL Template Engine Micro-Benchmark
+Times template selection for every question in sql_quality_benchmark.py
+(plus the template-targeted questions below), comparing:
+
+1. Single-pass keyword automaton (SQLTemplateRegistry.find_template)
+2. Per-template keyword scans, the strategy of the old hand-written chain
+
+Usage:
+    python -m tests.template_engine_benchmark [iterations]
+"""
+
+import sys
+import time
+from typing import Callable, List, Optional
+
+from app.services.sql_template_registry import SQLTemplate, sql_template_registry
+from tests.sql_quality_benchmark import BENCHMARK_CASES
+
+
+# Questions that should hit a template (the quality benchmark mostly misses)
+TEMPLATE_QUESTIONS = [
+    "Who has face access on SUBWAY devices?",
+    "Which students have face recognition access at MAINGATE",
+    "List fingerprint access on LAB devices",
+    "Show card and finger access users",
+    "Data removed from device HOSTEL",
+]
+
+
+def naive_find_template(question: str) -> Optional[SQLTemplate]:
+    """Template selection as the old chain did it: scan each template's keywords in turn"""
+    question_lower = question.lower()
+    for template in sql_template_registry.templates:
+        if any(kw in question_lower for kw in template.keywords):
+            return template
+    return None
+
+
+def time_matcher(matcher: Callable, questions: List[str], iterations: int) -> float:
+    """Return mean microseconds per question"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for question in questions:
+            matcher(question)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(questions)) * 1_000_000
+
+
+def run_benchmark(iterations: int = 2000):
+    """Run the benchmark and print a summary"""
+    questions = [tc.question for tc in BENCHMARK_CASES] + TEMPLATE_QUESTIONS
+    sql_template_registry.reload()
+
+    # Both strategies must agree before timing them
+    for question in questions:
+        assert naive_find_template(question) is sql_template_registry.find_template(question), question
+
+    hits = sum(1 for q in questions if sql_template_registry.find_template(q))
+    automaton_us = time_matcher(sql_template_registry.find_template, questions, iterations)
+    naive_us = time_matcher(naive_find_template, questions, iterations)
+    render_us = time_matcher(sql_template_registry.match, TEMPLATE_QUESTIONS, max(1, iterations // 10))
+
+    print("SQL Template Engine Micro-Benchmark")
+    print("=" * 60)
+    print(f"Templates: {len(sql_template_registry.templates)}  Questions: {len(questions)}  "
+          f"Template hits: {hits}  Iterations: {iterations}")
+    print(f"  Single-pass automaton:   {automaton_us:8.2f} us/question")
+    print(f"  Per-template scans:      {naive_us:8.2f} us/question")
+    print(f"  Full match + render:     {render_us:8.2f} us/question (template hits only)")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
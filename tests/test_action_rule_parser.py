@@ -0,0 +1,106 @@
+"""
+Unit Tests for the deterministic action rule parser
+"""
+
+import pytest
+
+from app.services.action_rule_parser import action_rule_parser
+from tests.action_parser_benchmark import is_correct, load_corpus, score_rule_parser
+
+
+THRESHOLD = 0.85
+
+
+class TestCommandRules:
+    """Test the anchored command grammar"""
+
+    @pytest.mark.parametrize("question,action_type,params", [
+        ("block EMP001", "block_access", {"target_user_id": "EMP001"}),
+        ("terminate ecode 2374", "employee_terminate", {"action": "terminate", "ecode": 2374}),
+        ("remove employee 2374 from blacklist", "employee_blacklist", {"action": "remove_blacklist", "ecode": 2374}),
+        ("blacklist employee 10001", "employee_blacklist", {"action": "blacklist", "ecode": 10001}),
+        ("Revoke access for EMP003", "revoke_access", {"target_user_id": "EMP003"}),
+        ("Block access to user cv", "block_access", {"target_user_id": "cv"}),
+    ])
+    def test_clear_commands_skip_the_llm(self, question, action_type, params):
+        result = action_rule_parser.parse(question)
+
+        assert result["confidence"] >= THRESHOLD
+        assert result["action_type"] == action_type
+        assert result["action_params"] == params
+
+    def test_reason_is_split_from_the_target(self):
+        result = action_rule_parser.parse("Disable employee John Smith because of misconduct")
+
+        assert result["action_params"] == {
+            "action": "deactivate", "employee_name": "John Smith", "reason": "misconduct"
+        }
+
+    def test_possessive_is_stripped_from_name(self):
+        result = action_rule_parser.parse("revoke john's access")
+
+        assert result["action_params"] == {"target_user_id": "john"}
+
+    def test_target_confidence_depends_on_identifier(self):
+        assert action_rule_parser.parse("block EMP001")["confidence"] == 0.95
+        assert action_rule_parser.parse("block user cv")["confidence"] == 0.9
+        assert action_rule_parser.parse("block cv")["confidence"] == 0.8
+
+
+class TestKeywordTier:
+    """Test the keyword classifier used below the threshold"""
+
+    def test_blacklist_is_not_classified_as_list_access(self):
+        result = action_rule_parser.parse("Please put employee 2374 on the blacklist today")
+
+        assert result["action_type"] == "employee_blacklist"
+        assert result["confidence"] < THRESHOLD
+
+    @pytest.mark.parametrize("question", [
+        "remove John from blacklist",
+        "please take John Smith off the blacklist",
+        "unblacklist John",
+        "whitelist John",
+    ])
+    def test_negated_blacklist_is_not_a_blacklist(self, question):
+        result = action_rule_parser.parse(question)
+
+        assert result["action_type"] == "employee_blacklist"
+        assert result["action_params"]["action"] == "remove_blacklist"
+        assert result["confidence"] < THRESHOLD
+
+    def test_unblock_is_not_a_block(self):
+        result = action_rule_parser.parse("unblock John now")
+
+        assert result["action_type"] == "grant_access"
+
+    def test_compound_requests_are_left_to_the_llm(self):
+        result = action_rule_parser.parse("Grant user 28734 access to Server Room")
+
+        assert result["action_type"] == "grant_access"
+        assert result["rule"] == "keywords"
+        assert result["confidence"] < THRESHOLD
+
+    def test_unrelated_question_is_none(self):
+        result = action_rule_parser.parse("How many employees are there?")
+
+        assert result["action_type"] == "none"
+        assert result["confidence"] == 0.0
+
+
+class TestCorpus:
+    """Test the parser against data/action_classification_corpus.json"""
+
+    def test_fast_path_is_always_correct(self):
+        scores = score_rule_parser(load_corpus(), THRESHOLD)
+
+        assert scores["fast_path_misses"] == []
+        assert scores["fast_path_coverage"] >= 0.5
+
+    def test_is_correct_checks_expected_params_subset(self):
+        case = {"action_type": "block_access", "action_params": {"target_user_id": "cv"}}
+
+        assert is_correct(case, {"action_type": "block_access",
+                                 "action_params": {"target_user_id": "cv", "reason": None}})
+        assert not is_correct(case, {"action_type": "block_access",
+                                     "action_params": {"target_user_id": "user"}})
@@ -0,0 +1,106 @@
+"""
+Unit Tests for the combined clarity + intent triage call
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.clarity_assessor import ClarityAssessor
+
+
+def _llm(payload):
+    return AsyncMock(return_value=f"```json\n{json.dumps(payload)}\n```")
+
+
+@pytest.fixture
+def assessor():
+    return ClarityAssessor()
+
+
+class TestTriage:
+    """Test ClarityAssessor.triage"""
+
+    @pytest.mark.asyncio
+    async def test_heuristically_unclear_makes_no_llm_call(self, assessor):
+        llm = AsyncMock()
+
+        result = await assessor.triage("hello", llm_complete=llm)
+
+        llm.assert_not_called()
+        assert result.llm_calls == 0
+        assert result.assessment.is_clear is False
+        assert result.assessment.reason == "greeting"
+        assert result.intent is None
+
+    @pytest.mark.asyncio
+    async def test_heuristically_clear_still_classifies_intent_in_one_call(self, assessor):
+        llm = _llm({"is_clear": False, "confidence": 0.1, "intent": "combined",
+                    "report_format": "excel", "email_recipient": "user_email"})
+
+        result = await assessor.triage("Email me an excel report of active employees", llm_complete=llm)
+
+        assert llm.await_count == 1
+        # Heuristic verdict wins over the LLM's clarity fields
+        assert result.assessment.is_clear is True
+        assert result.assessment.reason == "clear_action_keyword"
+        assert result.intent == {"intent": "combined", "report_format": "excel", "email_recipient": "user_email"}
+
+    @pytest.mark.asyncio
+    async def test_llm_unclear_returns_clarification_options(self, assessor):
+        llm = _llm({
+            "is_clear": False, "confidence": 0.4, "reason": "ambiguous",
+            "missing_info": ["which data"], "possible_intents": [],
+            "intent": "query", "report_format": "null", "email_recipient": None,
+            "clarification_question": "What would you like to see?",
+            "clarification_options": ["a", "b", "c", "d", "e"],
+        })
+
+        result = await assessor.triage("that thing from yesterday please", llm_complete=llm)
+
+        assert result.assessment.is_clear is False
+        assert result.clarification.question == "What would you like to see?"
+        assert result.clarification.options == ["a", "b", "c", "d"]
+        assert result.intent["report_format"] is None
+
+    @pytest.mark.asyncio
+    async def test_low_confidence_is_unclear_and_unknown_intent_defaults_to_query(self, assessor):
+        llm = _llm({"is_clear": True, "confidence": 0.6, "intent": "dance"})
+
+        result = await assessor.triage("that thing from yesterday please", llm_complete=llm)
+
+        assert result.assessment.is_clear is False
+        assert result.clarification is None
+        assert result.intent["intent"] == "query"
+
+    @pytest.mark.asyncio
+    async def test_llm_failure_assumes_clear_without_intent(self, assessor):
+        llm = AsyncMock(return_value="not json")
+
+        result = await assessor.triage("that thing from yesterday please", llm_complete=llm)
+
+        assert result.assessment.is_clear is True
+        assert result.assessment.reason == "llm_fallback"
+        assert result.intent is None
+
+
+class TestStandaloneAssessment:
+    """The standalone clarity call parses its reply like triage()"""
+
+    @pytest.mark.asyncio
+    async def test_llm_assessment_uses_the_shared_json_parser(self, assessor):
+        payload = {"is_clear": False, "confidence": 0.3, "reason": "ambiguous", "missing_info": ["which data"]}
+        assessor.model = MagicMock()
+        assessor.model.generate_content_async = AsyncMock(
+            return_value=SimpleNamespace(text=f"```json\n{json.dumps(payload)}\n```")
+        )
+
+        with patch("app.services.clarity_assessor.llm_usage.record_gemini"), \
+             patch.object(ClarityAssessor, "_parse_json_response", wraps=ClarityAssessor._parse_json_response) as parse:
+            assessment = await assessor._llm_assess_clarity("that thing from yesterday please")
+
+        parse.assert_called_once()
+        assert assessment.is_clear is False
+        assert assessment.missing_info == ["which data"]
@@ -0,0 +1,132 @@
+"""
+Unit Tests for the persistent embedding cache
+"""
+
+import os
+
+from app.rag.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbedder:
+    """Embeds each text as [len(text), 1.0, 2.0] and records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+
+class TestEmbeddingCache:
+    """Test lookups, persistence and crash recovery"""
+
+    def test_only_misses_are_computed(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path))
+        embed = CountingEmbedder()
+
+        first = cache.embed("model-a", "document", ["a", "bb", "a"], embed)
+        second = cache.embed("model-a", "document", ["bb", "ccc"], embed)
+
+        assert first == [[1.0, 1.0, 2.0], [2.0, 1.0, 2.0], [1.0, 1.0, 2.0]]
+        assert second == [[2.0, 1.0, 2.0], [3.0, 1.0, 2.0]]
+        assert embed.calls == [["a", "bb"], ["ccc"]]
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 4
+
+    def test_vectors_survive_a_restart(self, tmp_path):
+        EmbeddingCache(str(tmp_path)).embed("model-a", "document", ["a", "bb"], CountingEmbedder())
+
+        embed = CountingEmbedder()
+        vectors = EmbeddingCache(str(tmp_path)).embed("model-a", "document", ["bb", "a"], embed)
+
+        assert vectors == [[2.0, 1.0, 2.0], [1.0, 1.0, 2.0]]
+        assert embed.calls == []
+
+    def test_model_and_task_type_are_separate_namespaces(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path))
+        embed = CountingEmbedder()
+
+        cache.embed("model-a", "document", ["a"], embed)
+        cache.embed("model-b", "document", ["a"], embed)
+        cache.embed("model-a", "query", ["a"], embed)
+
+        assert len(embed.calls) == 3
+
+    def test_torn_write_is_dropped_and_repaired(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path))
+        cache.embed("model-a", "document", ["a", "bb"], CountingEmbedder())
+        namespace = cache._namespace("model-a", "document")
+        # Vector written, index entry cut short by a crash
+        with open(namespace.vectors_path, "ab") as f:
+            f.write(b"\0" * 12)
+        with open(namespace.index_path, "ab") as f:
+            f.write(b"\1" * 10)
+
+        reloaded = EmbeddingCache(str(tmp_path))
+        embed = CountingEmbedder()
+        assert reloaded.embed("model-a", "document", ["a", "ccc"], embed) == [[1.0, 1.0, 2.0], [3.0, 1.0, 2.0]]
+        assert embed.calls == [["ccc"]]
+        assert os.path.getsize(namespace.index_path) == 3 * 32
+
+        assert EmbeddingCache(str(tmp_path)).embed("model-a", "document", ["ccc"], embed) == [[3.0, 1.0, 2.0]]
+        assert len(embed.calls) == 1
+
+    def test_rows_written_by_another_instance_are_picked_up(self, tmp_path):
+        reader = EmbeddingCache(str(tmp_path))
+        writer = EmbeddingCache(str(tmp_path))
+        reader.embed("model-a", "document", ["a"], CountingEmbedder())
+
+        writer.embed("model-a", "document", ["bb"], CountingEmbedder())
+        embed = CountingEmbedder()
+
+        assert reader.embed("model-a", "document", ["bb"], embed) == [[2.0, 1.0, 2.0]]
+        assert embed.calls == []
+
+    def test_cache_stops_growing_at_max_rows(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path), max_rows=2)
+        embed = CountingEmbedder()
+
+        cache.embed("model-a", "document", ["a", "bb", "ccc"], embed)
+        cache.embed("model-a", "document", ["a", "bb", "ccc"], embed)
+
+        assert embed.calls == [["a", "bb", "ccc"], ["ccc"]]
+        assert cache.get_stats()["namespaces"]["model-a|document"]["rows"] == 2
+
+    def test_disabled_cache_always_computes(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path), enabled=False)
+        embed = CountingEmbedder()
+
+        cache.embed("model-a", "document", ["a"], embed)
+        cache.embed("model-a", "document", ["a"], embed)
+
+        assert len(embed.calls) == 2
+        assert os.listdir(tmp_path) == []
+
+
+class TestCachedEmbeddings:
+    """Test the LangChain wrapper used by the FAISS indexes"""
+
+    def test_documents_are_cached_and_queries_pass_through(self, tmp_path):
+        class Inner:
+            def __init__(self):
+                self.documents = CountingEmbedder()
+                self.queries = []
+
+            def embed_documents(self, texts):
+                return self.documents(texts)
+
+            def embed_query(self, text):
+                self.queries.append(text)
+                return [0.5, 0.5, 0.5]
+
+        inner = Inner()
+        embeddings = CachedEmbeddings(inner, "model-a", cache=EmbeddingCache(str(tmp_path)))
+
+        embeddings.embed_documents(["a", "bb"])
+        embeddings.embed_documents(["a", "bb"])
+
+        assert inner.documents.calls == [["a", "bb"]]
+        assert embeddings.embed_query("q") == [0.5, 0.5, 0.5]
+        assert inner.queries == ["q"]
@@ -0,0 +1,96 @@
+"""
+Unit Tests for the request-scoped EmbeddingContext
+Verifies each embedding model encodes the question at most once per request
+and that retrievers search with the precomputed vector.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from app.rag.embedding_context import EmbeddingContext, sentence_transformer_key
+
+
+class TestEmbeddingContext:
+    """Test EmbeddingContext memoization"""
+
+    def test_embeds_once_per_model(self):
+        embed = MagicMock(return_value=[0.1, 0.2])
+        ctx = EmbeddingContext("how many employees")
+
+        first = ctx.get("model-a", embed)
+        second = ctx.get("model-a", embed)
+
+        assert first == second == [0.1, 0.2]
+        embed.assert_called_once_with("how many employees")
+        assert ctx.get_stats() == {"models": 1, "computed": 1, "reused": 1}
+
+    def test_different_models_embed_separately(self):
+        ctx = EmbeddingContext("q")
+        ctx.get("model-a", lambda text: [1.0])
+        ctx.get("model-b", lambda text: [2.0])
+
+        assert ctx.get_stats()["computed"] == 2
+
+    def test_numpy_vectors_become_plain_floats(self):
+        ctx = EmbeddingContext("q")
+        vector = ctx.get("model-a", lambda text: np.array([0.5, 0.25], dtype=np.float32))
+
+        assert vector == [0.5, 0.25]
+        assert all(type(x) is float for x in vector)
+
+    def test_concurrent_lookups_share_one_encode(self):
+        calls = []
+
+        def slow_embed(text):
+            calls.append(text)
+            time.sleep(0.05)
+            return [1.0]
+
+        ctx = EmbeddingContext("q")
+        threads = [threading.Thread(target=ctx.get, args=("model-a", slow_embed)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+
+    def test_sentence_transformer_key_ignores_org_prefix(self):
+        assert sentence_transformer_key("sentence-transformers/all-MiniLM-L6-v2") == \
+            sentence_transformer_key("all-MiniLM-L6-v2")
+
+
+class TestRetrieversUseContext:
+    """Chroma and FAISS retrievers search by vector when given a context"""
+
+    def test_chroma_and_fewshots_share_vector(self):
+        from app.rag.chroma_manager import ChromaDBManager
+        from app.rag.few_shot_manager import FewShotManager
+
+        embed = MagicMock(return_value=[0.3, 0.4])
+
+        chroma = ChromaDBManager()
+        chroma._initialized = True
+        chroma.embedding_function = lambda texts: [embed(texts[0])]
+        chroma.collection = MagicMock()
+        chroma.collection.query.return_value = {"documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+        few_shots = FewShotManager()
+        few_shots._initialized = True
+        few_shots.embeddings = MagicMock()
+        few_shots.embeddings.embed_query.side_effect = embed
+        few_shots.vectorstore = MagicMock()
+        few_shots.vectorstore.similarity_search_with_score_by_vector.return_value = []
+
+        ctx = EmbeddingContext("how many employees")
+        with patch("app.rag.chroma_manager.settings.embedding_provider", "sentence-transformers"):
+            chroma.query_schemas("how many employees", embedding_context=ctx)
+        few_shots.get_relevant_examples("how many employees", embedding_context=ctx)
+
+        embed.assert_called_once()
+        assert chroma.collection.query.call_args.kwargs["query_embeddings"] == [[0.3, 0.4]]
+        few_shots.vectorstore.similarity_search_with_score_by_vector.assert_called_once_with([0.3, 0.4], k=3)
+        few_shots.vectorstore.similarity_search_with_score.assert_not_called()
@@ -0,0 +1,127 @@
+"""
+Unit Tests for the shared embedding model registry
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.rag.embedding_models import EmbeddingModelRegistry, SharedEmbeddingFunction, SharedEmbeddings
+
+
+class FakeModel:
+    """SentenceTransformer stand-in: embeds each text as [len(text), 1.0]"""
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def encode(self, texts):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        self.calls.append(list(texts))
+        if any(text == "BOOM" for text in texts):
+            raise ValueError("cannot encode")
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+class FakeLoader:
+    def __init__(self, model_factory=FakeModel):
+        self.loads = []
+        self.model_factory = model_factory
+
+    def __call__(self, model_name, device):
+        self.loads.append((model_name, device))
+        return self.model_factory()
+
+
+class TestRegistry:
+    """Test that each model is loaded once"""
+
+    def test_same_model_is_loaded_once(self):
+        loader = FakeLoader()
+        registry = EmbeddingModelRegistry(loader=loader)
+
+        first = registry.get("sentence-transformers/all-MiniLM-L6-v2", device="cpu")
+        second = registry.get("all-MiniLM-L6-v2", device="cpu")
+
+        assert first is second
+        assert loader.loads == [("sentence-transformers/all-MiniLM-L6-v2", "cpu")]
+        assert registry.get_stats()["models_loaded"] == 1
+
+    def test_different_models_and_devices_are_separate(self):
+        loader = FakeLoader()
+        registry = EmbeddingModelRegistry(loader=loader)
+
+        registry.get("all-MiniLM-L6-v2", device="cpu")
+        registry.get("all-mpnet-base-v2", device="cpu")
+        registry.get("all-MiniLM-L6-v2", device="cuda")
+
+        assert len(loader.loads) == 3
+
+    def test_concurrent_first_use_loads_once(self):
+        loader = FakeLoader()
+        registry = EmbeddingModelRegistry(loader=loader)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            encoders = list(pool.map(lambda _: registry.get("all-MiniLM-L6-v2", device="cpu"), range(16)))
+
+        assert len(loader.loads) == 1
+        assert all(encoder is encoders[0] for encoder in encoders)
+
+
+class TestSharedEncoder:
+    """Test request batching and result routing"""
+
+    def test_results_match_inputs(self):
+        encoder = EmbeddingModelRegistry(loader=FakeLoader()).get("m", device="cpu")
+
+        assert encoder.embed(["a", "bbb"]) == [[1.0, 1.0], [3.0, 1.0]]
+        assert encoder.encode("cc").tolist() == [2.0, 1.0]
+        assert encoder.embed([]) == []
+
+    def test_requests_queued_while_encoding_share_one_call(self):
+        gate = threading.Event()
+        model = FakeModel(gate=gate)
+        encoder = EmbeddingModelRegistry(loader=lambda name, device: model).get("m", device="cpu")
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(encoder.embed, ["x" * n]) for n in range(1, 7)]
+            # First request blocks the worker inside encode; the rest queue up behind it
+            while encoder._queue.qsize() < 5:
+                threading.Event().wait(0.001)
+            gate.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        assert results == [[[float(n), 1.0]] for n in range(1, 7)]
+        assert len(model.calls) == 2
+        assert sorted(len(call) for call in model.calls) == [1, 5]
+        assert encoder.get_stats()["requests"] == 6
+
+    def test_errors_reach_every_caller_in_the_batch_and_worker_survives(self):
+        encoder = EmbeddingModelRegistry(loader=FakeLoader()).get("m", device="cpu")
+
+        with pytest.raises(ValueError):
+            encoder.embed(["BOOM"])
+        assert encoder.embed(["ok"]) == [[2.0, 1.0]]
+
+
+class TestAdapters:
+    """Chroma and LangChain adapters share the encoder"""
+
+    def test_adapters_use_the_shared_encoder(self):
+        loader = FakeLoader()
+        registry = EmbeddingModelRegistry(loader=loader)
+
+        chroma_function = SharedEmbeddingFunction(registry.get("all-MiniLM-L6-v2", device="cpu"))
+        langchain_embeddings = SharedEmbeddings(registry.get("all-MiniLM-L6-v2", device="cpu"))
+
+        assert chroma_function(["ab"]) == [[2.0, 1.0]]
+        assert langchain_embeddings.embed_documents(["abc"]) == [[3.0, 1.0]]
+        assert langchain_embeddings.embed_query("a") == [1.0, 1.0]
+        assert len(loader.loads) == 1
@@ -0,0 +1,119 @@
+"""
+Unit Tests for the batched Google embedding function
+"""
+
+import threading
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.google_embeddings import EmbeddingBatchError, GoogleEmbeddingFunction
+
+
+class FakeEmbedEndpoint:
+    """genai.embed_content stand-in: one vector per text, with scripted failures"""
+
+    def __init__(self, transient_failures=0, poison=None):
+        self.calls = []
+        self.transient_failures = transient_failures
+        self.poison = poison
+        self._lock = threading.Lock()
+
+    def __call__(self, model, content, task_type=None):
+        with self._lock:
+            self.calls.append(list(content))
+            if self.transient_failures:
+                self.transient_failures -= 1
+                raise google_exceptions.ResourceExhausted("quota")
+        if self.poison and self.poison in content:
+            raise google_exceptions.InvalidArgument("bad input")
+        return {"embedding": [[float(len(text))] for text in content]}
+
+
+def _embedder(endpoint, **kwargs):
+    options = {
+        "batch_size": 10, "max_concurrency": 4, "max_retries": 2, "backoff_base": 0.0, "backoff_max": 0.0,
+        "cache": EmbeddingCache("unused", enabled=False),
+    }
+    options.update(kwargs)
+    return GoogleEmbeddingFunction(None, "models/test-embedding", embed_content=endpoint, **options)
+
+
+class TestBatching:
+    """Test batch requests and result ordering"""
+
+    def test_texts_are_sent_in_batches_and_order_is_kept(self):
+        endpoint = FakeEmbedEndpoint()
+        texts = ["x" * n for n in range(1, 26)]
+
+        embeddings = _embedder(endpoint)(texts)
+
+        assert embeddings == [[float(n)] for n in range(1, 26)]
+        assert sorted(len(call) for call in endpoint.calls) == [5, 10, 10]
+
+    def test_batch_size_is_capped_at_the_api_limit(self):
+        assert _embedder(FakeEmbedEndpoint(), batch_size=500).batch_size == 100
+
+    def test_empty_input(self):
+        endpoint = FakeEmbedEndpoint()
+
+        assert _embedder(endpoint)([]) == []
+        assert endpoint.calls == []
+
+
+class TestFailures:
+    """Test retries and partial-failure handling"""
+
+    def test_transient_errors_are_retried(self):
+        endpoint = FakeEmbedEndpoint(transient_failures=2)
+        embedder = _embedder(endpoint, max_concurrency=1)
+
+        assert embedder(["a", "bb"]) == [[1.0], [2.0]]
+        assert embedder.get_stats()["retries"] == 2
+
+    def test_bad_text_is_isolated_by_splitting_its_batch(self):
+        endpoint = FakeEmbedEndpoint(poison="POISON")
+        texts = [f"doc {n}" for n in range(8)]
+        texts[5] = "POISON"
+
+        with pytest.raises(EmbeddingBatchError) as error:
+            _embedder(endpoint)(texts)
+
+        assert error.value.failed_indexes == [5]
+        assert error.value.embeddings[5] is None
+        assert error.value.embeddings[4] == [5.0]
+
+    def test_embedded_texts_are_cached_before_the_error(self, tmp_path):
+        endpoint = FakeEmbedEndpoint(poison="POISON")
+        embedder = _embedder(endpoint, cache=EmbeddingCache(str(tmp_path)))
+
+        with pytest.raises(EmbeddingBatchError) as error:
+            embedder(["doc 0", "POISON", "doc 2", "doc 0"])
+
+        assert error.value.failed_indexes == [1]
+        assert error.value.embeddings == [[5.0], None, [5.0], [5.0]]
+
+        endpoint.calls.clear()
+        with pytest.raises(EmbeddingBatchError):
+            embedder(["doc 0", "POISON", "doc 2"])
+        # Only the text that failed is sent again
+        assert endpoint.calls == [["POISON"]]
+
+    def test_retries_are_bounded(self):
+        endpoint = FakeEmbedEndpoint(transient_failures=100)
+
+        with pytest.raises(EmbeddingBatchError) as error:
+            _embedder(endpoint, max_retries=1)(["only"])
+
+        assert error.value.failed_indexes == [0]
+        assert len(endpoint.calls) == 2
+
+    def test_exhausted_transient_errors_fail_the_batch_without_splitting(self):
+        endpoint = FakeEmbedEndpoint(transient_failures=100)
+
+        with pytest.raises(EmbeddingBatchError) as error:
+            _embedder(endpoint, max_retries=1, max_concurrency=1)(["a", "b", "c"])
+
+        assert error.value.failed_indexes == [0, 1, 2]
+        assert len(endpoint.calls) == 2
@@ -0,0 +1,146 @@
+"""
+Unit Tests for rolling conversation-history compaction
+"""
+
+from unittest.mock import patch
+
+from app.services.history_compactor import HistoryCompactor, parse_followup_context
+
+
+def _turn(n, sql=None, ids=None):
+    """One user + assistant exchange as stored by the conversation store"""
+    answer = f"Answer {n}"
+    if sql or ids:
+        answer += "\n\n---CONTEXT_FOR_FOLLOWUP---\n"
+        answer += f"[SQL_QUERY]: {sql or ''}\n[RESULT_IDS]: {ids or ''}\n[RESULT_COUNT]: 3"
+    return [
+        {"conversation_id": f"u{n}", "session_id": "s1", "user_id": "u1",
+         "message_type": "user", "message_content": f"Question {n} about employee 10{n}"},
+        {"conversation_id": f"a{n}", "session_id": "s1", "user_id": "u1",
+         "message_type": "assistant", "message_content": answer},
+    ]
+
+
+def _history(turns):
+    return [message for n in range(1, turns + 1) for message in _turn(n, sql=f"SELECT {n}", ids=f"{n},{n + 100}")]
+
+
+class TestParseFollowupContext:
+    """Test parsing of the follow-up context appended to assistant messages"""
+
+    def test_context_lines_are_extracted(self):
+        content = "5 employees found\n\n---CONTEXT_FOR_FOLLOWUP---\n[SQL_QUERY]: SELECT 1\n[RESULT_IDS]: 1,2\n[RESULT_COUNT]: 2"
+
+        assert parse_followup_context(content) == ("5 employees found", "SELECT 1", "1,2", 2)
+
+    def test_plain_answer(self):
+        assert parse_followup_context("Hello") == ("Hello", None, None, None)
+
+
+class TestCompaction:
+    """Test splitting history into a digest and verbatim turns"""
+
+    def test_short_history_is_kept_verbatim(self):
+        history = _history(3)
+
+        compact = HistoryCompactor(recent_turns=3).compact(history)
+
+        assert compact.recent == history
+        assert not compact.has_digest
+        assert compact.render_digest() == ""
+
+    def test_older_turns_are_folded(self):
+        compact = HistoryCompactor(recent_turns=2).compact(_history(5))
+
+        assert [m["conversation_id"] for m in compact.recent] == ["u4", "a4", "u5", "a5"]
+        assert compact.summary == [
+            'Q: "Question 1 about employee 101" -> A: Answer 1 (3 rows)',
+            'Q: "Question 2 about employee 102" -> A: Answer 2 (3 rows)',
+            'Q: "Question 3 about employee 103" -> A: Answer 3 (3 rows)',
+        ]
+        assert compact.last_fact().sql_query == "SELECT 3"
+        assert "101" in compact.entity_ids and "103" in compact.entity_ids
+        rendered = compact.render_digest()
+        assert "SQL USED: SELECT 1" in rendered
+        assert "Answer 4" not in rendered
+
+    def test_recent_window_starts_on_a_user_message(self):
+        history = _history(4) + [_turn(5)[0]]
+
+        compact = HistoryCompactor(recent_turns=2).compact(history)
+
+        assert [m["conversation_id"] for m in compact.recent] == ["u4", "a4", "u5"]
+
+    def test_summary_and_facts_are_bounded(self):
+        compact = HistoryCompactor(recent_turns=1, max_summary_turns=3).compact(_history(12))
+
+        assert len(compact.summary) == 3
+        assert compact.omitted_turns == 8
+        assert len(compact.facts) == 5
+        assert "(8 earlier exchange(s) not shown)" in compact.render_digest()
+
+    def test_disabled_compactor_keeps_everything(self):
+        history = _history(10)
+
+        assert HistoryCompactor(recent_turns=1, enabled=False).compact(history).recent == history
+
+
+class TestIncrementalDigest:
+    """Test that session digests are updated incrementally"""
+
+    def test_only_new_messages_are_folded(self):
+        compactor = HistoryCompactor(recent_turns=2)
+        compactor.compact(_history(5))
+
+        with patch.object(compactor, "_fold", wraps=compactor._fold) as fold:
+            compact = compactor.compact(_history(6))
+
+        assert fold.call_count == 2
+        assert len(compact.summary) == 4
+        assert compactor.get_stats()["messages_folded"] == 8
+
+    def test_unchanged_history_is_a_digest_hit(self):
+        compactor = HistoryCompactor(recent_turns=2)
+        compactor.compact(_history(5))
+        compact = compactor.compact(_history(5))
+
+        assert compactor.get_stats()["digest_hits"] == 1
+        assert len(compact.summary) == 3
+
+    def test_unrelated_history_rebuilds_the_digest(self):
+        compactor = HistoryCompactor(recent_turns=1)
+        compactor.compact(_history(4))
+        other = [dict(message, conversation_id="x" + message["conversation_id"]) for message in _history(3)]
+
+        compact = compactor.compact(other)
+
+        assert compactor.get_stats()["rebuilds"] == 1
+        assert len(compact.summary) == 2
+
+    def test_digests_are_per_session_with_lru_eviction(self):
+        compactor = HistoryCompactor(recent_turns=1, max_sessions=1)
+        compactor.compact(_history(3), session_id="s1")
+        compactor.compact(_history(3), session_id="s2")
+
+        assert compactor.get_stats()["sessions"] == 1
+        assert compactor.get_stats()["evictions"] == 1
+
+
+class TestTenantPromptHistory:
+    """Test that the tenant SQL prompt uses the compacted history"""
+
+    def test_prompt_contains_digest_and_recent_turns_only(self):
+        from app.agents.tenant_sql_agent import TenantSQLAgent
+
+        with patch("app.agents.tenant_sql_agent.history_compactor", HistoryCompactor(recent_turns=2)):
+            prompt = TenantSQLAgent()._build_prompt(
+                question="And their departments?",
+                schema_context=[],
+                few_shot_examples=[],
+                conversation_history=_history(8),
+            )
+
+        assert "EARLIER IN THIS CONVERSATION (summarized)" in prompt
+        assert "USER: Question 1 about employee 101" not in prompt
+        assert "USER: Question 8 about employee 108" in prompt
+        assert "SQL USED: SELECT 8" in prompt
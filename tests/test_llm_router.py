@@ -0,0 +1,211 @@
+"""
+Unit Tests for the hedged, circuit-broken LLM provider router
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.tenant_sql_agent import TenantSQLAgent
+from app.services.llm_router import LLMProviderRouter, LLMResponse, CircuitBreaker, is_provider_failure
+from app.services.llm_transport import LLMTransportError
+
+
+def _router(**kwargs):
+    options = dict(hedge_default_delay_ms=50, hedge_min_delay_ms=10, hedge_min_samples=3,
+                   failure_threshold=2, reset_timeout=0.1, attempt_timeout=2.0)
+    options.update(kwargs)
+    return LLMProviderRouter(**options)
+
+
+def _async_call(result, delay=0.0, error=None, calls=None, name=None):
+    async def call():
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return call
+
+
+class TestHedging:
+    """Test hedge requests and failover on the async path"""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_sends_no_hedge(self):
+        router = _router()
+        calls = []
+
+        result = await router.generate({
+            "gemini": _async_call("primary", calls=calls, name="gemini"),
+            "openrouter": _async_call("secondary", calls=calls, name="openrouter"),
+        }, primary="gemini")
+
+        assert result.text == "primary"
+        assert result.provider == "gemini"
+        assert calls == ["gemini"]
+        assert router.get_stats()["hedges_sent"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_secondary_wins(self):
+        router = _router()
+        cancelled = []
+
+        async def slow_primary():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "primary"
+
+        started = time.perf_counter()
+        result = await router.generate({
+            "gemini": slow_primary,
+            "openrouter": _async_call("secondary", delay=0.01),
+        }, primary="gemini", models={"gemini": "gemini-pro", "openrouter": "deepseek"})
+
+        assert (result.text, result.provider, result.model) == ("secondary", "openrouter", "deepseek")
+        assert time.perf_counter() - started < 0.5
+        assert cancelled == [True]
+        stats = router.get_stats()
+        assert stats["hedges_sent"] == 1
+        assert stats["hedge_wins"] == 1
+        assert stats["providers"]["gemini"]["cancelled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_tracks_observed_p95(self):
+        router = _router(hedge_default_delay_ms=5000)
+        for _ in range(3):
+            await router.generate({"gemini": _async_call("ok", delay=0.02)}, primary="gemini")
+
+        delay = router.hedge_delay("gemini")
+
+        assert 0.015 < delay < 0.5
+        assert router.get_stats()["providers"]["gemini"]["latency"]["count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_fails_over(self):
+        router = _router()
+
+        result = await router.generate({
+            "gemini": _async_call(None, error=LLMTransportError("boom", status_code=503)),
+            "openrouter": _async_call("secondary"),
+        }, primary="gemini")
+
+        assert (result.text, result.provider) == ("secondary", "openrouter")
+        assert router.get_stats()["failovers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_all_providers_failing_raises_last_error(self):
+        router = _router()
+
+        with pytest.raises(LLMTransportError):
+            await router.generate({
+                "gemini": _async_call(None, error=LLMTransportError("a", status_code=500)),
+                "openrouter": _async_call(None, error=LLMTransportError("b", status_code=502)),
+            }, primary="gemini")
+
+
+class TestCircuitBreaker:
+    """Test breaker transitions and routing around open breakers"""
+
+    def test_breaker_opens_then_probes_after_reset(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        assert not breaker.allow_request()
+
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        assert breaker.state == "half_open"
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_only_timeouts_and_server_errors_count(self):
+        assert is_provider_failure(asyncio.TimeoutError())
+        assert is_provider_failure(LLMTransportError("x", status_code=503))
+        assert is_provider_failure(LLMTransportError("x", status_code=408))
+        assert not is_provider_failure(LLMTransportError("x", status_code=400))
+        assert not is_provider_failure(Exception("Gemini returned empty response"))
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_routes_to_secondary(self):
+        router = _router()
+        failing = _async_call(None, error=LLMTransportError("down", status_code=500))
+        for _ in range(2):
+            with pytest.raises(LLMTransportError):
+                await router.generate({"gemini": failing}, primary="gemini")
+        assert router.get_stats()["providers"]["gemini"]["breaker"] == "open"
+
+        calls = []
+        result = await router.generate({
+            "gemini": _async_call("primary", calls=calls, name="gemini"),
+            "openrouter": _async_call("secondary", calls=calls, name="openrouter"),
+        }, primary="gemini")
+
+        assert result.text == "secondary"
+        assert calls == ["openrouter"]
+
+    @pytest.mark.asyncio
+    async def test_primary_still_tried_when_every_breaker_is_open(self):
+        router = _router()
+        router._provider("gemini").breaker.state = "open"
+        router._provider("gemini").breaker._opened_at = time.monotonic()
+
+        assert (await router.generate({"gemini": _async_call("ok")}, primary="gemini")).text == "ok"
+
+
+class TestSyncPath:
+    """Test thread-based hedging used by RAGSQLAgent's sync path"""
+
+    def test_sync_hedge_returns_first_answer(self):
+        router = _router()
+
+        result = router.generate_sync({
+            "gemini": lambda: time.sleep(0.5) or "primary",
+            "openrouter": lambda: "secondary",
+        }, primary="gemini", models={"gemini": "gemini-pro", "openrouter": "deepseek"})
+
+        assert (result.text, result.model) == ("secondary", "deepseek")
+        assert router.get_stats()["hedge_wins"] == 1
+
+
+class TestTenantAgentRouting:
+    """Test that TenantSQLAgent dispatches through the router"""
+
+    @pytest.mark.asyncio
+    async def test_secondary_provider_used_when_primary_fails(self):
+        agent = TenantSQLAgent()
+        agent.llm_provider = "gemini"
+        agent.secondary_providers = ["openrouter"]
+        agent.openrouter_model = "deepseek"
+        failing = _async_call(None, error=LLMTransportError("down", status_code=503))
+        succeeding = _async_call("SELECT 1")
+        agent._generate_sql_gemini = lambda prompt: failing()
+        agent._generate_sql_openrouter = lambda prompt: succeeding()
+
+        with patch("app.agents.tenant_sql_agent.llm_router", _router()):
+            response = await agent._call_sql_llm("prompt")
+
+        assert (response.text, response.provider) == ("SELECT 1", "openrouter")
+        assert response.model == "deepseek"
+
+    @pytest.mark.asyncio
+    async def test_query_log_records_the_model_that_answered(self, stub_agent, agent_dependencies, tenant_database):
+        stub_agent._generate_sql.return_value = LLMResponse("SELECT 1", "openrouter", "fallback-model")
+
+        with agent_dependencies(execute=AsyncMock(return_value=[{"x": 1}])) as logging_service:
+            await stub_agent.process_query(
+                question="How many employees?", tenant_database=tenant_database, platform_db=MagicMock(),
+            )
+
+        assert logging_service.log_query.call_args.kwargs["llm_model"] == "fallback-model"
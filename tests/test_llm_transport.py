@@ -0,0 +1,131 @@
+"""
+Unit Tests for the pooled OpenRouter transport
+Covers retry policy, error surfacing and connection reuse.
+"""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from app.services.llm_transport import LLMTransportError, OpenRouterTransport
+
+
+def _completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def _transport(handler, max_retries=2):
+    return OpenRouterTransport(
+        base_url="https://openrouter.test/api/v1",
+        api_key="test-key",
+        model="test-model",
+        max_retries=max_retries,
+        backoff_base=0.0,
+        backoff_max=0.0,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+class TestOpenRouterTransport:
+    """Test OpenRouterTransport against a mocked HTTP layer"""
+
+    @pytest.mark.asyncio
+    async def test_complete_returns_content(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json=_completion("  SELECT 1  "))
+
+        transport = _transport(handler)
+        content = await transport.complete("question", system="system prompt")
+
+        assert content == "SELECT 1"
+        assert seen[0].headers["Authorization"] == "Bearer test-key"
+        assert b'"role":"system"' in seen[0].content.replace(b" ", b"")
+        await transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        statuses = iter([503, 429, 200])
+
+        def handler(request):
+            status = next(statuses)
+            if status == 200:
+                return httpx.Response(200, json=_completion("SELECT 1"))
+            return httpx.Response(status, text="busy")
+
+        transport = _transport(handler)
+        assert await transport.complete("question") == "SELECT 1"
+        assert transport.retries == 2
+        assert transport.requests_sent == 3
+        await transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        transport = _transport(lambda request: httpx.Response(502, text="bad gateway"), max_retries=1)
+
+        with pytest.raises(LLMTransportError) as exc_info:
+            await transport.complete("question")
+
+        assert exc_info.value.status_code == 502
+        assert transport.requests_sent == 2
+        await transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_retried(self):
+        transport = _transport(lambda request: httpx.Response(401, text="unauthorized"))
+
+        with pytest.raises(LLMTransportError) as exc_info:
+            await transport.complete("question")
+
+        assert exc_info.value.status_code == 401
+        assert transport.retries == 0
+
+    def test_empty_content_raises(self):
+        transport = _transport(lambda request: httpx.Response(200, json=_completion("")))
+
+        with pytest.raises(LLMTransportError, match="empty content"):
+            transport.complete_sync("question")
+
+    def test_sync_client_is_reused(self):
+        transport = _transport(lambda request: httpx.Response(200, json=_completion("SELECT 1")))
+
+        transport.complete_sync("first")
+        client = transport._sync_client
+        transport.complete_sync("second")
+
+        assert transport._sync_client is client
+
+    @pytest.mark.asyncio
+    async def test_client_of_another_loop_is_closed(self):
+        transport = _transport(lambda request: httpx.Response(200, json=_completion("SELECT 1")))
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(transport.complete("first"), other_loop).result(timeout=5)
+            old_client = transport._async_clients[other_loop]
+
+            await transport.complete("second")
+            await asyncio.sleep(0.05)
+
+            assert old_client.is_closed
+            assert list(transport._async_clients) == [asyncio.get_running_loop()]
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(timeout=5)
+            other_loop.close()
+
+        client = transport._async_clients[asyncio.get_running_loop()]
+        await transport.aclose()
+        assert client.is_closed and not transport._async_clients
+
+    def test_retry_after_header_is_honoured(self):
+        transport = _transport(lambda request: None)
+        transport.backoff_max = 10.0
+        response = httpx.Response(429, headers={"Retry-After": "3"})
+
+        assert transport._backoff_delay(0, response) == 3.0
@@ -0,0 +1,171 @@
+"""
+Unit Tests for per-request / per-stage LLM usage accounting
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.services.llm_router import LLMResponse
+from app.services.llm_transport import OpenRouterTransport
+from app.services.llm_usage import LLMUsageTracker
+
+
+def _gemini_response(prompt_tokens, completion_tokens):
+    return SimpleNamespace(
+        text="SELECT 1",
+        usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens),
+    )
+
+
+class TestRecording:
+    """Test provider usage extraction and aggregation"""
+
+    def test_gemini_usage_metadata(self):
+        tracker = LLMUsageTracker()
+        tracker.record_gemini(_gemini_response(120, 30), time.perf_counter(), stage="intent")
+
+        stats = tracker.get_stats()
+
+        assert stats["total_tokens"] == 150
+        assert stats["stages"]["intent"]["prompt_tokens"] == 120
+        assert stats["stages"]["intent"]["completion_tokens"] == 30
+        assert stats["stages"]["intent"]["calls"] == 1
+
+    def test_missing_usage_counts_the_call_without_tokens(self):
+        tracker = LLMUsageTracker()
+        tracker.record_gemini(SimpleNamespace(text="x"), time.perf_counter())
+        tracker.record_openrouter({"choices": []}, time.perf_counter())
+
+        stats = tracker.get_stats()
+
+        assert stats["llm_calls"] == 2
+        assert stats["total_tokens"] == 0
+        assert stats["stages"]["other"]["calls"] == 2
+
+    def test_stage_context_and_ranking(self):
+        tracker = LLMUsageTracker()
+        with tracker.stage("clarity"):
+            tracker.record("gemini", 10, 5, 100)
+        tracker.record("gemini", 500, 100, 900, stage="sql_generation")
+
+        stages = list(tracker.get_stats()["stages"])
+
+        assert stages == ["sql_generation", "clarity"]
+
+    @pytest.mark.asyncio
+    async def test_openrouter_transport_records_usage(self):
+        def handler(request):
+            return httpx.Response(200, json={
+                "model": "test-model",
+                "choices": [{"message": {"content": "SELECT 1"}}],
+                "usage": {"prompt_tokens": 40, "completion_tokens": 8},
+            })
+
+        tracker = LLMUsageTracker()
+        transport = OpenRouterTransport(
+            base_url="https://openrouter.test/api/v1",
+            api_key="test-key",
+            model="test-model",
+            transport=httpx.MockTransport(handler),
+        )
+        with patch("app.services.llm_transport.llm_usage", tracker):
+            with tracker.stage("intent"):
+                await transport.complete("question")
+        await transport.aclose()
+
+        assert tracker.get_stats()["stages"]["intent"]["total_tokens"] == 48
+
+
+class TestRequestAttribution:
+    """Test attribution to requests and tenants"""
+
+    @pytest.mark.asyncio
+    async def test_track_accumulates_request_usage_per_stage(self):
+        tracker = LLMUsageTracker()
+        usage = tracker.new_request("tenant-a")
+
+        async def llm_step(prompt_tokens):
+            tracker.record("gemini", prompt_tokens, 10, 50)
+            return "ok"
+
+        assert await tracker.track(usage, "clarity", llm_step(20)) == "ok"
+        await tracker.track(usage, "sql_generation", llm_step(300))
+        # Outside any request: counted globally only
+        tracker.record("gemini", 1000, 0, 10, stage="onboarding")
+
+        assert usage.total_tokens == 340
+        assert set(usage.to_dict()["stages"]) == {"clarity", "sql_generation"}
+        assert tracker.get_stats("tenant-a")["total_tokens"] == 340
+        assert tracker.get_tenant_totals() == {"tenant-a": 340, "platform": 1000}
+
+    @pytest.mark.asyncio
+    async def test_tasks_spawned_inside_a_request_inherit_it(self):
+        tracker = LLMUsageTracker()
+        usage = tracker.new_request("tenant-a")
+
+        async def hedged():
+            async def attempt():
+                tracker.record("openrouter", 100, 20, 80)
+            await asyncio.gather(asyncio.create_task(attempt()), asyncio.create_task(attempt()))
+
+        await tracker.track(usage, "sql_generation", hedged())
+
+        assert usage.stages["sql_generation"].calls == 2
+        assert usage.total_tokens == 240
+
+    def test_concurrent_requests_do_not_mix(self):
+        tracker = LLMUsageTracker()
+        usage_a = tracker.new_request("a")
+        usage_b = tracker.new_request("b")
+
+        async def step(tokens):
+            await asyncio.sleep(0)
+            tracker.record("gemini", tokens, 0, 1)
+
+        async def run():
+            await asyncio.gather(
+                tracker.track(usage_a, "sql_generation", step(10)),
+                tracker.track(usage_b, "sql_generation", step(20)),
+            )
+
+        asyncio.run(run())
+
+        assert usage_a.total_tokens == 10
+        assert usage_b.total_tokens == 20
+
+
+class TestTenantAgentTokenLogging:
+    """Test that the tenant agent logs the request's token usage"""
+
+    @pytest.mark.asyncio
+    async def test_tokens_used_is_written_to_the_query_log(self, stub_agent, agent_dependencies, tenant_database):
+        tracker = LLMUsageTracker()
+
+        async def generate_sql(prompt):
+            tracker.record("gemini", 900, 40, 700)
+            return LLMResponse("SELECT COUNT(*) AS total FROM vw_EmployeeMaster_Vms", "gemini")
+
+        async def check_clarity(question, history):
+            tracker.record("gemini", 60, 20, 150)
+            return {"needs_clarification": False}
+
+        stub_agent._check_light_clarity = check_clarity
+        stub_agent._generate_sql = generate_sql
+
+        with agent_dependencies(execute=AsyncMock(return_value=[{"total": 5}]),
+                                agent_speculative_retrieval=False) as logging_service, \
+             patch("app.agents.tenant_sql_agent.llm_usage", tracker):
+            result = await stub_agent.process_query(
+                question="How many employees are there in total?", tenant_database=tenant_database,
+                platform_db=MagicMock(), user_id="system",
+            )
+
+        assert logging_service.log_query.call_args.kwargs["tokens_used"] == 1020
+        assert result["llm_usage"]["total_tokens"] == 1020
+        assert set(result["llm_usage"]["stages"]) == {"clarity", "sql_generation"}
+        assert tracker.get_stats(tenant_database.tenant_id)["total_tokens"] == 1020
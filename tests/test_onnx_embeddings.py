@@ -0,0 +1,139 @@
+"""
+Unit Tests for the ONNX embedding backend (tokenization, pooling, backend switch)
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+tokenizers = pytest.importorskip("tokenizers")
+
+from app.rag.embedding_context import sentence_transformer_key
+from app.rag.embedding_models import load_configured_model, local_index_suffix
+from app.rag.onnx_embeddings import OnnxEmbeddingModel
+
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "hello": 2, "world": 3, "big": 4, "cat": 5}
+
+
+def _tokenizer():
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    return tokenizer
+
+
+class FakeSession:
+    """InferenceSession stand-in: the hidden state of each token is [token_id, 1.0]"""
+
+    def __init__(self):
+        self.feeds = []
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def _model(**config):
+    options = {"pooling": "mean", "normalize": False, "max_seq_length": 8, "dimension": 2,
+               "inputs": ["input_ids", "attention_mask"]}
+    options.update(config)
+    batch_size = options.pop("batch_size", 32)
+    session = FakeSession()
+    return OnnxEmbeddingModel(session, _tokenizer(), options, batch_size=batch_size), session
+
+
+class TestOnnxEmbeddingModel:
+    """Test the tokenizer fast path and NumPy pooling"""
+
+    def test_mean_pooling_ignores_padding(self):
+        model, _ = _model()
+
+        vectors = model.encode(["hello world", "big"])
+
+        assert vectors.tolist() == [[2.5, 1.0], [4.0, 1.0]]
+
+    def test_single_string_returns_one_vector(self):
+        model, _ = _model()
+
+        assert model.encode("cat").tolist() == [5.0, 1.0]
+
+    def test_normalize(self):
+        model, _ = _model(normalize=True)
+
+        vectors = model.encode(["hello world", "cat"])
+
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+    def test_cls_pooling(self):
+        model, _ = _model(pooling="cls")
+
+        assert model.encode(["world cat"]).tolist() == [[3.0, 1.0]]
+
+    def test_length_sorted_batches_keep_input_order(self):
+        model, session = _model(batch_size=2)
+        texts = ["hello world big cat", "cat", "hello world", "big"]
+
+        vectors = model.encode(texts)
+
+        assert vectors.tolist() == [[3.5, 1.0], [5.0, 1.0], [2.5, 1.0], [4.0, 1.0]]
+        # Short texts batched together, long ones together: little padding
+        assert [feeds["input_ids"].shape for feeds in session.feeds] == [(2, 1), (2, 4)]
+
+    def test_truncation_and_token_type_ids(self):
+        model, session = _model(max_seq_length=2, inputs=["input_ids", "attention_mask", "token_type_ids"])
+
+        model.encode(["hello world big cat"])
+
+        assert session.feeds[0]["input_ids"].tolist() == [[2, 3]]
+        assert session.feeds[0]["token_type_ids"].tolist() == [[0, 0]]
+
+
+class TestBackendSelection:
+    """The backend is part of every embedding key and index path"""
+
+    def test_onnx_backend_gets_its_own_keys(self):
+        torch_key = sentence_transformer_key("all-MiniLM-L6-v2")
+
+        with patch("app.rag.embedding_context.settings.local_embedding_backend", "onnx"), \
+                patch("app.rag.embedding_context.settings.onnx_embedding_quantize", True):
+            assert sentence_transformer_key("all-MiniLM-L6-v2") == torch_key + ":onnx-int8"
+            assert local_index_suffix() == "_onnx_int8"
+
+        assert local_index_suffix() == ""
+
+    def test_configured_loader_dispatches_to_onnx(self):
+        with patch("app.rag.embedding_models.settings.local_embedding_backend", "onnx"), \
+                patch("app.rag.onnx_embeddings.load_onnx_model", return_value="onnx-model") as load:
+            assert load_configured_model("all-MiniLM-L6-v2", "cpu") == "onnx-model"
+
+        load.assert_called_once_with("all-MiniLM-L6-v2", "cpu")
+
+    def test_onnx_backend_gets_its_own_chroma_collections(self):
+        from unittest.mock import MagicMock
+
+        from app.memory.memory_retriever import MemoryRetriever
+        from app.rag.chroma_manager import ChromaDBManager
+
+        manager = ChromaDBManager()
+        model = MagicMock()
+        model.get_sentence_embedding_dimension.return_value = 384
+
+        with patch("app.rag.embedding_models.settings.local_embedding_backend", "onnx"), \
+                patch("app.rag.embedding_models.settings.onnx_embedding_quantize", False), \
+                patch("app.rag.chroma_manager.settings.embedding_provider", "sentence-transformers"), \
+                patch("app.rag.chroma_manager.settings.chroma_collection_name", "database_schema"), \
+                patch("app.rag.embedding_models.embedding_model_registry.get", return_value=model), \
+                patch("app.memory.memory_retriever.SENTENCE_TRANSFORMERS_AVAILABLE", True), \
+                patch("app.memory.memory_retriever.chromadb") as chromadb, \
+                patch.dict("os.environ", {}, clear=False) as environ:
+            environ.pop("CHROMADB_COLLECTION_NAME", None)
+            assert manager.collection_name == "database_schema_onnx"
+            MemoryRetriever(conversation_store=MagicMock(), chroma_mode="embedded")
+
+            with patch("app.rag.chroma_manager.settings.embedding_provider", "google"):
+                assert manager.collection_name == "database_schema"
+
+        create = chromadb.PersistentClient.return_value.get_or_create_collection
+        assert create.call_args.kwargs["name"] == "conversation_memory_onnx"
@@ -0,0 +1,60 @@
+"""
+Unit Tests for token-budgeted prompt context selection
+"""
+
+from unittest.mock import patch
+
+from app.services.prompt_budget import ContextItem, estimate_tokens, fit_context
+
+
+def _item(kind, distance, tokens):
+    return ContextItem(kind, f"{kind}-{distance}", distance, payload=f"{kind}-{distance}", tokens=tokens)
+
+
+class TestEstimateTokens:
+    """Test the token estimate"""
+
+    def test_empty_text_has_no_tokens(self):
+        assert estimate_tokens("") == 0
+
+    def test_character_fallback(self):
+        with patch("app.services.prompt_budget.HAS_TIKTOKEN", False):
+            assert estimate_tokens("SELECT 1") == 2
+            assert estimate_tokens("x" * 4001) == 1001
+
+
+class TestFitContext:
+    """Test ranked selection under the budget"""
+
+    def test_everything_fits(self):
+        items = [_item("schema", 0.2, 100), _item("schema", 0.1, 100), _item("example", 0.5, 50)]
+
+        kept, dropped = fit_context(items, 1000)
+
+        assert [item.payload for item in kept] == ["schema-0.1", "schema-0.2", "example-0.5"]
+        assert dropped == []
+
+    def test_least_relevant_items_are_dropped_first(self):
+        schemas = [_item("schema", d / 10, 100) for d in range(10)]
+        examples = [_item("example", d / 10, 100) for d in range(3)]
+
+        kept, dropped = fit_context(schemas + examples, 500)
+
+        # Examples interleave with schema documents by relative rank
+        assert [item.payload for item in kept] == [
+            "schema-0.0", "schema-0.1", "schema-0.2", "schema-0.3", "example-0.0",
+        ]
+        assert len(dropped) == 8
+
+    def test_oversized_item_is_skipped_for_smaller_ones(self):
+        items = [_item("schema", 0.1, 50), _item("schema", 0.2, 900), _item("schema", 0.3, 40)]
+
+        kept, dropped = fit_context(items, 100)
+
+        assert [item.payload for item in kept] == ["schema-0.1", "schema-0.3"]
+        assert [item.payload for item in dropped] == ["schema-0.2"]
+
+    def test_zero_budget_keeps_nothing(self):
+        kept, dropped = fit_context([_item("schema", 0.1, 10)], 0)
+
+        assert kept == [] and len(dropped) == 1
@@ -0,0 +1,217 @@
+"""
+Unit Tests for QueryCache
+Tests key normalization, TTL expiry, LRU eviction and invalidation
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.llm_router import LLMResponse
+from app.services.query_cache import QueryCache
+
+
+class TestQueryCacheKeys:
+    """Test cache key construction"""
+
+    def test_normalization_ignores_case_whitespace_and_punctuation(self):
+        cache = QueryCache()
+        a = cache.make_key("How many  active employees?", "db1", "admin")
+        b = cache.make_key("how many active employees", "db1", "ADMIN")
+        assert a == b
+
+    def test_keys_scoped_by_database_and_role(self):
+        cache = QueryCache()
+        base = cache.make_key("count employees", "db1", "ADMIN")
+        assert base != cache.make_key("count employees", "db2", "ADMIN")
+        assert base != cache.make_key("count employees", "db1", "VIEWER")
+
+    def test_keys_scoped_by_previous_answer(self):
+        cache = QueryCache()
+
+        def history(answer):
+            return [
+                {"message_type": "user", "message_content": "punches today"},
+                {"message_type": "assistant", "message_content": answer},
+                {"message_type": "user", "message_content": "what about last month?"},
+            ]
+
+        punches = cache.make_key("what about last month?", "db1", "ADMIN", history("[SQL_QUERY]: SELECT 1"))
+        visitors = cache.make_key("what about last month?", "db1", "ADMIN", history("[SQL_QUERY]: SELECT 2"))
+
+        assert punches != visitors
+        assert punches == cache.make_key("what about last month?", "db1", "ADMIN", history("[SQL_QUERY]: SELECT 1"))
+        # No earlier answer - first questions share entries across conversations
+        assert cache.make_key("and for HR?", "db1", "ADMIN", [{"message_type": "user", "message_content": "q"}]) == \
+            cache.make_key("and for HR?", "db1", "ADMIN")
+
+    def test_standalone_questions_ignore_the_previous_answer(self):
+        cache = QueryCache()
+        history = [
+            {"message_type": "user", "message_content": "list visitors today"},
+            {"message_type": "assistant", "message_content": "Found 3 visitors\n[SQL_QUERY]: SELECT 2"},
+        ]
+
+        assert cache.make_key("How many active employees?", "db1", "ADMIN", history) == \
+            cache.make_key("how many active employees", "db1", "ADMIN")
+        assert cache.may_be_followup("What about last month?")
+        assert cache.may_be_followup("in March?")
+        assert not cache.may_be_followup("How many active employees?")
+
+
+class TestQueryCacheLookup:
+    """Test get/set behaviour"""
+
+    def test_miss_then_hit(self):
+        cache = QueryCache()
+        key = cache.make_key("count employees", "db1", "ADMIN")
+
+        assert cache.get(key) is None
+        cache.set(key, "SELECT COUNT(*) FROM vw_EmployeeMaster_Vms", [{"n": 5}])
+
+        entry = cache.get(key)
+        assert entry.sql_query == "SELECT COUNT(*) FROM vw_EmployeeMaster_Vms"
+        assert entry.results == [{"n": 5}]
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["result_hits"] == 1
+
+    def test_repeated_question_hits_mid_session(self):
+        cache = QueryCache()
+
+        def history(*answers):
+            messages = []
+            for answer in answers:
+                messages.append({"message_type": "user", "message_content": "how many active employees"})
+                messages.append({"message_type": "assistant", "message_content": answer})
+            return messages
+
+        first = cache.make_key("how many active employees", "db1", "ADMIN", history("Found 12 visitors"))
+        cache.set(first, "SELECT COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active = 1", [{"n": 5}])
+
+        later = cache.make_key(
+            "How many active employees?", "db1", "ADMIN", history("Found 12 visitors", "There are 5 active employees")
+        )
+        entry = cache.get(later)
+        assert entry is not None
+        assert entry.results == [{"n": 5}]
+
+    def test_sql_ttl_expiry(self):
+        cache = QueryCache(ttl_seconds=10)
+        key = cache.make_key("count employees", "db1", "ADMIN")
+
+        with patch("app.services.query_cache.time.time", return_value=1000.0):
+            cache.set(key, "SELECT 1")
+        with patch("app.services.query_cache.time.time", return_value=1011.0):
+            assert cache.get(key) is None
+
+    def test_result_ttl_keeps_sql(self):
+        cache = QueryCache(ttl_seconds=3600, result_ttl_seconds=30)
+        key = cache.make_key("count employees", "db1", "ADMIN")
+
+        with patch("app.services.query_cache.time.time", return_value=1000.0):
+            cache.set(key, "SELECT 1", [{"n": 1}])
+        with patch("app.services.query_cache.time.time", return_value=1031.0):
+            entry = cache.get(key)
+
+        assert entry.sql_query == "SELECT 1"
+        assert entry.results is None
+
+    def test_large_results_not_cached(self):
+        cache = QueryCache(max_result_rows=2)
+        key = cache.make_key("list employees", "db1", "ADMIN")
+        cache.set(key, "SELECT 1", [{"n": 1}, {"n": 2}, {"n": 3}])
+        assert cache.get(key).results is None
+
+    def test_applied_limits_are_kept_with_the_sql(self):
+        cache = QueryCache()
+        key = cache.make_key("all punches", "db1", "ADMIN")
+        cache.set(key, "SELECT TOP (1000) * FROM vw_RawPunchDetail", applied_limits=["TOP (1000)"])
+        cache.set(key, "SELECT TOP (1000) * FROM vw_RawPunchDetail", [{"n": 1}])
+
+        assert cache.get(key).applied_limits == ["TOP (1000)"]
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_entries=2)
+        k1 = cache.make_key("q1", "db1", "ADMIN")
+        k2 = cache.make_key("q2", "db1", "ADMIN")
+        k3 = cache.make_key("q3", "db1", "ADMIN")
+
+        cache.set(k1, "SELECT 1")
+        cache.set(k2, "SELECT 2")
+        cache.get(k1)  # k1 becomes most recently used
+        cache.set(k3, "SELECT 3")
+
+        assert cache.contains(k1)
+        assert not cache.contains(k2)
+        assert cache.get_stats()["evictions"] == 1
+
+
+class TestQueryCacheInvalidation:
+    """Test explicit invalidation"""
+
+    def test_invalidate_all(self):
+        cache = QueryCache()
+        cache.set(cache.make_key("q1", "db1", "ADMIN"), "SELECT 1")
+        cache.set(cache.make_key("q2", "db2", "ADMIN"), "SELECT 2")
+
+        assert cache.invalidate() == 2
+        assert cache.get_stats()["entries"] == 0
+
+    def test_invalidate_single_database(self):
+        cache = QueryCache()
+        k1 = cache.make_key("q1", "db1", "ADMIN")
+        k2 = cache.make_key("q2", "db2", "ADMIN")
+        cache.set(k1, "SELECT 1")
+        cache.set(k2, "SELECT 2")
+
+        assert cache.invalidate("db1") == 1
+        assert not cache.contains(k1)
+        assert cache.contains(k2)
+
+
+class TestFollowupDetection:
+    """Only questions that refer back to earlier turns bypass the cache"""
+
+    def test_pronoun_questions_are_context_dependent(self):
+        from app.agents.tenant_sql_agent import TenantSQLAgent
+
+        agent = TenantSQLAgent()
+        assert agent._is_context_dependent("Which of them are active?")
+        assert agent._is_context_dependent("Show me where it was used")
+        assert agent._is_context_dependent("It should include contractors")
+
+    def test_it_department_is_not_a_followup(self):
+        from app.agents.tenant_sql_agent import TenantSQLAgent
+
+        agent = TenantSQLAgent()
+        assert not agent._is_context_dependent("How many employees are in the IT department?")
+        assert not agent._is_context_dependent("List IT staff who badged in today")
+        assert not agent._is_context_dependent("count employees in it department")
+
+
+class TestAgentAnswerCache:
+    """Test how the tenant agent reports answers served from the cache"""
+
+    @pytest.mark.asyncio
+    async def test_cached_flag_follows_what_the_cache_served(self, stub_agent, agent_dependencies, tenant_database):
+        stub_agent._generate_sql.return_value = LLMResponse("SELECT COUNT(*) AS Total FROM EmployeeMaster", "gemini")
+        execute = AsyncMock(return_value=[{"Total": 42}])
+
+        async def ask(refresh=False):
+            return await stub_agent.process_query(
+                question="How many employees?", tenant_database=tenant_database,
+                platform_db=MagicMock(), refresh=refresh,
+            )
+
+        with agent_dependencies(execute=execute, enable_cache=True), \
+             patch("app.agents.tenant_sql_agent.query_cache", QueryCache()):
+            first = await ask()
+            second = await ask()
+            refreshed = await ask(refresh=True)
+
+        assert (first["cached"], second["cached"], refreshed["cached"]) == (False, True, False)
+        assert execute.await_count == 2
+        stub_agent._generate_sql.assert_awaited_once()
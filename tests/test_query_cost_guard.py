@@ -0,0 +1,250 @@
+"""
+Unit Tests for the SHOWPLAN-based query cost guard
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.llm_router import LLMResponse
+from app.services.query_cost_guard import (
+    CostDecision,
+    QueryCostEstimate,
+    QueryCostGuard,
+    inject_date_bound,
+    inject_top,
+    parse_showplan_xml,
+)
+from app.services.result_cursors import ResultCursorStore
+
+
+SHOWPLAN = """<?xml version="1.0" encoding="utf-16"?>
+<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan" Version="1.564">
+  <BatchSequence><Batch><Statements>
+    <StmtSimple StatementText="SELECT ..." StatementType="SELECT"
+                StatementSubTreeCost="812.5" StatementEstRows="2400000" />
+  </Statements></Batch></BatchSequence>
+</ShowPlanXML>"""
+
+TENANT_DB = SimpleNamespace(id="db-1", name="Oryggi", db_type="mssql")
+
+
+def _guard(**kwargs):
+    options = dict(bound_cost=50, narrow_cost=500, background_cost=5000, top_rows=1000, date_window_days=31)
+    options.update(kwargs)
+    return QueryCostGuard(**options)
+
+
+def _estimates(*costs):
+    """AsyncMock returning one estimate per call"""
+    return AsyncMock(side_effect=[
+        QueryCostEstimate(estimated_cost=cost, estimated_rows=cost * 1000) if cost is not None else None
+        for cost in costs
+    ])
+
+
+class TestShowplan:
+    """Test reading estimates from SHOWPLAN_XML"""
+
+    def test_cost_and_rows_are_read_from_namespaced_plan(self):
+        estimate = parse_showplan_xml(SHOWPLAN)
+
+        assert estimate.estimated_cost == 812.5
+        assert estimate.estimated_rows == 2400000
+
+    def test_unreadable_plan_gives_no_estimate(self):
+        assert parse_showplan_xml("not xml") is None
+        assert parse_showplan_xml("<ShowPlanXML />") is None
+
+
+class TestRewrites:
+    """Test TOP and date-bound injection"""
+
+    def test_top_is_injected_after_distinct(self):
+        assert inject_top("SELECT DISTINCT Department FROM vw_EmployeeMaster_Vms", 1000) == (
+            "SELECT DISTINCT TOP (1000) Department FROM vw_EmployeeMaster_Vms"
+        )
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT TOP 10 * FROM vw_RawPunchDetail",
+        "SELECT COUNT(*) FROM vw_RawPunchDetail",
+        "SELECT Ecode FROM A UNION SELECT Ecode FROM B",
+    ])
+    def test_top_is_not_injected_where_it_changes_nothing_or_is_unsafe(self, sql):
+        assert inject_top(sql, 1000) is None
+
+    def test_grouped_aggregate_gets_top(self):
+        assert inject_top("SELECT Ecode, COUNT(*) FROM vw_RawPunchDetail GROUP BY Ecode", 50).startswith(
+            "SELECT TOP (50) Ecode"
+        )
+
+    def test_date_bound_joins_existing_where_with_alias(self):
+        sql, description = inject_date_bound(
+            "SELECT p.Ecode FROM dbo.vw_RawPunchDetail p WHERE p.Ecode = 5 OR p.Ecode = 6 ORDER BY p.Ecode", 31
+        )
+
+        assert sql == (
+            "SELECT p.Ecode FROM dbo.vw_RawPunchDetail p WHERE "
+            "[p].[ATDate] >= DATEADD(DAY, -31, CAST(GETDATE() AS DATE)) AND (p.Ecode = 5 OR p.Ecode = 6) "
+            "ORDER BY p.Ecode"
+        )
+        assert description == "vw_RawPunchDetail.ATDate (last 31 days)"
+
+    def test_date_bound_adds_where_before_group_by(self):
+        sql, _ = inject_date_bound("SELECT Ecode, COUNT(*) FROM MachineRawPunch GROUP BY Ecode", 7)
+
+        assert sql == (
+            "SELECT Ecode, COUNT(*) FROM MachineRawPunch WHERE "
+            "[MachineRawPunch].[PunchTime] >= DATEADD(DAY, -7, CAST(GETDATE() AS DATE)) GROUP BY Ecode"
+        )
+
+    def test_existing_date_filter_or_other_source_is_left_alone(self):
+        assert inject_date_bound("SELECT * FROM vw_RawPunchDetail WHERE ATDate = '2024-01-01'", 31) is None
+        assert inject_date_bound("SELECT * FROM vw_EmployeeMaster_Vms", 31) is None
+
+    def test_outer_joined_source_is_not_bounded(self):
+        # Employees with no punches: a WHERE bound on p would make this always empty
+        assert inject_date_bound(
+            "SELECT e.Ecode FROM vw_EmployeeMaster_Vms e "
+            "LEFT JOIN vw_RawPunchDetail p ON p.Ecode = e.Ecode WHERE p.Ecode IS NULL", 31
+        ) is None
+        assert inject_date_bound(
+            "SELECT p.Ecode FROM vw_RawPunchDetail p FULL OUTER JOIN vw_EmployeeMaster_Vms e ON p.Ecode = e.Ecode", 31
+        ) is None
+
+        # The preserved side of a LEFT JOIN can still be bounded
+        sql, _ = inject_date_bound(
+            "SELECT p.Ecode, e.Name FROM vw_RawPunchDetail p LEFT JOIN vw_EmployeeMaster_Vms e ON p.Ecode = e.Ecode", 31
+        )
+        assert sql.endswith("WHERE [p].[ATDate] >= DATEADD(DAY, -31, CAST(GETDATE() AS DATE))")
+
+
+class TestDecisions:
+    """Test the cost bands and the estimate cache"""
+
+    @pytest.mark.asyncio
+    async def test_cheap_query_runs_unchanged(self):
+        guard = _guard()
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", _estimates(10)):
+            decision = await guard.check(TENANT_DB, "SELECT * FROM vw_RawPunchDetail")
+
+        assert decision.action == "allow"
+        assert decision.sql_query == "SELECT * FROM vw_RawPunchDetail"
+
+    @pytest.mark.asyncio
+    async def test_moderate_query_is_bounded(self):
+        guard = _guard()
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", _estimates(120)):
+            decision = await guard.check(TENANT_DB, "SELECT Ecode FROM vw_RawPunchDetail")
+
+        assert decision.action == "bound"
+        assert decision.sql_query.startswith("SELECT TOP (1000) Ecode FROM vw_RawPunchDetail WHERE")
+        assert len(decision.applied) == 2
+
+    @pytest.mark.asyncio
+    async def test_expensive_query_is_bounded_when_date_bound_is_cheap_enough(self):
+        guard = _guard()
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", _estimates(900, 80)):
+            decision = await guard.check(TENANT_DB, "SELECT Ecode FROM vw_RawPunchDetail")
+
+        assert decision.action == "bound"
+        assert "ATDate" in decision.sql_query
+
+    @pytest.mark.asyncio
+    async def test_expensive_query_without_date_bound_asks_to_narrow(self):
+        guard = _guard()
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", _estimates(900)):
+            decision = await guard.check(TENANT_DB, "SELECT * FROM vw_EmployeeMaster_Vms")
+
+        assert decision.action == "narrow"
+        assert "900,000 rows" in decision.message
+
+    @pytest.mark.asyncio
+    async def test_very_expensive_query_goes_to_background_if_allowed(self):
+        guard = _guard()
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", _estimates(9000, 9000)):
+            assert (await guard.check(TENANT_DB, "SELECT * FROM vw_EmployeeMaster_Vms")).action == "background"
+            decision = await guard.check(TENANT_DB, "SELECT * FROM vw_EmployeeMaster_Vms", allow_background=False)
+
+        assert decision.action == "narrow"
+
+    @pytest.mark.asyncio
+    async def test_estimates_are_cached_and_failures_fail_open(self):
+        guard = _guard()
+        estimate = _estimates(120, None)
+        with patch("app.gateway.query_router.query_router.estimate_query_cost", estimate):
+            await guard.check(TENANT_DB, "SELECT * FROM vw_EmployeeMaster_Vms")
+            cached = await guard.estimate(TENANT_DB, "select *  from [vw_EmployeeMaster_Vms]")
+            decision = await guard.check(TENANT_DB, "SELECT * FROM DeptMaster")
+
+        assert cached.source == "cache"
+        assert decision.action == "allow"
+        stats = guard.get_stats()
+        assert stats["estimate_cache_hits"] == 1
+        assert stats["estimate_failures"] == 1
+
+
+class TestTenantAgentCostGuard:
+    """Test how process_query acts on cost decisions"""
+
+    @pytest.fixture
+    def run(self, stub_agent, agent_dependencies, tenant_database):
+        """Runs process_query under a given cost decision and waits for background work"""
+        stub_agent._generate_sql.return_value = LLMResponse("SELECT * FROM vw_RawPunchDetail", "gemini")
+
+        async def run(decision, execute, store):
+            with agent_dependencies(execute=execute, cost_guard_enabled=True), \
+                 patch("app.agents.tenant_sql_agent.query_cost_guard.check", AsyncMock(return_value=decision)), \
+                 patch("app.agents.tenant_sql_agent.result_cursor_store", store):
+                result = await stub_agent.process_query(
+                    question="Show all punches", tenant_database=tenant_database,
+                    platform_db=MagicMock(), user_id="user-1",
+                )
+                await asyncio.gather(*stub_agent._background_queries)
+            return result
+
+        return run
+
+    @pytest.mark.asyncio
+    async def test_narrow_decision_asks_for_clarification_without_executing(self, run):
+        execute = AsyncMock()
+        decision = CostDecision("narrow", "SELECT * FROM vw_RawPunchDetail",
+                                QueryCostEstimate(900, 900000), message="Could you narrow it down?")
+
+        result = await run(decision, execute, ResultCursorStore())
+
+        execute.assert_not_awaited()
+        assert result["needs_clarification"] is True
+        assert result["clarification_question"] == "Could you narrow it down?"
+        assert result["cost_guard"]["action"] == "narrow"
+
+    @pytest.mark.asyncio
+    async def test_background_decision_returns_pending_cursor(self, run):
+        rows = [{"Ecode": i} for i in range(3)]
+        execute = AsyncMock(return_value=rows)
+        store = ResultCursorStore()
+        decision = CostDecision("background", "SELECT * FROM vw_RawPunchDetail",
+                                QueryCostEstimate(9000, 9000000), message="Running in the background.")
+
+        result = await run(decision, execute, store)
+
+        assert result["cursor"]["status"] == "pending"
+        assert result["natural_answer"] == "Running in the background."
+        cursor = store.get(result["cursor"]["cursor_id"], "user-1")
+        assert cursor.status == "ready"
+        assert cursor.rows == rows
+
+    @pytest.mark.asyncio
+    async def test_bound_decision_tells_the_user_what_was_limited(self, run):
+        execute = AsyncMock(return_value=[{"Ecode": 1, "ATDate": "2024-01-01"}, {"Ecode": 2, "ATDate": "2024-01-02"}])
+        applied = ["date bound on ATDate (last 31 days)", "TOP (1000)"]
+        decision = CostDecision("bound", "SELECT TOP (1000) * FROM vw_RawPunchDetail WHERE ATDate >= '2024-01-01'",
+                                QueryCostEstimate(40, 1000), applied)
+
+        result = await run(decision, execute, ResultCursorStore())
+
+        assert execute.await_args.kwargs["query"] == decision.sql_query
+        assert result["applied_limits"] == applied
+        assert "date bound on ATDate (last 31 days) and TOP (1000)" in result["natural_answer"]
@@ -387,6 +387,57 @@ class TestQueryDatabaseToolExecution:
         assert data_access_call[1]["data_scoped"] == False  # ADMIN not scoped
 
 
+class TestQueryDatabaseToolFollowups:
+    """Test follow-ups answered from the previous result snapshot"""
+
+    @patch('app.tools.query_database_tool.result_snapshot_store')
+    @patch('app.tools.query_database_tool.sql_agent')
+    @patch('app.tools.query_database_tool.rbac_middleware')
+    @patch('app.tools.query_database_tool.audit_logger')
+    def test_snapshot_answer_skips_scoping_and_execution(self, mock_audit, mock_rbac, mock_sql_agent, mock_snapshots):
+        """Test rows filtered from the previous result are returned without a database call"""
+        rows = [{"Ecode": 7, "Department": "IT"}]
+        mock_sql_agent.generate_sql.return_value = {
+            "sql_query": "SELECT * FROM (SELECT Ecode, Department FROM EmployeeMaster) AS prev WHERE prev.[Department] = N'IT'",
+            "results": rows,
+            "answered_from_snapshot": True,
+        }
+        mock_sql_agent._format_answer.return_value = ""
+
+        tool = QueryDatabaseTool()
+        result = tool._run(
+            question="which of them are in IT",
+            user_id="admin_001",
+            user_role="ADMIN",
+            session_id="session-1"
+        )
+
+        assert result["success"] == True
+        assert result["results"] == rows
+        mock_sql_agent.execute_query.assert_not_called()
+        mock_rbac.apply_data_scoping.assert_not_called()
+        assert mock_sql_agent.generate_sql.call_args.kwargs["session_id"] == "session-1"
+        mock_snapshots.record.assert_called_once()
+
+    @patch('app.tools.query_database_tool.result_snapshot_store')
+    @patch('app.tools.query_database_tool.sql_agent')
+    @patch('app.tools.query_database_tool.rbac_middleware')
+    @patch('app.tools.query_database_tool.audit_logger')
+    def test_executed_results_are_snapshotted(self, mock_audit, mock_rbac, mock_sql_agent, mock_snapshots):
+        """Test the scoped query's rows are kept for the session's next follow-up"""
+        mock_sql_agent.generate_sql.return_value = {"sql_query": "SELECT Ecode FROM EmployeeMaster"}
+        mock_sql_agent.execute_query.return_value = [{"Ecode": 1}]
+        mock_rbac.apply_data_scoping.return_value = "SELECT Ecode FROM EmployeeMaster"
+
+        tool = QueryDatabaseTool()
+        tool._run(question="List employees", user_id="admin_001", user_role="ADMIN", session_id="session-1")
+
+        mock_snapshots.record.assert_called_once_with(
+            "session-1", "admin_001", "SELECT Ecode FROM EmployeeMaster", [{"Ecode": 1}],
+            history_sql="SELECT Ecode FROM EmployeeMaster",
+        )
+
+
 class TestQueryDatabaseToolMetadata:
     """Test suite for tool metadata"""
 
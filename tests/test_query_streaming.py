@@ -0,0 +1,188 @@
+"""
+Streaming Tests for the multi-tenant query pipeline
+Covers TenantSQLAgent.process_query_events and QueryRouter.stream_query.
+"""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.gateway.query_router import QueryRouter, batch_rows
+from app.services.sql_result_cache import SQLResultCache
+
+
+ROWS = [{"ECode": i, "EmpName": f"Employee {i}"} for i in range(5)]
+
+
+async def _stream_two_batches(**kwargs):
+    yield ["ECode", "EmpName"], ROWS[:3]
+    yield ["ECode", "EmpName"], ROWS[3:]
+
+
+class TestProcessQueryEvents:
+    """Test the staged event stream behind /mt/query/stream"""
+
+    @pytest.mark.asyncio
+    async def test_events_arrive_in_stage_order(self, stub_agent, agent_dependencies, tenant_database):
+        with agent_dependencies(stream=_stream_two_batches):
+            events = [
+                event async for event in stub_agent.process_query_events(
+                    question="List employees",
+                    tenant_database=tenant_database,
+                    platform_db=MagicMock(),
+                    stream_rows=True,
+                )
+            ]
+
+        names = [name for name, _ in events]
+        assert names == ["understanding", "sql", "columns", "rows", "rows", "result"]
+        assert events[1][1]["sql_query"].startswith("SELECT ECode")
+        assert events[2][1]["columns"] == ["ECode", "EmpName"]
+
+        result = events[-1][1]
+        assert result["success"] is True
+        assert result["results"] == ROWS
+        assert result["result_count"] == len(ROWS)
+
+    @pytest.mark.asyncio
+    async def test_paged_stream_sends_first_page_and_opens_cursor(self, stub_agent, agent_dependencies, tenant_database):
+        with agent_dependencies(stream=_stream_two_batches, execute=AsyncMock(return_value=ROWS)):
+            events = [
+                event async for event in stub_agent.process_query_events(
+                    question="List employees",
+                    tenant_database=tenant_database,
+                    platform_db=MagicMock(),
+                    stream_rows=True,
+                    page_size=2,
+                )
+            ]
+            await asyncio.gather(*stub_agent._background_queries)
+
+        streamed = [row for name, data in events if name == "rows" for row in data["rows"]]
+        result = events[-1][1]
+        assert streamed == ROWS[:2]
+        assert result["result_count"] == 2
+        assert result["cursor"]["has_more"] is True
+
+    @pytest.mark.asyncio
+    async def test_clarification_ends_stream_without_sql(self, stub_agent, tenant_database):
+        stub_agent._check_light_clarity = AsyncMock(return_value={
+            "needs_clarification": True,
+            "clarification_question": "Which department?",
+            "clarification_options": ["IT", "HR"],
+        })
+
+        events = [
+            event async for event in stub_agent.process_query_events(
+                question="Show me stuff",
+                tenant_database=tenant_database,
+                platform_db=MagicMock(),
+                stream_rows=True,
+            )
+        ]
+
+        assert [name for name, _ in events] == ["understanding", "result"]
+        assert events[-1][1]["needs_clarification"] is True
+
+    @pytest.mark.asyncio
+    async def test_process_query_still_returns_full_result(self, stub_agent, agent_dependencies, tenant_database):
+        with agent_dependencies(execute=AsyncMock(return_value=ROWS)):
+            result = await stub_agent.process_query(
+                question="List employees",
+                tenant_database=tenant_database,
+                platform_db=MagicMock(),
+            )
+
+        assert result["success"] is True
+        assert result["results"] == ROWS
+
+
+class TestQueryRouterStreaming:
+    """Test batch streaming in QueryRouter"""
+
+    def test_batch_rows_splits_and_keeps_columns(self):
+        batches = list(batch_rows(ROWS, 2))
+
+        assert [len(rows) for _, rows in batches] == [2, 2, 1]
+        assert all(columns == ["ECode", "EmpName"] for columns, _ in batches)
+
+    def test_batch_rows_empty_result_still_yields_once(self):
+        assert list(batch_rows([], 100)) == [([], [])]
+
+    @pytest.mark.asyncio
+    async def test_direct_stream_closes_cursor_when_consumer_stops(self, tenant_database):
+        closed = []
+
+        def iter_query_batches(**kwargs):
+            try:
+                for batch in batch_rows(ROWS, 1):
+                    yield batch
+            finally:
+                closed.append(True)
+
+        router = QueryRouter()
+        router._direct_manager = MagicMock()
+        router._direct_manager.iter_query_batches.side_effect = iter_query_batches
+        router._should_use_gateway = MagicMock(return_value=False)
+
+        stream = router.stream_query(tenant_database=tenant_database, query="SELECT 1", batch_size=1)
+        first = await stream.__anext__()
+        await stream.aclose()
+
+        assert first == (["ECode", "EmpName"], ROWS[:1])
+        assert closed == [True]
+
+    @pytest.mark.asyncio
+    async def test_cancel_during_fetch_waits_for_fetch_then_closes_cursor(self, tenant_database):
+        fetching = threading.Event()
+        release = threading.Event()
+        closed = []
+
+        def iter_query_batches(**kwargs):
+            try:
+                yield ["ECode", "EmpName"], ROWS[:1]
+                fetching.set()
+                release.wait(5)  # a slow fetchmany()
+                yield ["ECode", "EmpName"], ROWS[1:2]
+            finally:
+                closed.append(True)
+
+        router = QueryRouter()
+        router._direct_manager = MagicMock()
+        router._direct_manager.iter_query_batches.side_effect = iter_query_batches
+        router._should_use_gateway = MagicMock(return_value=False)
+
+        async def consume():
+            async for _ in router.stream_query(tenant_database=tenant_database, query="SELECT 1", batch_size=1):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(fetching.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert closed == []  # still fetching - not closed underneath the worker
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert closed == [True]
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_result_cache(self, tenant_database):
+        router = QueryRouter()
+        router._direct_manager = MagicMock()
+        router._direct_manager.iter_query_batches.side_effect = lambda **kwargs: iter(batch_rows(ROWS, 2))
+        router._should_use_gateway = MagicMock(return_value=False)
+        cache = SQLResultCache()
+
+        with patch("app.gateway.query_router.sql_result_cache", cache):
+            first = [row async for _, batch in router.stream_query(tenant_database, "SELECT * FROM AccessLevel")
+                     for row in batch]
+            second = [row async for _, batch in router.stream_query(tenant_database, "SELECT * FROM AccessLevel")
+                      for row in batch]
+
+        assert first == second == ROWS
+        assert router._direct_manager.iter_query_batches.call_count == 1
+        assert cache.hits == 1
@@ -0,0 +1,203 @@
+"""
+Unit Tests for server-side paginated result cursors
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.llm_router import LLMResponse
+from app.services.result_cursors import ResultCursorStore, paged_sql
+
+
+ROWS = [{"Ecode": i, "EmpName": f"Employee {i}"} for i in range(250)]
+ORDERED_SQL = "SELECT Ecode, EmpName FROM vw_EmployeeMaster_Vms ORDER BY Ecode"
+
+
+def _store(**kwargs):
+    options = dict(max_cursors=10, max_total_rows=1000, spill_rows=200, idle_ttl_seconds=60)
+    options.update(kwargs)
+    return ResultCursorStore(**options)
+
+
+class TestPagedSQL:
+    """Test the OFFSET/FETCH rewrite"""
+
+    def test_ordered_select_is_rewritten(self):
+        assert paged_sql(ORDERED_SQL, 200, 50) == f"{ORDERED_SQL} OFFSET 200 ROWS FETCH NEXT 50 ROWS ONLY"
+        assert paged_sql(ORDERED_SQL, 200, 50, "postgresql") == f"{ORDERED_SQL} LIMIT 50 OFFSET 200"
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT Ecode FROM vw_EmployeeMaster_Vms",
+        "SELECT TOP 10 Ecode FROM vw_EmployeeMaster_Vms ORDER BY Ecode",
+        "SELECT * FROM (SELECT TOP 5 Ecode FROM t ORDER BY Ecode) x",
+    ])
+    def test_unordered_or_limited_select_is_not_seekable(self, sql):
+        assert paged_sql(sql, 0, 10) is None
+
+
+class TestResultCursorStore:
+    """Test cursor lifecycle, ownership and memory bounds"""
+
+    @pytest.mark.asyncio
+    async def test_pages_are_served_from_the_spill(self):
+        store = _store()
+        cursor = store.open("db", "user-1", ORDERED_SQL, "mssql", ROWS[:150], complete=True, page_size=100)
+
+        page = await store.fetch_page(store.get(cursor.cursor_id, "user-1"), offset=100)
+
+        assert page["rows"] == ROWS[100:150]
+        assert page["has_more"] is False
+        assert page["next_offset"] is None
+        assert page["total_rows"] == 150
+
+    def test_other_users_cannot_read_or_close_a_cursor(self):
+        store = _store()
+        cursor = store.open("db", "user-1", ORDERED_SQL, "mssql", ROWS[:150], complete=True, page_size=100)
+
+        assert store.get(cursor.cursor_id, "user-2") is None
+        assert store.close(cursor.cursor_id, "user-2") is False
+        assert store.close(cursor.cursor_id, "user-1") is True
+        assert store.get(cursor.cursor_id, "user-1") is None
+
+    def test_idle_cursors_expire(self):
+        store = _store(idle_ttl_seconds=10)
+        cursor = store.open("db", "user-1", ORDERED_SQL, "mssql", ROWS[:150], complete=True, page_size=100)
+
+        with patch("app.services.result_cursors.time.monotonic", return_value=cursor.last_access + 11):
+            assert store.get(cursor.cursor_id, "user-1") is None
+        assert store.get_stats()["expirations"] == 1
+
+    def test_memory_is_bounded_by_spill_and_total_rows(self):
+        store = _store(spill_rows=200, max_total_rows=450)
+        first = store.open("db", "u", ORDERED_SQL, "mssql", ROWS, complete=True, page_size=100)
+        assert len(first.rows) == 200
+        assert first.complete is False and first.seekable is True
+
+        store.open("db", "u", ORDERED_SQL, "mssql", ROWS, complete=True, page_size=100)
+        store.open("db", "u", ORDERED_SQL, "mssql", ROWS, complete=True, page_size=100)
+
+        stats = store.get_stats()
+        assert stats["open_cursors"] == 2
+        assert stats["spilled_rows"] == 400
+        assert store.get(first.cursor_id, "u") is None
+
+    @pytest.mark.asyncio
+    async def test_reserved_cursor_is_pending_until_fulfilled(self):
+        store = _store(idle_ttl_seconds=10)
+        cursor = store.reserve("db", "u", ORDERED_SQL, "mssql", page_size=100)
+
+        with patch("app.services.result_cursors.time.monotonic", return_value=cursor.last_access + 60):
+            pending = await store.fetch_page(store.get(cursor.cursor_id, "u"), offset=0)
+        assert pending["status"] == "pending" and pending["has_more"] is True
+
+        assert store.fulfil(cursor.cursor_id, ROWS[:150], complete=True)
+        page = await store.fetch_page(store.get(cursor.cursor_id, "u"), offset=0)
+        assert page["status"] == "ready"
+        assert page["rows"] == ROWS[:100]
+        assert page["total_rows"] == 150
+
+    @pytest.mark.asyncio
+    async def test_failed_background_query_is_reported(self):
+        store = _store()
+        cursor = store.reserve("db", "u", ORDERED_SQL, "mssql", page_size=100)
+
+        assert store.fail(cursor.cursor_id, "Query timed out")
+        page = await store.fetch_page(cursor, offset=0)
+
+        assert page["status"] == "failed"
+        assert page["error"] == "Query timed out"
+        assert page["has_more"] is False
+
+    def test_pending_cursor_expires_after_the_background_timeout(self):
+        store = _store(idle_ttl_seconds=10, pending_timeout_seconds=100)
+        cursor = store.reserve("db", "u", ORDERED_SQL, "mssql", page_size=100)
+        reserved_at = cursor.last_access
+
+        with patch("app.services.result_cursors.time.monotonic", return_value=reserved_at + 105):
+            assert store.get(cursor.cursor_id, "u") is not None
+        with patch("app.services.result_cursors.time.monotonic", return_value=reserved_at + 105 + 111):
+            assert store.get(cursor.cursor_id, "u") is None
+
+    @pytest.mark.asyncio
+    async def test_pages_past_the_spill_are_fetched_with_offset_fetch(self):
+        store = _store(spill_rows=200)
+        cursor = store.open(
+            "db", "u", ORDERED_SQL, "mssql", ROWS, complete=False, page_size=100, conversation_id="conv-1"
+        )
+        assert store.needs_database(cursor, 200, 100)
+
+        execute = AsyncMock(return_value=ROWS[200:250])
+        with patch("app.gateway.query_router.query_router.execute_query", execute):
+            page = await store.fetch_page(cursor, offset=200, limit=100, tenant_database=MagicMock())
+
+        assert execute.await_args.kwargs["query"].endswith("OFFSET 200 ROWS FETCH NEXT 100 ROWS ONLY")
+        # Database reads are audited for the cursor's owner
+        assert execute.await_args.kwargs["user_id"] == "u"
+        assert execute.await_args.kwargs["conversation_id"] == "conv-1"
+        assert page["rows"] == ROWS[200:250]
+        assert page["has_more"] is False
+        assert store.get_stats()["pages_from_database"] == 1
+
+
+class TestTenantAgentPaging:
+    """Test that process_query returns the first page plus a cursor"""
+
+    @pytest.mark.asyncio
+    async def test_only_the_first_page_is_fetched(self, stub_agent, agent_dependencies, tenant_database):
+        stub_agent._generate_sql.return_value = LLMResponse(ORDERED_SQL, "gemini")
+        store = _store(spill_rows=1000)
+        execute = AsyncMock(side_effect=lambda **kwargs: ROWS[:kwargs["max_rows"]])
+
+        with agent_dependencies(execute=execute), \
+             patch("app.agents.tenant_sql_agent.result_cursor_store", store):
+            result = await stub_agent.process_query(
+                question="List employees", tenant_database=tenant_database,
+                platform_db=MagicMock(), user_id="user-1", page_size=100,
+            )
+
+        # One row past the page tells whether more follow
+        assert execute.await_args.kwargs["max_rows"] == 101
+        assert result["results"] == ROWS[:100]
+        assert result["result_count"] == 100
+        assert result["cursor"]["has_more"] is True
+        assert result["cursor"]["total_rows"] is None
+
+        # Ordered results: later pages are read with OFFSET/FETCH
+        cursor = store.get(result["cursor"]["cursor_id"], "user-1")
+        assert cursor.status == "ready" and cursor.seekable
+        assert store.needs_database(cursor, 100, 100)
+
+    @pytest.mark.asyncio
+    async def test_unordered_spill_is_read_in_the_background(self, stub_agent, agent_dependencies, tenant_database):
+        store = _store(spill_rows=1000)
+        execute = AsyncMock(side_effect=lambda **kwargs: ROWS[:kwargs["max_rows"]])
+
+        with agent_dependencies(execute=execute), \
+             patch("app.agents.tenant_sql_agent.result_cursor_store", store):
+            result = await stub_agent.process_query(
+                question="List employees", tenant_database=tenant_database,
+                platform_db=MagicMock(), user_id="user-1", page_size=100,
+            )
+            assert result["cursor"]["status"] == "pending"
+            await asyncio.gather(*stub_agent._background_queries)
+
+        assert result["results"] == ROWS[:100]
+        assert [call.kwargs["max_rows"] for call in execute.await_args_list] == [101, 1000]
+        cursor = store.get(result["cursor"]["cursor_id"], "user-1")
+        assert cursor.status == "ready"
+        assert cursor.rows == ROWS and cursor.complete
+
+    @pytest.mark.asyncio
+    async def test_cancelled_background_query_fails_its_cursor(self, stub_agent, tenant_database):
+        store = _store()
+        cursor = store.reserve("db", "user-1", ORDERED_SQL, "mssql", page_size=100)
+
+        with patch("app.agents.tenant_sql_agent.result_cursor_store", store), \
+             patch("app.agents.tenant_sql_agent.query_router.execute_query",
+                   AsyncMock(side_effect=asyncio.CancelledError)):
+            with pytest.raises(asyncio.CancelledError):
+                await stub_agent._run_background_query(cursor.cursor_id, tenant_database, ORDERED_SQL, "user-1")
+
+        assert store.get(cursor.cursor_id, "user-1").status == "failed"
@@ -0,0 +1,218 @@
+"""
+Unit Tests for per-session follow-up result snapshots
+"""
+
+from array import array
+from unittest.mock import patch
+
+from app.services.result_snapshots import ResultSnapshotStore, strip_order_by
+
+
+SQL = "SELECT Ecode, EmpName, Department, Gender FROM vw_EmployeeMaster_Vms WHERE Active = 1 ORDER BY EmpName"
+
+ROWS = [
+    {"Ecode": 1, "EmpName": "Asha", "Department": "IT", "Gender": "Female"},
+    {"Ecode": 2, "EmpName": "Ravi", "Department": "HR", "Gender": "Male"},
+    {"Ecode": 3, "EmpName": "Meera", "Department": "IT", "Gender": "Female"},
+    {"Ecode": 4, "EmpName": "John", "Department": "Finance", "Gender": "Male"},
+]
+
+
+def _store(**kwargs):
+    return ResultSnapshotStore(**{"max_sessions": 10, "max_rows": 100, "ttl_seconds": 60, **kwargs})
+
+
+class TestSnapshotStorage:
+    """Test compact column storage and row reconstruction"""
+
+    def test_columns_are_array_backed_and_rows_round_trip(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        assert isinstance(snapshot.data["Ecode"], array)
+        assert snapshot.key_column == "Ecode"
+        assert snapshot.key_values() == ["1", "2", "3", "4"]
+        assert snapshot.rows() == ROWS
+
+    def test_large_result_keeps_only_keys(self):
+        rows = [{"Ecode": i, "EmpName": f"E{i}"} for i in range(150)]
+        snapshot = _store().record("s1", "u1", SQL, rows)
+
+        assert snapshot.truncated
+        assert snapshot.data == {}
+        assert len(snapshot.key_values()) == 150
+        assert snapshot.match_filters("which of them are in IT") is None
+
+    def test_key_subquery_selects_keys_from_previous_query(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        assert snapshot.key_subquery() == (
+            "SELECT prev.[Ecode] FROM (SELECT Ecode, EmpName, Department, Gender FROM vw_EmployeeMaster_Vms "
+            "WHERE Active = 1) AS prev"
+        )
+        cte = _store().record("s1", "u1", "WITH t AS (SELECT Ecode FROM EmployeeMaster) SELECT * FROM t", ROWS)
+        assert cte.key_subquery() is None
+
+    def test_aggregation_result_has_no_keys(self):
+        snapshot = _store().record("s1", "u1", "SELECT COUNT(*) AS total FROM EmployeeMaster", [{"total": 42}])
+
+        assert snapshot.key_values() is None
+
+
+class TestLocalFiltering:
+    """Test which follow-ups can be answered from the snapshot alone"""
+
+    def test_value_filter_is_answered_locally(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        filters = snapshot.match_filters("Which of them are in IT?")
+
+        assert filters == [("Department", "IT")]
+        assert [row["Ecode"] for row in snapshot.filter_rows(filters)] == [1, 3]
+
+    def test_column_name_words_and_multiple_filters(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        filters = snapshot.match_filters("how many of them are female in the IT department")
+
+        assert sorted(filters) == [("Department", "IT"), ("Gender", "Female")]
+        assert len(snapshot.filter_rows(filters)) == 2
+
+    def test_extra_conditions_need_sql(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        assert snapshot.match_filters("which of them in IT joined after 2020") is None
+        assert snapshot.match_filters("what is their salary") is None
+
+    def test_value_must_match_whole_word_and_acronym_case(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        assert snapshot.match_filters("which of them are hiring") is None
+        assert snapshot.match_filters("which of them are in it") is None
+        assert snapshot.match_filters("which of them are in finance") == [("Department", "Finance")]
+
+    def test_filler_word_values_are_not_matched(self):
+        punches = [
+            {"Ecode": 1, "DeptName": "IT", "Direction": "In"},
+            {"Ecode": 2, "DeptName": "IT", "Direction": "Out"},
+            {"Ecode": 3, "DeptName": "HR", "Direction": "In"},
+        ]
+        snapshot = _store().record("s1", "u1", "SELECT Ecode, DeptName, Direction FROM vw_RawPunchDetail", punches)
+
+        filters = snapshot.match_filters("which of them are in IT")
+
+        assert filters == [("DeptName", "IT")]
+        assert len(snapshot.filter_rows(filters)) == 2
+        assert snapshot.match_filters("which of them are out") is None
+
+    def test_filtered_sql_wraps_previous_query(self):
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+
+        sql = snapshot.filtered_sql([("Department", "IT")])
+
+        assert sql == (
+            "SELECT * FROM (SELECT Ecode, EmpName, Department, Gender FROM vw_EmployeeMaster_Vms "
+            "WHERE Active = 1) AS prev WHERE prev.[Department] = N'IT'"
+        )
+
+    def test_strip_order_by_keeps_top_and_nested_order(self):
+        assert strip_order_by("SELECT TOP 5 * FROM T ORDER BY A") == "SELECT TOP 5 * FROM T ORDER BY A"
+        assert strip_order_by("SELECT * FROM T ORDER BY A OFFSET 0 ROWS") == "SELECT * FROM T ORDER BY A OFFSET 0 ROWS"
+        assert strip_order_by("SELECT * FROM T;") == "SELECT * FROM T"
+
+
+class TestSnapshotStore:
+    """Test session scoping, expiry and eviction"""
+
+    def test_snapshots_are_per_session_and_user(self):
+        store = _store()
+        store.record("s1", "u1", SQL, ROWS)
+
+        assert store.get("s1", "u1") is not None
+        assert store.get("s1", "u2") is None
+        assert store.get("s2", "u1") is None
+        assert store.get(None, "u1") is None
+
+    def test_expired_snapshot_is_dropped(self):
+        store = _store(ttl_seconds=60)
+        store.record("s1", "u1", SQL, ROWS)
+
+        with patch("app.services.result_snapshots.time.time", return_value=10 ** 12):
+            assert store.get("s1", "u1") is None
+
+    def test_lru_eviction(self):
+        store = _store(max_sessions=2)
+        store.record("s1", "u1", SQL, ROWS)
+        store.record("s2", "u1", SQL, ROWS)
+        store.get("s1", "u1")
+        store.record("s3", "u1", SQL, ROWS)
+
+        assert store.get("s2", "u1") is None
+        assert store.get("s1", "u1") is not None
+        assert store.get_stats()["evictions"] == 1
+
+    def test_snapshot_is_only_used_for_the_latest_answer(self):
+        store = _store()
+        scoped_sql = SQL.replace("WHERE Active = 1", "WHERE Active = 1 AND Department = 'IT'")
+        store.record("s1", "u1", scoped_sql, ROWS, history_sql=SQL)
+
+        def history(*assistant_messages):
+            messages = [{"message_type": "user", "message_content": "list active employees"}]
+            for content in assistant_messages:
+                messages.append({"message_type": "assistant", "message_content": content})
+                messages.append({"message_type": "user", "message_content": "which of them are in IT"})
+            return messages
+
+        answered = "Found 4 employees\n\n---CONTEXT_FOR_FOLLOWUP---\n[SQL_QUERY]: " + " ".join(SQL.split())
+        assert store.get_current("s1", "u1", history(answered)) is not None
+        # A later failed / non-query turn, or a different query, makes the snapshot stale
+        assert store.get_current("s1", "u1", history(answered, "Error processing request")) is None
+        other = "Found 2 visitors\n\n---CONTEXT_FOR_FOLLOWUP---\n[SQL_QUERY]: SELECT * FROM Visitors"
+        assert store.get_current("s1", "u1", history(answered, other)) is None
+        assert store.get_stats()["stale"] == 2
+
+    def test_disabled_store_records_nothing(self):
+        store = _store(enabled=False)
+
+        assert store.record("s1", "u1", SQL, ROWS) is None
+        assert store.get("s1", "u1") is None
+
+
+class TestLargeFollowupKeyLists:
+    """Test follow-ups over more keys than fit in an IN (...) literal list"""
+
+    def _agent(self):
+        from app.agents.sql_agent import RAGSQLAgent
+        return RAGSQLAgent.__new__(RAGSQLAgent)
+
+    def test_large_key_list_filters_through_previous_query(self):
+        from app.agents.sql_agent import PREVIOUS_ECODES_PLACEHOLDER
+
+        rows = [{"Ecode": i, "EmpName": f"E{i}"} for i in range(150)]
+        snapshot = _store().record("s1", "u1", SQL, rows)
+        agent = self._agent()
+
+        with patch("app.agents.sql_agent.settings.result_snapshot_max_inline_keys", 100):
+            ecodes, subquery = agent._limit_prefetched_ecodes(snapshot.key_values(), snapshot.key_subquery())
+        sql = agent._expand_ecode_placeholder(
+            f"SELECT * FROM EmployeeMaster e WHERE e.Ecode IN ({PREVIOUS_ECODES_PLACEHOLDER})", ecodes, subquery
+        )
+
+        assert sql == f"SELECT * FROM EmployeeMaster e WHERE e.Ecode IN ({snapshot.key_subquery()})"
+
+    def test_small_key_list_is_inlined(self):
+        from app.agents.sql_agent import PREVIOUS_ECODES_PLACEHOLDER
+
+        snapshot = _store().record("s1", "u1", SQL, ROWS)
+        agent = self._agent()
+
+        ecodes, subquery = agent._limit_prefetched_ecodes(snapshot.key_values(), snapshot.key_subquery())
+        sql = agent._expand_ecode_placeholder(f"WHERE e.Ecode IN ({PREVIOUS_ECODES_PLACEHOLDER})", ecodes, subquery)
+
+        assert subquery is None
+        assert sql == "WHERE e.Ecode IN ('1', '2', '3', '4')"
+
+    def test_large_key_list_without_subquery_is_dropped(self):
+        agent = self._agent()
+
+        with patch("app.agents.sql_agent.settings.result_snapshot_max_inline_keys", 100):
+            assert agent._limit_prefetched_ecodes([str(i) for i in range(150)], None) == (None, None)
@@ -0,0 +1,195 @@
+"""
+Unit Tests for incremental (diff-based) schema reindexing
+"""
+
+import uuid
+from unittest.mock import patch
+
+import chromadb
+import pytest
+from chromadb import EmbeddingFunction
+
+from app.rag.chroma_manager import ChromaDBManager
+from app.rag.embedding_cache import EmbeddingBatchError
+
+
+class FakeEmbeddingFunction(EmbeddingFunction):
+    """Embeds each text as a 2-dim vector and records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        return [[float(len(text)), 1.0] for text in input]
+
+
+@pytest.fixture
+def manager():
+    manager = ChromaDBManager()
+    manager.embedding_function = FakeEmbeddingFunction()
+    manager.collection = chromadb.EphemeralClient().create_collection(
+        f"sync-{uuid.uuid4().hex[:12]}", embedding_function=manager.embedding_function
+    )
+    manager._initialized = True
+    with patch("app.rag.chroma_manager.settings.embedding_provider", "sentence-transformers"):
+        yield manager
+
+
+def _sync(manager, docs, **kwargs):
+    ids = list(docs)
+    return manager.sync_schema_embeddings(
+        documents=[docs[doc_id] for doc_id in ids],
+        metadatas=[{"table_name": doc_id} for doc_id in ids],
+        ids=ids,
+        **kwargs
+    )
+
+
+class TestSchemaSync:
+    """Test that only differences are embedded and written"""
+
+    def test_first_sync_adds_everything(self, manager):
+        counts = _sync(manager, {"view_a": "A", "view_b": "BB"})
+
+        assert counts == {"added": 2, "updated": 0, "removed": 0, "skipped": 0, "failed": 0, "failed_ids": []}
+        assert manager.collection.count() == 2
+
+    def test_unchanged_documents_are_not_re_embedded(self, manager):
+        _sync(manager, {"view_a": "A", "view_b": "BB"})
+        manager.embedding_function.calls.clear()
+
+        counts = _sync(manager, {"view_a": "A", "view_b": "BB"})
+
+        assert counts == {"added": 0, "updated": 0, "removed": 0, "skipped": 2, "failed": 0, "failed_ids": []}
+        assert manager.embedding_function.calls == []
+
+    def test_changed_added_and_removed_documents(self, manager):
+        _sync(manager, {"view_a": "A", "view_b": "BB", "view_c": "CCC"})
+        manager.embedding_function.calls.clear()
+
+        counts = _sync(manager, {"view_a": "A", "view_b": "B changed", "view_d": "DDDD"})
+
+        assert counts == {"added": 1, "updated": 1, "removed": 1, "skipped": 1, "failed": 0, "failed_ids": []}
+        assert manager.embedding_function.calls == [["DDDD", "B changed"]]
+        stored = manager.collection.get(ids=["view_b"], include=["documents"])
+        assert stored["documents"] == ["B changed"]
+        assert sorted(manager.collection.get()["ids"]) == ["view_a", "view_b", "view_d"]
+
+    def test_documents_owned_by_other_indexers_are_kept(self, manager):
+        _sync(manager, {"schema_dbo.Other": "other"})
+
+        counts = _sync(manager, {"view_a": "A"}, id_prefixes=("view_", "table_"))
+
+        assert counts["removed"] == 0
+        assert "schema_dbo.Other" in manager.collection.get()["ids"]
+
+    def test_force_re_embeds_unchanged_documents(self, manager):
+        _sync(manager, {"view_a": "A"})
+
+        counts = _sync(manager, {"view_a": "A"}, force=True)
+
+        assert counts == {"added": 0, "updated": 1, "removed": 0, "skipped": 0, "failed": 0, "failed_ids": []}
+
+    def test_documents_that_fail_to_embed_are_left_for_the_next_sync(self, manager):
+        _sync(manager, {"view_a": "A", "view_b": "BB"})
+
+        def embed_all_but_poison(texts):
+            failed = [i for i, text in enumerate(texts) if "POISON" in text]
+            embeddings = [None if i in failed else [float(len(text)), 1.0] for i, text in enumerate(texts)]
+            if failed:
+                raise EmbeddingBatchError("bad input", failed_indexes=failed, embeddings=embeddings)
+            return embeddings
+
+        manager.embedding_function = embed_all_but_poison
+        counts = _sync(manager, {"view_a": "A POISON", "view_b": "BB changed", "view_c": "CCC"})
+
+        assert counts == {
+            "added": 1, "updated": 1, "removed": 0, "skipped": 0, "failed": 1, "failed_ids": ["view_a"]
+        }
+        stored = manager.collection.get(ids=["view_a", "view_b", "view_c"])
+        assert dict(zip(stored["ids"], stored["documents"])) == {"view_a": "A", "view_b": "BB changed", "view_c": "CCC"}
+
+    def test_queries_during_the_write_see_the_previous_contents(self, manager):
+        _sync(manager, {"view_a": "A", "view_b": "BB"})
+        seen_during_write = []
+
+        class QueryDuringUpsert:
+            """Collection proxy that runs a query right after the upsert is written"""
+
+            def __init__(self, inner):
+                self.inner = inner
+
+            def __getattr__(self, name):
+                return getattr(self.inner, name)
+
+            def upsert(self, **kwargs):
+                self.inner.upsert(**kwargs)
+                results = manager.query_schemas("question", n_results=10)
+                seen_during_write.append(sorted(results["documents"]))
+
+        manager.collection = QueryDuringUpsert(manager.collection)
+        _sync(manager, {"view_a": "A", "view_b": "BB changed"})
+
+        assert seen_during_write == [["A", "BB"]]
+        assert manager._sync_snapshot is None
+        assert sorted(manager.query_schemas("question", n_results=10)["documents"]) == ["A", "BB changed"]
+
+    def test_numpy_index_follows_documents_updated_in_place(self, manager, tmp_path):
+        with patch("app.rag.chroma_manager.settings.schema_retrieval_backend", "numpy"), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_path", str(tmp_path)):
+            _sync(manager, {"view_a": "old text"})
+            assert manager.query_schemas("question")["documents"] == ["old text"]
+
+            _sync(manager, {"view_a": "new text"})
+
+            assert manager.query_schemas("question")["documents"] == ["new text"]
+            # A fresh process loading the saved index sees the new text too
+            manager.vector_index = None
+            assert manager.query_schemas("question")["documents"] == ["new text"]
+
+
+class TestChangedTableEnrichment:
+    """Test that only tables whose metadata changed are sent to the LLM again"""
+
+    def _enricher(self):
+        from app.rag.schema_enricher import SchemaEnricher
+
+        enricher = SchemaEnricher.__new__(SchemaEnricher)
+        runs = iter(range(1, 100))
+        # Like the LLM, every enrichment run words the description differently
+        enricher.enrich_table = lambda table_meta: f"{table_meta['table_name']} description v{next(runs)}"
+        return enricher
+
+    def _sync_enriched(self, manager, enriched_tables):
+        return manager.sync_schema_embeddings(
+            documents=[enriched["enriched_description"] for enriched in enriched_tables],
+            metadatas=[
+                {"full_name": enriched["full_name"], "metadata_hash": enriched["metadata_hash"]}
+                for enriched in enriched_tables
+            ],
+            ids=[f"schema_{enriched['full_name']}" for enriched in enriched_tables],
+        )
+
+    def test_unchanged_tables_keep_their_description_and_embedding(self, manager):
+        enricher = self._enricher()
+        tables = [
+            {"table_name": "Employee", "full_name": "dbo.Employee", "columns": [{"name": "Ecode"}]},
+            {"table_name": "Visitor", "full_name": "dbo.Visitor", "columns": [{"name": "Id"}]},
+        ]
+        self._sync_enriched(manager, enricher.enrich_changed_tables(tables))
+
+        stored = manager.get_documents(["schema_dbo.Employee", "schema_dbo.Visitor"])
+        previous = {
+            metadata["full_name"]: (metadata["metadata_hash"], document) for document, metadata in stored.values()
+        }
+        tables[1] = {**tables[1], "columns": [{"name": "Id"}, {"name": "VisitDate"}]}
+        manager.embedding_function.calls.clear()
+
+        enriched_tables = enricher.enrich_changed_tables(tables, previous)
+        counts = self._sync_enriched(manager, enriched_tables)
+
+        assert [enriched["reused"] for enriched in enriched_tables] == [True, False]
+        assert enriched_tables[0]["enriched_description"] == "Employee description v1"
+        assert counts["updated"] == 1 and counts["skipped"] == 1
+        assert manager.embedding_function.calls == [["Visitor description v3"]]
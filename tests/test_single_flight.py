@@ -0,0 +1,150 @@
+"""
+Unit Tests for single-flight LLM call coalescing
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.tenant_sql_agent import TenantSQLAgent
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test coalescing, error propagation and cancellation"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "SELECT 1"
+
+        results = await asyncio.gather(*[flight.do("key", generate) for _ in range(5)])
+
+        assert results == ["SELECT 1"] * 5
+        assert len(calls) == 1
+        stats = flight.get_stats()
+        assert stats["executions"] == 1
+        assert stats["llm_calls_saved"] == 4
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_and_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight("test")
+
+        async def generate():
+            await asyncio.sleep(0.01)
+            return "SELECT 1"
+
+        await asyncio.gather(flight.do("a", generate), flight.do("b", generate))
+        await flight.do("a", generate)
+
+        assert flight.get_stats()["executions"] == 3
+        assert flight.get_stats()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_error_propagates_to_every_waiter(self):
+        flight = SingleFlight("test")
+
+        async def generate():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("rate limited")
+
+        results = await asyncio.gather(
+            *[flight.do("key", generate) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.get_stats()["failures"] == 1
+        # Failures are not remembered - the next call retries
+        with pytest.raises(RuntimeError):
+            await flight.do("key", generate)
+        assert flight.get_stats()["executions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        flight = SingleFlight("test")
+
+        async def generate():
+            await asyncio.sleep(0.05)
+            return "SELECT 1"
+
+        leader = asyncio.ensure_future(flight.do("key", generate))
+        follower = asyncio.ensure_future(flight.do("key", generate))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == "SELECT 1"
+        assert leader.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_shared_call_cancelled_when_all_waiters_leave(self):
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = []
+
+        async def generate():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("key", generate)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert cancelled == [True]
+        assert flight.get_stats()["in_flight"] == 0
+
+
+class TestTenantAgentCoalescing:
+    """Test that _generate_sql coalesces identical prompts"""
+
+    @pytest.mark.asyncio
+    async def test_identical_prompts_make_one_llm_call(self):
+        agent = TenantSQLAgent()
+        calls = []
+
+        async def call_llm(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            return f"SQL for {prompt}"
+
+        agent._call_sql_llm = call_llm
+
+        with patch("app.agents.tenant_sql_agent.llm_single_flight", SingleFlight("llm")):
+            results = await asyncio.gather(
+                agent._generate_sql("prompt A"),
+                agent._generate_sql("prompt A"),
+                agent._generate_sql("prompt B"),
+            )
+
+        assert results == ["SQL for prompt A", "SQL for prompt A", "SQL for prompt B"]
+        assert sorted(calls) == ["prompt A", "prompt B"]
+
+    @pytest.mark.asyncio
+    async def test_coalescing_can_be_disabled(self):
+        agent = TenantSQLAgent()
+        calls = []
+
+        async def call_llm(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.01)
+            return "SELECT 1"
+
+        agent._call_sql_llm = call_llm
+
+        with patch("app.agents.tenant_sql_agent.settings.agent_llm_coalescing", False):
+            await asyncio.gather(agent._generate_sql("prompt"), agent._generate_sql("prompt"))
+
+        assert len(calls) == 2
@@ -0,0 +1,229 @@
+"""
+Unit Tests for the per-tenant SQL result cache in front of QueryRouter
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.gateway.query_router import QueryRouter
+from app.services.sql_result_cache import (
+    SQLResultCache,
+    canonicalize_sql,
+    estimate_size,
+    referenced_tables,
+)
+
+
+def _cache(**kwargs):
+    options = dict(max_bytes=1_000_000, max_entry_bytes=100_000,
+                   volatile_ttl_seconds=30, default_ttl_seconds=300, lookup_ttl_seconds=3600)
+    options.update(kwargs)
+    return SQLResultCache(**options)
+
+
+ROWS = [{"Ecode": i, "EmpName": f"Employee {i}"} for i in range(5)]
+
+
+class TestCanonicalization:
+    """Test SQL canonicalization and table extraction"""
+
+    def test_formatting_differences_share_a_key(self):
+        a = "SELECT TOP 10 EmpName\nFROM   EmployeeMaster  -- active only\nWHERE Active = 1;"
+        b = "select top 10 EmpName from [EmployeeMaster] where Active = 1"
+
+        assert canonicalize_sql(a) == canonicalize_sql(b)
+        assert SQLResultCache.make_key(1, a) == SQLResultCache.make_key("1", b)
+
+    def test_identifier_and_alias_case_is_kept(self):
+        a = "SELECT COUNT(*) AS TotalEmployees FROM EmployeeMaster"
+        b = "SELECT count(*) AS totalemployees FROM EmployeeMaster"
+
+        # SQL Server names result columns as written, so these return different row keys
+        assert SQLResultCache.make_key(1, a) != SQLResultCache.make_key(1, b)
+        assert canonicalize_sql(a) == canonicalize_sql("select COUNT ( * ) as TotalEmployees from EmployeeMaster")
+
+    def test_string_literals_keep_case_and_tenants_are_separate(self):
+        a = "SELECT * FROM EmployeeMaster WHERE EmpName = 'John'"
+        b = "SELECT * FROM EmployeeMaster WHERE EmpName = 'JOHN'"
+
+        assert SQLResultCache.make_key(1, a) != SQLResultCache.make_key(1, b)
+        assert SQLResultCache.make_key(1, a) != SQLResultCache.make_key(2, a)
+
+    def test_referenced_tables_skip_schema_prefix_and_ctes(self):
+        sql = (
+            "WITH recent AS (SELECT Ecode FROM dbo.vw_RawPunchDetail) "
+            "SELECT e.EmpName, d.DesName FROM recent r "
+            "JOIN EmployeeMaster e ON e.Ecode = r.Ecode "
+            "LEFT JOIN [DesignationMaster] d ON d.DesCode = e.DesCode"
+        )
+
+        assert referenced_tables(sql) == {"vw_RawPunchDetail", "EmployeeMaster", "DesignationMaster"}
+
+    def test_referenced_tables_read_comma_separated_from_lists(self):
+        sql = (
+            "SELECT e.EmpName, p.PunchDateTime FROM dbo.EmployeeMaster AS e WITH (NOLOCK), "
+            "vw_RawPunchDetail p, (SELECT DesCode FROM DesignationMaster) d "
+            "WHERE e.Ecode = p.Ecode AND d.DesCode = e.DesCode"
+        )
+
+        assert referenced_tables(sql) == {"EmployeeMaster", "vw_RawPunchDetail", "DesignationMaster"}
+        assert _cache().ttl_for(sql) == 30
+
+
+class TestTTL:
+    """Test table-aware TTL selection"""
+
+    def test_table_classes(self):
+        cache = _cache()
+
+        assert cache.table_ttl("vw_RawPunchDetail") == 30
+        assert cache.table_ttl("vw_CompleteAttendanceReport") == 30
+        assert cache.table_ttl("DesignationMaster") == 3600
+        assert cache.table_ttl("DeptMaster") == 3600
+        assert cache.table_ttl("EmployeeMaster") == 300
+
+    def test_access_control_and_employee_views_are_not_lookups(self):
+        cache = _cache()
+
+        # Written by the chatbot's grant / revoke / blacklist actions
+        assert cache.table_ttl("View_Employee_Terminal_Authentication_Relation") == 30
+        assert cache.table_ttl("Employee_Terminal_Authentication_Relation") == 30
+        assert cache.table_ttl("vw_EmployeeMaster_Vms") == 300
+        assert cache.table_ttl("TerminalMaster") == 3600
+
+    def test_statement_uses_shortest_table_ttl(self):
+        cache = _cache()
+
+        assert cache.ttl_for("SELECT * FROM DesignationMaster") == 3600
+        assert cache.ttl_for(
+            "SELECT d.DesName, COUNT(*) FROM vw_RawPunchDetail p "
+            "JOIN DesignationMaster d ON d.DesCode = p.DesCode GROUP BY d.DesName"
+        ) == 30
+        assert cache.ttl_for("SELECT GETDATE()") == 30
+
+    def test_volatile_entry_expires_before_lookup_entry(self):
+        cache = _cache()
+        cache.set(1, "SELECT * FROM vw_RawPunchDetail", ROWS)
+        cache.set(1, "SELECT * FROM DesignationMaster", ROWS)
+
+        with patch("app.services.sql_result_cache.time.time", return_value=time.time() + 60):
+            assert cache.get(1, "SELECT * FROM vw_RawPunchDetail") is None
+            assert cache.get(1, "SELECT * FROM DesignationMaster") == ROWS
+
+        assert cache.get_stats()["expirations"] == 1
+
+
+class TestGetSet:
+    """Test hits, row limits, byte budget and invalidation"""
+
+    def test_hit_after_set(self):
+        cache = _cache()
+        sql = "SELECT Ecode, EmpName FROM EmployeeMaster"
+
+        assert cache.get(1, sql) is None
+        assert cache.set(1, sql, ROWS)
+        assert cache.get(1, "select Ecode,  EmpName\nfrom EmployeeMaster;") == ROWS
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_truncated_entry_does_not_serve_a_larger_limit(self):
+        cache = _cache()
+        sql = "SELECT Ecode FROM EmployeeMaster"
+        cache.set(1, sql, ROWS, max_rows=5)
+
+        assert cache.get(1, sql, max_rows=10) is None
+        assert cache.get(1, sql, max_rows=3) == ROWS[:3]
+
+    def test_complete_entry_serves_any_limit(self):
+        cache = _cache()
+        sql = "SELECT Ecode FROM EmployeeMaster"
+        cache.set(1, sql, ROWS, max_rows=1000)
+
+        assert cache.get(1, sql, max_rows=10000) == ROWS
+
+    def test_non_deterministic_and_oversized_results_are_skipped(self):
+        cache = _cache(max_entry_bytes=200)
+        big = [{"Ecode": i, "EmpName": "x" * 50} for i in range(50)]
+
+        assert not cache.set(1, "SELECT TOP 1 * FROM EmployeeMaster ORDER BY NEWID()", ROWS)
+        assert not cache.set(1, "SELECT * FROM EmployeeMaster", big)
+        assert cache.get_stats()["skipped"] == 2
+
+    def test_lru_eviction_by_bytes(self):
+        size = estimate_size(ROWS)
+        cache = _cache(max_bytes=size * 2)
+        cache.set(1, "SELECT 1 FROM EmployeeMaster", ROWS)
+        cache.set(1, "SELECT 2 FROM EmployeeMaster", ROWS)
+        cache.get(1, "SELECT 1 FROM EmployeeMaster")
+
+        cache.set(1, "SELECT 3 FROM EmployeeMaster", ROWS)
+
+        assert cache.get(1, "SELECT 2 FROM EmployeeMaster") is None
+        assert cache.get(1, "SELECT 1 FROM EmployeeMaster") == ROWS
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= size * 2
+
+    def test_invalidate_single_tenant(self):
+        cache = _cache()
+        cache.set(1, "SELECT * FROM EmployeeMaster", ROWS)
+        cache.set(2, "SELECT * FROM EmployeeMaster", ROWS)
+
+        assert cache.invalidate(1) == 1
+        assert cache.get(1, "SELECT * FROM EmployeeMaster") is None
+        assert cache.get(2, "SELECT * FROM EmployeeMaster") == ROWS
+
+
+class TestQueryRouterCaching:
+    """Test result caching inside QueryRouter.execute_query"""
+
+    @pytest.fixture
+    def router(self):
+        router = QueryRouter()
+        router._should_use_gateway = MagicMock(return_value=False)
+        router._execute_direct = MagicMock(return_value=ROWS)
+        return router
+
+    @pytest.fixture
+    def tenant_db(self):
+        return SimpleNamespace(id="db-1", name="Oryggi", connection_mode="direct_only")
+
+    @pytest.mark.asyncio
+    async def test_repeated_statement_hits_database_once(self, router, tenant_db):
+        with patch("app.gateway.query_router.sql_result_cache", _cache()):
+            first = await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster")
+            second = await router.execute_query(tenant_db, "select *  from [DesignationMaster]")
+
+        assert first == second == ROWS
+        assert router._execute_direct.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_bypass_and_params_go_to_database(self, router, tenant_db):
+        cache = _cache()
+        with patch("app.gateway.query_router.sql_result_cache", cache):
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster")
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster", bypass_cache=True)
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster WHERE DesCode = :c",
+                                       params={"c": 1})
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster WHERE DesCode = :c",
+                                       params={"c": 1})
+
+        assert router._execute_direct.call_count == 4
+        assert cache.get_stats()["bypasses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_is_audited(self, router, tenant_db):
+        router.audit_cached_read = MagicMock()
+        with patch("app.gateway.query_router.sql_result_cache", _cache()):
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster", user_id="u-1")
+            router.audit_cached_read.assert_not_called()
+            await router.execute_query(tenant_db, "SELECT * FROM DesignationMaster",
+                                       user_id="u-2", conversation_id="c-2")
+
+        router.audit_cached_read.assert_called_once_with(
+            "db-1", "SELECT * FROM DesignationMaster", len(ROWS), "u-2", "c-2"
+        )
@@ -0,0 +1,147 @@
+"""
+Unit Tests for the SQL template registry
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.sql_template_registry import SQLTemplateRegistry, HAS_YAML
+
+
+def _template(name, keywords, **extra):
+    template = {
+        "name": name,
+        "keywords": keywords,
+        "conditions": [f"t.Kind = '{name}'"],
+        "sql": "SELECT * FROM t WHERE {conditions}",
+        "tables": ["t"],
+    }
+    template.update(extra)
+    return template
+
+
+@pytest.fixture
+def registry():
+    registry = SQLTemplateRegistry(path="unused.json")
+    registry.load_templates([
+        _template(
+            "face_access",
+            ["face access", "who has face"],
+            parameters={
+                "domain": {
+                    "patterns": [r"on\s+(\w+)\s+devices?", r"at\s+(\w+)"],
+                    "exclude": ["the", "all"],
+                    "condition": "v.DomainName LIKE '%{value}%'",
+                },
+                "role": {"choices": [
+                    {"keywords": ["student"], "condition": "e.AccessType = 'Student'"},
+                ]},
+            },
+            conditions=["v.AuthenticationID = 7", "{domain}", "{role}", "e.Active = 1"],
+        ),
+        _template("finger_access", ["finger access"]),
+        _template("card_access", ["card and finger"]),
+    ])
+    return registry
+
+
+class TestSQLTemplateRegistry:
+    """Test template selection and rendering"""
+
+    def test_no_match_returns_none(self, registry):
+        assert registry.match("How many active employees are there?") is None
+
+    def test_renders_parameters_in_condition_order(self, registry):
+        result = registry.match("Which students have face access on SUBWAY devices?")
+
+        assert result["template_used"] == "face_access"
+        assert result["sql_query"] == (
+            "SELECT * FROM t WHERE v.AuthenticationID = 7\n"
+            "    AND v.DomainName LIKE '%SUBWAY%'\n"
+            "    AND e.AccessType = 'Student'\n"
+            "    AND e.Active = 1"
+        )
+
+    def test_excluded_capture_falls_through_to_next_pattern(self, registry):
+        result = registry.match("Who has face access on the devices at MAINGATE")
+
+        assert "LIKE '%MAINGATE%'" in result["sql_query"]
+
+    def test_captured_quotes_are_escaped(self):
+        registry = SQLTemplateRegistry(path="unused.json")
+        registry.load_templates([_template("face_access", ["face access"], parameters={
+            "domain": {"patterns": [r"on\s+(.+?)\s+devices"], "condition": "v.DomainName LIKE '%{value}%'"},
+        }, conditions=["{domain}"])])
+
+        result = registry.match("face access on X' OR 1=1 -- devices")
+
+        assert result["sql_query"] == "SELECT * FROM t WHERE v.DomainName LIKE '%X'' OR 1=1 --%'"
+
+    def test_unmatched_parameters_are_dropped(self, registry):
+        result = registry.match("who has face access")
+
+        assert "DomainName" not in result["sql_query"]
+        assert "AccessType" not in result["sql_query"]
+
+    def test_overlapping_keywords_respect_priority(self, registry):
+        # "card and finger access" contains both "card and finger" and the
+        # overlapping, higher-priority "finger access"
+        assert registry.match("card and finger access users")["template_used"] == "finger_access"
+
+    def test_prefix_keyword_keeps_its_priority(self):
+        registry = SQLTemplateRegistry(path="unused.json")
+        registry.load_templates([
+            _template("short", ["face"]),
+            _template("long", ["face access"]),
+        ])
+
+        assert registry.find_template("face access list").name == "short"
+
+    def test_loads_json_file(self, tmp_path):
+        path = tmp_path / "templates.json"
+        path.write_text(json.dumps({"templates": [_template("card_access", ["card access"])]}))
+
+        registry = SQLTemplateRegistry(path=str(path))
+
+        assert registry.match("employees with card access")["tables_referenced"] == ["t"]
+        assert registry.get_stats()["matches"] == 1
+
+    @pytest.mark.skipif(not HAS_YAML, reason="PyYAML not installed")
+    def test_loads_yaml_file(self, tmp_path):
+        import yaml
+
+        path = tmp_path / "templates.yaml"
+        path.write_text(yaml.safe_dump({"templates": [_template("card_access", ["card access"])]}))
+
+        registry = SQLTemplateRegistry(path=str(path))
+
+        assert registry.match("card access report")["template_used"] == "card_access"
+
+    def test_missing_file_matches_nothing(self, tmp_path):
+        registry = SQLTemplateRegistry(path=str(tmp_path / "missing.json"))
+
+        assert registry.match("who has face access") is None
+
+
+class TestTenantAgentTemplates:
+    """Test which tenants get the template fast path"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("db_type, uses_template", [("mssql", True), ("postgresql", False)])
+    async def test_templates_only_serve_sql_server_tenants(
+        self, registry, stub_agent, agent_dependencies, make_tenant_database, db_type, uses_template
+    ):
+        execute = AsyncMock(return_value=[])
+
+        with agent_dependencies(execute=execute), \
+             patch("app.agents.tenant_sql_agent.sql_template_registry", registry):
+            result = await stub_agent.process_query(
+                question="Who has face access?", tenant_database=make_tenant_database(db_type=db_type),
+                platform_db=MagicMock(),
+            )
+
+        assert result["success"] is True
+        assert (stub_agent._generate_sql.await_count == 0) is uses_template
+        assert ("AuthenticationID = 7" in execute.await_args.kwargs["query"]) is uses_template
@@ -0,0 +1,224 @@
+"""
+Unit Tests for the offline SQL pre-flight validator
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.tenant_sql_agent import TenantSQLAgent
+from app.services.llm_router import LLMResponse
+from app.services.sql_validator import SQLCatalog, SQLValidationError, SQLValidator
+
+
+@pytest.fixture
+def catalog():
+    catalog = SQLCatalog(complete=True)
+    catalog.add("vw_EmployeeMaster_Vms", ["Ecode", "CorpEmpCode", "EmpName", "Dname", "Active", "DateofJoin"])
+    catalog.add("MachineMaster", ["MachineID", "IPAddress", "MachineName"])
+    catalog.add("EmployeeMaster")   # columns unknown
+    return catalog
+
+
+@pytest.fixture
+def validator():
+    return SQLValidator("/nonexistent/catalog.json")
+
+
+def codes(result):
+    return [issue.code for issue in result.errors]
+
+
+class TestStatementChecks:
+    """Test read-only single-statement enforcement"""
+
+    @pytest.mark.parametrize("sql,code", [
+        ("DELETE FROM EmployeeMaster WHERE Ecode = 1", "not_select"),
+        ("SELECT 1; DROP TABLE EmployeeMaster", "multiple_statements"),
+        ("SELECT EmpName INTO #tmp FROM vw_EmployeeMaster_Vms", "forbidden_keyword"),
+        ("  -- just a comment", "empty"),
+    ])
+    def test_rejects_non_select(self, validator, catalog, sql, code):
+        assert code in codes(validator.validate(sql, catalog))
+
+    def test_keywords_inside_strings_and_comments_are_ignored(self, validator, catalog):
+        sql = "SELECT EmpName FROM dbo.vw_EmployeeMaster_Vms WHERE Dname = 'DELETE; DROP' -- UPDATE"
+
+        assert validator.validate(sql, catalog).is_valid
+
+
+class TestCatalogChecks:
+    """Test table and column resolution"""
+
+    def test_unknown_table_with_suggestion(self, validator, catalog):
+        result = validator.validate("SELECT * FROM dbo.vw_EmployeeMaster_VMS2", catalog)
+
+        assert codes(result) == ["unknown_table"]
+        assert result.errors[0].suggestions[0] == "vw_EmployeeMaster_Vms"
+
+    def test_unknown_table_allowed_by_incomplete_catalog(self, validator):
+        partial = SQLCatalog()
+        partial.add("EmployeeMaster")
+
+        assert validator.validate("SELECT * FROM dbo.SomeCustomView", partial).is_valid
+
+    def test_unknown_qualified_column_and_alias(self, validator, catalog):
+        sql = """SELECT e.EmpName, e.Department, m.IPAddress, x.Foo
+                 FROM dbo.vw_EmployeeMaster_Vms e JOIN MachineMaster AS m ON m.MachineID = e.Ecode"""
+
+        result = validator.validate(sql, catalog)
+
+        assert codes(result) == ["unknown_column", "unknown_alias"]
+        assert result.errors[0].identifier == "Department"
+        assert result.errors[1].identifier == "x"
+
+    def test_bare_columns_checked_for_single_source(self, validator, catalog):
+        result = validator.validate(
+            "SELECT EmpNme, COUNT(*) Total FROM dbo.vw_EmployeeMaster_Vms WHERE Active = 1 GROUP BY EmpNme", catalog
+        )
+
+        assert codes(result) == ["unknown_column"]
+        assert result.errors[0].suggestions[0] == "EmpName"
+        assert "did you mean: EmpName" in result.to_prompt()
+
+    def test_aliases_functions_and_date_parts_are_not_columns(self, validator, catalog):
+        sql = """SELECT TOP 10 Dname, COUNT(*) AS EmployeeCount, Joined = MIN(DateofJoin),
+                        CAST(DateofJoin AS DATE) JoinDate
+                 FROM [dbo].[vw_EmployeeMaster_Vms] WITH (NOLOCK)
+                 WHERE Active = 1 AND DateofJoin >= DATEADD(day, -30, GETDATE())
+                 GROUP BY Dname, DateofJoin ORDER BY EmployeeCount DESC"""
+
+        assert validator.validate(sql, catalog).is_valid
+
+    def test_case_alias_without_as_and_niladic_functions_are_not_columns(self, validator, catalog):
+        sql = """SELECT EmpName, CASE WHEN Active = 1 THEN 'Active' ELSE 'Inactive' END Status,
+                        CURRENT_TIMESTAMP, CURRENT_USER, SYSTEM_USER
+                 FROM vw_EmployeeMaster_Vms"""
+
+        assert validator.validate(sql, catalog).is_valid
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT Dname, COUNT(*) total FROM vw_EmployeeMaster_Vms GROUP BY Dname ORDER BY total DESC",
+        "SELECT TOP 5 EmpName Name FROM vw_EmployeeMaster_Vms ORDER BY Name",
+        "SELECT Ecode, CASE WHEN Active = 1 THEN 'Active' ELSE 'Inactive' END Status "
+        "FROM vw_EmployeeMaster_Vms ORDER BY Status",
+    ])
+    def test_implicit_aliases_can_be_referenced(self, validator, catalog, sql):
+        assert validator.validate(sql, catalog).is_valid
+
+    def test_top_argument_and_qualified_columns_are_not_aliases(self, validator, catalog):
+        result = validator.validate("SELECT TOP 5 EmpNme FROM vw_EmployeeMaster_Vms ORDER BY EmpNme", catalog)
+        assert codes(result) == ["unknown_column"]
+
+        result = validator.validate(
+            "SELECT v.Ecode, v.EmpNme FROM vw_EmployeeMaster_Vms v ORDER BY EmpNme", catalog
+        )
+        assert "unknown_column" in codes(result)
+
+    def test_unknown_columns_not_checked(self, validator, catalog):
+        sql = "WITH recent AS (SELECT Ecode FROM EmployeeMaster) SELECT r.Ecode, r.Anything FROM recent r"
+
+        assert validator.validate(sql, catalog).is_valid
+        assert validator.validate("SELECT Whatever FROM EmployeeMaster", catalog).is_valid
+
+
+class TestCatalogCompleteness:
+    """Only a tenant's own SchemaCache makes unknown tables an error"""
+
+    @staticmethod
+    def _platform_db(records):
+        platform_db = MagicMock()
+        platform_db.query.return_value.filter.return_value.all.return_value = records
+        return platform_db
+
+    def test_reference_catalog_allows_other_tenants_tables(self):
+        validator = SQLValidator("./data/database_analysis.json")
+
+        assert not validator.base_catalog.complete
+        assert validator.validate("SELECT TOP 5 * FROM dbo.Customers").is_valid
+
+    def test_tenant_without_schema_cache_uses_incomplete_catalog(self, validator):
+        catalog = validator.tenant_catalog(self._platform_db([]), "tenant-db")
+
+        assert not catalog.complete
+        assert validator.validate("SELECT TOP 5 * FROM dbo.Customers", catalog).is_valid
+
+    def test_tenant_schema_cache_makes_catalog_complete(self, validator):
+        records = [SimpleNamespace(table_name="Customers", column_info='[{"name": "CustomerID"}]')]
+        catalog = validator.tenant_catalog(self._platform_db(records), "tenant-db")
+
+        assert catalog.complete
+        assert validator.validate("SELECT CustomerID FROM dbo.Customers", catalog).is_valid
+        assert codes(validator.validate("SELECT * FROM dbo.Orders", catalog)) == ["unknown_table"]
+
+
+class TestTenantAgentPreflight:
+    """Test the agent's validate -> single repair -> reject flow"""
+
+    @pytest.fixture
+    def agent(self, catalog):
+        agent = TenantSQLAgent()
+        agent._run_blocking = AsyncMock(return_value=catalog)
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_valid_sql_makes_no_repair_call(self, agent):
+        agent._generate_sql = AsyncMock()
+
+        with patch("app.agents.tenant_sql_agent.sql_validator", SQLValidator("/nonexistent")):
+            sql = await agent._preflight_sql("prompt", "SELECT EmpName FROM vw_EmployeeMaster_Vms", MagicMock(), MagicMock())
+
+        assert sql == "SELECT EmpName FROM vw_EmployeeMaster_Vms"
+        agent._generate_sql.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_invalid_sql_is_repaired_once(self, agent):
+        agent._generate_sql = AsyncMock(return_value=LLMResponse("SELECT EmpName FROM vw_EmployeeMaster_Vms", "gemini"))
+        validator = SQLValidator("/nonexistent")
+
+        with patch("app.agents.tenant_sql_agent.sql_validator", validator):
+            sql = await agent._preflight_sql("prompt", "SELECT EmpNme FROM vw_EmployeeMaster_Vms", MagicMock(), MagicMock())
+
+        assert sql == "SELECT EmpName FROM vw_EmployeeMaster_Vms"
+        repair_prompt = agent._generate_sql.await_args.args[0]
+        assert "Column 'EmpNme' does not exist" in repair_prompt
+        assert validator.get_stats()["repaired"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_repair_raises_without_execution(self, agent):
+        agent._generate_sql = AsyncMock(return_value=LLMResponse("UPDATE EmployeeMaster SET Active = 0", "gemini"))
+        validator = SQLValidator("/nonexistent")
+
+        with patch("app.agents.tenant_sql_agent.sql_validator", validator):
+            with pytest.raises(SQLValidationError) as exc_info:
+                await agent._preflight_sql("prompt", "SELECT EmpNme FROM vw_EmployeeMaster_Vms", MagicMock(), MagicMock())
+
+        assert exc_info.value.result.errors[0].code == "not_select"
+        assert validator.get_stats()["gateway_executions_prevented"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reference_catalog_errors_are_only_logged(self, agent):
+        reference = SQLCatalog()
+        reference.add("vw_EmployeeMaster_Vms", ["Ecode", "EmpName"])
+        agent._run_blocking = AsyncMock(return_value=reference)
+        agent._generate_sql = AsyncMock()
+        validator = SQLValidator("/nonexistent")
+
+        with patch("app.agents.tenant_sql_agent.sql_validator", validator):
+            sql = await agent._preflight_sql("prompt", "SELECT Region FROM vw_EmployeeMaster_Vms", MagicMock(), MagicMock())
+
+        assert sql == "SELECT Region FROM vw_EmployeeMaster_Vms"
+        agent._generate_sql.assert_not_called()
+        assert validator.get_stats()["gateway_executions_prevented"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_catalog_repair_runs_original_sql(self, agent):
+        agent._generate_sql = AsyncMock(return_value=LLMResponse("SELECT EmpNam FROM vw_EmployeeMaster_Vms", "gemini"))
+        validator = SQLValidator("/nonexistent")
+
+        with patch("app.agents.tenant_sql_agent.sql_validator", validator):
+            sql = await agent._preflight_sql("prompt", "SELECT EmpNme FROM vw_EmployeeMaster_Vms", MagicMock(), MagicMock())
+
+        assert sql == "SELECT EmpNme FROM vw_EmployeeMaster_Vms"
+        assert validator.get_stats()["failed_open"] == 1
@@ -0,0 +1,189 @@
+"""
+Concurrency Tests for TenantSQLAgent
+Verifies that process_query never blocks the event loop, so N parallel
+/mt/query requests finish in roughly one LLM latency instead of N.
+"""
+
+import asyncio
+import functools
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+LLM_LATENCY = 0.3
+RETRIEVAL_LATENCY = 0.05
+PARALLEL_REQUESTS = 8
+
+
+async def _slow_openrouter(prompt):
+    await asyncio.sleep(LLM_LATENCY)
+    return "SELECT COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active = 1"
+
+
+def _blocking_openrouter(prompt):
+    time.sleep(LLM_LATENCY)
+    return "SELECT COUNT(*) FROM vw_EmployeeMaster_Vms WHERE Active = 1"
+
+
+def _blocking_execute_direct(tenant_database, query, params):
+    time.sleep(RETRIEVAL_LATENCY)
+    return [{"count": 42}]
+
+
+def _blocking_schema_context(question, n_results=10, embedding_context=None):
+    time.sleep(RETRIEVAL_LATENCY)
+    return []
+
+
+def _blocking_fewshots(question, n_results=5, embedding_context=None):
+    time.sleep(RETRIEVAL_LATENCY)
+    return []
+
+
+@pytest.fixture
+def agent(stub_agent):
+    """Agent with retrieval replaced by blocking stubs and a slow LLM"""
+    agent = stub_agent
+    # Use the real _generate_sql so the provider call is on the critical path
+    del agent._generate_sql
+    agent.llm_provider = "openrouter"
+    agent.openrouter_model = "test-model"
+    agent._generate_sql_openrouter = _slow_openrouter
+    agent._get_global_schema_context = _blocking_schema_context
+    agent._get_global_fewshots = _blocking_fewshots
+    return agent
+
+
+class TestTenantSQLAgentConcurrency:
+    """Parallel requests must overlap rather than serialize"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_queries_complete_in_one_llm_latency(self, agent, agent_dependencies,
+                                                                 make_tenant_database):
+        logging_service = MagicMock()
+        logging_service.log_query.side_effect = lambda **kwargs: time.sleep(0.02) or "req-1"
+        logging_service.update_query_result.side_effect = lambda **kwargs: time.sleep(0.02) or True
+
+        with agent_dependencies(execute=AsyncMock(return_value=[{"count": 42}]), logging_service=logging_service):
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                agent.process_query(
+                    question=f"How many active employees are in building {i}",
+                    tenant_database=make_tenant_database(),
+                    platform_db=MagicMock(),
+                )
+                for i in range(PARALLEL_REQUESTS)
+            ])
+            elapsed = time.perf_counter() - start
+
+        assert all(r["success"] for r in results)
+        serial_time = PARALLEL_REQUESTS * (LLM_LATENCY + 2 * RETRIEVAL_LATENCY)
+        # Allow generous headroom over a single pipeline latency, but far below serial
+        assert elapsed < serial_time / 3, f"took {elapsed:.2f}s, serial would be {serial_time:.2f}s"
+
+    @pytest.mark.asyncio
+    async def test_parallel_queries_overlap_with_blocking_stages(self, agent, agent_dependencies,
+                                                                  make_tenant_database):
+        """Blocking (sync) LLM, logging and pyodbc calls run off the loop and overlap"""
+        # A sync provider SDK call goes through the agent's bounded executor
+        agent._generate_sql_openrouter = lambda prompt: agent._run_blocking(_blocking_openrouter, prompt)
+        logging_service = MagicMock()
+        logging_service.log_query.side_effect = lambda **kwargs: time.sleep(0.02) or "req-1"
+        logging_service.update_query_result.side_effect = lambda **kwargs: time.sleep(0.02) or True
+
+        with agent_dependencies(logging_service=logging_service), \
+             patch("app.gateway.query_router.sql_result_cache.enabled", False), \
+             patch("app.gateway.query_router.query_router._should_use_gateway", return_value=False), \
+             patch("app.gateway.query_router.query_router._execute_direct", side_effect=_blocking_execute_direct):
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                agent.process_query(
+                    question=f"How many active employees are in building {i}",
+                    tenant_database=make_tenant_database(),
+                    platform_db=MagicMock(),
+                )
+                for i in range(PARALLEL_REQUESTS)
+            ])
+            elapsed = time.perf_counter() - start
+
+        assert all(r["success"] for r in results)
+        serial_time = PARALLEL_REQUESTS * (LLM_LATENCY + 3 * RETRIEVAL_LATENCY)
+        assert elapsed < serial_time / 3, f"took {elapsed:.2f}s, serial would be {serial_time:.2f}s"
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive_during_llm_call(self, agent, agent_dependencies, tenant_database):
+        """A heartbeat-like coroutine keeps ticking while a query is in flight"""
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        with agent_dependencies(execute=AsyncMock(return_value=[])):
+            beat = asyncio.create_task(heartbeat())
+            await agent.process_query(
+                question="How many active employees",
+                tenant_database=tenant_database,
+                platform_db=MagicMock(),
+            )
+            beat.cancel()
+
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        assert max(gaps) < LLM_LATENCY / 2
+
+
+class TestSpeculativeRetrieval:
+    """Retrieval overlaps the clarity check and is discarded when clarification is needed"""
+
+    CLARITY_LATENCY = 0.2
+
+    async def _slow_clarity(self, question, conversation_history=None, needs_clarification=False):
+        await asyncio.sleep(self.CLARITY_LATENCY)
+        if needs_clarification:
+            return {
+                "needs_clarification": True,
+                "clarification_question": "Which building?",
+                "clarification_options": ["A", "B"],
+            }
+        return {"needs_clarification": False}
+
+    @pytest.mark.asyncio
+    async def test_critical_path_is_max_not_sum(self, agent, agent_dependencies, tenant_database):
+        agent._check_light_clarity = self._slow_clarity
+
+        with agent_dependencies(execute=AsyncMock(return_value=[]), agent_speculative_retrieval=True):
+            result = await agent.process_query(
+                question="How many active employees",
+                tenant_database=tenant_database,
+                platform_db=MagicMock(),
+            )
+
+        timings = result["timings"]
+        assert result["success"]
+        assert timings["clarity_ms"] >= self.CLARITY_LATENCY * 1000 * 0.9
+        assert "schema_retrieval_ms" in timings and "fewshot_retrieval_ms" in timings
+        # Clarity and retrieval overlap: pre-LLM time is close to the clarity check alone
+        sequential_ms = (self.CLARITY_LATENCY + 2 * RETRIEVAL_LATENCY) * 1000
+        assert timings["pre_llm_ms"] < sequential_ms - RETRIEVAL_LATENCY * 1000
+
+    @pytest.mark.asyncio
+    async def test_retrieval_discarded_when_clarification_needed(self, agent, tenant_database):
+        agent._check_light_clarity = functools.partial(self._slow_clarity, needs_clarification=True)
+        agent._generate_sql = AsyncMock()
+
+        with patch("app.agents.tenant_sql_agent.settings.agent_speculative_retrieval", True):
+            result = await agent.process_query(
+                question="Show me stuff",
+                tenant_database=tenant_database,
+                platform_db=MagicMock(),
+            )
+
+        assert result["needs_clarification"] is True
+        assert result["sql_query"] is None
+        assert "pre_llm_ms" not in result["timings"]
+        agent._generate_sql.assert_not_called()
@@ -0,0 +1,192 @@
+"""
+Unit Tests for the in-process NumPy vector index
+"""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.rag.vector_index import NumpyVectorIndex, UnsupportedFilterError, corpus_fingerprint
+
+
+def _index(docs=40, dim=16, seed=7):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((docs, dim)).astype(np.float32) * 3
+    ids = [f"doc_{n}" for n in range(docs)]
+    metadatas = [{"type": "view" if n % 4 == 0 else "table", "rank": n % 3} for n in range(docs)]
+    return NumpyVectorIndex.build(ids, [f"text {n}" for n in range(docs)], metadatas, embeddings), embeddings
+
+
+def _exact_top_k(embeddings, query, k, allowed=None):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    order = [int(i) for i in np.argsort(-scores) if allowed is None or i in allowed]
+    return [f"doc_{i}" for i in order[:k]]
+
+
+class TestQuery:
+    """Test exact top-k and distances"""
+
+    def test_top_k_matches_exact_cosine_ranking(self):
+        index, embeddings = _index()
+        query = embeddings[5] + 0.5
+
+        results = index.query(query, n_results=5)
+
+        assert results["ids"] == _exact_top_k(embeddings, query, 5)
+        assert results["distances"] == sorted(results["distances"])
+
+    def test_distances_are_squared_l2_of_unit_vectors(self):
+        index, embeddings = _index()
+
+        results = index.query(embeddings[3] * 10, n_results=1)
+
+        assert results["ids"] == ["doc_3"]
+        assert results["distances"][0] == pytest.approx(0.0, abs=1e-5)
+
+    def test_n_results_larger_than_corpus(self):
+        index, _ = _index(docs=3)
+
+        assert len(index.query([1.0] * 16, n_results=10)["ids"]) == 3
+
+
+class TestFilters:
+    """Test Chroma-style where filters"""
+
+    def test_equality_filter(self):
+        index, embeddings = _index()
+        query = embeddings[1]
+
+        results = index.query(query, n_results=3, where={"type": "view"})
+
+        views = {n for n in range(40) if n % 4 == 0}
+        assert results["ids"] == _exact_top_k(embeddings, query, 3, allowed=views)
+        assert all(metadata["type"] == "view" for metadata in results["metadatas"])
+
+    def test_operators_and_boolean_combinations(self):
+        index, embeddings = _index()
+        where = {"$or": [{"type": {"$eq": "view"}}, {"rank": {"$in": [1]}}], "type": {"$ne": "missing"}}
+
+        results = index.query(embeddings[0], n_results=40, where=where)
+
+        expected = {f"doc_{n}" for n in range(40) if n % 4 == 0 or n % 3 == 1}
+        assert set(results["ids"]) == expected
+
+    def test_filter_with_no_matches(self):
+        index, embeddings = _index()
+
+        assert index.query(embeddings[0], where={"type": "procedure"})["ids"] == []
+
+    def test_unsupported_operator_raises(self):
+        index, embeddings = _index()
+
+        with pytest.raises(UnsupportedFilterError):
+            index.query(embeddings[0], where={"rank": {"$gt": 1}})
+
+
+class TestPersistence:
+    """Test save / memory-mapped load"""
+
+    def test_saved_index_loads_memory_mapped(self, tmp_path):
+        index, embeddings = _index()
+        index.fingerprint = "abc"
+        index.save(str(tmp_path))
+
+        loaded = NumpyVectorIndex.load(str(tmp_path))
+
+        assert isinstance(loaded.matrix, np.memmap)
+        assert loaded.fingerprint == "abc"
+        assert loaded.query(embeddings[9], n_results=4) == index.query(embeddings[9], n_results=4)
+
+    def test_missing_or_truncated_index_is_not_loaded(self, tmp_path):
+        assert NumpyVectorIndex.load(str(tmp_path)) is None
+
+        _index()[0].save(str(tmp_path))
+        with open(tmp_path / "vectors.f32", "r+b") as f:
+            f.truncate(100)
+        assert NumpyVectorIndex.load(str(tmp_path)) is None
+
+    def test_matrix_from_another_save_is_not_loaded(self, tmp_path):
+        _index(seed=1)[0].save(str(tmp_path))
+        old_vectors = (tmp_path / "vectors.f32").read_bytes()
+        _index(seed=2)[0].save(str(tmp_path))
+
+        # A reader between the two replaces of a save sees the new sidecar with the old matrix
+        (tmp_path / "vectors.f32").write_bytes(old_vectors)
+
+        assert NumpyVectorIndex.load(str(tmp_path)) is None
+
+    def test_fingerprint_depends_on_ids_and_model(self):
+        assert corpus_fingerprint(["a", "b"], "m") == corpus_fingerprint(["b", "a"], "m")
+        assert corpus_fingerprint(["a", "b"], "m") != corpus_fingerprint(["a"], "m")
+        assert corpus_fingerprint(["a"], "m") != corpus_fingerprint(["a"], "other")
+
+    def test_fingerprint_depends_on_contents(self):
+        assert corpus_fingerprint(["a", "b"], "m", ["x", "y"]) == corpus_fingerprint(["b", "a"], "m", ["y", "x"])
+        assert corpus_fingerprint(["a"], "m", ["old"]) != corpus_fingerprint(["a"], "m", ["new"])
+
+
+class TestChromaManagerBackend:
+    """ChromaDBManager serves queries from the in-process index when configured"""
+
+    def _manager(self):
+        from app.rag.chroma_manager import ChromaDBManager
+
+        manager = ChromaDBManager()
+        manager._initialized = True
+        manager.embedding_function = lambda texts: [[1.0, 0.0] for _ in texts]
+        manager.collection = MagicMock()
+        manager.collection.get.return_value = {
+            "ids": ["a", "b"],
+            "documents": ["doc a", "doc b"],
+            "metadatas": [{"type": "view"}, {"type": "table"}],
+            "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+        }
+        return manager
+
+    def test_numpy_backend_builds_index_and_skips_chroma_query(self, tmp_path):
+        manager = self._manager()
+
+        with patch("app.rag.chroma_manager.settings.schema_retrieval_backend", "numpy"), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_path", str(tmp_path)):
+            results = manager.query_schemas("employees", n_results=1)
+
+        assert results["documents"] == ["doc a"]
+        manager.collection.query.assert_not_called()
+        assert (tmp_path / "vectors.f32").exists()
+
+    def test_index_is_invalidated_when_collection_changes(self, tmp_path):
+        manager = self._manager()
+
+        with patch("app.rag.chroma_manager.settings.schema_retrieval_backend", "numpy"), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_path", str(tmp_path)):
+            manager.query_schemas("employees")
+            manager.add_schema_embeddings(["doc c"], [{"type": "view"}], ["c"])
+
+        assert manager.vector_index is None
+
+    def test_reindex_by_another_worker_is_picked_up(self, tmp_path):
+        manager = self._manager()
+
+        with patch("app.rag.chroma_manager.settings.schema_retrieval_backend", "numpy"), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_path", str(tmp_path)), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_check_seconds", 30):
+            manager.query_schemas("employees", n_results=1)
+            # Another process rewrites document "a" in the shared collection
+            manager.collection.get.return_value = dict(manager.collection.get.return_value, documents=["new a", "doc b"])
+
+            assert manager.query_schemas("employees", n_results=1)["documents"] == ["doc a"]
+            manager._vector_index_checked_at -= 31
+            assert manager.query_schemas("employees", n_results=1)["documents"] == ["new a"]
+
+    def test_unsupported_filter_falls_back_to_chroma(self, tmp_path):
+        manager = self._manager()
+        manager.collection.query.return_value = {"documents": [["doc b"]], "metadatas": [[{}]], "distances": [[0.5]]}
+
+        with patch("app.rag.chroma_manager.settings.schema_retrieval_backend", "numpy"), \
+                patch("app.rag.chroma_manager.settings.schema_vector_index_path", str(tmp_path)):
+            results = manager.query_schemas("employees", filter_metadata={"rank": {"$gt": 1}})
+
+        assert results["documents"] == ["doc b"]
+        manager.collection.query.assert_called_once()